@@ -0,0 +1,190 @@
+"""Measure how long the server takes to answer an MCP client that has just spawned it.
+
+Usage:
+    uv run python benchmarks/startup.py [--runs 10] [--output results.json] [--compare baseline.json]
+
+Every run starts ``python -m mcp_omnifocus`` with the stdio transport, as MCP clients do for each session,
+and times from the spawn:
+
+    initialize_ms   until the response to the initialize request, i.e. the time-to-ready
+    tools_list_ms   until the response to the tools/list request sent right after it
+
+Separate processes time the imports of the same runs:
+
+    import_ms        importing mcp_omnifocus.server
+    import_floor_ms  importing FastMCP and typer, which the server cannot start without
+
+No script is run in OmniFocus, so the benchmark runs on any system. Reported times are medians over the runs.
+With ``--profile`` the results also list the modules that take longest to import with the server, from
+``python -X importtime``, to find what to defer when a regression shows up.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+# Metrics whose growth is a regression
+COMPARED = ("initialize_ms", "tools_list_ms", "import_ms")
+
+_INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2025-06-18",
+        "capabilities": {},
+        "clientInfo": {"name": "startup-benchmark", "version": "1"},
+    },
+}
+_INITIALIZED = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+_TOOLS_LIST = {"jsonrpc": "2.0", "id": 2, "method": "tools/list"}
+
+
+def _send(process: subprocess.Popen, message: dict[str, Any]) -> None:
+    process.stdin.write(json.dumps(message) + "\n")
+    process.stdin.flush()
+
+
+def _response(process: subprocess.Popen, request_id: int) -> dict[str, Any]:
+    """Read messages from the server until the response to a request."""
+    for line in process.stdout:
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            return message
+    raise RuntimeError(f"The server exited before answering request {request_id}")
+
+
+def time_to_ready(env: dict[str, str]) -> dict[str, float]:
+    """Spawn the server and time its first responses in milliseconds."""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "mcp_omnifocus"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        env=env,
+    )
+    try:
+        _send(process, _INITIALIZE)
+        _response(process, 1)
+        initialized = time.perf_counter()
+        _send(process, _INITIALIZED)
+        _send(process, _TOOLS_LIST)
+        tools = _response(process, 2)["result"]["tools"]
+        listed = time.perf_counter()
+    finally:
+        process.stdin.close()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    if not tools:
+        raise RuntimeError("The server listed no tools")
+    return {"initialize_ms": (initialized - start) * 1000, "tools_list_ms": (listed - start) * 1000}
+
+
+def time_import(statements: list[str], env: dict[str, str]) -> float:
+    """Time import statements in a fresh interpreter, in milliseconds."""
+    code = (
+        "import time\nstart = time.perf_counter()\n"
+        + "".join(f"{statement}\n" for statement in statements)
+        + "print((time.perf_counter() - start) * 1000)"
+    )
+    return float(
+        subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True).stdout
+    )
+
+
+def profile_imports(env: dict[str, str], limit: int = 15) -> list[dict[str, Any]]:
+    """List the modules that take longest to import with the server, including the modules they import."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import mcp_omnifocus.server"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    ).stderr
+    modules = []
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        modules.append(
+            {"module": fields[2].strip(), "self_ms": int(fields[0]) / 1000, "cumulative_ms": int(fields[1]) / 1000}
+        )
+    return sorted(modules, key=lambda module: module["cumulative_ms"], reverse=True)[:limit]
+
+
+def run(runs: int) -> dict[str, float]:
+    """Start the server the given number of times, and return the median of every metric."""
+    # FastMCP must not look up its latest release over the network, which would time the network
+    env = {**os.environ, "FASTMCP_CHECK_FOR_UPDATES": "off"}
+    samples: dict[str, list[float]] = {}
+    for _ in range(runs):
+        timings = {
+            **time_to_ready(env),
+            "import_ms": time_import(["import mcp_omnifocus.server"], env),
+            # FastMCP defers most of its imports until FastMCP itself is imported
+            "import_floor_ms": time_import(["from fastmcp import FastMCP", "import typer"], env),
+        }
+        for metric, value in timings.items():
+            samples.setdefault(metric, []).append(value)
+    return {metric: round(statistics.median(values), 1) for metric, values in samples.items()}
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """List the metrics that grew by more than the tolerance compared to a baseline result file."""
+    regressions = []
+    for metric in COMPARED:
+        previous = baseline.get("results", {}).get(metric)
+        current = results["results"][metric]
+        if previous and current > previous * (1 + tolerance):
+            regressions.append(f"{metric} {previous} -> {current}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="Number of times the server is started")
+    parser.add_argument("--output", type=Path, help="File to write the results to")
+    parser.add_argument("--compare", type=Path, help="Previous results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed growth before a metric regresses")
+    parser.add_argument("--profile", action="store_true", help="List the slowest imports of the server")
+    args = parser.parse_args()
+
+    results = {
+        "benchmark": "startup",
+        "created": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": args.runs,
+        "results": run(args.runs),
+    }
+    if args.profile:
+        results["imports"] = profile_imports(dict(os.environ))
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        args.output.write_text(output + "\n")
+
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
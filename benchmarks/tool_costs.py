@@ -0,0 +1,291 @@
+"""Measure the cost of the OmniFocus tools against synthetic databases of increasing size.
+
+Usage:
+    uv run python benchmarks/tool_costs.py [--sizes 1000 10000 100000] [--repeat 5]
+        [--output results.json] [--compare baseline.json] [--tolerance 0.25]
+
+The scripts generated by ``mcp_omnifocus.utils.omnifocus`` are run under node against the stand-in
+object model in ``tests/fake_omnifocus.js``, which replaces ``run_jxa_script`` and ``stream_jxa_script``, so the benchmark runs
+on any system with node and without OmniFocus. For every tool and database size it reports:
+
+    latency_ms     wall time of the call, including the stand-in
+    script_ms      time spent in the stand-in, i.e. what osascript and OmniFocus would take
+    script_bytes   size of the script sent to OmniFocus
+    stdout_bytes   size of the JSON output the script hands back
+    decode_ms      time to decode that output, none for streamed output, which is decoded as it is read
+    peak_memory    peak bytes allocated by Python during the call
+
+Latencies are medians over the repeats. The stand-in is much slower than OmniFocus to start, so
+compare script_ms between runs of this benchmark rather than with real OmniFocus timings.
+
+Results are printed as JSON, and written to --output. With --compare, the latency, output size and
+memory of every tool are checked against a previous result file, and the run fails when any of them
+grew by more than the tolerance.
+"""
+
+import argparse
+import json
+import platform
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from mcp_omnifocus.utils import omnifocus, scripting
+from mcp_omnifocus.utils.cache import snapshot_cache
+from mcp_omnifocus.utils.scripting import JXAScriptError
+
+FAKE_OMNIFOCUS = Path(__file__).parent.parent / "tests" / "fake_omnifocus.js"
+
+WORDS = "buy call email plan review write fix book order pay send read draft check clean prepare".split()
+NOUNS = "milk report plumber invoice garden slides budget taxes car dentist flights agenda notes".split()
+STATUSES = ["Available"] * 6 + ["Next", "Blocked", "DueSoon", "Overdue", "Completed", "Dropped"]
+
+
+def synthetic_database(tasks: int, seed: int = 0) -> dict[str, list[dict[str, Any]]]:
+    """Generate a database with the given number of tasks, spread over projects and a tag hierarchy."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=UTC)
+
+    def date() -> str | None:
+        return (start + timedelta(days=rng.randint(0, 365))).isoformat() if rng.random() < 0.3 else None
+
+    tags = []
+    for index in range(40):
+        parent = tags[rng.randrange(len(tags))]["id"] if tags and rng.random() < 0.5 else None
+        tags.append({"id": f"tag{index}", "name": f"{rng.choice(NOUNS).title()} {index}", "parent": parent})
+
+    projects = [
+        {
+            "id": f"project{index}",
+            "name": f"{rng.choice(WORDS).title()} {rng.choice(NOUNS)} {index}",
+            "status": "Active",
+        }
+        for index in range(max(1, tasks // 50))
+    ]
+
+    records = []
+    for index in range(tasks):
+        records.append(
+            {
+                "id": f"task{index}",
+                "name": f"{rng.choice(WORDS).title()} {rng.choice(NOUNS)} {index}",
+                "note": " ".join(rng.choices(WORDS + NOUNS, k=rng.randint(0, 40))),
+                "project": rng.choice(projects)["id"] if rng.random() < 0.8 else None,
+                "status": rng.choice(STATUSES),
+                "flagged": rng.random() < 0.1,
+                "dueDate": date(),
+                "deferDate": date(),
+                "added": "2024-06-01T00:00:00+00:00",
+                "modified": "2024-06-01T00:00:00+00:00",
+                "tags": [tag["id"] for tag in rng.sample(tags, rng.randint(0, 3))],
+            }
+        )
+    return {"projects": projects, "tags": tags, "tasks": records}
+
+
+LIBRARY = re.compile(r"var (__mcpOmnifocusLibrary_\w+) = true;")
+LIBRARY_CHECK = re.compile(r"typeof (__mcpOmnifocusLibrary_\w+) ===")
+
+
+class FakeOsascript:
+    """Stands in for run_jxa_script, evaluating the OmniFocus script under node against a database file.
+
+    Every script runs in a new node process, the script libraries OmniFocus would keep between calls
+    are remembered here and put back in front of the calls that rely on them.
+    """
+
+    def __init__(self, database_path: Path):
+        self.database_path = database_path
+        self.libraries: dict[str, str] = {}
+        self.stdout: str | None = ""
+        self.stdout_bytes = 0
+        self.script_bytes = 0
+        self.script_ms = 0.0
+
+    def __call__(self, script: str, timeout: int = 30, args: list[str] | None = None) -> str:
+        request = self._request(script, args, stream=False)
+        start = time.perf_counter()
+        result = subprocess.run(["node", str(FAKE_OMNIFOCUS)], input=request, capture_output=True, text=True)
+        self.script_ms = (time.perf_counter() - start) * 1000
+        if result.returncode != 0:
+            raise JXAScriptError(f"AppleScript failed: {result.stderr.strip()}")
+        self.stdout = result.stdout.strip()
+        self.stdout_bytes = len(self.stdout.encode())
+        return self.stdout
+
+    def stream(self, script: str, timeout: float = 30, args: list[str] | None = None) -> Iterator[str]:
+        """Stands in for stream_jxa_script, yielding the output lines as node writes them."""
+        request = self._request(script, args, stream=True)
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            ["node", str(FAKE_OMNIFOCUS)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        process.stdin.write(request)
+        process.stdin.close()
+        size = 0
+        for line in process.stdout:
+            size += len(line.encode())
+            yield line.rstrip("\n")
+        if process.wait() != 0:
+            raise JXAScriptError(f"AppleScript failed: {process.stderr.read().strip()}")
+        self.script_ms = (time.perf_counter() - start) * 1000
+        # Only the size of streamed output is kept, holding it would defeat the streaming
+        self.stdout = None
+        self.stdout_bytes = size
+
+    def _request(self, script: str, args: list[str] | None, stream: bool) -> str:
+        # The script handed to OmniFocus is the first argument of the evaluation wrapper
+        source = args[0] if args else script
+        self.script_bytes = len(source.encode())
+        if match := LIBRARY.search(source):
+            self.libraries[match.group(1)] = source[: match.end()]
+        elif (match := LIBRARY_CHECK.search(source)) and match.group(1) in self.libraries:
+            source = f"{self.libraries[match.group(1)]}\n{source}"
+        return json.dumps({"databasePath": str(self.database_path), "script": source, "raw": True, "stream": stream})
+
+
+def tools(database: dict[str, list[dict[str, Any]]]) -> dict[str, Callable[[], Any]]:
+    """The tool calls to measure, with arguments picked from the database."""
+    tag_id = database["tags"][0]["id"]
+    project_id = database["projects"][0]["id"]
+    task_id = database["tasks"][len(database["tasks"]) // 2]["id"]
+    return {
+        "list_projects": lambda: omnifocus.list_projects(),
+        "list_tags": lambda: omnifocus.list_tags(),
+        "list_tasks": lambda: omnifocus.list_tasks(),
+        "list_tasks[fields=id,name]": lambda: omnifocus.list_tasks(fields=["id", "name"]),
+        "list_tasks[limit=100]": lambda: omnifocus.list_tasks(limit=100),
+        "list_tasks_by_project": lambda: omnifocus.list_tasks_by_project(project_id),
+        "list_tasks_by_tag": lambda: omnifocus.list_tasks_by_tag(tag_id),
+        "get_task": lambda: omnifocus.get_task(task_id),
+        "update_task": lambda: omnifocus.update_task(task_id, task_name="Renamed", task_flagged=True),
+        "query_tasks[flagged,due]": lambda: omnifocus.query_tasks(
+            {"and": [{"field": "flagged", "op": "eq", "value": True}, {"field": "dueDate", "op": "exists"}]},
+            sort=[{"field": "dueDate"}],
+        ),
+        "list_changes[all]": lambda: omnifocus.list_changes(None, all_fields=True),
+    }
+
+
+def measure(call: Callable[[], Any], fake: FakeOsascript, repeat: int) -> dict[str, float]:
+    """Time a tool call, its output size, decode time and peak Python memory."""
+    call()  # Warm up, the first call also sends the script library
+
+    latencies, script_times = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - start) * 1000)
+        script_times.append(fake.script_ms)
+
+    stdout, stdout_bytes = fake.stdout, fake.stdout_bytes
+    decode_times = []
+    for _ in range(repeat if stdout is not None else 0):
+        start = time.perf_counter()
+        json.loads(stdout)
+        decode_times.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    try:
+        call()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "latency_ms": round(statistics.median(latencies), 3),
+        "script_ms": round(statistics.median(script_times), 3),
+        "script_bytes": fake.script_bytes,
+        "stdout_bytes": stdout_bytes,
+        "decode_ms": round(statistics.median(decode_times), 3) if decode_times else None,
+        "peak_memory": peak,
+    }
+
+
+def run(sizes: list[int], repeat: int) -> dict[str, Any]:
+    """Measure every tool against a synthetic database of each size."""
+    ttl, original, original_stream = snapshot_cache.ttl, scripting.run_jxa_script, scripting.stream_jxa_script
+    snapshot_cache.configure(ttl=0)  # Measure what a cache miss costs
+    results: dict[str, Any] = {}
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for size in sizes:
+                database = synthetic_database(size)
+                path = Path(directory) / f"database-{size}.json"
+                path.write_text(json.dumps(database))
+                fake = FakeOsascript(path)
+                scripting.run_jxa_script, scripting.stream_jxa_script = fake, fake.stream
+                results[str(size)] = {name: measure(call, fake, repeat) for name, call in tools(database).items()}
+    finally:
+        scripting.run_jxa_script, scripting.stream_jxa_script = original, original_stream
+        snapshot_cache.configure(ttl=ttl)
+    return results
+
+
+# Metrics checked by --compare, decode and script times are too noisy to fail a run on
+COMPARED = ("latency_ms", "stdout_bytes", "peak_memory")
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """List the metrics that grew by more than the tolerance compared to a baseline result file."""
+    regressions = []
+    for size, measured in results["results"].items():
+        for name, metrics in measured.items():
+            previous = baseline.get("results", {}).get(size, {}).get(name)
+            if previous is None:
+                continue
+            for metric in COMPARED:
+                if previous.get(metric) and metrics[metric] > previous[metric] * (1 + tolerance):
+                    regressions.append(f"{size} tasks, {name}: {metric} {previous[metric]} -> {metrics[metric]}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Database sizes in tasks")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timed calls per tool and size")
+    parser.add_argument("--output", type=Path, help="File to write the results to")
+    parser.add_argument("--compare", type=Path, help="Previous results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed growth before a metric regresses")
+    args = parser.parse_args()
+
+    if shutil.which("node") is None:
+        parser.error("node is required to run the OmniFocus stand-in")
+
+    results = {
+        "benchmark": "tool_costs",
+        "created": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": run(args.sizes, args.repeat),
+    }
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        args.output.write_text(output + "\n")
+
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Compare the size and decode time of task lists sent as column tables and as one object per task.
+
+Usage:
+    uv run python benchmarks/wire_format.py [--sizes 1000 10000 100000] [--repeat 5] [--output results.json]
+
+The task listings of ``mcp_omnifocus.utils.omnifocus`` are run under node against the stand-in object
+model in ``tests/fake_omnifocus.js`` over the synthetic databases of ``tool_costs.py``, once with
+column tables and once with objects. For every listing, database size and encoding it reports:
+
+    stdout_bytes   size of the JSON output the script hands back
+    decode_ms      time to decode that output into task dictionaries
+    script_ms      time spent in the stand-in, i.e. what osascript and OmniFocus would take
+
+Decode times are medians over the repeats. Both encodings decode to the same tasks, which is checked.
+"""
+
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from tool_costs import FakeOsascript, synthetic_database
+
+from mcp_omnifocus.utils import columns, omnifocus
+from mcp_omnifocus.utils.scripting import __evaluate_script__, build_script
+
+ALL_TASK_FIELDS = list(omnifocus.TaskField.__args__)
+
+# The listings to compare, as the script and the arguments other than the rows per table
+LISTINGS: dict[str, tuple[str, dict[str, Any]]] = {
+    "list_tasks": (omnifocus.__list_tasks__, {"page": None, "fields": None}),
+    "list_tasks[all fields]": (omnifocus.__list_tasks__, {"page": None, "fields": ALL_TASK_FIELDS}),
+    "list_changes[all]": (omnifocus.__list_changes__, {"since": None, "allFields": True}),
+}
+
+
+def decode(output: str, rows: int | None) -> list[dict[str, Any]]:
+    """Decode the output of a listing into task dictionaries, as the omnifocus module does."""
+    value = json.loads(output)
+    tasks = value["tasks"] if isinstance(value, dict) else value
+    if rows is None:
+        return tasks
+    return [task for table in tasks for task in columns.decode_table(table)]
+
+
+def measure(fake: FakeOsascript, script: str, args: dict[str, Any], rows: int | None, repeat: int) -> dict[str, Any]:
+    """Run a listing with the given rows per table, or objects for None, and time decoding its output."""
+    source = build_script(script, {**args, "rows": rows}, omnifocus.__common_functions__)
+    output = fake(__evaluate_script__, args=[source])
+
+    decode_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tasks = decode(output, rows)
+        decode_times.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "stdout_bytes": len(output.encode()),
+        "decode_ms": round(statistics.median(decode_times), 3),
+        "script_ms": round(fake.script_ms, 3),
+        "tasks": tasks,
+    }
+
+
+def run(sizes: list[int], repeat: int) -> dict[str, Any]:
+    """Measure every listing with both encodings against a synthetic database of each size."""
+    results: dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = Path(directory) / f"database-{size}.json"
+            path.write_text(json.dumps(synthetic_database(size)))
+            fake = FakeOsascript(path)
+            results[str(size)] = {}
+            for name, (script, args) in LISTINGS.items():
+                measured = {
+                    "columns": measure(fake, script, args, columns.TABLE_ROWS, repeat),
+                    "objects": measure(fake, script, args, None, repeat),
+                }
+                if measured["columns"].pop("tasks") != measured["objects"].pop("tasks"):
+                    raise AssertionError(f"{name} decodes differently from column tables and objects")
+                measured["bytes_saved"] = round(
+                    1 - measured["columns"]["stdout_bytes"] / measured["objects"]["stdout_bytes"], 3
+                )
+                measured["decode_saved"] = round(
+                    1 - measured["columns"]["decode_ms"] / max(measured["objects"]["decode_ms"], 1e-9), 3
+                )
+                results[str(size)][name] = measured
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Database sizes in tasks")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timed decodes per listing and size")
+    parser.add_argument("--output", type=Path, help="File to write the results to")
+    args = parser.parse_args()
+
+    if shutil.which("node") is None:
+        parser.error("node is required to run the OmniFocus stand-in")
+
+    results = {
+        "benchmark": "wire_format",
+        "created": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "rows_per_table": columns.TABLE_ROWS,
+        "results": run(args.sizes, args.repeat),
+    }
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        args.output.write_text(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
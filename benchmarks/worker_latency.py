@@ -0,0 +1,83 @@
+"""Compare per-call latency of one-shot osascript runs against the persistent JXA worker.
+
+Usage:
+    uv run python benchmarks/worker_latency.py [--calls 50] [--fake]
+
+Without ``--fake`` the benchmark talks to the real OmniFocus through osascript, so it only runs on
+macOS. With ``--fake`` it puts the stand-in ``tests/fake_osascript.py`` on the PATH instead, which
+measures the process spawn and framing overhead on any system.
+"""
+
+import argparse
+import json
+import os
+import stat
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from mcp_omnifocus.utils.scripting import disable_worker, enable_worker, evaluate_javascript
+
+FAKE_OSASCRIPT = Path(__file__).parent.parent / "tests" / "fake_osascript.py"
+
+
+def install_fake_osascript(directory: Path) -> None:
+    """Put an ``osascript`` shim that runs the stand-in at the front of the PATH."""
+    shim = directory / "osascript"
+    shim.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_OSASCRIPT}" "$@"\n')
+    shim.chmod(shim.stat().st_mode | stat.S_IEXEC)
+    os.environ["PATH"] = f"{directory}{os.pathsep}{os.environ['PATH']}"
+
+
+def measure(script: str, calls: int) -> list[float]:
+    """Time each of a number of evaluate_javascript calls in milliseconds."""
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        evaluate_javascript(script)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings: list[float]) -> dict[str, float]:
+    ordered = sorted(timings)
+    return {
+        "calls": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": round(ordered[len(ordered) // 2], 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50, help="Number of calls to time in each mode")
+    parser.add_argument("--fake", action="store_true", help="Use the stand-in osascript instead of OmniFocus")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.fake:
+            install_fake_osascript(Path(directory))
+            script = "fake:echo:ok"
+        else:
+            script = "(() => 'ok')();"
+
+        one_shot = measure(script, args.calls)
+
+        worker = enable_worker()
+        try:
+            worker.start()  # Startup is paid once per session, keep it out of the per-call numbers
+            persistent = measure(script, args.calls)
+        finally:
+            disable_worker()
+
+    results = {"one_shot": summarize(one_shot), "worker": summarize(persistent)}
+    results["speedup"] = round(results["one_shot"]["mean_ms"] / results["worker"]["mean_ms"], 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 import sys
 
-from mcp_omnifocus import server
-
 
 def main():
-    sys.exit(server.main())
+    # The server, and FastMCP with it, is only imported when the server is started, so that importing the
+    # utils of the package stays cheap
+    from mcp_omnifocus import server
+
+    sys.exit(server.app())
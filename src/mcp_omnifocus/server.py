@@ -1,15 +1,47 @@
+import atexit
+import functools
+import inspect
+import tempfile
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from pathlib import Path
 from textwrap import dedent
-from typing import Annotated
+from typing import TYPE_CHECKING, Annotated, Any, Literal
 
 import typer
 from fastmcp import FastMCP
 from pydantic import Field
 
-from mcp_omnifocus.utils import omnifocus
+from mcp_omnifocus.utils import omnifocus, scripting
+from mcp_omnifocus.utils.cache import on_write, snapshot_cache
+from mcp_omnifocus.utils.metrics import call_metrics
+from mcp_omnifocus.utils.tags import TagIndex
+
+if TYPE_CHECKING:
+    # Imported where they are used, as the features they belong to are optional and the server starts faster
+    # without them
+    from mcp_omnifocus.utils.mirror import Mirror
+    from mcp_omnifocus.utils.sync import DeltaSync
+    from mcp_omnifocus.utils.warmup import WarmUp
+    from mcp_omnifocus.utils.watcher import DatabaseWatcher
+    from mcp_omnifocus.utils.write_behind import WriteBehindQueue
 
 # Initialize the app
 app = typer.Typer(add_completion=False)
 
+
+@asynccontextmanager
+async def _lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """Start the warm-up of --warm-up on the server's event loop as the server starts up."""
+    if warm_up is not None:
+        warm_up.start()
+    try:
+        yield
+    finally:
+        if warm_up is not None:
+            warm_up.stop()
+
+
 # Initialize the FastMCP Server
 mcp = FastMCP(
     name="OmniFocus MCP Server",
@@ -25,41 +57,198 @@ mcp = FastMCP(
         Use the provide tools to reivew project status and task completion, 
         create new tasks, projects, and tags, and manage your OmniFocus data effectively.
         """,
+    lifespan=_lifespan,
 )
 
-
-@mcp.tool
-def list_perspectives() -> list[str]:
+# Tools are async: the blocking OmniFocus functions run in worker threads through scripting.call_async,
+# which starts their osascript processes on the event loop so that slow calls do not hold up others.
+
+
+def tool(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Register an MCP tool whose scripts are recorded in the call metrics under its name."""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with call_metrics.tool(func.__name__):
+            return await func(*args, **kwargs)
+
+    return mcp.tool(wrapper)
+
+
+# Set when the server is started with --delta-sync, list tools are then answered from this local copy
+delta_sync: "DeltaSync | None" = None
+
+# The SQLite mirror search_tasks answers from, opened on first use unless --mirror names a file
+mirror: "Mirror | None" = None
+mirror_max_age: float = 30
+
+# Set when the server is started with --write-behind, task mutations are then queued here
+write_queue: "WriteBehindQueue | None" = None
+
+# Set when the server is started with --warm-up, reads the data most sessions start with in the background
+warm_up: "WarmUp | None" = None
+
+# Set when the server is started with --watch, tells when OmniFocus or its sync changed the database
+watcher: "DatabaseWatcher | None" = None
+
+# Seconds reads are cached by default when the watcher drops them as soon as OmniFocus changes, or when the
+# warm-up fills the cache
+WATCHED_CACHE_TTL = 30
+
+
+def _warm_up_steps() -> dict[str, Callable[[], Any]]:
+    """The warm-up steps, reading what list_projects, list_tags and list_inbox answer from.
+
+    With the cache disabled, what the reads return would be thrown away, only the connection is warmed up.
+    """
+    steps: dict[str, Callable[[], Any]] = {"connect": omnifocus.prime}
+    if delta_sync is not None:
+        steps["sync"] = delta_sync.refresh
+    elif snapshot_cache.enabled:
+        steps["projects"] = omnifocus.list_projects
+        steps["tags"] = omnifocus.tag_index
+    if snapshot_cache.enabled:
+        steps["inbox"] = omnifocus.list_inbox
+    return steps
+
+
+async def _settle_writes() -> None:
+    """Apply the queued task mutations before reading tasks, so that reads see them."""
+    if write_queue is not None and write_queue.pending():
+        await scripting.call_async(write_queue.flush, keep_failures=True)
+
+
+def _writer() -> Any:
+    """Where task mutations go: the write-behind queue when enabled, otherwise straight to OmniFocus."""
+    return write_queue if write_queue is not None else omnifocus
+
+
+def _database_changed(paths: set[Path]) -> None:
+    """Drop the reads cached before OmniFocus changed its database, and bring the local copies up to date."""
+    snapshot_cache.invalidate()
+    if mirror is not None:
+        mirror.mark_stale()
+    if delta_sync is not None:
+        # Only the changes since the last refresh are read, in the watcher thread rather than the next tool call
+        delta_sync.refresh()
+
+
+@on_write
+def _mark_mirror_stale(namespaces: tuple[str, ...]) -> None:
+    if mirror is not None:
+        mirror.mark_stale()
+
+
+Limit = Annotated[
+    int | None,
+    Field(
+        ge=1,
+        description="The maximum number of tasks to return, None for all of them. When a limit or cursor is given "
+        "the result is a page with the 'tasks', the 'total' number of tasks and the 'next_cursor'.",
+    ),
+]
+Cursor = Annotated[str | None, Field(description="The next_cursor of a previous page to continue from")]
+TaskFields = Annotated[
+    list[omnifocus.TaskField] | None,
+    Field(
+        description="The task fields to return, None for the default fields "
+        f"{omnifocus.DEFAULT_TASK_FIELDS}. Request only what you need, notes in particular can be large."
+    ),
+]
+TaskFilter = Annotated[
+    dict[str, Any] | None,
+    Field(
+        description="The filter the tasks must match, None for all tasks. A filter is either "
+        '{"and": [filter, ...]}, {"or": [filter, ...]}, {"not": filter} or {"field", "op", "value"}. '
+        "Fields and their ops: name, note, projectName (eq, contains, startswith, exists; case-insensitive); "
+        "projectId (eq, in, exists); status (eq, in); flagged, completed, dropped (eq); "
+        "dueDate, deferDate, added, modified (lt, lte, gt, gte with an ISO date value, exists); "
+        "tagIds (has, has_any, in_subtree to include child tags, exists). "
+        'Example: {"and": [{"field": "flagged", "op": "eq", "value": true}, '
+        '{"field": "dueDate", "op": "lt", "value": "2025-07-01"}]}'
+    ),
+]
+
+
+@tool
+async def list_perspectives() -> list[str]:
     """List all perspectives in OmniFocus."""
-    return omnifocus.list_perspectives()
+    return await scripting.call_async(
+        omnifocus.list_perspectives,
+    )
 
 
-@mcp.tool
-def list_projects() -> list[dict[str, str]]:
+@tool
+async def list_projects(
+    fields: Annotated[
+        list[omnifocus.ProjectField] | None,
+        Field(
+            description=f"The project fields to return, None for the default fields {omnifocus.DEFAULT_PROJECT_FIELDS}"
+        ),
+    ] = None,
+) -> list[dict[str, Any]]:
     """List all projects in OmniFocus."""
-    return omnifocus.list_projects()
+    if delta_sync is not None:
+        await scripting.call_async(delta_sync.refresh)
+        return delta_sync.list_projects(fields)
+    return await scripting.call_async(omnifocus.list_projects, fields=fields)
 
 
-@mcp.tool
-def list_tags() -> list[dict[str, str]]:
+@tool
+async def list_tags(
+    fields: Annotated[
+        list[omnifocus.TagField] | None,
+        Field(description=f"The tag fields to return, None for the default fields {omnifocus.DEFAULT_TAG_FIELDS}"),
+    ] = None,
+    tree: Annotated[
+        bool, Field(description='Return the tags nested under their parents, each with a "children" list of tags')
+    ] = False,
+) -> list[dict[str, Any]]:
     """List all tags in OmniFocus."""
-    return omnifocus.list_tags()
-
-
-@mcp.tool
-def list_tasks() -> list[dict[str, str]]:
+    if delta_sync is not None:
+        await scripting.call_async(delta_sync.refresh)
+        if tree:
+            index = TagIndex(delta_sync.list_tags(["id", "name", "fullName", "parentId"]))
+            return index.tree(fields or omnifocus.DEFAULT_TAG_FIELDS)
+        return delta_sync.list_tags(fields)
+    return await scripting.call_async(omnifocus.list_tags, fields=fields, tree=tree)
+
+
+@tool
+async def list_tasks(
+    limit: Limit = None, cursor: Cursor = None, fields: TaskFields = None
+) -> list[dict[str, Any]] | dict:
     """List all tasks in OmniFocus. The task full name is the full heirarchy of the task, including parent tags."""
-    return omnifocus.list_tasks()
+    await _settle_writes()
+    if delta_sync is not None:
+        await scripting.call_async(delta_sync.refresh)
+        tasks = delta_sync.list_tasks(fields)
+        return tasks if limit is None and cursor is None else omnifocus.paginate(tasks, limit, cursor)
+    return await scripting.call_async(omnifocus.list_tasks, limit=limit, cursor=cursor, fields=fields)
+
+
+@tool
+async def list_inbox(
+    limit: Limit = None, cursor: Cursor = None, fields: TaskFields = None
+) -> list[dict[str, Any]] | dict:
+    """List all tasks in the OmniFocus Inbox."""
+    await _settle_writes()
+    return await scripting.call_async(omnifocus.list_inbox, limit=limit, cursor=cursor, fields=fields)
 
 
-@mcp.tool
-def list_inbox() -> list[dict[str, str]]:
-    """List all tasks in the OmniFocus Inbox."""
-    return omnifocus.list_perspective_tasks("Inbox")
+@tool
+async def get_task(
+    task_id: Annotated[str, Field(description="The ID of the task to get")], fields: TaskFields = None
+) -> dict[str, Any]:
+    """Get a single task in OmniFocus by its ID."""
+    await _settle_writes()
+    if write_queue is not None:
+        task_id = write_queue.resolve(task_id)
+    return await scripting.call_async(omnifocus.get_task, task_id, fields=fields)
 
 
-@mcp.tool
-def update_task(
+@tool
+async def update_task(
     task_id: Annotated[str, Field(description="The ID of the task to update")],
     name: Annotated[str | None, Field(description="The updated task name, None if unchanged")] = None,
     project_id: Annotated[
@@ -85,9 +274,12 @@ def update_task(
         ),
     ] = None,
     flagged: Annotated[bool | None, Field(description="The updated task flagged status, None if unchanged")] = None,
-) -> dict[str, str]:
-    """Update a task in OmniFocus with a new name, assigned project name, tags, note, due date, and/or defer date."""
-    return omnifocus.update_task(
+) -> dict[str, Any]:
+    """Update a task in OmniFocus with a new name, assigned project name, tags, note, due date, and/or defer date.
+    Returns the updated task. In write-behind mode the update is queued instead, and the result is an
+    acknowledgement: {"task_id", "action", "queued": true, "pending": the number of queued changes}."""
+    return await scripting.call_async(
+        _writer().update_task,
         task_id,
         task_name=name,
         task_project_id=project_id,
@@ -99,35 +291,92 @@ def update_task(
     )
 
 
-@mcp.tool
-def complete_task(task_id: Annotated[str, Field(description="The ID of the task to complete")]) -> dict[str, str]:
-    """Complete a task in OmniFocus."""
-    return omnifocus.complete_task(task_id)
+@tool
+async def complete_task(task_id: Annotated[str, Field(description="The ID of the task to complete")]) -> dict[str, Any]:
+    """Complete a task in OmniFocus. Returns the completed task, or in write-behind mode the acknowledgement
+    of the queued change, as update_task does."""
+    return await scripting.call_async(_writer().complete_task, task_id)
 
 
-@mcp.tool
-def drop_task(task_id: Annotated[str, Field(description="The ID of the task to drop")]) -> dict[str, str]:
-    """Drop a task in OmniFocus."""
-    return omnifocus.drop_task(task_id)
+@tool
+async def drop_task(task_id: Annotated[str, Field(description="The ID of the task to drop")]) -> dict[str, Any]:
+    """Drop a task in OmniFocus. Returns the dropped task, or in write-behind mode the acknowledgement of the
+    queued change, as update_task does."""
+    return await scripting.call_async(_writer().drop_task, task_id)
 
 
-@mcp.tool
-def activate_task(task_id: Annotated[str, Field(description="The ID of the task to activate")]) -> dict[str, str]:
-    """Activate (un-drop or un-complete) a task in OmniFocus."""
-    return omnifocus.activate_task(task_id)
+@tool
+async def activate_task(task_id: Annotated[str, Field(description="The ID of the task to activate")]) -> dict[str, Any]:
+    """Activate (un-drop or un-complete) a task in OmniFocus. Returns the activated task, or in write-behind
+    mode the acknowledgement of the queued change, as update_task does."""
+    return await scripting.call_async(_writer().activate_task, task_id)
 
 
-@mcp.tool
-def create_task(
+@tool
+async def batch_update_tasks(
+    operations: Annotated[
+        list[omnifocus.TaskOperation],
+        Field(
+            description="The operations to apply in order. Each has a task_id and an action: 'update' applies the "
+            "given name, note, tag_ids, project_id, defer_date, due_date and flagged; 'complete', 'drop' and "
+            "'activate' change the task status; 'move' moves the task to project_id; 'create' creates a task "
+            "with the given name and fields, its task_id is a placeholder later operations can refer to it with."
+        ),
+    ],
+) -> list[dict]:
+    """Create, update, complete, drop, activate and move many tasks in OmniFocus at once.
+    Prefer this over repeated single task calls when processing several tasks, a failing operation
+    is reported in its result and does not stop the rest of the batch."""
+    await _settle_writes()
+    return await scripting.call_async(omnifocus.batch_update_tasks, operations)
+
+
+@tool
+async def import_tasks(
+    text: Annotated[
+        str,
+        Field(
+            description="The outline to import. Project lines ('Name:' in TaskPaper, '# Name' in Markdown) hold the "
+            "tasks below them, indented tasks are nested under the task above them, other lines are notes. "
+            "Items take @due(2025-01-02 17:00), @defer(...), @flagged, @done, @tags(a, b) and @tag attributes."
+        ),
+    ],
+    syntax: Annotated[
+        Literal["auto", "taskpaper", "markdown"],
+        Field(description="The syntax of the outline, 'auto' tells TaskPaper and Markdown apart"),
+    ] = "auto",
+) -> list[dict]:
+    """Create many projects and tasks in OmniFocus at once from a TaskPaper or Markdown outline, with their
+    nesting, notes, tags, dates and flags. Prefer this over repeated create_task calls when capturing several
+    tasks. Returns the id of every project and task in the order of the outline, a project named as an existing
+    one adds its tasks to it. A failing item is reported in its result and does not stop the rest."""
+    await _settle_writes()
+    return await scripting.call_async(omnifocus.import_outline, text, syntax)
+
+
+@tool
+async def flush_writes() -> dict[str, Any]:
+    """Apply the task changes queued in write-behind mode to OmniFocus now. Returns the outcome of each
+    queued change, and the changes that failed in earlier background flushes."""
+    if write_queue is None:
+        return {"results": [], "earlier_failures": []}
+    results = await scripting.call_async(write_queue.flush)
+    return {"results": results, "earlier_failures": write_queue.take_failures()}
+
+
+@tool
+async def create_task(
     name: Annotated[str, Field(description="The name of the task to create")],
     note: Annotated[str | None, Field(description="The note for the task, None if no note")] = None,
-) -> dict[str, str]:
-    """Create a new task in OmniFocus with a name and an optional note."""
-    return omnifocus.create_task(task_name=name, task_note=note)
+) -> dict[str, Any]:
+    """Create a new task in OmniFocus with a name and an optional note. Returns the created task. In
+    write-behind mode the creation is queued instead, and the result is an acknowledgement whose task_id is
+    a provisional id other tools accept until OmniFocus has created the task."""
+    return await scripting.call_async(_writer().create_task, task_name=name, task_note=note)
 
 
-@mcp.tool
-def list_tasks_by_project(
+@tool
+async def list_tasks_by_project(
     project_id: Annotated[str, Field(description="The ID of the project to list tasks for")],
     task_status: Annotated[
         list[omnifocus.TaskStatus] | None,
@@ -136,15 +385,21 @@ def list_tasks_by_project(
             "of requesting available and unblocked tasks ['Available', 'Next', 'Overdue', 'DueSoon']."
         ),
     ] = None,
-) -> list[dict[str, str]]:
+    limit: Limit = None,
+    cursor: Cursor = None,
+    fields: TaskFields = None,
+) -> list[dict[str, Any]] | dict:
     """List all tasks in a specific project."""
     if task_status is None:
         task_status = ["Available", "Next", "Overdue", "DueSoon"]
-    return omnifocus.list_tasks_by_project(project_id, task_status=task_status)
+    await _settle_writes()
+    return await scripting.call_async(
+        omnifocus.list_tasks_by_project, project_id, task_status=task_status, limit=limit, cursor=cursor, fields=fields
+    )
 
 
-@mcp.tool
-def list_tasks_by_tag(
+@tool
+async def list_tasks_by_tag(
     tag_id: Annotated[str, Field(description="The ID of the tag to list tasks for")],
     task_status: Annotated[
         list[omnifocus.TaskStatus] | None,
@@ -153,11 +408,157 @@ def list_tasks_by_tag(
             "of requesting available and unblocked tasks ['Available', 'Next', 'Overdue', 'DueSoon']."
         ),
     ] = None,
-) -> list[dict[str, str]]:
+    limit: Limit = None,
+    cursor: Cursor = None,
+    fields: TaskFields = None,
+    include_descendants: Annotated[
+        bool, Field(description="Also list the tasks of the child tags of the tag, and of their children")
+    ] = False,
+) -> list[dict[str, Any]] | dict:
     """List all tasks with a specific tag."""
     if task_status is None:
         task_status = ["Available", "Next", "Overdue", "DueSoon"]
-    return omnifocus.list_tasks_by_tag(tag_id, task_status=task_status)
+    await _settle_writes()
+    return await scripting.call_async(
+        omnifocus.list_tasks_by_tag,
+        tag_id,
+        task_status=task_status,
+        limit=limit,
+        cursor=cursor,
+        fields=fields,
+        include_descendants=include_descendants,
+    )
+
+
+@tool
+async def query_tasks(
+    filter: TaskFilter = None,
+    sort: Annotated[
+        list[dict[str, str]] | None,
+        Field(description='Sort keys, e.g. [{"field": "dueDate", "direction": "asc"}]. Missing values sort last.'),
+    ] = None,
+    limit: Annotated[int | None, Field(ge=1, description="The maximum number of tasks to return")] = None,
+    fields: TaskFields = None,
+) -> list[dict[str, Any]]:
+    """Find tasks in OmniFocus matching a filter. The filter is evaluated inside OmniFocus, so prefer
+    this over listing all tasks when looking for tasks by due date, flag, tag, name, note or status."""
+    await _settle_writes()
+    return await scripting.call_async(omnifocus.query_tasks, filter, sort=sort, limit=limit, fields=fields)
+
+
+@tool
+async def task_stats(
+    group_by: Annotated[
+        list[omnifocus.StatsDimension],
+        Field(
+            description="The dimensions to count tasks by: 'project' (None for the inbox), 'tag' (a task with "
+            "several tags counts once per tag, None for untagged tasks), 'status', 'flagged', and 'due' (the "
+            "bucket of the due date: overdue, today, next_7_days, later or none). Several dimensions count every "
+            "combination, e.g. ['project', 'status']. An empty list only counts the tasks."
+        ),
+    ],
+    filter: TaskFilter = None,
+    include_completed: Annotated[bool, Field(description="Whether to count completed and dropped tasks")] = False,
+    limit: Annotated[int | None, Field(ge=1, description="The maximum number of groups to return")] = None,
+) -> dict[str, Any]:
+    """Count tasks in OmniFocus grouped by project, tag, status, flag or due date, computed inside OmniFocus.
+    Returns the total and the groups with their "count", largest first. Prefer this over listing tasks to
+    answer review questions such as how many tasks are overdue per project or which tags have the most tasks."""
+    await _settle_writes()
+    return await scripting.call_async(
+        omnifocus.task_stats, group_by, filter=filter, include_completed=include_completed, limit=limit
+    )
+
+
+@tool
+async def search_tasks(
+    text: Annotated[str, Field(description="The words to search for in task names and notes")],
+    limit: Annotated[int, Field(ge=1, description="The maximum number of tasks to return")] = 20,
+    include_completed: Annotated[bool, Field(description="Whether to include completed and dropped tasks")] = False,
+    project_id: Annotated[str | None, Field(description="Only search the tasks of this project")] = None,
+    tag_id: Annotated[str | None, Field(description="Only search the tasks with this tag")] = None,
+    fields: TaskFields = None,
+) -> list[dict[str, Any]]:
+    """Search OmniFocus tasks by words in their name or note, best matches first. Every word must match,
+    words also match longer words they start with. Each task has a relevance "score" and a "snippet" of the
+    matching text with the matched words in [brackets]. Prefer this over listing all tasks to find tasks by text."""
+    global mirror
+    await _settle_writes()
+    if mirror is None:
+        from mcp_omnifocus.utils.mirror import Mirror
+
+        mirror = Mirror()
+    await scripting.call_async(mirror.refresh_if_stale, mirror_max_age)
+    return await scripting.call_async(
+        mirror.search_tasks,
+        text,
+        limit=limit,
+        include_completed=include_completed,
+        project_id=project_id,
+        tag_id=tag_id,
+        fields=fields,
+    )
+
+
+@mcp.resource("omnifocus://stats/cache", mime_type="application/json")
+def cache_stats() -> dict:
+    """Hit, miss, eviction and invalidation counts of the project, tag and task snapshot cache."""
+    return snapshot_cache.stats()
+
+
+@mcp.resource("omnifocus://stats/writes", mime_type="application/json")
+def write_stats() -> dict:
+    """Queued, applied and failed task mutations of write-behind mode, and the last batch error."""
+    return write_queue.stats() if write_queue is not None else {"enabled": False}
+
+
+@mcp.resource("omnifocus://stats/health", mime_type="application/json")
+def health_stats() -> dict:
+    """The circuit breaker state, retry and timeout counts, and the timeout every script is given."""
+    return scripting.resilience_stats()
+
+
+@mcp.resource("omnifocus://stats/warmup", mime_type="application/json")
+def warm_up_stats() -> dict:
+    """Whether the warm-up of --warm-up finished, and the status and duration of each of its steps."""
+    return warm_up.stats() if warm_up is not None else {"enabled": False}
+
+
+@mcp.resource("omnifocus://stats/watcher", mime_type="application/json")
+def watcher_stats() -> dict:
+    """The path and backend of the --watch watcher, and how many changes of the OmniFocus database it reported."""
+    return watcher.stats() if watcher is not None else {"enabled": False}
+
+
+@mcp.resource("omnifocus://stats/coalescing", mime_type="application/json")
+def coalescing_stats() -> dict:
+    """How many reads ran in OmniFocus, and how many shared the execution of an identical read in flight."""
+    return scripting.single_flight.stats()
+
+
+@tool
+async def get_call_stats(
+    format: Annotated[
+        Literal["json", "prometheus"],
+        Field(description="'json' for histograms per tool, 'prometheus' for the Prometheus text format"),
+    ] = "json",
+) -> dict | str:
+    """Get the number, errors, durations and sizes of the scripts each tool ran in OmniFocus.
+    Durations are split into the time spent starting osascript and transferring output, evaluating
+    in OmniFocus and decoding the result, to find out where slow calls spend their time."""
+    return call_metrics.prometheus() if format == "prometheus" else call_metrics.snapshot()
+
+
+@mcp.resource("omnifocus://stats/calls", mime_type="application/json")
+def call_stats() -> dict:
+    """Call counts, errors, and duration and size histograms of the scripts run per tool."""
+    return call_metrics.snapshot()
+
+
+@mcp.resource("omnifocus://stats/calls/prometheus", mime_type="text/plain")
+def call_stats_prometheus() -> str:
+    """The call metrics in the Prometheus text exposition format."""
+    return call_metrics.prometheus()
 
 
 @mcp.prompt
@@ -176,9 +577,234 @@ def process_inbox() -> str:
     Use the #list_inbox tool to get the list of tasks in the inbox.
     Use the tools #list_projects, #list_tags, #list_tasks_by_project, and #list_tasks_by_tag to get the list of existing projects and tags and their tasks.
     Use the #update_task tool to update the task with the suggested project and tag.
+    When the user confirms several tasks at once, use the #batch_update_tasks tool to update them in one call.
     """)
 
 
 @app.command()
-def main():
-    mcp.run(transport="stdio")
+def main(
+    worker: Annotated[
+        bool,
+        typer.Option(
+            envvar="MCP_OMNIFOCUS_WORKER",
+            help="Evaluate scripts in one long-lived osascript process instead of one process per call.",
+        ),
+    ] = False,
+    cache_ttl: Annotated[
+        float | None,
+        typer.Option(
+            envvar="MCP_OMNIFOCUS_CACHE_TTL",
+            min=0,
+            help="Seconds to serve project, tag and task lists from the cache, 0 disables the cache. "
+            f"Defaults to {WATCHED_CACHE_TTL:g} with --watch, which drops the cache when OmniFocus changes, "
+            "or with --warm-up, which fills it, and to 0 otherwise.",
+        ),
+    ] = None,
+    cache_size: Annotated[
+        int,
+        typer.Option(envvar="MCP_OMNIFOCUS_CACHE_SIZE", help="Maximum number of list results to cache."),
+    ] = 128,
+    sync: Annotated[
+        bool,
+        typer.Option(
+            "--delta-sync/--no-delta-sync",
+            envvar="MCP_OMNIFOCUS_DELTA_SYNC",
+            help="Keep a local copy of tasks, projects and tags, refreshed with only what changed since the last call.",
+        ),
+    ] = False,
+    max_concurrency: Annotated[
+        int,
+        typer.Option(
+            envvar="MCP_OMNIFOCUS_MAX_CONCURRENCY",
+            min=1,
+            help="Maximum number of osascript processes running at once when the worker is disabled.",
+        ),
+    ] = 4,
+    mirror_path: Annotated[
+        str | None,
+        typer.Option(
+            "--mirror",
+            envvar="MCP_OMNIFOCUS_MIRROR",
+            help="SQLite file to keep the search_tasks mirror in across restarts, in memory when not given.",
+        ),
+    ] = None,
+    mirror_age: Annotated[
+        float,
+        typer.Option(
+            "--mirror-max-age",
+            envvar="MCP_OMNIFOCUS_MIRROR_MAX_AGE",
+            help="Seconds search_tasks answers from the mirror before refreshing it with the changes in OmniFocus.",
+        ),
+    ] = 30,
+    slow_call_ms: Annotated[
+        float | None,
+        typer.Option(
+            envvar="MCP_OMNIFOCUS_SLOW_CALL_MS",
+            help="Log the timings, sizes and arguments of scripts that take longer than this many milliseconds.",
+        ),
+    ] = None,
+    column_tables: Annotated[
+        bool,
+        typer.Option(
+            "--column-tables/--no-column-tables",
+            envvar="MCP_OMNIFOCUS_COLUMN_TABLES",
+            help="Transfer task lists from OmniFocus as compact column tables instead of one object per task.",
+        ),
+    ] = True,
+    headless_perspectives: Annotated[
+        bool,
+        typer.Option(
+            "--headless-perspectives/--no-headless-perspectives",
+            envvar="MCP_OMNIFOCUS_HEADLESS_PERSPECTIVES",
+            help="List perspectives that can be described as task filters without switching the front window.",
+        ),
+    ] = True,
+    write_behind: Annotated[
+        bool,
+        typer.Option(
+            "--write-behind/--no-write-behind",
+            envvar="MCP_OMNIFOCUS_WRITE_BEHIND",
+            help="Acknowledge task changes at once and apply them to OmniFocus in merged batches.",
+        ),
+    ] = False,
+    write_behind_ms: Annotated[
+        float,
+        typer.Option(
+            envvar="MCP_OMNIFOCUS_WRITE_BEHIND_MS",
+            min=1,
+            help="Milliseconds a queued task change waits before the queue is applied.",
+        ),
+    ] = 500,
+    write_behind_ops: Annotated[
+        int,
+        typer.Option(
+            envvar="MCP_OMNIFOCUS_WRITE_BEHIND_OPS",
+            min=1,
+            help="Number of queued task changes that has the queue applied without waiting.",
+        ),
+    ] = 50,
+    write_journal: Annotated[
+        str,
+        typer.Option(
+            envvar="MCP_OMNIFOCUS_WRITE_JOURNAL",
+            help="File queued task changes are journaled to until applied, and queued again from after a crash. "
+            "A server finding it held by another running server journals to a file of its own next to it.",
+        ),
+    ] = str(Path(tempfile.gettempdir()) / "mcp-omnifocus-writes.jsonl"),
+    timeout: Annotated[
+        float,
+        typer.Option(
+            envvar="MCP_OMNIFOCUS_TIMEOUT",
+            min=1,
+            help="Longest time in seconds a script may run, and the timeout of scripts run fewer than five times.",
+        ),
+    ] = 30,
+    adaptive_timeouts: Annotated[
+        bool,
+        typer.Option(
+            "--adaptive-timeouts/--no-adaptive-timeouts",
+            envvar="MCP_OMNIFOCUS_ADAPTIVE_TIMEOUTS",
+            help="Give every script a timeout derived from its recent durations instead of the longest timeout.",
+        ),
+    ] = True,
+    retries: Annotated[
+        int,
+        typer.Option(
+            envvar="MCP_OMNIFOCUS_RETRIES",
+            min=0,
+            help="Times a script is retried when OmniFocus is busy or not running.",
+        ),
+    ] = 2,
+    breaker_threshold: Annotated[
+        int,
+        typer.Option(
+            envvar="MCP_OMNIFOCUS_BREAKER_THRESHOLD",
+            min=0,
+            help="Failures in a row after which calls fail at once for the cooldown, 0 disables the breaker.",
+        ),
+    ] = 5,
+    breaker_cooldown: Annotated[
+        float,
+        typer.Option(
+            envvar="MCP_OMNIFOCUS_BREAKER_COOLDOWN",
+            min=0,
+            help="Seconds calls fail at once after the breaker opened, before one call probes OmniFocus again.",
+        ),
+    ] = 10,
+    warm: Annotated[
+        bool,
+        typer.Option(
+            "--warm-up/--no-warm-up",
+            envvar="MCP_OMNIFOCUS_WARM_UP",
+            help="Connect to OmniFocus and read the projects, tags and inbox in the background as the server starts.",
+        ),
+    ] = False,
+    database: Annotated[
+        str | None,
+        typer.Option(
+            envvar="MCP_OMNIFOCUS_DATABASE",
+            help="Unencrypted .ofocus bundle to read tasks, projects and tags from, asking OmniFocus when it cannot.",
+        ),
+    ] = None,
+    watch: Annotated[
+        str | None,
+        typer.Option(
+            envvar="MCP_OMNIFOCUS_WATCH",
+            help="OmniFocus data directory to watch, cached reads are dropped as soon as its files change.",
+        ),
+    ] = None,
+    watch_debounce: Annotated[
+        float,
+        typer.Option(
+            envvar="MCP_OMNIFOCUS_WATCH_DEBOUNCE",
+            min=0,
+            help="Seconds without file changes that end a burst of changes, such as a sync, reported as one.",
+        ),
+    ] = 1.0,
+):
+    global delta_sync, mirror, mirror_max_age, write_queue, warm_up, watcher
+    if worker:
+        scripting.enable_worker()
+    scripting.set_max_concurrency(max_concurrency)
+    scripting.configure_resilience(timeout, adaptive_timeouts, retries, breaker_threshold, breaker_cooldown)
+    if cache_ttl is None:
+        # Without the watcher, changes made in OmniFocus itself would go unseen until cached reads expire, which
+        # the warm-up accepts as it has nowhere else to keep what it reads
+        cache_ttl = WATCHED_CACHE_TTL if watch is not None or warm else 0
+    snapshot_cache.configure(ttl=cache_ttl, maxsize=cache_size)
+    if sync:
+        from mcp_omnifocus.utils.sync import DeltaSync
+
+        delta_sync = DeltaSync()
+    if mirror_path is not None:
+        from mcp_omnifocus.utils.mirror import Mirror
+
+        mirror = Mirror(mirror_path)
+    mirror_max_age = mirror_age
+    call_metrics.slow_call_ms = slow_call_ms
+    omnifocus.set_column_tables(column_tables)
+    omnifocus.set_headless_perspectives(headless_perspectives)
+    omnifocus.set_database(database)
+    if write_behind:
+        from mcp_omnifocus.utils.write_behind import WriteBehindQueue
+
+        write_queue = WriteBehindQueue(write_journal, interval=write_behind_ms / 1000, max_operations=write_behind_ops)
+        write_queue.start()
+        atexit.register(write_queue.stop)
+    if watch is not None:
+        from mcp_omnifocus.utils.watcher import DatabaseWatcher
+
+        watcher = DatabaseWatcher(watch, _database_changed, debounce=watch_debounce)
+        watcher.start()
+        atexit.register(watcher.stop)
+    if warm:
+        from mcp_omnifocus.utils.warmup import WarmUp
+
+        # Started by the lifespan once the server runs, the steps then share the concurrency limit of tool calls
+        warm_up = WarmUp(_warm_up_steps())
+    run_options: dict[str, Any] = {}
+    if "show_banner" in inspect.signature(mcp.run).parameters:
+        # The banner of FastMCP 2.10 and later renders with rich and looks up the latest FastMCP release over the
+        # network before the server answers its first request, while the client never sees it
+        run_options["show_banner"] = False
+    mcp.run(transport="stdio", **run_options)
@@ -0,0 +1,248 @@
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from mcp_omnifocus.utils.scripting import single_flight
+
+# Returned by a patch update to drop a cached read that cannot be patched
+DROP = object()
+
+
+class SnapshotCache:
+    """A size bounded, time limited cache of OmniFocus read results.
+
+    Entries are grouped by namespace (e.g. "tasks", "projects", "tags") so that a write can invalidate
+    or patch every cached read of the data it touched. The least recently used entry is evicted once
+    the cache is full, and entries expire after the TTL. A TTL of 0 disables caching.
+
+    Every invalidation or patch of a namespace bumps its generation. A read takes the generation before it
+    runs and passes it to set, which does not cache the read if a write changed the data meanwhile.
+    """
+
+    def __init__(self, ttl: float = 30, maxsize: int = 128):
+        """Create an empty cache.
+
+        Args:
+            ttl: Time in seconds a cached read stays valid, 0 disables caching.
+            maxsize: Maximum number of cached reads across all namespaces.
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str], tuple[float, Any]] = OrderedDict()
+        # Bumped when every namespace is dropped at once, and per namespace
+        self._epoch = 0
+        self._generations: dict[str, int] = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0, "patches": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def configure(self, ttl: float | None = None, maxsize: int | None = None) -> None:
+        """Change the TTL and/or size of the cache, dropping every cached read."""
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+            if maxsize is not None:
+                self.maxsize = maxsize
+            self._entries.clear()
+            self._epoch += 1
+
+    def get(self, namespace: str, key: str) -> tuple[bool, Any]:
+        """Look up a cached read.
+
+        Returns:
+            A tuple of whether the read was cached and its value.
+        """
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[(namespace, key)]
+                self._stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end((namespace, key))
+            self._stats["hits"] += 1
+            return True, entry[1]
+
+    def generation(self, namespace: str) -> tuple[int, int]:
+        """Return the generation of a namespace, which changes whenever its cached reads are dropped or patched."""
+        with self._lock:
+            return self._epoch, self._generations.get(namespace, 0)
+
+    def set(self, namespace: str, key: str, value: Any, generation: tuple[int, int] | None = None) -> None:
+        """Cache the value of a read, evicting the least recently used reads if the cache is full.
+
+        Args:
+            namespace: The kind of data read.
+            key: The key of the read within its namespace.
+            value: The value read.
+            generation: The generation of the namespace when the read started, the value is not cached if
+                a write invalidated or patched the namespace since.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and generation != (self._epoch, self._generations.get(namespace, 0)):
+                return
+            self._entries[(namespace, key)] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, *namespaces: str) -> None:
+        """Drop the cached reads of the given namespaces, or of every namespace if none are given."""
+        with self._lock:
+            if namespaces:
+                for namespace in namespaces:
+                    self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            else:
+                self._epoch += 1
+            for entry_key in list(self._entries):
+                if not namespaces or entry_key[0] in namespaces:
+                    del self._entries[entry_key]
+                    self._stats["invalidations"] += 1
+
+    def patch(self, namespace: str, update: Callable[[Any], Any]) -> None:
+        """Replace every cached read of a namespace with the result of applying update to it.
+
+        The expiry of patched reads is left unchanged. If update returns DROP or raises, the read is
+        dropped instead.
+        """
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for entry_key, (expires, value) in list(self._entries.items()):
+                if entry_key[0] != namespace:
+                    continue
+                try:
+                    patched = update(value)
+                except Exception:
+                    patched = DROP
+                if patched is DROP:
+                    del self._entries[entry_key]
+                    self._stats["invalidations"] += 1
+                else:
+                    self._entries[entry_key] = (expires, patched)
+                    self._stats["patches"] += 1
+
+    def clear(self) -> None:
+        """Drop every cached read and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+            self._stats = dict.fromkeys(self._stats, 0)
+
+    def stats(self) -> dict[str, Any]:
+        """Return the cache configuration, size and hit/miss counters."""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "ttl": self.ttl,
+                "maxsize": self.maxsize,
+                "size": len(self._entries),
+                **self._stats,
+                "hit_ratio": round(self._stats["hits"] / lookups, 3) if lookups else None,
+            }
+
+
+snapshot_cache = SnapshotCache()
+
+_write_listeners: list[Callable[[tuple[str, ...]], None]] = []
+
+
+def on_write(listener: Callable[[tuple[str, ...]], None]) -> Callable[[tuple[str, ...]], None]:
+    """Register a listener called with the namespaces a decorated write touched, once it succeeds."""
+    _write_listeners.append(listener)
+    return listener
+
+
+def _notify(namespaces: tuple[str, ...]) -> None:
+    for listener in list(_write_listeners):
+        listener(namespaces)
+
+
+def _make_key(signature: inspect.Signature, args: tuple, kwargs: dict) -> str:
+    """Key a call by the arguments it binds, so that the same call gets one key however its arguments are given."""
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return json.dumps(bound.arguments, sort_keys=True, default=str)
+
+
+def cached(namespace: str) -> Callable:
+    """Decorate a read function so its results are served from the snapshot cache.
+
+    Args:
+        namespace: The kind of data the function reads, used by writes to invalidate or patch it.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not snapshot_cache.enabled:
+                return func(*args, **kwargs)
+            key = f"{func.__qualname__}:{_make_key(signature, args, kwargs)}"
+            hit, value = snapshot_cache.get(namespace, key)
+            if hit:
+                return value
+            # Taken before reading, so that a write made during the read keeps its result out of the cache
+            generation = snapshot_cache.generation(namespace)
+            value = func(*args, **kwargs)
+            snapshot_cache.set(namespace, key, value, generation)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+def invalidates(*namespaces: str) -> Callable:
+    """Decorate a write function so it drops the cached reads of the given namespaces once it succeeds.
+
+    The write is never coalesced with reads, see mcp_omnifocus.utils.scripting.SingleFlight.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with single_flight.write():
+                result = func(*args, **kwargs)
+            snapshot_cache.invalidate(*namespaces)
+            _notify(namespaces)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def patches(namespace: str, update: Callable[[Any, Any], Any]) -> Callable:
+    """Decorate a write function so it patches the cached reads of a namespace with its result.
+
+    Args:
+        namespace: The kind of data the function writes.
+        update: Called with a cached read and the result of the write, returns the patched read.
+
+    The write is never coalesced with reads, see mcp_omnifocus.utils.scripting.SingleFlight.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with single_flight.write():
+                result = func(*args, **kwargs)
+            snapshot_cache.patch(namespace, lambda value: update(value, result))
+            _notify((namespace,))
+            return result
+
+        return wrapper
+
+    return decorator
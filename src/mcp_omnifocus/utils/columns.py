@@ -0,0 +1,262 @@
+"""A compact encoding of task lists for the transfer from OmniFocus to Python.
+
+Instead of one object per task, repeating every key, tasks are sent as column tables:
+
+    {
+        "count": 2,
+        "columns": {"id": ["a", "b"], "projectName": [0, -1], "flagged": [1, 0], "dueDate": [1735812000000, null]},
+        "zones": {},
+        "strings": ["Home"],
+        "zoneNames": ["GMT+0000 (Coordinated Universal Time)"]
+    }
+
+Project names, statuses and tags are indexes into the interned ``strings`` of the table, flags are 0 or 1,
+missing values of both are -1, and dates are epoch milliseconds. The zone part of ``Date.toString`` is sent once per UTC offset in
+``zoneNames``, so that dates can be formatted exactly as OmniFocus formats them; when a table has dates in
+more than one zone, ``zones`` holds the index of the zone of every date. ``decode_table`` turns a table back into
+the task dictionaries the object encoding would have produced.
+
+Long lists are split into several tables of a bounded number of rows, each with its own string tables, so
+they can be streamed and decoded one table at a time.
+"""
+
+import itertools
+import json
+from datetime import date
+from textwrap import dedent
+from typing import Any, Literal
+
+Encoding = Literal["interned", "internedList", "flag", "date"]
+
+# How task fields are encoded in column tables, the fields not listed are sent as they are
+TASK_ENCODINGS: dict[str, Encoding] = {
+    "projectName": "interned",
+    "status": "interned",
+    "projectId": "interned",
+    "tags": "internedList",
+    "tagIds": "internedList",
+    "flagged": "flag",
+    "dropped": "flag",
+    "completed": "flag",
+    "deferDate": "date",
+    "dueDate": "date",
+    "added": "date",
+    "modified": "date",
+}
+
+# The number of tasks per table
+TABLE_ROWS = 1000
+
+__column_functions__ = dedent("""
+var taskColumnEncodings = ${encodings};
+
+// Dates are read as Date objects for column tables, and formatted on the Python side
+var taskColumnFields = Object.assign({}, taskFields, {
+    deferDate: task => task.deferDate || null,
+    dueDate: task => task.dueDate || null,
+    added: task => task.added || null,
+    modified: task => task.modified || null,
+});
+
+function columnTable(fields, encodings) {
+    const columns = {};
+    const zones = {};
+    const strings = [];
+    const stringIndexes = new Map();
+    const zoneNames = [];
+    const zoneIndexes = new Map();
+    fields.forEach(field => {
+        columns[field] = [];
+        if (encodings[field] === 'date') {
+            zones[field] = [];
+        }
+    });
+
+    function intern(value) {
+        if (value === null || value === undefined) {
+            return -1;
+        }
+        let index = stringIndexes.get(value);
+        if (index === undefined) {
+            index = strings.length;
+            strings.push(value);
+            stringIndexes.set(value, index);
+        }
+        return index;
+    }
+
+    function zone(date) {
+        // Formatting a date is only needed once per UTC offset, to learn the name of its zone
+        const offset = date.getTimezoneOffset();
+        let index = zoneIndexes.get(offset);
+        if (index === undefined) {
+            const text = date.toString();
+            index = zoneNames.length;
+            zoneNames.push(text.slice(text.indexOf(' GMT') + 1));
+            zoneIndexes.set(offset, index);
+        }
+        return index;
+    }
+
+    const table = { count: 0, columns: columns, zones: zones, strings: strings, zoneNames: zoneNames };
+    return {
+        table: table,
+        add(row) {
+            fields.forEach(field => {
+                const value = row[field];
+                switch (encodings[field]) {
+                    case 'interned':
+                        columns[field].push(intern(value));
+                        break;
+                    case 'internedList':
+                        columns[field].push(value ? value.map(intern) : null);
+                        break;
+                    case 'flag':
+                        columns[field].push(value === null || value === undefined ? -1 : value ? 1 : 0);
+                        break;
+                    case 'date':
+                        columns[field].push(value ? value.getTime() : null);
+                        zones[field].push(value ? zone(value) : null);
+                        break;
+                    default:
+                        columns[field].push(value === undefined ? null : value);
+                }
+            });
+            table.count++;
+        },
+    };
+}
+
+function formatTaskColumns(tasks, fields, rows) {
+    fields = fields || defaultTaskFields;
+    const tables = [];
+    let current = null;
+    tasks.forEach(task => {
+        let row;
+        try {
+            row = pickFields(task, taskColumnFields, fields);
+        } catch (e) {
+            return;  // Skipped, like the tasks formatTask cannot read
+        }
+        if (current === null || current.table.count >= rows) {
+            current = columnTable(fields, taskColumnEncodings);
+            tables.push(current.table);
+        }
+        current.add(row);
+    });
+    tables.forEach(table => {
+        if (table.zoneNames.length < 2) {
+            table.zones = {};  // Every date is in the only zone
+        }
+    });
+    return tables;
+}
+""").replace("${encodings}", json.dumps(TASK_ENCODINGS))
+
+_DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_DAY_MS = 86_400_000
+
+# Flags by their encoding, -1 for missing ones
+_FLAGS = (False, True, None)
+
+
+def _zone_offset(zone: str) -> int:
+    """The UTC offset in milliseconds of a zone as JavaScript names it, e.g. "GMT+0100 (...)"."""
+    sign = -1 if zone[3] == "-" else 1
+    return sign * (int(zone[4:6]) * 60 + int(zone[6:8])) * 60_000
+
+
+class _ZoneDates(dict[float | None, str | None]):
+    """The dates formatted as JavaScript's Date.toString does in one zone, by their epoch milliseconds.
+
+    Dates are formatted on first lookup, so that whole columns can be mapped through the lookup.
+    """
+
+    def __init__(self, zone: str):
+        super().__init__({None: None})
+        self.zone = zone
+        self.offset = _zone_offset(zone)
+        self.days: dict[int, str] = {}
+
+    def __missing__(self, milliseconds: float) -> str:
+        day, time_of_day = divmod(int(milliseconds // 1) + self.offset, _DAY_MS)
+        prefix = self.days.get(day)
+        if prefix is None:
+            # Day and month names are always English in JavaScript, unlike strftime's
+            local = date.fromordinal(_EPOCH_ORDINAL + day)
+            prefix = f"{_DAYS[local.weekday()]} {_MONTHS[local.month - 1]} {local.day:02d} {local.year:04d}"
+            self.days[day] = prefix
+        hours, seconds = divmod(time_of_day // 1000, 3600)
+        minutes, seconds = divmod(seconds, 60)
+        text = self[milliseconds] = f"{prefix} {hours:02d}:{minutes:02d}:{seconds:02d} {self.zone}"
+        return text
+
+
+def format_js_date(milliseconds: float, zone: str) -> str:
+    """Format a time as JavaScript's Date.toString does.
+
+    Args:
+        milliseconds: The time in epoch milliseconds.
+        zone: The zone part of Date.toString for that time, e.g. "GMT+0100 (Central European Standard Time)".
+
+    Returns:
+        The date, e.g. "Thu Jan 02 2025 11:00:00 GMT+0100 (Central European Standard Time)".
+    """
+    return _zone_dates(zone)[milliseconds]
+
+
+# Formatted dates are kept across tables and calls, as the same due dates and days come up again
+_MAX_ZONE_DATES = 100_000
+_formatted_dates: dict[str, _ZoneDates] = {}
+
+
+def _zone_dates(zone: str) -> _ZoneDates:
+    dates = _formatted_dates.get(zone)
+    if dates is None or len(dates) > _MAX_ZONE_DATES:
+        dates = _formatted_dates[zone] = _ZoneDates(zone)
+    return dates
+
+
+def decode_table(table: dict[str, Any], encodings: dict[str, Encoding] = TASK_ENCODINGS) -> list[dict[str, Any]]:
+    """Decode a column table into one dictionary per row.
+
+    Args:
+        table: The table, as built by the formatTaskColumns script function.
+        encodings: How the fields of the table are encoded.
+
+    Returns:
+        The rows, with the same fields and values as the object encoding.
+    """
+    # Missing values are encoded as -1, the index of the None added at the end
+    strings = [*table["strings"], None]
+    lookup = strings.__getitem__
+    zones = [_zone_dates(zone) for zone in table["zoneNames"]]
+
+    # Columns are decoded with map wherever possible, which loops in C rather than in Python
+    fields = list(table["columns"])
+    columns = []
+    for field in fields:
+        values = table["columns"][field]
+        encoding = encodings.get(field)
+        if encoding == "interned":
+            values = list(map(lookup, values))
+        elif encoding == "internedList":
+            if None in values:
+                values = [None if value is None else list(map(lookup, value)) for value in values]
+            else:
+                values = list(map(list, map(map, itertools.repeat(lookup), values)))
+        elif encoding == "flag":
+            values = list(map(_FLAGS.__getitem__, values))
+        elif encoding == "date" and len(zones) < 2:
+            # Tables only have more than one zone when their dates span a daylight saving change, and none
+            # when they have no dates at all
+            values = list(map(zones[0].__getitem__, values)) if zones else values
+        elif encoding == "date":
+            values = [
+                None if value is None else zones[zone][value]
+                for value, zone in zip(values, table["zones"][field], strict=True)
+            ]
+        columns.append(values)
+    return list(map(dict, map(zip, itertools.repeat(fields), zip(*columns, strict=True))))
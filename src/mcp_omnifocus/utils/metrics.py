@@ -0,0 +1,212 @@
+"""Per-call measurements of the scripts evaluated in OmniFocus, aggregated into histograms.
+
+Every call to ``evaluate_javascript`` is recorded under the tool that made it with the time spent in
+each phase:
+
+    script     running osascript, from starting the process to reading its output
+    evaluate   evaluating the script inside OmniFocus, as timed by the script wrapper
+    transport  the rest of the osascript run: process spawn, loading the script, transferring output
+    decode     decoding the JSON output
+    total      the whole evaluate_javascript call
+
+plus ``compile`` for scripts compiled with osacompile, ``tool`` for whole tool calls, the size of the
+script sent and the output received, and the class of any error raised.
+"""
+
+import contextlib
+import json
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextvars import ContextVar
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, math.inf)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, math.inf)
+
+# The name of the tool whose calls are being recorded, None outside of tools
+current_tool: ContextVar[str | None] = ContextVar("current_tool", default=None)
+
+
+class Histogram:
+    """Counts of observed values in cumulative buckets, with their sum, as in Prometheus."""
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "buckets": {_format_bound(bound): count for bound, count in zip(self.buckets, self.counts, strict=True)},
+        }
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == math.inf else f"{bound:g}"
+
+
+class CallMetrics:
+    """Histograms of call durations per tool and phase, and of script and output sizes per tool."""
+
+    def __init__(self, slow_call_ms: float | None = None):
+        """Create empty metrics.
+
+        Args:
+            slow_call_ms: Log calls that take longer than this many milliseconds, None to log none.
+        """
+        self.slow_call_ms = slow_call_ms
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop every measurement."""
+        with self._lock:
+            self._durations: dict[tuple[str, str], Histogram] = {}
+            self._sizes: dict[tuple[str, str], Histogram] = {}
+            self._calls: Counter[str] = Counter()
+            # Keyed by tool, "tool" or "call" for errors raised by a whole tool or by one script, and class
+            self._errors: Counter[tuple[str, str, str]] = Counter()
+
+    @contextlib.contextmanager
+    def tool(self, name: str) -> Iterator[None]:
+        """Record the calls made inside the block under a tool name, and the duration of the block itself."""
+        token = current_tool.set(name)
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            with self._lock:
+                self._errors[(name, "tool", type(e).__name__)] += 1
+            raise
+        finally:
+            current_tool.reset(token)
+            self.observe_duration("tool", (time.perf_counter() - start) * 1000, tool=name)
+
+    def observe_duration(self, phase: str, milliseconds: float, tool: str | None = None) -> None:
+        """Record the duration of a phase outside of a whole call, e.g. a compile."""
+        key = (tool or current_tool.get() or "none", phase)
+        with self._lock:
+            self._durations.setdefault(key, Histogram(DURATION_BUCKETS)).observe(milliseconds)
+
+    def record_call(
+        self,
+        timings: dict[str, float],
+        script_bytes: int,
+        output_bytes: int,
+        error: str | None = None,
+        script: str = "",
+    ) -> None:
+        """Record one evaluate_javascript call.
+
+        Args:
+            timings: Milliseconds spent in each phase of the call.
+            script_bytes: The size of the script sent to OmniFocus.
+            output_bytes: The size of the output received, 0 if the call failed.
+            error: The class name of the exception the call raised, if any.
+            script: The script, logged in part when the call is slow.
+        """
+        tool = current_tool.get() or "none"
+        with self._lock:
+            self._calls[tool] += 1
+            for phase, milliseconds in timings.items():
+                self._durations.setdefault((tool, phase), Histogram(DURATION_BUCKETS)).observe(milliseconds)
+            self._sizes.setdefault((tool, "script"), Histogram(SIZE_BUCKETS)).observe(script_bytes)
+            self._sizes.setdefault((tool, "output"), Histogram(SIZE_BUCKETS)).observe(output_bytes)
+            if error is not None:
+                self._errors[(tool, "call", error)] += 1
+
+        if self.slow_call_ms is not None and timings.get("total", 0) >= self.slow_call_ms:
+            # The arguments are at the end of the script, which is what tells slow calls apart
+            call = script[-300:]
+            logger.warning(
+                "Slow OmniFocus call: %s",
+                json.dumps(
+                    {
+                        "tool": tool,
+                        "timings_ms": {phase: round(value, 3) for phase, value in timings.items()},
+                        "script_bytes": script_bytes,
+                        "output_bytes": output_bytes,
+                        "error": error,
+                        "call": call,
+                    }
+                ),
+            )
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the measurements per tool: call and error counts, duration and size histograms."""
+        with self._lock:
+            tools: dict[str, Any] = {}
+
+            def entry(tool: str) -> dict[str, Any]:
+                return tools.setdefault(
+                    tool, {"calls": 0, "errors": {"tool": {}, "call": {}}, "durations_ms": {}, "bytes": {}}
+                )
+
+            for tool, count in self._calls.items():
+                entry(tool)["calls"] = count
+            for (tool, scope, error), count in self._errors.items():
+                entry(tool)["errors"][scope][error] = count
+            for (tool, phase), histogram in self._durations.items():
+                entry(tool)["durations_ms"][phase] = histogram.snapshot()
+            for (tool, kind), histogram in self._sizes.items():
+                entry(tool)["bytes"][kind] = histogram.snapshot()
+            return {"slow_call_ms": self.slow_call_ms, "tools": dict(sorted(tools.items()))}
+
+    def prometheus(self) -> str:
+        """Return the measurements in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP mcp_omnifocus_calls_total Scripts evaluated in OmniFocus.",
+                "# TYPE mcp_omnifocus_calls_total counter",
+            ]
+            lines += [
+                f'mcp_omnifocus_calls_total{{tool="{tool}"}} {count}' for tool, count in sorted(self._calls.items())
+            ]
+            lines += [
+                "# HELP mcp_omnifocus_errors_total Errors raised by whole tools (scope tool) and scripts (scope call).",
+                "# TYPE mcp_omnifocus_errors_total counter",
+            ]
+            lines += [
+                f'mcp_omnifocus_errors_total{{tool="{tool}",scope="{scope}",error="{error}"}} {count}'
+                for (tool, scope, error), count in sorted(self._errors.items())
+            ]
+            lines += _histogram_lines(
+                "mcp_omnifocus_duration_milliseconds", "Time spent per phase of a call.", "phase", self._durations
+            )
+            lines += _histogram_lines(
+                "mcp_omnifocus_size_bytes", "Size of the scripts sent and output received.", "kind", self._sizes
+            )
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(
+    name: str, description: str, label: str, histograms: dict[tuple[str, str], Histogram]
+) -> list[str]:
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+    for (tool, value), histogram in sorted(histograms.items()):
+        labels = f'tool="{tool}",{label}="{value}"'
+        for bound, count in zip(histogram.buckets, histogram.counts, strict=True):
+            lines.append(f'{name}_bucket{{{labels},le="{_format_bound(bound)}"}} {count}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.sum:g}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return lines
+
+
+call_metrics = CallMetrics()
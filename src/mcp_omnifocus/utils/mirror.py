@@ -0,0 +1,278 @@
+import json
+import re
+import sqlite3
+import time
+from typing import Any
+
+from mcp_omnifocus.utils import omnifocus
+from mcp_omnifocus.utils.sync import DeltaSync, Kind
+
+SCHEMA_VERSION = 1
+
+__schema__ = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    note TEXT,
+    project_id TEXT,
+    status TEXT,
+    completed INTEGER,
+    dropped INTEGER,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_project ON tasks (project_id);
+CREATE TABLE IF NOT EXISTS projects (id TEXT PRIMARY KEY, name TEXT, note TEXT, status TEXT, record TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS tags (id TEXT PRIMARY KEY, name TEXT, parent_id TEXT, record TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS task_tags (task_id TEXT, tag_id TEXT, PRIMARY KEY (task_id, tag_id)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS task_tags_tag ON task_tags (tag_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS task_search USING fts5(name, note, tokenize = 'unicode61 remove_diacritics 2');
+"""
+
+# Matches in a task name count ten times as much as matches in its note
+NAME_WEIGHT, NOTE_WEIGHT = 10.0, 1.0
+
+
+def match_expression(text: str) -> str | None:
+    """Turn free text into an FTS5 query matching tasks that contain every word, or a word starting with it.
+
+    Returns None when the text has no words to search for.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+class Mirror(DeltaSync):
+    """A copy of the OmniFocus tasks, projects and tags in SQLite, with a full text index over tasks.
+
+    The mirror is refreshed with the same delta listings as DeltaSync, and kept in a file so that it
+    survives restarts, or in memory. Task names and notes are indexed with FTS5 for ranked searches
+    that never reach OmniFocus.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        """Open a mirror, creating its tables if needed.
+
+        Args:
+            path: The SQLite database file, ":memory:" for a mirror that is not kept.
+        """
+        super().__init__()
+        self.path = path
+        self.refreshed_at: float | None = None
+        self.stale = False
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock:
+            version = self._db.execute("PRAGMA user_version").fetchone()[0]
+            if version not in (0, SCHEMA_VERSION):
+                self._drop()
+            self._db.executescript(__schema__)
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'watermark'").fetchone()
+            self.watermark = json.loads(row["value"]) if row else None
+            self._db.commit()
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+    def refresh(self) -> dict[str, dict[str, int]]:
+        try:
+            summary = super().refresh()
+        except BaseException:
+            with self._lock:
+                self._db.rollback()
+            raise
+        self.refreshed_at = time.monotonic()
+        self.stale = False
+        return summary
+
+    def refresh_if_stale(self, max_age: float) -> None:
+        """Refresh unless the last refresh is less than max_age seconds old and no write happened since."""
+        if self.stale or self.refreshed_at is None or time.monotonic() - self.refreshed_at >= max_age:
+            self.refresh()
+
+    def mark_stale(self) -> None:
+        """Have the next refresh_if_stale refresh, e.g. after a write to OmniFocus."""
+        self.stale = True
+
+    def reset(self) -> None:
+        with self._lock:
+            self._drop()
+            self._db.executescript(__schema__)
+            self._db.commit()
+            self.watermark = None
+            self.refreshed_at = None
+
+    def rebuild(self) -> dict[str, dict[str, int]]:
+        """Drop every local record and list everything from OmniFocus again."""
+        self.reset()
+        return self.refresh()
+
+    def _drop(self) -> None:
+        for table in ("meta", "tasks", "projects", "tags", "task_tags", "task_search"):
+            self._db.execute(f"DROP TABLE IF EXISTS {table}")
+
+    def _merge(self, kind: Kind, records: list[dict[str, Any]]) -> int:
+        if not records:
+            return 0
+        ids = [record["id"] for record in records]
+        known = set()
+        for start in range(0, len(ids), 500):
+            chunk = ids[start : start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            known.update(
+                row[0] for row in self._db.execute(f"SELECT id FROM {kind} WHERE id IN ({placeholders})", chunk)
+            )
+
+        if kind == "tasks":
+            self._merge_tasks(records)
+        elif kind == "projects":
+            self._db.executemany(
+                "INSERT OR REPLACE INTO projects (id, name, note, status, record) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (record["id"], record.get("name"), record.get("note"), record.get("status"), json.dumps(record))
+                    for record in records
+                ],
+            )
+        else:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO tags (id, name, parent_id, record) VALUES (?, ?, ?, ?)",
+                [(record["id"], record.get("name"), record.get("parentId"), json.dumps(record)) for record in records],
+            )
+        return len(records) - len(known)
+
+    def _merge_tasks(self, records: list[dict[str, Any]]) -> None:
+        for record in records:
+            # Upserting keeps the rowid, which is shared with the search index
+            rowid = self._db.execute(
+                """
+                INSERT INTO tasks (id, name, note, project_id, status, completed, dropped, record)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    name = excluded.name, note = excluded.note, project_id = excluded.project_id,
+                    status = excluded.status, completed = excluded.completed, dropped = excluded.dropped,
+                    record = excluded.record
+                RETURNING rowid
+                """,
+                (
+                    record["id"],
+                    record.get("name"),
+                    record.get("note"),
+                    record.get("projectId"),
+                    record.get("status"),
+                    bool(record.get("completed")),
+                    bool(record.get("dropped")),
+                    json.dumps(record),
+                ),
+            ).fetchone()[0]
+            self._db.execute("DELETE FROM task_search WHERE rowid = ?", (rowid,))
+            self._db.execute(
+                "INSERT INTO task_search (rowid, name, note) VALUES (?, ?, ?)",
+                (rowid, record.get("name") or "", record.get("note") or ""),
+            )
+            self._db.execute("DELETE FROM task_tags WHERE task_id = ?", (record["id"],))
+            self._db.executemany(
+                "INSERT OR IGNORE INTO task_tags (task_id, tag_id) VALUES (?, ?)",
+                [(record["id"], tag_id) for tag_id in record.get("tagIds") or []],
+            )
+
+    def _count(self, kind: Kind) -> int:
+        return self._db.execute(f"SELECT COUNT(*) FROM {kind}").fetchone()[0]
+
+    def _prune(self, kind: Kind, remaining: set[str]) -> int:
+        removed = [row[0] for row in self._db.execute(f"SELECT id FROM {kind}") if row[0] not in remaining]
+        for record_id in removed:
+            if kind == "tasks":
+                self._db.execute(
+                    "DELETE FROM task_search WHERE rowid = (SELECT rowid FROM tasks WHERE id = ?)", (record_id,)
+                )
+                self._db.execute("DELETE FROM task_tags WHERE task_id = ?", (record_id,))
+            self._db.execute(f"DELETE FROM {kind} WHERE id = ?", (record_id,))
+        return len(removed)
+
+    def _commit(self, watermark: float) -> None:
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('watermark', ?)", (json.dumps(watermark),))
+        self._db.commit()
+        self.watermark = watermark
+
+    def _records(self, kind: Kind) -> list[dict[str, Any]]:
+        with self._lock:
+            return [json.loads(row[0]) for row in self._db.execute(f"SELECT record FROM {kind} ORDER BY rowid")]
+
+    def list_tasks(self, fields: list[omnifocus.TaskField] | None = None) -> list[dict[str, Any]]:
+        return omnifocus.project_fields(
+            self._with_current_names(self._records("tasks")), fields, omnifocus.DEFAULT_TASK_FIELDS
+        )
+
+    def list_projects(self, fields: list[omnifocus.ProjectField] | None = None) -> list[dict[str, Any]]:
+        return omnifocus.project_fields(self._records("projects"), fields, omnifocus.DEFAULT_PROJECT_FIELDS)
+
+    def list_tags(self, fields: list[omnifocus.TagField] | None = None) -> list[dict[str, Any]]:
+        return omnifocus.project_fields(self._records("tags"), fields, omnifocus.DEFAULT_TAG_FIELDS)
+
+    def search_tasks(
+        self,
+        text: str,
+        limit: int = 20,
+        include_completed: bool = False,
+        project_id: str | None = None,
+        tag_id: str | None = None,
+        fields: list[omnifocus.TaskField] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Search the task names and notes, best matches first.
+
+        Args:
+            text: The words to search for, every word must appear in the name or note. Words also match
+                longer words they start with.
+            limit: The maximum number of tasks to return.
+            include_completed: Whether to include completed and dropped tasks.
+            project_id: Only search the tasks of this project.
+            tag_id: Only search the tasks with this tag.
+            fields: The task fields to return, None for the default fields.
+
+        Returns:
+            The matching tasks, each with its "score" (higher is better) and a "snippet" of the matching
+            text with the matched words in [brackets].
+        """
+        expression = match_expression(text)
+        if expression is None:
+            return []
+
+        conditions = ["task_search MATCH ?"]
+        parameters: list[Any] = [expression]
+        if not include_completed:
+            conditions.append("NOT tasks.completed AND NOT tasks.dropped")
+        if project_id is not None:
+            conditions.append("tasks.project_id = ?")
+            parameters.append(project_id)
+        if tag_id is not None:
+            conditions.append("tasks.id IN (SELECT task_id FROM task_tags WHERE tag_id = ?)")
+            parameters.append(tag_id)
+
+        with self._lock:
+            rows = self._db.execute(
+                f"""
+                SELECT
+                    tasks.record,
+                    bm25(task_search, {NAME_WEIGHT}, {NOTE_WEIGHT}) AS rank,
+                    snippet(task_search, -1, '[', ']', '…', 12) AS snippet
+                FROM task_search JOIN tasks ON tasks.rowid = task_search.rowid
+                WHERE {" AND ".join(conditions)}
+                ORDER BY rank
+                LIMIT ?
+                """,
+                [*parameters, limit],
+            ).fetchall()
+
+        records = omnifocus.project_fields(
+            self._with_current_names([json.loads(row["record"]) for row in rows]), fields, omnifocus.DEFAULT_TASK_FIELDS
+        )
+        # bm25 is lower for better matches
+        return [
+            {**record, "score": round(-row["rank"], 3), "snippet": row["snippet"]}
+            for record, row in zip(records, rows, strict=True)
+        ]
@@ -0,0 +1,396 @@
+"""A read-only view of the OmniFocus database read straight from its ``.ofocus`` bundle on disk.
+
+OmniFocus keeps its database as a bundle of zipped transactions, each holding a ``contents.xml``:
+
+    OmniFocus.ofocus/
+        00000000000000=hNT3XIxoxlB+jYzpsrGX8Fj.zip   the base transaction, with every object
+        20250102100000=jYzpsrGX8Fj+a1b2c3d4e5f.zip   a delta, with the objects added, updated or deleted since
+
+Transactions are named after the time they were saved, so applying them in the order of their names gives
+the current database. The elements of a transaction are tasks (projects are tasks with a ``<project>``
+element), contexts (tags), folders and the links between tasks and tags; an ``op`` attribute says whether
+an element updates or deletes the object of its id, elements without one add it.
+
+Reading the bundle answers the list functions of ``mcp_omnifocus.utils.omnifocus`` without a script in
+OmniFocus, and works without OmniFocus running at all, so it is also how those functions are tested on
+Linux. Transactions are parsed with a streaming parser, one top-level element at a time, and only the
+transactions saved since the previous read are parsed again.
+
+The records have the same fields as the ones OmniFocus formats, with two approximations: task statuses are
+derived from the dates, flags and project states in the bundle (OmniFocus computes them with its own
+settings, such as the due soon interval), and dates carry the local zone abbreviation of Python rather
+than the zone name of JavaScript, e.g. "GMT+0100 (CET)" for "GMT+0100 (Central European Standard Time)".
+
+Encrypted databases cannot be read, ``DatabaseUnreadableError`` is then raised so the caller asks OmniFocus.
+"""
+
+import threading
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+from xml.etree import ElementTree
+
+from mcp_omnifocus.utils import columns
+
+_NAMESPACE = "{http://www.omnigroup.com/namespace/OmniFocus/v2}"
+
+# The kinds of objects read from transactions, by the tag of their element
+_KINDS = {"task": "task", "context": "tag", "folder": "folder", "task-to-tag": "link"}
+
+_PROJECT_STATUSES = {"active": "Active", "inactive": "OnHold", "done": "Done", "dropped": "Dropped"}
+
+
+class DatabaseUnreadableError(Exception):
+    """The bundle is missing, encrypted, or has a transaction that cannot be parsed."""
+
+
+class OFocusDatabase:
+    """The tasks, projects and tags of an ``.ofocus`` bundle, read again whenever OmniFocus saves to it."""
+
+    def __init__(self, path: str | Path, due_soon: float = 2 * 86_400, write_grace: float = 30):
+        """Open a bundle, which is read on first use.
+
+        Args:
+            path: The ``.ofocus`` bundle.
+            due_soon: Seconds before their due date that tasks are due soon.
+            write_grace: Seconds to wait for OmniFocus to save a change made through its scripts, during which
+                the bundle is reported unreadable rather than read while it misses the change.
+        """
+        self.path = Path(path)
+        self.due_soon = due_soon
+        self.write_grace = write_grace
+        self._lock = threading.Lock()
+        self._objects: dict[str, dict[str, dict[str, Any]]] = {kind: {} for kind in _KINDS.values()}
+        self._applied: list[str] = []
+        self._records: dict[str, Any] | None = None
+        self._derived_at = 0.0
+        self._awaiting: tuple[float, list[str]] | None = None
+
+    def expect_change(self) -> None:
+        """Note a change made through OmniFocus, which the bundle only has once OmniFocus saved it."""
+        with self._lock:
+            try:
+                self._awaiting = (time.monotonic(), self._transactions())
+            except DatabaseUnreadableError:
+                self._awaiting = None
+
+    def tasks(self) -> list[dict[str, Any]]:
+        """Return every task with all its fields, in the order of the inbox and the library."""
+        return self._read()["tasks"]
+
+    def projects(self) -> list[dict[str, Any]]:
+        """Return every project with all its fields, in the order of the library."""
+        return self._read()["projects"]
+
+    def tags(self) -> list[dict[str, Any]]:
+        """Return every tag with all its fields, parents before their children."""
+        return self._read()["tags"]
+
+    def task(self, task_id: str) -> dict[str, Any] | None:
+        """Return a task with all its fields, None when there is no such task."""
+        return self._read()["tasksById"].get(task_id)
+
+    def project_tasks(self, project_id: str) -> list[dict[str, Any]] | None:
+        """Return the tasks at the top level of a project, None when there is no such project."""
+        return self._read()["projectTasks"].get(project_id)
+
+    def _read(self) -> dict[str, Any]:
+        with self._lock:
+            names = self._transactions()
+            if self._awaiting is not None:
+                since, applied = self._awaiting
+                if names == applied and time.monotonic() - since < self.write_grace:
+                    raise DatabaseUnreadableError("OmniFocus has not saved the latest change yet")
+                self._awaiting = None
+
+            if names[: len(self._applied)] != self._applied:
+                # Older transactions were merged into a new base, which is read from scratch
+                self._objects = {kind: {} for kind in _KINDS.values()}
+                self._applied = []
+            for name in names[len(self._applied) :]:
+                self._apply(self._parse(name))
+                self._applied = self._applied + [name]
+                self._records = None
+
+            # Statuses depend on the time, so they are derived again every minute even without changes
+            if self._records is None or time.monotonic() - self._derived_at > 60:
+                self._records = self._derive()
+                self._derived_at = time.monotonic()
+            return self._records
+
+    def _transactions(self) -> list[str]:
+        """List the transactions of the bundle in the order they are applied."""
+        if (self.path / "encrypted").exists():
+            raise DatabaseUnreadableError(f"The database is encrypted: {self.path}")
+        try:
+            names = sorted(entry.name for entry in self.path.iterdir() if entry.name.endswith(".zip"))
+        except OSError as e:
+            raise DatabaseUnreadableError(f"Could not read the database: {e}") from e
+        if not names:
+            raise DatabaseUnreadableError(f"The database has no transactions: {self.path}")
+        return names
+
+    def _parse(self, name: str) -> list[tuple[str, str, str | None, dict[str, Any] | None]]:
+        """Parse a transaction into its operations, as (kind, id, op, fields) tuples."""
+        operations = []
+        try:
+            with zipfile.ZipFile(self.path / name) as archive, archive.open("contents.xml") as contents:
+                depth, root = 0, None
+                for event, element in ElementTree.iterparse(contents, events=("start", "end")):
+                    if event == "start":
+                        root = element if root is None else root
+                        depth += 1
+                        continue
+                    depth -= 1
+                    if depth != 1:
+                        continue
+                    kind = _KINDS.get(element.tag.removeprefix(_NAMESPACE))
+                    op = element.get("op")
+                    if kind is not None and op != "reference":
+                        operations.append((kind, element.get("id"), op, None if op == "delete" else _fields(element)))
+                    # Only the element at hand is held in memory
+                    root.clear()
+        except (OSError, KeyError, ValueError, TypeError, zipfile.BadZipFile, ElementTree.ParseError) as e:
+            raise DatabaseUnreadableError(f"Could not read the transaction {name}: {e}") from e
+        return operations
+
+    def _apply(self, operations: list[tuple[str, str, str | None, dict[str, Any] | None]]) -> None:
+        for kind, object_id, op, fields in operations:
+            if op == "delete":
+                self._objects[kind].pop(object_id, None)
+            else:
+                # Updates hold every field of the object
+                self._objects[kind][object_id] = fields
+
+    def _derive(self) -> dict[str, Any]:
+        """Turn the objects of the transactions into the task, project and tag records, and their indexes."""
+        tasks, tags, folders = self._objects["task"], self._objects["tag"], self._objects["folder"]
+        tag_ids_by_task: dict[str, list[str]] = {}
+        for link in sorted(self._objects["link"].values(), key=lambda link: link["rank-in-task"]):
+            if link["task"] in tasks and link["context"] in tags:
+                tag_ids_by_task.setdefault(link["task"], []).append(link["context"])
+        for task_id, task in tasks.items():
+            # Before tags, a task had a single context
+            if task["context"] in tags and task["context"] not in tag_ids_by_task.get(task_id, []):
+                tag_ids_by_task.setdefault(task_id, []).insert(0, task["context"])
+
+        children: dict[str | None, list[str]] = {}
+        for object_id, task in tasks.items():
+            parent = task["task"] if task["task"] in tasks else None
+            children.setdefault(parent, []).append(object_id)
+        for siblings in children.values():
+            siblings.sort(key=lambda object_id: tasks[object_id]["rank"])
+
+        tag_records = _tag_records(tags)
+        names = {record["id"]: record["name"] for record in tag_records}
+        now = time.time() * 1000
+        due_soon = now + self.due_soon * 1000
+
+        task_records: list[dict[str, Any]] = []
+        project_records: list[dict[str, Any]] = []
+        project_tasks: dict[str, list[dict[str, Any]]] = {}
+
+        def visit(task_id: str, project: dict[str, Any] | None, inherited: dict[str, Any]) -> None:
+            task = tasks[task_id]
+            tag_ids = tag_ids_by_task.get(task_id, [])
+            record = {
+                "id": task_id,
+                "name": task["name"],
+                "flagged": task["flagged"],
+                "deferDate": _format_date(task["start"]),
+                "dueDate": _format_date(task["due"]),
+                "tags": [names[tag_id] for tag_id in tag_ids],
+                "note": task["note"],
+                "tagIds": tag_ids,
+            }
+            remaining = [child for child in children.get(task_id, []) if not _finished(tasks[child])]
+            if task["project"] is not None:
+                status = _PROJECT_STATUSES.get(task["project"]["status"], "Active")
+                if task["completed"] is not None and status == "Active":
+                    status = "Done"
+                project_records.append({**record, "status": status})
+                project_tasks[task_id] = []
+                project = {"id": task_id, "name": task["name"], "status": status}
+                inherited = {
+                    "defer": task["start"],
+                    "due": task["due"],
+                    "dropped": status == "Dropped",
+                    "blocked": status in ("OnHold", "Done"),
+                }
+            else:
+                status = _task_status(task, inherited, now, due_soon)
+                task_record = {
+                    **record,
+                    "projectName": project["name"] if project else None,
+                    "status": status,
+                    "dropped": task["hidden"] is not None,
+                    "completed": task["completed"] is not None,
+                    "projectId": project["id"] if project else None,
+                    "added": _format_date(task["added"]),
+                    "modified": _format_date(task["modified"]),
+                }
+                task_records.append(task_record)
+                if project is not None and task["task"] == project["id"]:
+                    project_tasks[project["id"]].append(task_record)
+                inherited = {
+                    "defer": _latest(inherited["defer"], task["start"]),
+                    "due": _earliest(inherited["due"], task["due"]),
+                    "dropped": status == "Dropped",
+                    "blocked": status == "Blocked",
+                }
+
+            sequential = task["order"] == "sequential"
+            for child in children.get(task_id, []):
+                # In a sequential project or group, only the first remaining task is available
+                order = None
+                if sequential and child in remaining:
+                    order = "next" if child == remaining[0] else "blocked"
+                visit(child, project, {**inherited, "order": order})
+
+        top = children.get(None, [])
+        inbox = [task_id for task_id in top if tasks[task_id]["project"] is None]
+        library = _library_order([task_id for task_id in top if task_id not in inbox], tasks, folders)
+        root = {"defer": None, "due": None, "dropped": False, "blocked": False, "order": None}
+        for task_id in inbox + library:
+            visit(task_id, None, root)
+        return {
+            "tasks": task_records,
+            "projects": project_records,
+            "tags": tag_records,
+            "tasksById": {record["id"]: record for record in task_records},
+            "projectTasks": project_tasks,
+        }
+
+
+def _finished(task: dict[str, Any]) -> bool:
+    return task["completed"] is not None or task["hidden"] is not None
+
+
+def _task_status(task: dict[str, Any], inherited: dict[str, Any], now: float, due_soon: float) -> str:
+    """Derive the status of a task from its own dates and flags and those of its project and parents."""
+    if task["completed"] is not None:
+        return "Completed"
+    if task["hidden"] is not None or inherited["dropped"]:
+        return "Dropped"
+    defer = _latest(inherited["defer"], task["start"])
+    if inherited["blocked"] or inherited["order"] == "blocked" or (defer is not None and defer > now):
+        return "Blocked"
+    due = _earliest(inherited["due"], task["due"])
+    if due is not None and due < now:
+        return "Overdue"
+    if due is not None and due < due_soon:
+        return "DueSoon"
+    return "Next" if inherited["order"] == "next" else "Available"
+
+
+def _latest(first: float | None, second: float | None) -> float | None:
+    return second if first is None else first if second is None else max(first, second)
+
+
+def _earliest(first: float | None, second: float | None) -> float | None:
+    return second if first is None else first if second is None else min(first, second)
+
+
+def _library_order(project_ids: list[str], tasks: dict[str, dict[str, Any]], folders: dict[str, Any]) -> list[str]:
+    """Order projects as the library lists them: folders and projects by rank, folders before their contents."""
+
+    def path(task_id: str) -> list[int]:
+        ranks = [tasks[task_id]["rank"]]
+        folder_id = tasks[task_id]["project"]["folder"]
+        seen = set()
+        while folder_id in folders and folder_id not in seen:
+            seen.add(folder_id)
+            ranks.insert(0, folders[folder_id]["rank"])
+            folder_id = folders[folder_id]["folder"]
+        return ranks
+
+    return sorted(project_ids, key=path)
+
+
+def _tag_records(tags: dict[str, dict[str, Any]]) -> list[dict[str, Any]]:
+    """List the tags top-down with their full names, as the tagHierarchy script function does."""
+    children: dict[str | None, list[str]] = {}
+    for tag_id, tag in tags.items():
+        children.setdefault(tag["context"] if tag["context"] in tags else None, []).append(tag_id)
+
+    records = []
+    pending = [
+        (tag_id, None, None) for tag_id in sorted(children.get(None, []), key=lambda tag_id: tags[tag_id]["rank"])
+    ]
+    pending.reverse()
+    while pending:
+        tag_id, parent_id, parent_name = pending.pop()
+        name = tags[tag_id]["name"]
+        full_name = name if parent_name is None else f"{parent_name} : {name}"
+        records.append({"id": tag_id, "name": name, "fullName": full_name, "parentId": parent_id})
+        nested = sorted(children.get(tag_id, []), key=lambda child: tags[child]["rank"], reverse=True)
+        pending.extend((child, tag_id, full_name) for child in nested)
+    return records
+
+
+def _fields(element: ElementTree.Element) -> dict[str, Any]:
+    """Read the fields of a task, context, folder or task-to-tag element."""
+
+    def child(name: str) -> ElementTree.Element | None:
+        return element.find(_NAMESPACE + name)
+
+    def text(name: str) -> str | None:
+        found = child(name)
+        return found.text if found is not None and found.text else None
+
+    def idref(name: str) -> str | None:
+        found = child(name)
+        return found.get("idref") if found is not None else None
+
+    project = child("project")
+    project_folder = project.find(_NAMESPACE + "folder") if project is not None else None
+    return {
+        "name": text("name") or "",
+        "rank": int(text("rank") or 0),
+        "note": _note(child("note")),
+        "flagged": text("flagged") == "true",
+        "start": _parse_date(text("start")),
+        "due": _parse_date(text("due")),
+        "completed": _parse_date(text("completed")),
+        "hidden": _parse_date(text("hidden")),
+        "added": _parse_date(text("added")),
+        "modified": _parse_date(text("modified")),
+        "order": text("order"),
+        "task": idref("task"),
+        "context": idref("context"),
+        "folder": idref("folder"),
+        "rank-in-task": int(text("rank-in-task") or 0),
+        "project": None
+        if project is None
+        else {
+            "status": (project.findtext(_NAMESPACE + "status") or "active").strip(),
+            "folder": project_folder.get("idref") if project_folder is not None else None,
+        },
+    }
+
+
+def _note(element: ElementTree.Element | None) -> str:
+    """Read the plain text of a note, whose paragraphs are stored as rich text."""
+    if element is None:
+        return ""
+    paragraphs = element.iter(_NAMESPACE + "p")
+    lines = ["".join(lit.text or "" for lit in paragraph.iter(_NAMESPACE + "lit")) for paragraph in paragraphs]
+    return "\n".join(lines) if lines else "".join(element.itertext()).strip()
+
+
+def _parse_date(value: str | None) -> float | None:
+    """Parse a date of a transaction into epoch milliseconds, dates without a zone are in the local zone."""
+    if value is None:
+        return None
+    return datetime.fromisoformat(value.strip()).timestamp() * 1000
+
+
+def _format_date(milliseconds: float | None) -> str | None:
+    """Format a date as Date.toString does in the local zone, see the module docstring for the zone name."""
+    if milliseconds is None:
+        return None
+    local = datetime.fromtimestamp(milliseconds / 1000).astimezone()
+    offset = local.strftime("%z")
+    return columns.format_js_date(milliseconds, f"GMT{offset} ({local.tzname()})")
@@ -1,12 +1,114 @@
-from string import Template
+import base64
+import json
+import logging
+from collections.abc import Callable, Iterator
+from pathlib import Path
 from textwrap import dedent
-from typing import Literal
+from typing import TYPE_CHECKING, Any, Literal, NotRequired, TypedDict, TypeVar, get_args
 
-from mcp_omnifocus.utils.scripting import evaluate_javascript
+from mcp_omnifocus.utils import columns, outline, perspectives, query
+from mcp_omnifocus.utils.cache import DROP, cached, invalidates, on_write, patches, snapshot_cache
+from mcp_omnifocus.utils.scripting import coalesced, evaluate_javascript, evaluate_javascript_stream
+from mcp_omnifocus.utils.tags import TagIndex
 
-TaskStatus = Literal["Available", "Blocked", "Completed", "Dropped", "DueSoon", "Next", "Overdue"]
+if TYPE_CHECKING:
+    # Imported by set_database, the bundle is only read when the server is given one
+    from mcp_omnifocus.utils.ofocus import OFocusDatabase
+
+logger = logging.getLogger(__name__)
 
-__common_functions__ = dedent("""
+T = TypeVar("T")
+
+TaskStatus = Literal["Available", "Blocked", "Completed", "Dropped", "DueSoon", "Next", "Overdue"]
+TaskField = Literal[
+    "id",
+    "name",
+    "projectName",
+    "status",
+    "flagged",
+    "deferDate",
+    "dueDate",
+    "dropped",
+    "completed",
+    "tags",
+    "note",
+    "projectId",
+    "tagIds",
+    "added",
+    "modified",
+]
+ProjectField = Literal["id", "name", "status", "flagged", "deferDate", "dueDate", "tags", "note", "tagIds"]
+TagField = Literal["id", "name", "fullName", "parentId"]
+DEFAULT_TASK_FIELDS: list[TaskField] = [
+    "id",
+    "name",
+    "projectName",
+    "status",
+    "flagged",
+    "deferDate",
+    "dueDate",
+    "dropped",
+    "completed",
+    "tags",
+    "note",
+]
+DEFAULT_PROJECT_FIELDS: list[ProjectField] = ["id", "name", "status", "flagged", "deferDate", "dueDate", "tags"]
+DEFAULT_TAG_FIELDS: list[TagField] = ["id", "name", "fullName"]
+TaskAction = Literal["create", "update", "complete", "drop", "activate", "move"]
+StatsDimension = Literal["project", "tag", "status", "flagged", "due"]
+
+
+class TaskOperation(TypedDict):
+    """A single operation on a task, as accepted by batch_update_tasks."""
+
+    task_id: str
+    action: TaskAction
+    name: NotRequired[str | None]
+    note: NotRequired[str | None]
+    tag_ids: NotRequired[list[str] | None]
+    project_id: NotRequired[str | None]
+    defer_date: NotRequired[str | None]
+    due_date: NotRequired[str | None]
+    flagged: NotRequired[bool | None]
+
+
+class TaskPage(TypedDict):
+    """A page of tasks, as returned by the list functions when a limit or cursor is given."""
+
+    tasks: list[dict[str, Any]]
+    total: int
+    next_cursor: str | None
+
+
+class TaskOperationResult(TypedDict):
+    """The outcome of a single operation in a batch."""
+
+    task_id: str
+    action: TaskAction
+    success: bool
+    task: dict[str, Any] | None
+    error: str | None
+
+
+class ImportedItem(TypedDict):
+    """The outcome of importing a single project or task of an outline."""
+
+    id: str | None
+    kind: Literal["project", "task"]
+    name: str
+    created: bool
+    error: str | None
+
+
+class TaskStats(TypedDict):
+    """The task counts returned by task_stats."""
+
+    total: int
+    groups: list[dict[str, Any]]
+
+
+__common_functions__ = (
+    dedent("""
 function projectStatusToString(status) {
     // Handle null/undefined cases
     if (!status) {
@@ -60,6 +162,21 @@ function getFullTagName(tag) {
     }
     return names.join(' : ');
 };
+
+function tagHierarchy() {
+    // One top-down traversal: the full name of every tag is its parent's plus its own name, rather than
+    // a walk up the parents of each tag
+    const records = [];
+    function visit(tag, parentId, parentName) {
+        const id = tag.id.primaryKey;
+        const name = tag.name;
+        const fullName = parentName === null ? name : parentName + ' : ' + name;
+        records.push({ id: id, name: name, fullName: fullName, parentId: parentId });
+        tag.children.forEach(child => visit(child, id, fullName));
+    }
+    tags.forEach(tag => visit(tag, null, null));
+    return records;
+}
                               
 function getLeafNodes(node) {
     if (!node.children || node.children.length === 0) {
@@ -69,29 +186,119 @@ function getLeafNodes(node) {
 }
 
 function getPerspectiveByName(name) {
-    let perspectives = new Array()
-    perspectives = perspectives.concat(Perspective.BuiltIn.all)
-    perspectives = perspectives.concat(Perspective.Custom.all)
-    perspectiveNames = perspectives.map(perspective => perspective.name.toUpperCase())
-
-    return perspectives[perspectiveNames.indexOf(name.toUpperCase())] || null;
+    const wanted = name.toUpperCase();
+    const matches = perspective => perspective.name.toUpperCase() === wanted;
+    return Perspective.BuiltIn.all.find(matches) || Perspective.Custom.all.find(matches) || null;
 }
                               
-function formatTask(task) {
+var taskFields = {
+    id: task => task.id.primaryKey,
+    name: task => task.name,
+    projectName: task => task.containingProject ? task.containingProject.name : null,
+    status: task => taskStatusToString(task.taskStatus),
+    flagged: task => task.flagged,
+    deferDate: task => task.deferDate ? task.deferDate.toString() : null,
+    dueDate: task => task.dueDate ? task.dueDate.toString() : null,
+    dropped: task => task.dropped,
+    completed: task => task.completed,
+    tags: task => task.tags ? task.tags.map(tt => tt.name) : [],
+    note: task => task.note,
+    projectId: task => task.containingProject ? task.containingProject.id.primaryKey : null,
+    tagIds: task => task.tags ? task.tags.map(tt => tt.id.primaryKey) : [],
+    added: task => task.added ? task.added.toString() : null,
+    modified: task => task.modified ? task.modified.toString() : null,
+};
+var defaultTaskFields = [
+    'id', 'name', 'projectName', 'status', 'flagged', 'deferDate', 'dueDate', 'dropped', 'completed', 'tags', 'note'
+];
+
+var projectFields = {
+    id: project => project.id.primaryKey,
+    name: project => project.name,
+    status: project => projectStatusToString(project.status),
+    flagged: project => project.flagged,
+    deferDate: project => project.deferDate ? project.deferDate.toString() : null,
+    dueDate: project => project.dueDate ? project.dueDate.toString() : null,
+    tags: project => project.tags ? project.tags.map(tt => tt.name) : [],
+    note: project => project.note,
+    tagIds: project => project.tags ? project.tags.map(tt => tt.id.primaryKey) : [],
+};
+var defaultProjectFields = ['id', 'name', 'status', 'flagged', 'deferDate', 'dueDate', 'tags'];
+
+var tagFields = {
+    id: tag => tag.id.primaryKey,
+    name: tag => tag.name,
+    fullName: tag => getFullTagName(tag),
+    parentId: tag => tag.parent ? tag.parent.id.primaryKey : null,
+};
+var defaultTagFields = ['id', 'name', 'fullName'];
+
+function pickFields(object, getters, fields) {
+    // Only the requested properties are read, each one is a round-trip through the scripting bridge
+    const result = {};
+    fields.forEach(field => {
+        result[field] = getters[field](object);
+    });
+    return result;
+}
+
+function formatTask(task, fields) {
+    return pickFields(task, taskFields, fields || defaultTaskFields);
+}
+
+function formatTasks(tasks, page, fields, rows) {
+    // With rows, tasks are sent as column tables of that many rows, see mcp_omnifocus.utils.columns
+    function formatAll(tasks) {
+        if (rows) {
+            return formatTaskColumns(tasks, fields, rows);
+        }
+        return tasks.map(task => {
+            try {
+                return formatTask(task, fields);
+            } catch (e) {
+                return null;
+            }
+        }).filter(Boolean);
+    }
+
+    if (!page) {
+        return formatAll(tasks);
+    }
+
+    // Resume after the last task of the previous page so that tasks added or removed before it do not
+    // shift the page, the offset is only used when that task no longer exists.
+    let start = page.offset || 0;
+    if (page.after) {
+        const index = tasks.findIndex(task => task.id.primaryKey === page.after);
+        if (index >= 0) {
+            start = index + 1;
+        }
+    }
+    const end = page.limit ? start + page.limit : tasks.length;
+    const slice = tasks.slice(start, end);
     return {
-        id: task.id.primaryKey,
-        name: task.name,
-        projectName: task.containingProject ? task.containingProject.name : null,
-        status: taskStatusToString(task.taskStatus),
-        flagged: task.flagged,
-        deferDate: task.deferDate ? task.deferDate.toString() : null,
-        dueDate: task.dueDate ? task.dueDate.toString() : null,
-        dropped: task.dropped,
-        completed: task.completed,
-        tags: task.tags ? task.tags.map(tt => tt.name) : [],
-        note: task.note
+        tasks: formatAll(slice),
+        total: tasks.length,
+        next: end < tasks.length && slice.length > 0
+            ? { after: slice[slice.length - 1].id.primaryKey, offset: end }
+            : null,
     };
 }
+
+function formatProject(project, fields) {
+    return pickFields(project, projectFields, fields || defaultProjectFields);
+}
+
+function formatTag(tag, fields) {
+    return pickFields(tag, tagFields, fields || defaultTagFields);
+}
+
+function modificationTime(object) {
+    // Projects carry their added and modified dates on their root task
+    const dated = object.task || object;
+    const date = dated.modified || dated.added;
+    return date ? date.getTime() : null;
+}
                               
 function taskStatusFilter(task, allowedStatuses) {
     if (!allowedStatuses || allowedStatuses.length === 0) {
@@ -99,154 +306,641 @@ function taskStatusFilter(task, allowedStatuses) {
     }
     return allowedStatuses.includes(taskStatusToString(task.taskStatus));
 }
+
+function applyTaskChanges(task, changes) {
+    if (changes.name) {
+        task.name = changes.name;
+    }
+
+    if (changes.note) {
+        task.note = changes.note;
+    }
+
+    if (changes.tagIds) {
+        changes.tagIds.forEach(tagId => {
+            let tag = Tag.byIdentifier(tagId);
+            if (tag) {
+                task.addTag(tag);
+            }
+        });
+    }
+
+    if (changes.projectId) {
+        let project = Project.byIdentifier(changes.projectId);
+        if (project) {
+            moveTasks([task], project);
+        }
+    }
+
+    if (changes.deferDate) {
+        task.deferDate = new Date(changes.deferDate);
+    }
+
+    if (changes.dueDate) {
+        task.dueDate = new Date(changes.dueDate);
+    }
+
+    if (changes.flagged !== null && changes.flagged !== undefined) {
+        task.flagged = changes.flagged;
+    }
+}
+""")
+    + columns.__column_functions__
+)
+
+# The common functions with those of the filters compiled by mcp_omnifocus.utils.query
+__query_library__ = __common_functions__ + query.__query_functions__
+
+
+def _fields(fields: list[str] | None, allowed: Any) -> list[str] | None:
+    """Validate a field projection against a field Literal, None selects the default fields."""
+    if fields is None:
+        return None
+    unknown = [field for field in fields if field not in get_args(allowed)]
+    if unknown or not fields:
+        raise ValueError(f"Invalid fields: {unknown or fields}, expected some of {list(get_args(allowed))}")
+    return list(dict.fromkeys(fields))
+
+
+def project_fields(records: list[dict[str, Any]], fields: list[str] | None, default: list[str]) -> list[dict[str, Any]]:
+    """Project records held in memory to the requested fields, or the default fields when None.
+
+    Args:
+        records: The task, project or tag records to project.
+        fields: The fields to keep.
+        default: The fields returned by OmniFocus when none are requested.
+    """
+    keep = fields or default
+    return [{field: record.get(field) for field in keep} for record in records]
+
+
+def _page(limit: int | None, cursor: str | None) -> dict[str, Any] | None:
+    """Build the page object understood by the formatTasks script function, None for no paging."""
+    if limit is None and cursor is None:
+        return None
+    if limit is not None and limit < 1:
+        raise ValueError(f"Invalid limit: {limit}, it must be at least 1")
+
+    page = {"limit": limit, "after": None, "offset": 0}
+    if cursor is not None:
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            page.update(after=str(position["after"]), offset=int(position["offset"]))
+        except (ValueError, TypeError, KeyError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+    return page
+
+
+# Whether task lists are transferred as column tables rather than one object per task
+column_tables = True
+
+
+def set_column_tables(enabled: bool) -> None:
+    """Choose whether task lists are transferred from OmniFocus as column tables, see mcp_omnifocus.utils.columns."""
+    global column_tables
+    column_tables = enabled
+
+
+def _rows() -> int | None:
+    """The number of rows per column table to ask formatTasks for, None for one object per task."""
+    return columns.TABLE_ROWS if column_tables else None
+
+
+def _decode_tasks(tasks: list[dict[str, Any]], rows: int | None) -> list[dict[str, Any]]:
+    """Turn the tasks formatted with the given rows per column table into task dictionaries."""
+    if rows is None:
+        return tasks
+    return [task for table in tasks for task in columns.decode_table(table)]
+
+
+def _paged(result: list[dict[str, Any]] | dict[str, Any], rows: int | None = None) -> list[dict[str, Any]] | TaskPage:
+    """Turn the result of formatTasks into a task list or a page with an opaque next cursor."""
+    if isinstance(result, list):
+        return _decode_tasks(result, rows)
+    cursor = base64.urlsafe_b64encode(json.dumps(result["next"]).encode()).decode() if result["next"] else None
+    return {"tasks": _decode_tasks(result["tasks"], rows), "total": result["total"], "next_cursor": cursor}
+
+
+def paginate(records: list[dict[str, Any]], limit: int | None = None, cursor: str | None = None) -> TaskPage:
+    """Page through a task list held in memory, with the same cursors as the list functions.
+
+    Args:
+        records: The tasks to page through.
+        limit: The maximum number of tasks to return, None for all of them.
+        cursor: The next_cursor of a previous page to continue from.
+
+    Returns:
+        A page with the tasks, the total number of tasks and the cursor of the next page.
+    """
+    page = _page(limit, cursor) or {"limit": None, "after": None, "offset": 0}
+    start = page["offset"]
+    if page["after"] is not None:
+        start = next((index + 1 for index, record in enumerate(records) if record["id"] == page["after"]), start)
+    end = start + page["limit"] if page["limit"] else len(records)
+    tasks = records[start:end]
+    following = {"after": tasks[-1]["id"], "offset": end} if end < len(records) and tasks else None
+    return _paged({"tasks": tasks, "total": len(records), "next": following})
+
+
+# Set by set_database, the read functions then answer from the .ofocus bundle while it can be read
+database: "OFocusDatabase | None" = None
+
+
+def set_database(path: str | Path | None) -> None:
+    """Answer the read functions from an .ofocus bundle, see mcp_omnifocus.utils.ofocus, or always from OmniFocus.
+
+    Args:
+        path: The .ofocus bundle of OmniFocus, None to stop reading one.
+    """
+    global database
+    if path is None:
+        database = None
+        return
+    from mcp_omnifocus.utils.ofocus import OFocusDatabase
+
+    database = OFocusDatabase(path)
+
+
+def _from_database(read: "Callable[[OFocusDatabase], T | None]") -> T | None:
+    """Answer a read from the .ofocus bundle, None when OmniFocus must be asked instead.
+
+    That is when no bundle is set, it cannot be read (e.g. it is encrypted), or the read returns None itself
+    because the bundle does not have what was asked for.
+    """
+    if database is None:
+        return None
+    from mcp_omnifocus.utils.ofocus import DatabaseUnreadableError
+
+    try:
+        return read(database)
+    except DatabaseUnreadableError as e:
+        logger.info("Asking OmniFocus, the database cannot be read: %s", e)
+        return None
+
+
+@on_write
+def _expect_database_change(namespaces: tuple[str, ...]) -> None:
+    # Changes made through OmniFocus reach the bundle once OmniFocus saves them
+    if database is not None:
+        database.expect_change()
+
+
+def _database_tasks(
+    tasks: list[dict[str, Any]], limit: int | None, cursor: str | None, fields: list[str] | None
+) -> list[dict[str, Any]] | TaskPage:
+    """Project and page tasks read from the .ofocus bundle as the list functions return them."""
+    if limit is None and cursor is None:
+        return project_fields(tasks, fields, DEFAULT_TASK_FIELDS)
+    page = paginate(tasks, limit, cursor)
+    return {**page, "tasks": project_fields(page["tasks"], fields, DEFAULT_TASK_FIELDS)}
+
+
+def _with_status(tasks: list[dict[str, Any]], task_status: list[TaskStatus] | None) -> list[dict[str, Any]]:
+    return [task for task in tasks if task["status"] in task_status] if task_status else tasks
+
+
+def _evaluate(script: str, library: str | None = __common_functions__, **args: Any) -> Any:
+    """Call one of the script functions of this module in OmniFocus with JSON encoded keyword arguments."""
+    return evaluate_javascript(script, args, library=library)
+
+
+def _evaluate_stream(script: str, library: str | None = __common_functions__, **args: Any) -> Iterator[Any]:
+    """Like _evaluate, yielding the items of the list the script returns as they are decoded."""
+    return evaluate_javascript_stream(script, args, library=library)
+
+
+def _stream_tasks(script: str, **args: Any) -> Iterator[dict[str, Any]]:
+    """Stream the tasks a script lists with formatTasks, decoding them one column table at a time."""
+    rows = _rows()
+    for item in _evaluate_stream(script, rows=rows, **args):
+        if rows is None:
+            yield item
+        else:
+            yield from columns.decode_table(item)
+
+
+__list_perspectives__ = dedent("""
+args => {
+    let perspectives = new Array();
+    perspectives = perspectives.concat(Perspective.BuiltIn.all);
+    perspectives = perspectives.concat(Perspective.Custom.all);
+    return perspectives.map(perspective => perspective.name);
+}
 """)
 
 
+def prime() -> None:
+    """Connect to OmniFocus, starting it if needed, and send it the common functions later calls rely on."""
+    _evaluate("args => null")
+
+
+@coalesced
 def list_perspectives() -> list[str]:
     """List all perspectives in OmniFocus.
 
     Returns:
         A list containing the list of perspective names.
     """
-    script = dedent("""
-    (() => {
-        let perspectives = new Array();
-        perspectives = perspectives.concat(Perspective.BuiltIn.all);
-        perspectives = perspectives.concat(Perspective.Custom.all);
-        return perspectives.map(perspective => perspective.name);
-    })();
-    """)
+    return _evaluate(__list_perspectives__, library=None)
 
-    return evaluate_javascript(script)
 
+__list_projects__ = dedent("""
+args => flattenedProjects.map(project => formatProject(project, args.fields))
+""")
 
-def list_projects() -> list[dict[str, str]]:
+
+@coalesced
+@cached("projects")
+def list_projects(fields: list[ProjectField] | None = None) -> list[dict[str, str]]:
     """List all projects in OmniFocus.
 
+    Args:
+        fields: The project fields to return, None for the default fields.
+
     Returns:
         A list of dictionaries containing project names, ids, statuses, etc.
     """
-    script = Template(
-        dedent("""
-    ${__common_functions__}
-    
-    (() => {
-        return flattenedProjects.map(project => {
-            return {
-                id: project.id.primaryKey,
-                name: project.name,
-                status: projectStatusToString(project.status),
-                flagged: project.flagged,
-                deferDate: project.deferDate ? project.deferDate.toString() : null,
-                dueDate: project.dueDate ? project.dueDate.toString() : null,
-                tags: project.tags ? project.tags.map(tt => tt.name) : [],
-            };
-        });
-    })();
-    """)
-    )
+    fields = _fields(fields, ProjectField)
+    projects = _from_database(lambda database: project_fields(database.projects(), fields, DEFAULT_PROJECT_FIELDS))
+    if projects is not None:
+        return projects
+    return _evaluate(__list_projects__, fields=fields)
 
-    return evaluate_javascript(script.substitute(__common_functions__=__common_functions__))
 
+__list_tags__ = dedent("""
+args => tagHierarchy()
+""")
 
-def list_tags() -> list[dict[str, str]]:
+
+@coalesced
+@cached("tags")
+def tag_index() -> TagIndex:
+    """Read the tag hierarchy of OmniFocus into an index by tag id.
+
+    Returns:
+        The index, from which full names, ancestors and subtrees of tags are resolved without calling OmniFocus.
+    """
+    records = _from_database(lambda database: database.tags())
+    return TagIndex(records if records is not None else _evaluate(__list_tags__))
+
+
+def list_tags(fields: list[TagField] | None = None, tree: bool = False) -> list[dict[str, Any]]:
     """List all tags in OmniFocus.
 
+    Args:
+        fields: The tag fields to return, None for the default fields.
+        tree: Whether to return the tags nested under their parents, each with a "children" list of tags.
+
     Returns:
         A list of dictionaries containing tag names and ids, with full hierarchical names.
     """
-    script = Template(
-        dedent("""
-    ${__common_functions__}    
-    
-    (() => {
-        return flattenedTags.map(tag => {
-            return {
-                id: tag.id.primaryKey,
-                name: tag.name,
-                fullName: getFullTagName(tag),
-            };
-        });
-    })();
-    """)
-    )
+    fields = _fields(fields, TagField)
+    index = tag_index()
+    if tree:
+        return index.tree(fields or DEFAULT_TAG_FIELDS)
+    return project_fields(index.records, fields, DEFAULT_TAG_FIELDS)
+
 
-    return evaluate_javascript(script.substitute(__common_functions__=__common_functions__))
+__list_tasks__ = dedent("""
+args => formatTasks(flattenedTasks, args.page, args.fields, args.rows)
+""")
 
 
-def list_tasks() -> list[dict[str, str]]:
+@coalesced
+@cached("tasks")
+def list_tasks(
+    limit: int | None = None, cursor: str | None = None, fields: list[TaskField] | None = None
+) -> list[dict[str, str]] | TaskPage:
     """List all tasks in OmniFocus.
 
+    Args:
+        limit: The maximum number of tasks to return, None for all of them.
+        cursor: The next_cursor of a previous page to continue from.
+        fields: The task fields to return, None for the default fields.
+
     Returns:
-        A list of dictionaries containing task names, ids, project ids, and tag ids.
+        A list of dictionaries containing task names, ids, project ids, and tag ids. If a limit or cursor
+        is given, a page with the tasks, the total number of tasks and the cursor of the next page.
     """
-    script = Template(
-        dedent("""
-    ${__common_functions__}
+    page, rows, fields = _page(limit, cursor), _rows(), _fields(fields, TaskField)
+    tasks = _from_database(lambda database: _database_tasks(database.tasks(), limit, cursor, fields))
+    if tasks is not None:
+        return tasks
+    if page is None:
+        # Decoded line by line, so the whole output is never held next to the tasks
+        return list(_stream_tasks(__list_tasks__, page=None, fields=fields))
+    return _paged(_evaluate(__list_tasks__, page=page, fields=fields, rows=rows), rows)
+
+
+__list_changes__ = dedent("""
+args => {
+    const since = args.since;
+    const allFields = args.allFields;
+    const now = Date.now();
+
+    function modifiedSince(object) {
+        // Objects without dates are always reported, we cannot tell whether they changed
+        const time = modificationTime(object);
+        return since === null || time === null || time >= since;
+    }
 
-    (() => {
-        return flattenedTasks.map((task) => {
+    let dueSoon = 2 * 86400 * 1000;
+    try {
+        dueSoon = settings.objectForKey('DueSoonInterval') * 1000 || dueSoon;
+    } catch (e) {
+        // Older versions of OmniFocus do not expose their settings, they default to two days
+    }
+    function crossed(date, before) {
+        return date ? date.getTime() - before >= since && date.getTime() - before < now : false;
+    }
+
+    // The status of a task changes without the task being modified, when its defer date passes, it becomes
+    // due soon or overdue, or its project is put on hold. Such tasks are listed as changes too.
+    const changedProjects = new Set();
+    function taskChanged(task) {
+        if (modifiedSince(task)) {
+            return true;
+        }
+        const defer = task.effectiveDeferDate || task.deferDate;
+        const due = task.effectiveDueDate || task.dueDate;
+        if (crossed(defer, 0) || crossed(due, 0) || crossed(due, dueSoon)) {
+            return true;
+        }
+        const project = task.containingProject;
+        return project ? changedProjects.has(project.id.primaryKey) : false;
+    }
+
+    function listChanged(objects, format, changed) {
+        const listed = objects.filter(changed || modifiedSince);
+        if (!format) {
+            return listed;
+        }
+        return listed.map(object => {
             try {
-                return formatTask(task);
+                return format(object);
             } catch (e) {
                 return null;
             }
         }).filter(Boolean);
-    })();
-    """)
-    )
+    }
 
-    return evaluate_javascript(script.substitute(__common_functions__=__common_functions__))
+    const tasks = flattenedTasks;
+    const projects = flattenedProjects;
+    const tags = flattenedTags;
+    projects.forEach(project => {
+        // Projects without dates are listed every time, their tasks are not
+        const time = modificationTime(project);
+        if (since !== null && time !== null && time >= since) {
+            changedProjects.add(project.id.primaryKey);
+        }
+    });
+    return {
+        now: now,
+        tasks: args.rows
+            ? formatTaskColumns(
+                listChanged(tasks, null, taskChanged), allFields ? Object.keys(taskFields) : null, args.rows
+            )
+            : listChanged(tasks, task => formatTask(task, allFields ? Object.keys(taskFields) : null), taskChanged),
+        projects: listChanged(projects, project => formatProject(project, allFields ? Object.keys(projectFields) : null)),
+        tags: listChanged(tags, tag => formatTag(tag, allFields ? Object.keys(tagFields) : null)),
+        counts: { tasks: tasks.length, projects: projects.length, tags: tags.length },
+    };
+}
+""")
 
 
-def list_perspective_tasks(perspective_name: str) -> list[dict[str, str]]:
-    """List all tasks in a specific perspective in OmniFocus.
+@coalesced
+def list_changes(since: float | None = None, all_fields: bool = False) -> dict[str, Any]:
+    """List the tasks, projects and tags added or modified in OmniFocus since a point in time.
 
     Args:
-        perspective_name: The name of the perspective to filter tasks by.
+        since: The OmniFocus clock time in epoch milliseconds to list changes from, as returned in "now"
+            by a previous call. If None, everything is listed.
+        all_fields: Whether to return every available field instead of the default fields.
 
     Returns:
-        A list of dictionaries containing task names, ids, project ids, and tag ids.
+        A dictionary with the OmniFocus clock time the listing started at ("now"), the changed "tasks",
+        "projects" and "tags" formatted as by the list functions, and the total number of each in the
+        database ("counts"), which can be used to detect deletions. Changed tasks include those whose status
+        changed since, as their defer or due date passed or their project was modified.
     """
-    script = Template(
-        dedent("""
-    ${__common_functions__}                            
+    rows = _rows()
+    changes = _evaluate(__list_changes__, since=since, allFields=all_fields, rows=rows)
+    changes["tasks"] = _decode_tasks(changes["tasks"], rows)
+    return changes
+
+
+__list_ids__ = dedent("""
+args => ({
+    tasks: flattenedTasks.map(task => task.id.primaryKey),
+    projects: flattenedProjects.map(project => project.id.primaryKey),
+    tags: flattenedTags.map(tag => tag.id.primaryKey),
+})
+""")
 
-    (() => {
-        let perspective = getPerspectiveByName("${perspective_name}");
 
-        if (!perspective) {
-            throw "Could not find perspective: " + perspective_name.toString();
+@coalesced
+def list_ids() -> dict[str, list[str]]:
+    """List the ids of every task, project and tag in OmniFocus.
+
+    Returns:
+        A dictionary with lists of "tasks", "projects" and "tags" ids.
+    """
+    return _evaluate(__list_ids__, library=None)
+
+
+__describe_perspectives__ = dedent("""
+args => {
+    const builtIn = Perspective.BuiltIn.all.map(perspective => ({ name: perspective.name, custom: false }));
+    const custom = Perspective.Custom.all.map(perspective => {
+        let rules = null;
+        let aggregation = null;
+        try {
+            rules = perspective.archivedFilterRules || null;
+            aggregation = perspective.archivedTopLevelFilterAggregation || null;
+        } catch (e) {
+            // Filter rules are only exposed by recent versions of OmniFocus
         }
+        return { name: perspective.name, custom: true, rules: rules, aggregation: aggregation };
+    });
+    return builtIn.concat(custom);
+}
+""")
 
-        win = document.windows[0];
-        win.perspective = perspective;
 
-        if (perspective == Perspective.BuiltIn.Forecast) {
-            var now = new Date();
-            var today = Calendar.current.startOfDay(now);
-            var dc = new DateComponents();
-            dc.day = -1;
-            var yesterday = Calendar.current.dateByAddingDateComponents(today, dc);
-            win.selectForecastDays([win.forecastDayForDate(yesterday), win.forecastDayForDate(today)]);
+@coalesced
+@cached("perspectives")
+def perspective_index() -> dict[str, dict[str, Any]]:
+    """Read the perspectives of OmniFocus into a lookup by upper-cased name.
+
+    Returns:
+        The perspectives by name, each with its "name", whether it is "custom", and the filter "rules" and
+        top level "aggregation" of custom perspectives when OmniFocus exposes them. Built-in perspectives
+        come first when names clash, as in the getPerspectiveByName script function.
+    """
+    index: dict[str, dict[str, Any]] = {}
+    for perspective in _evaluate(__describe_perspectives__, library=None):
+        index.setdefault(perspective["name"].upper(), perspective)
+    return index
+
+
+# Whether perspectives that can be described as task filters are listed without a window
+headless_perspectives = True
+
+
+def set_headless_perspectives(enabled: bool) -> None:
+    """Choose whether perspectives are evaluated from the database when possible, see mcp_omnifocus.utils.perspectives."""
+    global headless_perspectives
+    headless_perspectives = enabled
+
+
+def _perspective_view(perspective_name: str) -> tuple[perspectives.Source, dict[str, Any] | None] | None:
+    """The tasks a perspective starts from and their filter, None if it has to be listed through a window."""
+    view = perspectives.built_in_view(perspective_name)
+    if view is not None:
+        return view
+    perspective = perspective_index().get(perspective_name.upper())
+    if perspective is None or not perspective["custom"]:
+        # Unknown names are left to the window path, which finds perspectives added since the lookup was
+        # cached and reports the others as missing
+        return None
+    return perspectives.custom_view(perspective["rules"], perspective["aggregation"])
+
+
+__list_view_tasks__ = dedent("""
+args => {
+    // The predicate is compiled from the filter of the perspective, see mcp_omnifocus.utils.perspectives
+    const matches = (0, eval)(args.predicate);
+    const source = args.source === "inbox"
+        ? Array.from(inbox).flatMap(task => [task].concat(task.flattenedChildren))
+        : flattenedTasks;
+
+    // Only the leaves are listed, like the rows of a perspective's outline
+    const tasks = source.filter(task => {
+        try {
+            return !task.hasChildren && matches(task);
+        } catch (e) {
+            return false;
         }
+    });
+    return formatTasks(tasks, args.page, args.fields, args.rows);
+}
+""")
 
-        return getLeafNodes(win.content.rootNode).map((l) => {
-            const task = l.object;
-            try {
-                return formatTask(task);
-            } catch (e) {
-                return null;
-            }
-        }).filter(Boolean);
+__list_perspective_tasks__ = dedent("""
+args => {
+    let perspective = getPerspectiveByName(args.perspectiveName);
 
-    })();
-    """)
-    )
+    if (!perspective) {
+        throw "Could not find perspective: " + args.perspectiveName;
+    }
 
-    return evaluate_javascript(
-        script.substitute(__common_functions__=__common_functions__, perspective_name=perspective_name)
-    )
+    const win = document.windows[0];
+    if (!win) {
+        throw "No OmniFocus window is open to show perspective: " + args.perspectiveName;
+    }
+    win.perspective = perspective;
+
+    if (perspective == Perspective.BuiltIn.Forecast) {
+        var now = new Date();
+        var today = Calendar.current.startOfDay(now);
+        var dc = new DateComponents();
+        dc.day = -1;
+        var yesterday = Calendar.current.dateByAddingDateComponents(today, dc);
+        win.selectForecastDays([win.forecastDayForDate(yesterday), win.forecastDayForDate(today)]);
+    }
+
+    const tasks = getLeafNodes(win.content.rootNode).map(l => l.object).filter(Boolean);
+    return formatTasks(tasks, args.page, args.fields, args.rows);
+}
+""")
+
+
+@coalesced
+def list_perspective_tasks(
+    perspective_name: str,
+    limit: int | None = None,
+    cursor: str | None = None,
+    fields: list[TaskField] | None = None,
+) -> list[dict[str, str]] | TaskPage:
+    """List all tasks in a specific perspective in OmniFocus.
+
+    Inbox, Flagged, Forecast and custom perspectives whose filter rules translate into a task filter are
+    evaluated from the database. Other perspectives are shown in the front window to list the tasks of its
+    outline, which needs an open window.
+
+    Args:
+        perspective_name: The name of the perspective to filter tasks by.
+        limit: The maximum number of tasks to return, None for all of them.
+        cursor: The next_cursor of a previous page to continue from.
+        fields: The task fields to return, None for the default fields.
+
+    Returns:
+        A list of dictionaries containing task names, ids, project ids, and tag ids. If a limit or cursor
+        is given, a page with the tasks, the total number of tasks and the cursor of the next page.
+    """
+    view = _perspective_view(perspective_name) if headless_perspectives else None
+    rows = _rows()
+    if view is None:
+        result = _evaluate(
+            __list_perspective_tasks__,
+            perspectiveName=perspective_name,
+            page=_page(limit, cursor),
+            fields=_fields(fields, TaskField),
+            rows=rows,
+        )
+    else:
+        source, expression = view
+        result = _evaluate(
+            __list_view_tasks__,
+            library=__query_library__,
+            source=source,
+            predicate=query.compile_predicate(query.validate(expression) if expression is not None else None),
+            page=_page(limit, cursor),
+            fields=_fields(fields, TaskField),
+            rows=rows,
+        )
+    return _paged(result, rows)
+
+
+@coalesced
+@cached("inbox")
+def list_inbox(
+    limit: int | None = None,
+    cursor: str | None = None,
+    fields: list[TaskField] | None = None,
+) -> list[dict[str, str]] | TaskPage:
+    """List the tasks of the Inbox perspective, see list_perspective_tasks.
+
+    Unlike other perspectives, the inbox is cached, as most sessions start by reading it.
+
+    Args:
+        limit: The maximum number of tasks to return, None for all of them.
+        cursor: The next_cursor of a previous page to continue from.
+        fields: The task fields to return, None for the default fields.
+    """
+    return list_perspective_tasks("Inbox", limit=limit, cursor=cursor, fields=fields)
+
+
+@on_write
+def _invalidate_inbox(namespaces: tuple[str, ...]) -> None:
+    # Task writes patch cached task lists, which cannot tell whether a task was moved out of the inbox
+    if "tasks" in namespaces:
+        snapshot_cache.invalidate("inbox")
+
+
+__cleanup_perspective__ = dedent("""
+args => {
+    let perspective = getPerspectiveByName(args.perspectiveName);
+
+    if (!perspective) {
+        throw "Could not find perspective: " + args.perspectiveName;
+    }
+
+    document.windows[0].perspective = perspective;
+    cleanUp();
+}
+""")
 
 
 def cleanup_perspective_name(perspective_name: str):
@@ -255,26 +949,63 @@ def cleanup_perspective_name(perspective_name: str):
     Args:
         perspective_name: The name of the perspective to clean up.
     """
-    script = Template(
-        dedent("""
-    ${__common_functions__}
-                    
-    (() => {
-        let perspective = getPerspectiveByName("${perspective_name}");
-
-        if (!perspective) {
-            throw "Could not find perspective: " + perspective_name.toString();
-        }
+    _evaluate(__cleanup_perspective__, perspectiveName=perspective_name)
+
+
+def _project_like(task: dict[str, Any], example: dict[str, Any]) -> dict[str, Any] | Any:
+    """Project a full task to the fields of a cached task, DROP if the cached task has fields it lacks."""
+    if not set(example) <= set(task):
+        return DROP
+    return {field: task[field] for field in example}
+
+
+def _replace_task(tasks: list[dict[str, Any]] | TaskPage, task: dict[str, Any]) -> list[dict[str, Any]] | Any:
+    """Replace the task with the same id in a cached task list or page."""
+    if isinstance(tasks, dict):
+        replaced = _replace_task(tasks["tasks"], task)
+        return DROP if replaced is DROP else {**tasks, "tasks": replaced}
+    if tasks and "id" not in tasks[0]:
+        return DROP  # Tasks listed without their ids cannot be matched
+
+    replaced = []
+    for cached_task in tasks:
+        if cached_task.get("id") == task["id"]:
+            cached_task = _project_like(task, cached_task)
+            if cached_task is DROP:
+                return DROP
+        replaced.append(cached_task)
+    return replaced
+
+
+def _append_task(tasks: list[dict[str, Any]] | TaskPage, task: dict[str, Any]) -> list[dict[str, Any]] | Any:
+    """Append a new task to a cached task list, pages are dropped as the task may belong on any of them."""
+    if isinstance(tasks, dict):
+        return DROP
+    if not tasks:
+        return DROP  # The fields of an empty list are unknown
+    appended = _project_like(task, tasks[0])
+    return DROP if appended is DROP else tasks + [appended]
+
+
+__update_task__ = dedent("""
+args => {
+    let task = Task.byIdentifier(args.taskId);
+    if (!task) {
+        throw "Could not find task: " + args.taskId;
+    }
 
-        document.windows[0].perspective = perspective;
-        cleanUp();
-    })();
-    """)
-    )
+    try {
+        applyTaskChanges(task, args.changes);
+    } catch (e) {
+        throw "Error updating task: " + e.toString();
+    }
 
-    evaluate_javascript(script.substitute(__common_functions__=__common_functions__, perspective_name=perspective_name))
+    return formatTask(task);
+}
+""")
 
 
+@patches("tasks", _replace_task)
 def update_task(
     task_id: str,
     task_name: str | None = None,
@@ -293,109 +1024,87 @@ def update_task(
     Returns:
         A dictionary containing the updated task's details.
     """
-    script = Template(
-        dedent("""
-    ${__common_functions__}
-               
-    (() => {
-        let task = Task.byIdentifier("${task_id}");
-        if (!task) {
-            throw "Could not find task: " + task_id.toString();
-        }
-        let newName = ${task_name};
-        let newNote = ${task_note};
-        let newTags = ${task_tag_ids};
-        let newProjectId = ${task_project_id};
-        let newDeferDate = ${task_defer_date};
-        let newDueDate = ${task_due_date};
-        let newFlagged = ${task_flagged};
-               
-        try {
-            if (newName) {
-                task.name = newName;
-            }
-            
-            if (newNote) {
-                task.note = newNote;
-            }
-            
-            if (newTags) {
-                newTags.forEach(tagId => {
-                    let tag = Tag.byIdentifier(tagId);
-                    if (tag) {
-                        task.addTag(tag);
-                    }
-                });
-            }
-                
-            if (newProjectId) {
-                let project = Project.byIdentifier(newProjectId);
-                if (project) {
-                    moveTasks([task], project);
-                }
-            }
-            
-            if (newDeferDate) {
-                task.deferDate = new Date(newDeferDate);
-            }
-               
-            if (newDueDate) {
-                task.dueDate = new Date(newDueDate);
-            }
-               
-            if (newFlagged !== null && newFlagged !== undefined) {
-                task.flagged = newFlagged;
-            }
-        } catch (e) {
-            throw "Error updating task: " + e.toString();
-        }
-               
-        return formatTask(task);
-    })();
-    """)
-    )
-    return evaluate_javascript(
-        script.substitute(
-            __common_functions__=__common_functions__,
-            task_id=task_id,
-            task_name=f'"{task_name}"' if task_name else "null",
-            task_note=f'"{task_note}"' if task_note else "null",
-            task_tag_ids=f"[{', '.join([f'"{tag}"' for tag in task_tag_ids])}]" if task_tag_ids else "[]",
-            task_project_id=f'"{task_project_id}"' if task_project_id else "null",
-            task_defer_date=f'"{task_defer_date}"' if task_defer_date else "null",
-            task_due_date=f'"{task_due_date}"' if task_due_date else "null",
-            task_flagged="null" if task_flagged is None else str(task_flagged).lower(),
-        )
+    return _evaluate(
+        __update_task__,
+        taskId=task_id,
+        changes=_task_changes(
+            name=task_name,
+            note=task_note,
+            tag_ids=task_tag_ids,
+            project_id=task_project_id,
+            defer_date=task_defer_date,
+            due_date=task_due_date,
+            flagged=task_flagged,
+        ),
     )
 
 
-def get_task(task_id: str) -> dict[str, str]:
+def _task_changes(
+    name: str | None = None,
+    note: str | None = None,
+    tag_ids: list[str] | None = None,
+    project_id: str | None = None,
+    defer_date: str | None = None,
+    due_date: str | None = None,
+    flagged: bool | None = None,
+) -> dict[str, Any]:
+    """Build the changes object understood by the applyTaskChanges script function."""
+    return {
+        "name": name,
+        "note": note,
+        "tagIds": tag_ids or [],
+        "projectId": project_id,
+        "deferDate": defer_date,
+        "dueDate": due_date,
+        "flagged": flagged,
+    }
+
+
+__get_task__ = dedent("""
+args => {
+    let task = Task.byIdentifier(args.taskId);
+    if (!task) {
+        throw "Could not find task: " + args.taskId;
+    }
+
+    return formatTask(task, args.fields);
+}
+""")
+
+
+@coalesced
+def get_task(task_id: str, fields: list[TaskField] | None = None) -> dict[str, str]:
     """Get a task by its ID in OmniFocus.
 
     Args:
         task_id: The ID of the task to retrieve.
+        fields: The task fields to return, None for the default fields.
 
     Returns:
         A dictionary containing the task's details.
     """
-    script = Template(
-        dedent("""
-    ${__common_functions__}
-    
-    (() => {
-        let task = Task.byIdentifier("${task_id}");
-        if (!task) {
-            throw "Could not find task: " + task_id.toString();
-        }
-        
-        return formatTask(task);
-    })();
-    """)
-    )
+    fields = _fields(fields, TaskField)
+    # Tasks added since OmniFocus last saved are not in the bundle yet
+    task = _from_database(lambda database: database.task(task_id))
+    if task is not None:
+        return project_fields([task], fields, DEFAULT_TASK_FIELDS)[0]
+    return _evaluate(__get_task__, taskId=task_id, fields=fields)
+
+
+__complete_task__ = dedent("""
+args => {
+    let task = Task.byIdentifier(args.taskId);
+    if (!task) {
+        throw "Could not find task: " + args.taskId;
+    }
 
-    return evaluate_javascript(script.substitute(__common_functions__=__common_functions__, task_id=task_id))
+    task.markComplete();
+    return formatTask(task);
+}
+""")
 
 
+@invalidates("tasks")
 def complete_task(task_id: str) -> dict[str, str]:
     """Complete a task in OmniFocus.
 
@@ -405,25 +1114,23 @@ def complete_task(task_id: str) -> dict[str, str]:
     Returns:
         A dictionary containing the completed task's details.
     """
-    script = Template(
-        dedent("""
-    ${__common_functions__}
-    
-    (() => {
-        let task = Task.byIdentifier("${task_id}");
-        if (!task) {
-            throw "Could not find task: " + task_id.toString();
-        }
-        
-        task.markComplete();
-        return formatTask(task);
-    })();
-    """)
-    )
+    return _evaluate(__complete_task__, taskId=task_id)
 
-    return evaluate_javascript(script.substitute(__common_functions__=__common_functions__, task_id=task_id))
 
+__drop_task__ = dedent("""
+args => {
+    let task = Task.byIdentifier(args.taskId);
+    if (!task) {
+        throw "Could not find task: " + args.taskId;
+    }
 
+    task.drop(false);
+    return formatTask(task);
+}
+""")
+
+
+@invalidates("tasks")
 def drop_task(task_id: str) -> dict[str, str]:
     """Complete a task in OmniFocus.
 
@@ -433,25 +1140,23 @@ def drop_task(task_id: str) -> dict[str, str]:
     Returns:
         A dictionary containing the dropped task's details.
     """
-    script = Template(
-        dedent("""
-    ${__common_functions__}
-               
-    (() => {
-        let task = Task.byIdentifier("${task_id}");
-        if (!task) {
-            throw "Could not find task: " + task_id.toString();
-        }
-        
-        task.drop(false);
-        return formatTask(task);
-    })();
-    """)
-    )
+    return _evaluate(__drop_task__, taskId=task_id)
 
-    return evaluate_javascript(script.substitute(__common_functions__=__common_functions__, task_id=task_id))
+
+__activate_task__ = dedent("""
+args => {
+    let task = Task.byIdentifier(args.taskId);
+    if (!task) {
+        throw "Could not find task: " + args.taskId;
+    }
+
+    task.active = true;
+    return formatTask(task);
+}
+""")
 
 
+@invalidates("tasks")
 def activate_task(task_id: str) -> dict[str, str]:
     """Activate a task in OmniFocus.
 
@@ -461,25 +1166,21 @@ def activate_task(task_id: str) -> dict[str, str]:
     Returns:
         A dictionary containing the activated task's details.
     """
-    script = Template(
-        dedent("""
-    ${__common_functions__}
-    
-    (() => {
-        let task = Task.byIdentifier("${task_id}");
-        if (!task) {
-            throw "Could not find task: " + task_id.toString();
-        }
-        
-        task.active = true;
-        return formatTask(task);
-    })();
-    """)
-    )
+    return _evaluate(__activate_task__, taskId=task_id)
 
-    return evaluate_javascript(script.substitute(__common_functions__=__common_functions__, task_id=task_id))
+
+__create_task__ = dedent("""
+args => {
+    let task = new Task(args.name);
+    if (args.note) {
+        task.note = args.note;
+    }
+    return formatTask(task);
+}
+""")
 
 
+@patches("tasks", _append_task)
 def create_task(task_name: str, task_note: str | None = None) -> dict[str, str]:
     """Create a new task in OmniFocus.
 
@@ -490,113 +1191,596 @@ def create_task(task_name: str, task_note: str | None = None) -> dict[str, str]:
     Returns:
         A dictionary containing the created task's details.
     """
-    script = Template(
-        dedent("""
-    ${__common_functions__}
-    
-    (() => {
-        let task = new Task("${task_name}");
-        let task_note = ${task_note};
-        if (task_note) {
-            task.note = task_note;
-        }
-        return formatTask(task);
-    })();
-    """)
-    )
+    return _evaluate(__create_task__, name=task_name, note=task_note)
 
-    return evaluate_javascript(
-        script.substitute(
-            __common_functions__=__common_functions__,
-            task_name=task_name,
-            task_note=f'"{task_note}"' if task_note else "null",
-        )
-    )
+
+__list_container_tasks__ = dedent("""
+args => {
+    const container = args.kind === "project" ? Project.byIdentifier(args.id) : Tag.byIdentifier(args.id);
+    if (!container) {
+        throw "Could not find " + args.kind + ": " + args.id;
+    }
+
+    let tasks = container.tasks;
+    if (args.descendantIds && args.descendantIds.length > 0) {
+        // Tasks with several tags of the subtree are listed once, descendants deleted since are skipped
+        const seen = new Set(tasks.map(task => task.id.primaryKey));
+        tasks = tasks.slice();
+        args.descendantIds.forEach(id => {
+            const tag = Tag.byIdentifier(id);
+            (tag ? tag.tasks : []).forEach(task => {
+                const taskId = task.id.primaryKey;
+                if (!seen.has(taskId)) {
+                    seen.add(taskId);
+                    tasks.push(task);
+                }
+            });
+        });
+    }
+    tasks = tasks.filter(task => taskStatusFilter(task, args.taskStatus));
+    return formatTasks(tasks, args.page, args.fields, args.rows);
+}
+""")
 
 
-def list_tasks_by_project(project_id: str, task_status: list[TaskStatus] | None = None) -> list[dict[str, str]]:
+@coalesced
+def list_tasks_by_project(
+    project_id: str,
+    task_status: list[TaskStatus] | None = None,
+    limit: int | None = None,
+    cursor: str | None = None,
+    fields: list[TaskField] | None = None,
+) -> list[dict[str, str]] | TaskPage:
     """List all tasks in a specific project in OmniFocus.
 
     Args:
         project_id: The ID of the project to filter tasks by.
         task_status: A list of task statuses to filter by. If None, all tasks are returned.
+        limit: The maximum number of tasks to return, None for all of them.
+        cursor: The next_cursor of a previous page to continue from.
+        fields: The task fields to return, None for the default fields.
 
     Returns:
-        A list of dictionaries containing task names, ids, project ids, and tag ids.
+        A list of dictionaries containing task names, ids, project ids, and tag ids. If a limit or cursor
+        is given, a page with the tasks, the total number of tasks and the cursor of the next page.
     """
-    script = Template(
-        dedent("""
-    ${__common_functions__}
-    
-    (() => {
-        let project = Project.byIdentifier("${project_id}");
-        const allowedStatuses = ${task_status};
+    fields, rows = _fields(fields, TaskField), _rows()
+
+    def read(database: "OFocusDatabase") -> list[dict[str, Any]] | TaskPage | None:
+        tasks = database.project_tasks(project_id)
+        return None if tasks is None else _database_tasks(_with_status(tasks, task_status), limit, cursor, fields)
+
+    tasks = _from_database(read)
+    if tasks is not None:
+        return tasks
+    return _paged(
+        _evaluate(
+            __list_container_tasks__,
+            kind="project",
+            id=project_id,
+            taskStatus=task_status or None,
+            page=_page(limit, cursor),
+            fields=fields,
+            rows=rows,
+        ),
+        rows,
+    )
+
+
+@coalesced
+def list_tasks_by_tag(
+    tag_id: str,
+    task_status: list[TaskStatus] | None = None,
+    limit: int | None = None,
+    cursor: str | None = None,
+    fields: list[TaskField] | None = None,
+    include_descendants: bool = False,
+) -> list[dict[str, str]] | TaskPage:
+    """List all tasks with a specific tag in OmniFocus.
 
-        if (!project) {
-            throw "Could not find project: " + project_id.toString();
+    Args:
+        tag_id: The ID of the tag to filter tasks by.
+        task_status: A list of task statuses to filter by. If None, all tasks are returned.
+        limit: The maximum number of tasks to return, None for all of them.
+        cursor: The next_cursor of a previous page to continue from.
+        fields: The task fields to return, None for the default fields.
+        include_descendants: Whether to also list the tasks of the descendants of the tag, as resolved
+            from the tag index.
+
+    Returns:
+        A list of dictionaries containing task names, ids, project ids, and tag ids. If a limit or cursor
+        is given, a page with the tasks, the total number of tasks and the cursor of the next page.
+    """
+    fields = _fields(fields, TaskField)
+
+    def read(database: "OFocusDatabase") -> list[dict[str, Any]] | TaskPage | None:
+        index = TagIndex(database.tags())
+        if tag_id not in index:
+            return None
+        tag_ids = index.subtree(tag_id) if include_descendants else [tag_id]
+        # Tasks of the tag itself first, then those of its descendants, as OmniFocus lists them
+        tasks = {task["id"]: task for task in database.tasks() if tag_id in task["tagIds"]}
+        for task in database.tasks():
+            if task["id"] not in tasks and not set(tag_ids).isdisjoint(task["tagIds"]):
+                tasks[task["id"]] = task
+        return _database_tasks(_with_status(list(tasks.values()), task_status), limit, cursor, fields)
+
+    tasks = _from_database(read)
+    if tasks is not None:
+        return tasks
+
+    descendant_ids = None
+    if include_descendants:
+        index = tag_index()
+        if tag_id not in index:
+            # The tag may have been added since the index was cached
+            snapshot_cache.invalidate("tags")
+            index = tag_index()
+        # A tag still missing is left for OmniFocus to report
+        descendant_ids = index.subtree(tag_id)[1:] if tag_id in index else None
+    rows = _rows()
+    return _paged(
+        _evaluate(
+            __list_container_tasks__,
+            kind="tag",
+            id=tag_id,
+            descendantIds=descendant_ids,
+            taskStatus=task_status or None,
+            page=_page(limit, cursor),
+            fields=fields,
+            rows=rows,
+        ),
+        rows,
+    )
+
+
+__batch_update_tasks__ = dedent("""
+args => {
+    // Tasks created by the batch, by the placeholder id later operations refer to them with
+    const created = {};
+
+    function applyOperation(operation) {
+        if (operation.action === "create") {
+            if (!operation.changes.name) {
+                throw "A name is required to create a task";
+            }
+            const task = new Task(operation.changes.name);
+            created[operation.taskId] = task;
+            applyTaskChanges(task, Object.assign({}, operation.changes, { name: null }));
+            return formatTask(task);
         }
 
-        return project.tasks
-            .filter(task => taskStatusFilter(task, allowedStatuses))
-            .map((task) => {
-                try {
-                    return formatTask(task);
-                } catch (e) {
-                    return null;
+        let task = created[operation.taskId] || Task.byIdentifier(operation.taskId);
+        if (!task) {
+            throw "Could not find task: " + operation.taskId;
+        }
+
+        switch (operation.action) {
+            case "update":
+                applyTaskChanges(task, operation.changes);
+                break;
+            case "complete":
+                task.markComplete();
+                break;
+            case "drop":
+                task.drop(false);
+                break;
+            case "activate":
+                task.active = true;
+                break;
+            case "move": {
+                let project = Project.byIdentifier(operation.changes.projectId);
+                if (!project) {
+                    throw "Could not find project: " + operation.changes.projectId;
                 }
-            }).filter(Boolean);
-    })();
-    """)
-    )
+                moveTasks([task], project);
+                break;
+            }
+            default:
+                throw "Unknown action: " + operation.action;
+        }
+        return formatTask(task);
+    }
 
-    return evaluate_javascript(
-        script.substitute(
-            __common_functions__=__common_functions__,
-            project_id=project_id,
-            task_status=f"[{', '.join([f'"{status}"' for status in task_status])}]" if task_status else "null",
-        )
-    )
+    return args.operations.map(operation => {
+        try {
+            return { task: applyOperation(operation), error: null };
+        } catch (e) {
+            return { task: null, error: e.toString() };
+        }
+    });
+}
+""")
 
 
-def list_tasks_by_tag(tag_id: str, task_status: list[TaskStatus] | None = None) -> list[dict[str, str]]:
-    """List all tasks with a specific tag in OmniFocus.
+@invalidates("tasks")
+def batch_update_tasks(operations: list[TaskOperation]) -> list[TaskOperationResult]:
+    """Apply many task operations in OmniFocus with a single script evaluation.
+
+    Each operation is applied independently, a failing operation is reported in its result and does
+    not stop the rest of the batch.
 
     Args:
-        tag_id: The ID of the tag to filter tasks by.
-        task_status: A list of task statuses to filter by. If None, all tasks are returned.
+        operations: The operations to apply, in order. The action is one of "update" (apply the given
+            name, note, tag_ids, project_id, defer_date, due_date and flagged), "complete", "drop",
+            "activate", "move" (move the task to project_id) or "create" (create a task in the inbox with
+            the given name and other fields, the task_id is a placeholder later operations of the batch
+            can refer to the new task with).
 
     Returns:
-        A list of dictionaries containing task names, ids, project ids, and tag ids.
+        A list with one result per operation, in the same order, containing the updated task's details
+        on success or the error message on failure.
     """
-    script = Template(
-        dedent("""
-    ${__common_functions__}
-    
-    (() => {
-        let tag = Tag.byIdentifier("${tag_id}");
-        const allowedStatuses = ${task_status};
+    if not operations:
+        return []
+
+    payload = [
+        {
+            "taskId": operation["task_id"],
+            "action": operation["action"],
+            "changes": _task_changes(
+                name=operation.get("name"),
+                note=operation.get("note"),
+                tag_ids=operation.get("tag_ids"),
+                project_id=operation.get("project_id"),
+                defer_date=operation.get("defer_date"),
+                due_date=operation.get("due_date"),
+                flagged=operation.get("flagged"),
+            ),
+        }
+        for operation in operations
+    ]
+    outcomes = _evaluate(__batch_update_tasks__, operations=payload)
+
+    return [
+        {
+            "task_id": operation["task_id"],
+            "action": operation["action"],
+            "success": outcome["error"] is None,
+            "task": outcome["task"],
+            "error": outcome["error"],
+        }
+        for operation, outcome in zip(operations, outcomes, strict=True)
+    ]
+
+
+__import_outline__ = dedent("""
+args => {
+    // Projects and tasks imported by this script, by their index in args.items
+    const imported = {};
+
+    function tagNamed(name) {
+        return flattenedTags.find(tag => tag.name === name) || new Tag(name);
+    }
+
+    function parentOf(item) {
+        if (item.parentFailed) {
+            throw "The item it is nested under could not be imported";
+        }
+        if (item.parentIndex !== null) {
+            if (!imported[item.parentIndex]) {
+                throw "The item it is nested under could not be imported";
+            }
+            return imported[item.parentIndex];
+        }
+        if (item.parentId === null) {
+            return null;
+        }
+        const parent = item.parentKind === "project" ? Project.byIdentifier(item.parentId) : Task.byIdentifier(item.parentId);
+        if (!parent) {
+            throw "Could not find " + item.parentKind + ": " + item.parentId;
+        }
+        return parent;
+    }
+
+    function importItem(item, index) {
+        let created = true;
+        let object = null;
+        if (item.kind === "project") {
+            // Tasks are added to a project of the same name when there is one
+            object = flattenedProjects.find(project => project.name === item.name) || null;
+            created = object === null;
+            object = object || new Project(item.name);
+        } else {
+            const parent = parentOf(item);
+            object = parent ? new Task(item.name, parent.ending) : new Task(item.name);
+        }
+        imported[index] = object;
+        if (created) {
+            if (item.note) {
+                object.note = item.note;
+            }
+            item.tags.forEach(name => object.addTag(tagNamed(name)));
+            if (item.deferDate) {
+                object.deferDate = new Date(item.deferDate);
+            }
+            if (item.dueDate) {
+                object.dueDate = new Date(item.dueDate);
+            }
+            if (item.flagged) {
+                object.flagged = true;
+            }
+            if (item.completed) {
+                object.markComplete();
+            }
+        }
+        return { id: object.id.primaryKey, created: created };
+    }
 
-        if (!tag) {
-            throw "Could not find tag: " + tag_id.toString();
+    return args.items.map((item, index) => {
+        try {
+            return Object.assign(importItem(item, index), { error: null });
+        } catch (e) {
+            return { id: null, created: false, error: e.toString() };
         }
-        
-        return tag.tasks
-            .filter(task => taskStatusFilter(task, allowedStatuses))
-            .map((task) => {
-                try {
-                    return formatTask(task);
-                } catch (e) {
-                    return null;
+    });
+}
+""")
+
+# The number of outline items imported per script evaluation
+IMPORT_CHUNK_SIZE = 250
+
+
+@invalidates("tasks", "projects", "tags")
+def import_outline(
+    text: str, syntax: outline.Syntax = "auto", chunk_size: int = IMPORT_CHUNK_SIZE
+) -> list[ImportedItem]:
+    """Create the projects and tasks of a TaskPaper or Markdown outline in OmniFocus, with their hierarchy.
+
+    The outline is parsed in Python, see mcp_omnifocus.utils.outline, and imported with one script evaluation
+    per chunk of items. A project named as an existing one adds its tasks to that project, unknown tags are
+    created. An item that fails is reported in its result, along with the items nested under it, and does not
+    stop the rest of the import.
+
+    Args:
+        text: The outline.
+        syntax: "taskpaper", "markdown" or "auto".
+        chunk_size: The number of items imported per script evaluation.
+
+    Returns:
+        A list with one result per project and task, in the order of the outline, with its id.
+
+    Raises:
+        ValueError: If the outline has an invalid date or an item without a name.
+    """
+    items = outline.parse_outline(text, syntax)
+    results: list[ImportedItem] = []
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start : start + chunk_size]
+        payload = []
+        for item in chunk:
+            parent = item["parent"]
+            # Items nested under an item of an earlier chunk refer to it by the id it was imported with
+            earlier = results[parent] if parent is not None and parent < start else None
+            payload.append(
+                {
+                    "kind": item["kind"],
+                    "name": item["name"],
+                    "note": item["note"],
+                    "tags": item["tags"],
+                    "flagged": item["flagged"],
+                    "completed": item["completed"],
+                    "deferDate": item["defer_date"],
+                    "dueDate": item["due_date"],
+                    "parentIndex": parent - start if parent is not None and earlier is None else None,
+                    "parentId": earlier["id"] if earlier is not None else None,
+                    "parentKind": earlier["kind"] if earlier is not None else None,
+                    "parentFailed": earlier is not None and earlier["id"] is None,
                 }
-            }).filter(Boolean);
-    })();
-    """)
-    )
+            )
+        outcomes = _evaluate(__import_outline__, items=payload)
+        for item, outcome in zip(chunk, outcomes, strict=True):
+            results.append(
+                {
+                    "id": outcome["id"],
+                    "kind": item["kind"],
+                    "name": item["name"],
+                    "created": outcome["created"],
+                    "error": outcome["error"],
+                }
+            )
+    return results
 
-    return evaluate_javascript(
-        script.substitute(
-            __common_functions__=__common_functions__,
-            tag_id=tag_id,
-            task_status=f"[{', '.join([f'"{status}"' for status in task_status])}]" if task_status else "null",
-        )
+
+__query_tasks__ = dedent("""
+args => {
+    // The predicate is compiled from a validated filter, see mcp_omnifocus.utils.query
+    const matches = (0, eval)(args.predicate);
+    const sort = args.sort;
+
+    let tasks = flattenedTasks.filter(task => {
+        try {
+            return matches(task);
+        } catch (e) {
+            return false;
+        }
+    });
+
+    if (sort.length > 0) {
+        const keyed = tasks.map(task => ({ task: task, keys: sort.map(key => queryFields[key.field](task)) }));
+        keyed.sort((a, b) => {
+            for (let i = 0; i < sort.length; i++) {
+                const order = compareQueryValues(a.keys[i], b.keys[i], sort[i].direction === "desc");
+                if (order !== 0) {
+                    return order;
+                }
+            }
+            return 0;
+        });
+        tasks = keyed.map(entry => entry.task);
+    }
+
+    if (args.limit) {
+        tasks = tasks.slice(0, args.limit);
+    }
+    return formatTasks(tasks, null, args.fields, args.rows);
+}
+""")
+
+
+@coalesced
+def query_tasks(
+    filter: dict[str, Any] | None = None,
+    sort: list[dict[str, Any]] | None = None,
+    limit: int | None = None,
+    fields: list[TaskField] | None = None,
+) -> list[dict[str, str]]:
+    """List the tasks in OmniFocus that match a filter, evaluated inside OmniFocus.
+
+    Args:
+        filter: The filter expression the tasks must match, None for all tasks. See mcp_omnifocus.utils.query.
+        sort: Sort keys, each a {"field", "direction"} object with direction "asc" (default) or "desc".
+            Tasks without a value for a key sort last.
+        limit: The maximum number of tasks to return, None for all of them.
+        fields: The task fields to return, None for the default fields.
+
+    Returns:
+        A list of dictionaries containing the matching tasks' details.
+
+    Raises:
+        QueryError: If the filter or sort is invalid.
+    """
+    expression = query.validate(filter) if filter is not None else None
+    sort_keys = query.validate_sort(sort)
+    if limit is not None and limit < 1:
+        raise query.QueryError(f"Invalid limit: {limit}, it must be at least 1")
+
+    rows = _rows()
+    tasks = _evaluate(
+        __query_tasks__,
+        library=__query_library__,
+        predicate=query.compile_predicate(expression),
+        sort=sort_keys,
+        limit=limit,
+        fields=_fields(fields, TaskField),
+        rows=rows,
     )
+    return _decode_tasks(tasks, rows)
+
+
+__task_stats__ = dedent("""
+args => {
+    // The predicate is compiled from a validated filter, see mcp_omnifocus.utils.query
+    const matches = (0, eval)(args.predicate);
+
+    const now = new Date();
+    const tomorrow = new Date(now.getFullYear(), now.getMonth(), now.getDate() + 1);
+    const nextWeek = new Date(now.getFullYear(), now.getMonth(), now.getDate() + 7);
+    function dueBucket(task) {
+        const due = task.dueDate;
+        if (!due) {
+            return "none";
+        }
+        if (due < now) {
+            return "overdue";
+        }
+        return due < tomorrow ? "today" : due < nextWeek ? "next_7_days" : "later";
+    }
+
+    // The groups each dimension counts a task in, a task with several tags is counted once per tag
+    const dimensions = {
+        project: task => {
+            const project = task.containingProject;
+            return [{ projectId: project ? project.id.primaryKey : null, project: project ? project.name : null }];
+        },
+        tag: task => task.tags.length > 0
+            ? task.tags.map(tag => ({ tagId: tag.id.primaryKey, tag: tag.name }))
+            : [{ tagId: null, tag: null }],
+        status: task => [{ status: taskStatusToString(task.taskStatus) }],
+        flagged: task => [{ flagged: task.flagged }],
+        due: task => [{ due: dueBucket(task) }],
+    };
+    const groupBy = args.groupBy.map(dimension => dimensions[dimension]);
+
+    const groups = new Map();
+    let total = 0;
+    flattenedTasks.forEach(task => {
+        try {
+            if (!matches(task)) {
+                return;
+            }
+        } catch (e) {
+            return;
+        }
+        total += 1;
+        let keys = [{}];
+        groupBy.forEach(values => {
+            const taskValues = values(task);
+            keys = keys.flatMap(key => taskValues.map(value => Object.assign({}, key, value)));
+        });
+        keys.forEach(key => {
+            const id = JSON.stringify(key);
+            const group = groups.get(id);
+            if (group) {
+                group.count += 1;
+            } else {
+                groups.set(id, Object.assign(key, { count: 1 }));
+            }
+        });
+    });
+
+    // Only the largest groups are sent back
+    const sorted = Array.from(groups.entries())
+        .sort((a, b) => b[1].count - a[1].count || (a[0] < b[0] ? -1 : a[0] > b[0] ? 1 : 0))
+        .map(entry => entry[1]);
+    return { total: total, groups: args.limit ? sorted.slice(0, args.limit) : sorted };
+}
+""")
+
+
+@coalesced
+def task_stats(
+    group_by: list[StatsDimension],
+    filter: dict[str, Any] | None = None,
+    include_completed: bool = False,
+    limit: int | None = None,
+) -> TaskStats:
+    """Count tasks in OmniFocus by project, tag, status, flag or due date, in one pass inside OmniFocus.
+
+    Only the counts are returned, not the tasks. Grouping by several dimensions counts the tasks of every
+    combination of their values, e.g. by project and status.
+
+    Args:
+        group_by: The dimensions to group by: "project" (projectId and project name, None for the inbox),
+            "tag" (tagId and tag name, a task with several tags counts in each, None for untagged tasks),
+            "status", "flagged", and "due" (the bucket of the due date: "overdue", "today", "next_7_days",
+            "later" or "none"). No dimension counts all the tasks in one group.
+        filter: The filter expression the counted tasks must match, None for all tasks. See
+            mcp_omnifocus.utils.query.
+        include_completed: Whether to count completed and dropped tasks.
+        limit: The maximum number of groups to return, None for all of them.
+
+    Returns:
+        The number of tasks counted, and the groups with their values and task "count", largest first.
+
+    Raises:
+        QueryError: If the filter or limit is invalid.
+        ValueError: If a dimension is unknown.
+    """
+    unknown = [dimension for dimension in group_by if dimension not in get_args(StatsDimension)]
+    if unknown:
+        raise ValueError(f"Invalid dimensions: {unknown}, expected some of {list(get_args(StatsDimension))}")
+    if limit is not None and limit < 1:
+        raise query.QueryError(f"Invalid limit: {limit}, it must be at least 1")
+    if not include_completed:
+        remaining = {"not": {"field": "status", "op": "in", "value": ["Completed", "Dropped"]}}
+        filter = remaining if filter is None else {"and": [remaining, filter]}
+
+    expression = query.validate(filter) if filter is not None else None
+    # Due date buckets move with the clock, tasks become overdue without any write to drop the cached counts
+    count = _count_tasks if "due" in group_by else _cached_count_tasks
+    return count(query.compile_predicate(expression), list(dict.fromkeys(group_by)), limit)
+
+
+def _count_tasks(predicate: str, group_by: list[StatsDimension], limit: int | None) -> TaskStats:
+    return _evaluate(__task_stats__, library=__query_library__, predicate=predicate, groupBy=group_by, limit=limit)
+
+
+_cached_count_tasks = cached("task_stats")(_count_tasks)
+
+
+@on_write
+def _invalidate_task_stats(namespaces: tuple[str, ...]) -> None:
+    # Counts cannot be patched with the written task, and renamed projects and tags change the group names
+    if {"tasks", "projects", "tags"} & set(namespaces):
+        snapshot_cache.invalidate("task_stats")
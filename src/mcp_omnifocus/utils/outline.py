@@ -0,0 +1,174 @@
+"""Outlines of projects and tasks written in TaskPaper or Markdown, parsed for a bulk import into OmniFocus.
+
+TaskPaper, as OmniFocus itself exports it:
+
+    Home:
+    - Buy milk @tags(Errands) @due(2025-01-02)
+    - Fix the shelf @flagged
+        Needs longer screws
+        - Buy screws @defer(2025-01-01 09:00)
+    - Call plumber
+
+Markdown:
+
+    # Home
+    - [ ] Buy milk @errands @due(2025-01-02)
+    - [ ] Fix the shelf @flagged
+      Needs longer screws
+      - [x] Buy screws
+
+Project lines (``Name:`` at the top level in TaskPaper, headings in Markdown) hold the tasks below them,
+tasks are nested under the task above them that is indented less, and other lines are appended to the note
+of the item above them. Tasks before the first project go to the inbox.
+
+Attributes are written as TaskPaper tags: ``@due(...)`` and ``@defer(...)`` (or ``@start(...)``) take an ISO
+date, with a time or without one, in which case OmniFocus' default times are used (5 PM for due dates, midnight
+for defer dates); ``@flagged`` flags and ``@done`` completes the item; ``@tags(a, b)`` tags it with several
+tags; any other ``@name`` tags it with ``name``. Values of other attributes OmniFocus exports, such as
+``@estimate(30m)``, are ignored.
+"""
+
+import re
+from datetime import datetime, time
+from typing import Literal, TypedDict
+
+Syntax = Literal["auto", "taskpaper", "markdown"]
+
+
+class OutlineItem(TypedDict):
+    """A project or task of an outline, as returned by parse_outline."""
+
+    kind: Literal["project", "task"]
+    name: str
+    note: str | None
+    tags: list[str]
+    flagged: bool
+    completed: bool
+    defer_date: str | None
+    due_date: str | None
+    parent: int | None
+
+
+_ATTRIBUTE = re.compile(r"(?<!\S)@([\w.-]+)(?:\(([^)]*)\))?")
+# Attributes OmniFocus exports that are neither tags nor supported by the import
+_IGNORED = {"estimate", "autodone", "parallel", "repeat-method", "repeat-rule", "context", "project"}
+_DEFAULT_TIMES = {"defer_date": time(0, 0), "due_date": time(17, 0)}
+
+_HEADING = re.compile(r"#{1,6}\s+(.*)")
+_MARKDOWN_ITEM = re.compile(r"(?:[-*+]|\d+[.)])\s+(?:\[([ xX])\]\s+)?(.*)")
+_TASKPAPER_ITEM = re.compile(r"-\s+(.*)")
+_TASKPAPER_PROJECT = re.compile(r"([^@]*?):((?:\s+@.*)?)")
+
+
+def parse_outline(text: str, syntax: Syntax = "auto") -> list[OutlineItem]:
+    """Parse an outline into its projects and tasks, in the order they are written.
+
+    Args:
+        text: The outline.
+        syntax: "taskpaper", "markdown", or "auto" to tell them apart by the Markdown headings, checkboxes and
+            numbered or starred list items only Markdown has.
+
+    Returns:
+        The items, each with the index of the item it is nested under as its parent, None for top level items.
+
+    Raises:
+        ValueError: If a date is not an ISO date.
+    """
+    lines = text.expandtabs(4).splitlines()
+    if syntax == "auto":
+        syntax = "markdown" if any(_is_markdown(line.strip()) for line in lines) else "taskpaper"
+
+    items: list[OutlineItem] = []
+    # The items lines can be nested under, with their indentation, innermost last. The current project is
+    # first, with an indentation below any line's as it holds every task up to the next project.
+    open_items: list[tuple[int, int]] = []
+    for line in lines:
+        content = line.strip()
+        if not content:
+            continue
+        indent = len(line) - len(line.lstrip())
+        while open_items and open_items[-1][0] >= indent:
+            open_items.pop()
+
+        kind, checked, body = _classify(content, syntax, nested=bool(open_items) and indent > 0)
+        if kind is None:
+            if items:
+                note = items[-1]["note"]
+                items[-1]["note"] = content if note is None else f"{note}\n{content}"
+            continue
+        if kind == "project":
+            # Projects are top level, everything open is closed
+            open_items = []
+        item = _item(kind, body, open_items[-1][1] if open_items else None)
+        item["completed"] = item["completed"] or checked
+        items.append(item)
+        open_items.append((-1 if kind == "project" else indent, len(items) - 1))
+    return items
+
+
+def _is_markdown(content: str) -> bool:
+    return bool(_HEADING.fullmatch(content)) or bool(re.match(r"(?:[-*+]\s+\[[ xX]\]|[*+]|\d+[.)])\s", content))
+
+
+def _classify(content: str, syntax: Syntax, nested: bool) -> tuple[Literal["project", "task"] | None, bool, str]:
+    """Tell whether a line is a project, a task or a note line, and whether it is checked."""
+    if syntax == "markdown":
+        if heading := _HEADING.fullmatch(content):
+            return "project", False, heading.group(1)
+        if item := _MARKDOWN_ITEM.fullmatch(content):
+            return "task", item.group(1) in ("x", "X"), item.group(2)
+        return None, False, content
+    if item := _TASKPAPER_ITEM.fullmatch(content):
+        return "task", False, item.group(1)
+    if project := _TASKPAPER_PROJECT.fullmatch(content):
+        # Projects nested in TaskPaper become action groups, OmniFocus only nests projects in folders
+        return "task" if nested else "project", False, project.group(1) + project.group(2)
+    return None, False, content
+
+
+def _item(kind: Literal["project", "task"], body: str, parent: int | None) -> OutlineItem:
+    """Build an item from the text of its line, reading its attributes out of its name."""
+    item: OutlineItem = {
+        "kind": kind,
+        "name": "",
+        "note": None,
+        "tags": [],
+        "flagged": False,
+        "completed": False,
+        "defer_date": None,
+        "due_date": None,
+        "parent": parent,
+    }
+    for match in _ATTRIBUTE.finditer(body):
+        name, value = match.group(1), match.group(2)
+        attribute = name.lower()
+        if attribute == "due":
+            item["due_date"] = _parse_date(value, "due_date")
+        elif attribute in ("defer", "start"):
+            item["defer_date"] = _parse_date(value, "defer_date")
+        elif attribute == "flagged":
+            item["flagged"] = True
+        elif attribute == "done":
+            item["completed"] = True
+        elif attribute == "tags":
+            item["tags"].extend(tag.strip() for tag in (value or "").split(",") if tag.strip())
+        elif attribute not in _IGNORED:
+            item["tags"].append(name)
+    item["tags"] = list(dict.fromkeys(item["tags"]))
+    item["name"] = " ".join(_ATTRIBUTE.sub("", body).split())
+    if not item["name"]:
+        raise ValueError(f"An outline item needs a name: {body!r}")
+    return item
+
+
+def _parse_date(value: str | None, field: str) -> str:
+    """Turn an ISO date, with or without a time, into the local date and time OmniFocus is given."""
+    try:
+        parsed = datetime.fromisoformat((value or "").strip())
+    except ValueError:
+        raise ValueError(
+            f"Invalid date: {value!r}, expected an ISO date such as 2025-01-02 or 2025-01-02 17:00"
+        ) from None
+    if len((value or "").strip()) <= len("2025-01-02"):
+        parsed = datetime.combine(parsed.date(), _DEFAULT_TIMES[field])
+    return parsed.isoformat(timespec="seconds")
@@ -0,0 +1,141 @@
+"""Perspectives evaluated from the OmniFocus database rather than from the outline of a window.
+
+Listing a perspective through a window means switching the front window to it, waiting for OmniFocus to
+redraw the outline and walking its nodes, which is slow, runs behind every other UI update and fails
+when no window is open. Most perspectives can instead be described as task filters:
+
+    Inbox      the remaining tasks in the inbox
+    Flagged    the available flagged tasks
+    Forecast   the remaining tasks due yesterday or today, the days the window path selects
+    custom     the filter rules of the perspective (``archivedFilterRules``), translated into a
+               filter of ``mcp_omnifocus.utils.query``
+
+``built_in_view`` and ``custom_view`` return the tasks a perspective starts from and their filter, or
+None when it can only be listed through a window: the other built-in perspectives, and custom
+perspectives with rules that have no equivalent filter, such as focus on folders or dates relative to
+today.
+"""
+
+from datetime import date, timedelta
+from typing import Any, Literal
+
+Source = Literal["inbox", "tasks"]
+
+REMAINING = ["Available", "Blocked", "DueSoon", "Next", "Overdue"]
+AVAILABLE = ["Available", "DueSoon", "Next", "Overdue"]
+
+# Filters for the values of the actionAvailability and actionStatus rules of custom perspectives
+_AVAILABILITY = {
+    "remaining": {"field": "status", "op": "in", "value": REMAINING},
+    "available": {"field": "status", "op": "in", "value": AVAILABLE},
+    "completed": {"field": "status", "op": "eq", "value": "Completed"},
+    "dropped": {"field": "status", "op": "eq", "value": "Dropped"},
+}
+_STATUS = {
+    "flagged": {"field": "flagged", "op": "eq", "value": True},
+    "due": {"field": "status", "op": "in", "value": ["DueSoon", "Overdue"]},
+}
+
+
+class _Unsupported(Exception):
+    """Raised for a filter rule that has no equivalent task filter."""
+
+
+def built_in_view(name: str, today: date | None = None) -> tuple[Source, dict[str, Any]] | None:
+    """Return the source and filter of a built-in perspective, None if it is not evaluated headless.
+
+    Args:
+        name: The name of the perspective, in any case.
+        today: The local date the Forecast is for, None for today.
+    """
+    name = name.upper()
+    if name == "INBOX":
+        return "inbox", {"field": "status", "op": "in", "value": REMAINING}
+    if name == "FLAGGED":
+        return "tasks", {
+            "and": [
+                {"field": "flagged", "op": "eq", "value": True},
+                {"field": "status", "op": "in", "value": AVAILABLE},
+            ]
+        }
+    if name == "FORECAST":
+        today = today or date.today()
+        return "tasks", {
+            "and": [
+                {"field": "status", "op": "in", "value": REMAINING},
+                {"field": "dueDate", "op": "gte", "value": (today - timedelta(days=1)).isoformat()},
+                {"field": "dueDate", "op": "lt", "value": (today + timedelta(days=1)).isoformat()},
+            ]
+        }
+    return None
+
+
+def _rule_filter(rule: dict[str, Any]) -> dict[str, Any] | None:
+    """Translate one filter rule of a custom perspective, None for a rule that matches every task."""
+    if "disabledRule" in rule:
+        return None
+    if "aggregateType" in rule:
+        return _aggregate(rule.get("aggregateRules") or [], rule["aggregateType"])
+    if len(rule) != 1:
+        raise _Unsupported(rule)
+
+    key, value = next(iter(rule.items()))
+    if key == "actionAvailability" and value in _AVAILABILITY:
+        return _AVAILABILITY[value]
+    if key == "actionStatus" and value in _STATUS:
+        return _STATUS[value]
+    if key == "actionHasAnyOfTags" and value:
+        return {"field": "tagIds", "op": "has_any", "value": value}
+    if key == "actionHasAllOfTags" and value:
+        return {"and": [{"field": "tagIds", "op": "has", "value": tag_id} for tag_id in value]}
+    if key in ("actionIsUntagged", "actionHasNoTags") and isinstance(value, bool):
+        return {"field": "tagIds", "op": "exists", "value": not value}
+    if key == "actionHasNoProject" and isinstance(value, bool):
+        return {"field": "projectId", "op": "exists", "value": not value}
+    if key == "actionHasDueDate" and isinstance(value, bool):
+        return {"field": "dueDate", "op": "exists", "value": value}
+    if key == "actionHasDeferDate" and isinstance(value, bool):
+        return {"field": "deferDate", "op": "exists", "value": value}
+    if key == "actionIsLeaf" and value is True:
+        return None  # Perspectives are listed as the leaves of their outline in any case
+    if key == "actionMatchingSearch" and value:
+        return {
+            "and": [
+                {
+                    "or": [
+                        {"field": "name", "op": "contains", "value": term},
+                        {"field": "note", "op": "contains", "value": term},
+                    ]
+                }
+                for term in value
+            ]
+        }
+    raise _Unsupported(rule)
+
+
+def _aggregate(rules: list[dict[str, Any]], aggregation: str) -> dict[str, Any] | None:
+    filters = [_rule_filter(rule) for rule in rules if "disabledRule" not in rule]
+    if aggregation == "all":
+        filters = [operand for operand in filters if operand is not None]
+        return {"and": filters} if filters else None
+    if aggregation not in ("any", "none") or not filters or None in filters:
+        # Any of no rules matches nothing, and any rule matching everything makes the aggregate do so
+        raise _Unsupported(aggregation)
+    return {"or": filters} if aggregation == "any" else {"not": {"or": filters}}
+
+
+def custom_view(
+    rules: list[dict[str, Any]] | None, aggregation: str | None
+) -> tuple[Source, dict[str, Any] | None] | None:
+    """Return the source and filter of a custom perspective, None if its rules cannot be translated.
+
+    Args:
+        rules: The archivedFilterRules of the perspective, None if OmniFocus does not expose them.
+        aggregation: The archivedTopLevelFilterAggregation of the perspective, "all", "any" or "none".
+    """
+    if rules is None:
+        return None
+    try:
+        return "tasks", _aggregate(rules, aggregation or "all")
+    except _Unsupported:
+        return None
@@ -0,0 +1,341 @@
+"""Structured task filters, compiled into JXA predicates that are evaluated inside OmniFocus.
+
+A filter is a JSON-like expression:
+
+    {"and": [filter, ...]}
+    {"or": [filter, ...]}
+    {"not": filter}
+    {"field": <field>, "op": <op>, "value": <value>}
+
+For example, flagged tasks due before the end of the year that are not tagged Waiting:
+
+    {"and": [
+        {"field": "flagged", "op": "eq", "value": True},
+        {"field": "dueDate", "op": "lt", "value": "2025-12-31"},
+        {"not": {"field": "tagIds", "op": "has", "value": "waitingTagId"}},
+    ]}
+
+Filters are validated and normalized in Python (dates become epoch milliseconds) before they are
+compiled, and ``evaluate`` applies the same semantics to task records held in memory.
+"""
+
+import json
+import math
+from datetime import datetime
+from textwrap import dedent
+from typing import Any, Literal, get_args
+
+FieldType = Literal["string", "id", "status", "bool", "date", "tags"]
+
+FIELDS: dict[str, FieldType] = {
+    "name": "string",
+    "note": "string",
+    "projectName": "string",
+    "projectId": "id",
+    "status": "status",
+    "flagged": "bool",
+    "completed": "bool",
+    "dropped": "bool",
+    "dueDate": "date",
+    "deferDate": "date",
+    "added": "date",
+    "modified": "date",
+    "tagIds": "tags",
+}
+
+OPERATORS: dict[FieldType, set[str]] = {
+    "string": {"eq", "contains", "startswith", "exists"},
+    "id": {"eq", "in", "exists"},
+    "status": {"eq", "in"},
+    "bool": {"eq"},
+    "date": {"lt", "lte", "gt", "gte", "exists"},
+    "tags": {"has", "has_any", "in_subtree", "exists"},
+}
+
+STATUSES = ("Available", "Blocked", "Completed", "Dropped", "DueSoon", "Next", "Overdue")
+
+SortDirection = Literal["asc", "desc"]
+
+__query_functions__ = dedent("""
+var queryFields = {
+    name: task => task.name,
+    note: task => task.note,
+    projectName: task => task.containingProject ? task.containingProject.name : null,
+    projectId: task => task.containingProject ? task.containingProject.id.primaryKey : null,
+    status: task => taskStatusToString(task.taskStatus),
+    flagged: task => task.flagged,
+    completed: task => task.completed,
+    dropped: task => task.dropped,
+    dueDate: task => task.dueDate ? task.dueDate.getTime() : null,
+    deferDate: task => task.deferDate ? task.deferDate.getTime() : null,
+    added: task => task.added ? task.added.getTime() : null,
+    modified: task => task.modified ? task.modified.getTime() : null,
+    tagIds: task => task.tags ? task.tags.map(tt => tt.id.primaryKey) : [],
+};
+
+function tagSubtree(tagId) {
+    const tag = Tag.byIdentifier(tagId);
+    if (!tag) {
+        return [];
+    }
+    return [tagId].concat(tag.flattenedTags.map(tt => tt.id.primaryKey));
+}
+
+function queryLower(value) {
+    return value === null || value === undefined ? "" : String(value).toLowerCase();
+}
+
+function compareQueryValues(a, b, descending) {
+    // Missing values sort last in either direction
+    if (a === b) {
+        return 0;
+    }
+    if (a === null || a === undefined) {
+        return 1;
+    }
+    if (b === null || b === undefined) {
+        return -1;
+    }
+    const order = typeof a === "string" ? a.localeCompare(b) : (a < b ? -1 : 1);
+    return descending ? -order : order;
+}
+""")
+
+
+class QueryError(ValueError):
+    """Exception raised when a task filter or sort is invalid."""
+
+    pass
+
+
+def _to_millis(value: Any, path: str) -> int:
+    if isinstance(value, bool) or not isinstance(value, str | int | float):
+        raise QueryError(f"{path}: expected an ISO date string, got {value!r}")
+    if isinstance(value, int | float):
+        if not math.isfinite(value):
+            raise QueryError(f"{path}: expected a finite number of milliseconds, got {value!r}")
+        return int(value)
+    try:
+        # Dates without a time zone are in local time, the same as task dates set through update_task
+        return int(datetime.fromisoformat(value).astimezone().timestamp() * 1000)
+    except (ValueError, OverflowError, OSError) as e:
+        raise QueryError(f"{path}: expected an ISO date string, got {value!r}") from e
+
+
+def validate(expression: dict[str, Any], path: str = "filter") -> dict[str, Any]:
+    """Validate a filter expression and return its normalized form.
+
+    Args:
+        expression: The filter to validate.
+        path: Where the expression is in the overall filter, used in error messages.
+
+    Returns:
+        The filter with date values converted to epoch milliseconds.
+
+    Raises:
+        QueryError: If the filter is malformed, uses an unknown field or an operator the field does not support.
+    """
+    if not isinstance(expression, dict):
+        raise QueryError(f"{path}: expected an object, got {expression!r}")
+
+    for combinator in ("and", "or"):
+        if combinator in expression:
+            operands = expression[combinator]
+            if len(expression) != 1 or not isinstance(operands, list) or not operands:
+                raise QueryError(f"{path}: '{combinator}' expects a non-empty list of filters")
+            return {combinator: [validate(operand, f"{path}.{combinator}[{i}]") for i, operand in enumerate(operands)]}
+
+    if "not" in expression:
+        if len(expression) != 1:
+            raise QueryError(f"{path}: 'not' expects a single filter")
+        return {"not": validate(expression["not"], f"{path}.not")}
+
+    field, op = expression.get("field"), expression.get("op")
+    # Filters are JSON from the client, a field or operator may be a list or object that cannot be looked up
+    if not isinstance(field, str) or field not in FIELDS:
+        raise QueryError(f"{path}: unknown field {field!r}, expected one of {sorted(FIELDS)}")
+    field_type = FIELDS[field]
+    if not isinstance(op, str) or op not in OPERATORS[field_type]:
+        raise QueryError(
+            f"{path}: field {field!r} does not support {op!r}, expected one of {sorted(OPERATORS[field_type])}"
+        )
+
+    if op == "exists":
+        value = expression.get("value", True)
+        if not isinstance(value, bool):
+            raise QueryError(f"{path}: 'exists' expects true or false")
+        return {"field": field, "op": op, "value": value}
+
+    if "value" not in expression:
+        raise QueryError(f"{path}: missing value")
+    value = expression["value"]
+
+    if field_type == "date":
+        value = _to_millis(value, path)
+    elif field_type == "bool":
+        if not isinstance(value, bool):
+            raise QueryError(f"{path}: field {field!r} expects true or false")
+    elif op in ("in", "has_any"):
+        if not isinstance(value, list) or not value or not all(isinstance(item, str) for item in value):
+            raise QueryError(f"{path}: {op!r} expects a non-empty list of strings")
+    elif not isinstance(value, str):
+        raise QueryError(f"{path}: field {field!r} expects a string")
+
+    if field_type == "status":
+        unknown = [status for status in (value if isinstance(value, list) else [value]) if status not in STATUSES]
+        if unknown:
+            raise QueryError(f"{path}: unknown statuses {unknown}, expected some of {list(STATUSES)}")
+
+    return {"field": field, "op": op, "value": value}
+
+
+def validate_sort(sort: list[dict[str, Any]] | None) -> list[dict[str, Any]]:
+    """Validate sort keys, each a {"field", "direction"} object with direction "asc" (default) or "desc"."""
+    keys = []
+    for i, key in enumerate(sort or []):
+        if not isinstance(key, dict):
+            raise QueryError(f"sort[{i}]: expected a {{field, direction}} object, got {key!r}")
+        field, direction = key.get("field"), key.get("direction", "asc")
+        if not isinstance(field, str) or field not in FIELDS or FIELDS[field] == "tags":
+            raise QueryError(f"sort[{i}]: cannot sort by {field!r}")
+        if not isinstance(direction, str) or direction not in get_args(SortDirection):
+            raise QueryError(f"sort[{i}]: direction must be 'asc' or 'desc'")
+        keys.append({"field": field, "direction": direction})
+    return keys
+
+
+def _compile(expression: dict[str, Any], subtrees: list[str]) -> str:
+    if "and" in expression:
+        return "(" + " && ".join(_compile(operand, subtrees) for operand in expression["and"]) + ")"
+    if "or" in expression:
+        return "(" + " || ".join(_compile(operand, subtrees) for operand in expression["or"]) + ")"
+    if "not" in expression:
+        return f"!{_compile(expression['not'], subtrees)}"
+
+    field, op, value = expression["field"], expression["op"], expression["value"]
+    read = f"q({json.dumps(field)})"
+    literal = json.dumps(value)
+    field_type = FIELDS[field]
+
+    if op == "exists":
+        if field_type == "tags":
+            test = f"({read}.length > 0)"
+        elif field_type == "string":
+            test = f"(queryLower({read}) !== '')"
+        else:
+            test = f"({read} !== null && {read} !== undefined)"
+        return test if value else f"!{test}"
+    if field_type == "string":
+        lowered = json.dumps(value.lower())
+        if op == "eq":
+            return f"(queryLower({read}) === {lowered})"
+        if op == "contains":
+            return f"queryLower({read}).includes({lowered})"
+        return f"queryLower({read}).startsWith({lowered})"
+    if field_type == "tags":
+        if op == "has":
+            return f"{read}.includes({literal})"
+        if op == "has_any":
+            return f"{read}.some(id => {literal}.includes(id))"
+        subtrees.append(value)
+        return f"{read}.some(id => subtree{len(subtrees) - 1}.includes(id))"
+    if op == "in":
+        return f"{literal}.includes({read})"
+    if op == "eq":
+        return f"({read} === {literal})"
+    comparison = {"lt": "<", "lte": "<=", "gt": ">", "gte": ">="}[op]
+    return f"({read} !== null && {read} {comparison} {literal})"
+
+
+def compile_predicate(expression: dict[str, Any] | None) -> str:
+    """Compile a validated filter into the source of a JXA function taking a task and returning a boolean.
+
+    Each task property is read from OmniFocus at most once per task, no matter how often the filter uses it.
+    Requires the ``__query_functions__`` and the common ``taskStatusToString`` script functions.
+    """
+    if expression is None:
+        return "(task => true)"
+    subtrees: list[str] = []
+    body = _compile(expression, subtrees)
+    # Tag subtrees are resolved once, not once per task
+    preamble = "".join(
+        f"    const subtree{i} = tagSubtree({json.dumps(tag_id)});\n" for i, tag_id in enumerate(subtrees)
+    )
+    return (
+        "(() => {\n"
+        f"{preamble}"
+        "    return task => {\n"
+        "        const memo = {};\n"
+        "        const q = field => field in memo ? memo[field] : (memo[field] = queryFields[field](task));\n"
+        f"        return {body};\n"
+        "    };\n"
+        "})()"
+    )
+
+
+def _lower(value: Any) -> str:
+    return "" if value is None else str(value).lower()
+
+
+def evaluate(
+    expression: dict[str, Any] | None, record: dict[str, Any], tag_parents: dict[str, str | None] | None = None
+) -> bool:
+    """Evaluate a validated filter against a task record held in memory, with the compiled semantics.
+
+    Args:
+        expression: The validated filter, None matches everything.
+        record: The task, with the filter field names as keys. Dates are epoch milliseconds or None.
+        tag_parents: The parent id of every tag, needed for "in_subtree".
+
+    Returns:
+        Whether the task matches the filter.
+    """
+    if expression is None:
+        return True
+    if "and" in expression:
+        return all(evaluate(operand, record, tag_parents) for operand in expression["and"])
+    if "or" in expression:
+        return any(evaluate(operand, record, tag_parents) for operand in expression["or"])
+    if "not" in expression:
+        return not evaluate(expression["not"], record, tag_parents)
+
+    field, op, value = expression["field"], expression["op"], expression["value"]
+    actual = record.get(field)
+    field_type = FIELDS[field]
+
+    if op == "exists":
+        if field_type == "tags":
+            present = bool(actual)
+        elif field_type == "string":
+            present = _lower(actual) != ""
+        else:
+            present = actual is not None
+        return present == value
+    if field_type == "string":
+        if op == "eq":
+            return _lower(actual) == value.lower()
+        if op == "contains":
+            return value.lower() in _lower(actual)
+        return _lower(actual).startswith(value.lower())
+    if field_type == "tags":
+        tag_ids = actual or []
+        if op == "has":
+            return value in tag_ids
+        if op == "has_any":
+            return any(tag_id in value for tag_id in tag_ids)
+        return any(_descends_from(tag_id, value, tag_parents or {}) for tag_id in tag_ids)
+    if op == "in":
+        return actual in value
+    if op == "eq":
+        return actual == value
+    if actual is None:
+        return False
+    return {"lt": actual < value, "lte": actual <= value, "gt": actual > value, "gte": actual >= value}[op]
+
+
+def _descends_from(tag_id: str | None, ancestor_id: str, tag_parents: dict[str, str | None]) -> bool:
+    while tag_id is not None:
+        if tag_id == ancestor_id:
+            return True
+        tag_id = tag_parents.get(tag_id)
+    return False
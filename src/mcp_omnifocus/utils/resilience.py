@@ -0,0 +1,195 @@
+"""Timeouts, retries and a circuit breaker for the scripts evaluated in OmniFocus.
+
+While OmniFocus syncs, launches or hangs, its scripts either fail with an Apple event error or never answer.
+With a fixed timeout every call then waits the full timeout, and every tool call after it does the same. The
+policies here keep those stalls short:
+
+    timeouts   each script gets a timeout derived from how long it took before (``LatencyHistory``),
+               so a script that usually answers in a second is given up on after seconds, not minutes
+    retries    failures that are known to be transient (``classify``) are retried after a short backoff,
+               writes only when the script cannot have run
+    breaker    after several transient failures in a row, calls fail at once for a cooldown instead of
+               waiting on OmniFocus (``CircuitBreaker``), then a single call probes whether it is back
+
+Errors the scripts raise themselves, such as an unknown task id, are answers from OmniFocus: they are not
+retried and do not count as failures.
+"""
+
+import collections
+import re
+import threading
+import time
+from collections.abc import Callable
+from typing import Any, Literal
+
+# How a failed call is classified:
+#   unavailable  OmniFocus is not running or the Apple event connection broke, the script did not run
+#   busy         OmniFocus did not answer the Apple event in time, the script may still have run
+#   timeout      the script did not finish within its timeout
+#   cancelled    the call was cancelled by its caller
+#   error        anything else, including errors raised by the script itself
+Failure = Literal["unavailable", "busy", "timeout", "cancelled", "error"]
+
+# Apple event error codes by failure: -600 application isn't running, -609 connection is invalid,
+# -10810 and -10827 launch failures, -1712 Apple event timed out
+_ERROR_CODES: dict[int, Failure] = {
+    -600: "unavailable",
+    -609: "unavailable",
+    -10810: "unavailable",
+    -10827: "unavailable",
+    -1712: "busy",
+}
+_ERROR_CODE = re.compile(r"\((-\d+)\)")
+
+# The failures that count towards opening the circuit breaker
+TRANSIENT: frozenset[Failure] = frozenset({"unavailable", "busy", "timeout"})
+
+
+def classify(message: str) -> Failure:
+    """Classify the message of a failed script call, see Failure."""
+    if "timed out after" in message:
+        return "timeout"
+    if message.endswith("cancelled"):
+        return "cancelled"
+    for code in _ERROR_CODE.findall(message):
+        failure = _ERROR_CODES.get(int(code))
+        if failure is not None:
+            return failure
+    return "error"
+
+
+def retryable(failure: Failure, write: bool) -> bool:
+    """Whether a call that failed this way may be retried.
+
+    Timeouts are not retried, as the retry would wait as long again. Writes are only retried when the
+    script cannot have run, so that a change is never applied twice.
+    """
+    return failure == "unavailable" or (failure == "busy" and not write)
+
+
+class LatencyHistory:
+    """Recent durations of every script, and the timeouts derived from them."""
+
+    def __init__(
+        self,
+        ceiling: float = 30,
+        floor: float = 5,
+        multiplier: float = 4,
+        window: int = 50,
+        min_samples: int = 5,
+    ):
+        """Create an empty history.
+
+        Args:
+            ceiling: The timeout in seconds of scripts without enough history, and the longest one given.
+            floor: The shortest timeout in seconds given.
+            multiplier: The timeout of a script as a multiple of the 95th percentile of its durations.
+            window: The number of recent durations kept per script.
+            min_samples: The number of durations a script needs before its timeout is derived from them.
+        """
+        self.ceiling = ceiling
+        self.floor = floor
+        self.multiplier = multiplier
+        self.window = window
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._durations: dict[str, collections.deque[float]] = {}
+
+    def observe(self, key: str, seconds: float) -> None:
+        """Record how long a script took, or the timeout it was given when it timed out."""
+        with self._lock:
+            durations = self._durations.get(key)
+            if durations is None:
+                durations = self._durations[key] = collections.deque(maxlen=self.window)
+            durations.append(seconds)
+
+    def timeout(self, key: str) -> float:
+        """Return the timeout in seconds for the next run of a script."""
+        with self._lock:
+            durations = sorted(self._durations.get(key, ()))
+        if len(durations) < self.min_samples:
+            return self.ceiling
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        return min(self.ceiling, max(self.floor, p95 * self.multiplier))
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Return the number of durations, the slowest one and the current timeout of every script."""
+        with self._lock:
+            keys = {key: len(durations) for key, durations in self._durations.items()}
+            slowest = {key: max(durations) for key, durations in self._durations.items()}
+        return {
+            key: {"samples": samples, "max_s": round(slowest[key], 3), "timeout_s": round(self.timeout(key), 3)}
+            for key, samples in keys.items()
+        }
+
+
+class CircuitBreaker:
+    """Fails calls at once while OmniFocus keeps failing, instead of waiting on it.
+
+    The breaker is closed while calls succeed. After ``threshold`` transient failures in a row it opens
+    and rejects every call for ``cooldown`` seconds. Then it lets one call through to probe OmniFocus:
+    the breaker closes if that call succeeds and opens for another cooldown if it fails.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 10, clock: Callable[[], float] = time.monotonic):
+        """Create a closed breaker.
+
+        Args:
+            threshold: The number of transient failures in a row that opens the breaker, 0 never opens it.
+            cooldown: Seconds the breaker stays open before probing.
+            clock: The monotonic clock cooldowns are measured with.
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._stats = {"opened": 0, "rejected": 0}
+
+    @property
+    def state(self) -> Literal["closed", "open", "half-open"]:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if self._clock() - self._opened_at >= self.cooldown else "open"
+
+    def acquire(self) -> float | None:
+        """Admit a call, or return the seconds until the breaker probes again when the call is rejected."""
+        with self._lock:
+            if self._opened_at is None:
+                return None
+            remaining = self._opened_at + self.cooldown - self._clock()
+            if remaining <= 0 and not self._probing:
+                self._probing = True
+                return None
+            self._stats["rejected"] += 1
+            return max(remaining, 0)
+
+    def success(self) -> None:
+        """Record a call OmniFocus answered, which closes the breaker."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def failure(self) -> None:
+        """Record a transient failure, which opens the breaker after threshold of them or a failed probe."""
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self.threshold and self._failures >= self.threshold):
+                if not self._probing:
+                    self._stats["opened"] += 1
+                self._opened_at = self._clock()
+                self._probing = False
+
+    def release(self) -> None:
+        """Record a call that neither succeeded nor failed transiently, e.g. one that was cancelled."""
+        with self._lock:
+            self._probing = False
+
+    def snapshot(self) -> dict[str, Any]:
+        state = self.state
+        with self._lock:
+            return {"state": state, "consecutive_failures": self._failures, **self._stats}
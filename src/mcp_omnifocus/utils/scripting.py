@@ -1,6 +1,122 @@
+import asyncio
+import atexit
+import collections
+import concurrent.futures
+import contextlib
+import contextvars
+import functools
+import hashlib
+import inspect
+import itertools
 import json
+import os
+import queue
 import subprocess
-from typing import Any
+import tempfile
+import threading
+import time
+import weakref
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from textwrap import dedent
+from typing import Any, TypeVar
+
+from mcp_omnifocus.utils.metrics import call_metrics, current_tool
+from mcp_omnifocus.utils.resilience import TRANSIENT, CircuitBreaker, LatencyHistory, classify, retryable
+
+T = TypeVar("T")
+
+WORKER_PROTOCOL = "mcp-omnifocus-worker/1"
+
+# Returned by a call when the script library it needs is not defined in OmniFocus (yet)
+LIBRARY_MISSING = "mcp-omnifocus:library-missing"
+
+# Starts the first line of the evaluation output, with the milliseconds OmniFocus took to evaluate the script
+EVALUATE_MS_HEADER = "#evaluate-ms "
+
+# Hands the Omni Automation script given as the first argument to OmniFocus, compiled once with osacompile
+__evaluate_script__ = dedent("""
+function run(argv) {
+    const start = Date.now();
+    const result = JSON.stringify(Application("OmniFocus").evaluateJavascript(argv[0]));
+    return "${header}" + (Date.now() - start) + "\\n" + (result === undefined ? "" : result);
+}
+""").replace("${header}", EVALUATE_MS_HEADER)
+
+# Like __evaluate_script__, for scripts that encode their own value as newline-delimited JSON
+__stream_script__ = dedent("""
+function run(argv) {
+    const start = Date.now();
+    const result = Application("OmniFocus").evaluateJavascript(argv[0]);
+    return "${header}" + (Date.now() - start) + "\\n" + result;
+}
+""").replace("${header}", EVALUATE_MS_HEADER)
+
+# Encodes the value of a streamed script, one JSON line per item of an array, a single line otherwise
+__ndjson__ = (
+    "(value => Array.isArray(value) ? value.map(item => JSON.stringify(item)).join('\\n') : JSON.stringify(value))"
+)
+
+__worker_script__ = dedent("""
+// ${protocol}
+ObjC.import('Foundation');
+
+(() => {
+    const stdin = $.NSFileHandle.fileHandleWithStandardInput;
+    const stdout = $.NSFileHandle.fileHandleWithStandardOutput;
+
+    function write(message) {
+        const line = $.NSString.alloc.initWithUTF8String(JSON.stringify(message) + "\\n");
+        stdout.writeData(line.dataUsingEncoding($.NSUTF8StringEncoding));
+    }
+
+    function evaluate(request) {
+        try {
+            const result = (0, eval)(request.script);
+            return { id: request.id, result: result === undefined || result === null ? "" : String(result) };
+        } catch (e) {
+            return { id: request.id, error: e.toString() };
+        }
+    }
+
+    write({ ready: "${protocol}" });
+
+    const pending = $.NSMutableData.data;
+    let buffer = "";
+    while (true) {
+        const data = stdin.availableData;
+        if (data.length === 0) {
+            break;  // stdin closed, the server is shutting the worker down
+        }
+        pending.appendData(data);
+
+        // A read may end in the middle of a multi-byte character, keep buffering until it decodes
+        const text = $.NSString.alloc.initWithDataEncoding(pending, $.NSUTF8StringEncoding);
+        if (!text || text.isNil()) {
+            continue;
+        }
+        buffer += text.js;
+        pending.setLength(0);
+
+        let newline;
+        while ((newline = buffer.indexOf("\\n")) >= 0) {
+            const line = buffer.slice(0, newline);
+            buffer = buffer.slice(newline + 1);
+            if (!line.trim()) {
+                continue;
+            }
+            let request;
+            try {
+                request = JSON.parse(line);
+            } catch (e) {
+                write({ id: null, error: "Invalid request: " + e.toString() });
+                continue;
+            }
+            write(evaluate(request));
+        }
+    }
+})();
+""").replace("${protocol}", WORKER_PROTOCOL)
 
 
 class JXAScriptError(Exception):
@@ -9,13 +125,27 @@ class JXAScriptError(Exception):
     pass
 
 
-def run_jxa_script(script: str, timeout: int = 30) -> str:
+class JXAWorkerError(JXAScriptError):
+    """Exception raised when the JXA worker process cannot start or dies mid-request."""
+
+    pass
+
+
+class OmniFocusUnavailableError(JXAScriptError):
+    """Exception raised without calling OmniFocus while the circuit breaker is open after repeated failures."""
+
+    pass
+
+
+def run_jxa_script(script: str, timeout: int = 30, args: list[str] | None = None) -> str:
     """
     Run JavaScript for Automation script and return the output.
 
     Args:
         script: JXA code to execute
         timeout: Maximum execution time in seconds
+        args: Arguments passed to the run(argv) function of the script. Scripts taking arguments are
+            compiled once with osacompile and reused, see compile_script.
 
     Returns:
         Script output as string (empty string if no output)
@@ -24,9 +154,7 @@ def run_jxa_script(script: str, timeout: int = 30) -> str:
         JXAScriptError: If script execution fails
     """
     try:
-        result = subprocess.run(
-            ["osascript", "-l", "JavaScript", "-e", script], capture_output=True, text=True, timeout=timeout
-        )
+        result = subprocess.run(_osascript_command(script, args), capture_output=True, text=True, timeout=timeout)
 
         if result.returncode != 0:
             error_msg = result.stderr.strip() if result.stderr else "Unknown AppleScript error"
@@ -42,18 +170,1011 @@ def run_jxa_script(script: str, timeout: int = 30) -> str:
         raise JXAScriptError(f"AppleScript execution error: {str(e)}") from e
 
 
-def evaluate_javascript(script: str) -> Any:
+_compiled_scripts: dict[str, Path | None] = {}
+_compile_lock = threading.Lock()
+
+
+def script_cache_dir() -> Path:
+    """The directory compiled scripts are kept in, MCP_OMNIFOCUS_SCRIPT_CACHE or a temporary directory."""
+    return Path(os.environ.get("MCP_OMNIFOCUS_SCRIPT_CACHE") or Path(tempfile.gettempdir()) / "mcp-omnifocus")
+
+
+def compile_script(script: str) -> Path | None:
+    """Compile a JXA script with osacompile, once per distinct script.
+
+    Compiled scripts are stored on disk under a hash of their source, so they are also reused after the
+    server restarts.
+
+    Args:
+        script: JXA code to compile.
+
+    Returns:
+        The path of the compiled .scpt file, or None if osacompile is not available or fails, in which
+        case the script has to be run from source.
+    """
+    digest = hashlib.sha256(script.encode()).hexdigest()[:16]
+    with _compile_lock:
+        if digest in _compiled_scripts:
+            return _compiled_scripts[digest]
+
+        path: Path | None = script_cache_dir() / f"{digest}.scpt"
+        if not path.exists():
+            # Compile next to the final path and rename, so concurrent servers never see a partial file
+            partial = path.with_name(f"{digest}.{os.getpid()}.scpt")
+            start = time.perf_counter()
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                result = subprocess.run(
+                    ["osacompile", "-l", "JavaScript", "-o", str(partial), "-e", script],
+                    capture_output=True,
+                    text=True,
+                    timeout=30,
+                )
+                if result.returncode == 0:
+                    os.replace(partial, path)
+                else:
+                    path = None
+            except (OSError, subprocess.SubprocessError):
+                path = None
+            call_metrics.observe_duration("compile", (time.perf_counter() - start) * 1000)
+        _compiled_scripts[digest] = path
+        return path
+
+
+def _osascript_command(script: str, args: list[str] | None) -> list[str]:
+    """Build the osascript command line, running scripts that take arguments from their compiled form."""
+    if args is None:
+        return ["osascript", "-l", "JavaScript", "-e", script]
+    path = compile_script(script)
+    if path is None:
+        return ["osascript", "-l", "JavaScript", "-e", script, *args]
+    return ["osascript", str(path), *args]
+
+
+class JXAWorker:
+    """A long-lived osascript process that evaluates JXA scripts sent to it over stdin.
+
+    Requests and responses are framed as one JSON object per line. The worker greets with a
+    ``{"ready": WORKER_PROTOCOL}`` line, then answers every ``{"id", "script"}`` request with
+    either ``{"id", "result"}`` or ``{"id", "error"}``.
+
+    A worker that times out is killed, and one that crashes is discarded; either way the next
+    request starts a fresh process.
+    """
+
+    def __init__(self, command: list[str] | None = None, startup_timeout: float = 10):
+        """Create a worker, the process itself is started lazily on the first request.
+
+        Args:
+            command: The command that starts the worker, defaults to osascript running the JXA read-eval loop.
+            startup_timeout: Maximum time in seconds to wait for the worker to report it is ready.
+        """
+        self.command = command or ["osascript", "-l", "JavaScript", "-e", __worker_script__]
+        self.startup_timeout = startup_timeout
+        self._lock = threading.Lock()
+        self._process: subprocess.Popen | None = None
+        self._responses: queue.Queue[str | None] = queue.Queue()
+        self._stderr: collections.deque[str] = collections.deque(maxlen=20)
+        self._next_id = 0
+
+    @property
+    def alive(self) -> bool:
+        """Whether the worker process is currently running."""
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> None:
+        """Start the worker process and wait for its ready line.
+
+        Raises:
+            JXAWorkerError: If the process cannot be started or does not report ready in time.
+        """
+        with self._lock:
+            self._start()
+
+    def stop(self) -> None:
+        """Stop the worker process if it is running."""
+        with self._lock:
+            self._stop()
+
+    def run(self, script: str, timeout: float = 30) -> str:
+        """Evaluate a JXA script in the worker and return its output.
+
+        Args:
+            script: JXA code to execute, the value of its last expression is returned.
+            timeout: Maximum execution time in seconds.
+
+        Returns:
+            Script output as string (empty string if no output)
+
+        Raises:
+            JXAWorkerError: If the worker cannot be started or dies before answering.
+            JXAScriptError: If the script fails or times out.
+        """
+        with self._lock:
+            if not self.alive:
+                self._start()
+
+            self._next_id += 1
+            request_id = self._next_id
+            try:
+                self._process.stdin.write(json.dumps({"id": request_id, "script": script}) + "\n")
+                self._process.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                self._stop()
+                raise JXAWorkerError(f"JXA worker is not accepting requests: {e}") from e
+
+            deadline = time.monotonic() + timeout
+            while True:
+                message = self._read(deadline)
+                if message is None:
+                    self._stop(kill=True)
+                    raise JXAScriptError(f"AppleScript timed out after {timeout} seconds")
+                if message.get("id") != request_id:
+                    continue  # A late answer to a request that was abandoned
+                if "error" in message:
+                    raise JXAScriptError(f"AppleScript failed: {message['error']}")
+                return str(message.get("result", "")).strip()
+
+    def _read(self, deadline: float) -> dict[str, Any] | None:
+        """Read the next response, returning None on timeout."""
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                line = self._responses.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            if line is None:
+                stderr = " ".join(self._stderr).strip() or "no output"
+                self._stop()
+                raise JXAWorkerError(f"JXA worker exited unexpectedly: {stderr}")
+            try:
+                return json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Ignore anything that is not a protocol message
+
+    def _start(self) -> None:
+        self._stop()
+        try:
+            process = subprocess.Popen(
+                self.command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding="utf-8",
+                bufsize=1,
+            )
+        except OSError as e:
+            raise JXAWorkerError(f"Could not start JXA worker: {e}") from e
+
+        # Each process gets its own queue so that output from a killed worker can never be mistaken for
+        # an answer from its replacement.
+        responses: queue.Queue[str | None] = queue.Queue()
+        stderr = collections.deque(maxlen=20)
+        threading.Thread(target=_pump, args=(process.stdout, responses.put, responses.put), daemon=True).start()
+        threading.Thread(target=_pump, args=(process.stderr, stderr.append), daemon=True).start()
+        self._process, self._responses, self._stderr = process, responses, stderr
+
+        message = self._read(time.monotonic() + self.startup_timeout)
+        if message is None or message.get("ready") != WORKER_PROTOCOL:
+            self._stop()
+            raise JXAWorkerError(f"JXA worker did not start within {self.startup_timeout} seconds")
+
+    def _stop(self, kill: bool = False) -> None:
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            if kill:
+                process.kill()
+            else:
+                process.stdin.close()
+            process.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+            process.wait()
+
+
+def _pump(stream, sink, on_close=None) -> None:
+    """Forward lines from a worker pipe to a sink, calling on_close with None once the pipe closes."""
+    try:
+        for line in stream:
+            sink(line.rstrip("\n"))
+    except (OSError, ValueError):
+        pass
+    finally:
+        if on_close is not None:
+            on_close(None)
+
+
+def stream_jxa_script(script: str, timeout: float = 30, args: list[str] | None = None) -> Iterator[str]:
+    """
+    Run JavaScript for Automation script and yield its output line by line as it is read.
+
+    Only the line being read is held in memory, so large outputs can be decoded as they arrive. The
+    osascript process is killed if the script times out or the generator is closed early.
+
+    Args:
+        script: JXA code to execute
+        timeout: Maximum time in seconds for the script to run and its output to be read
+        args: Arguments passed to the run(argv) function of the script, see run_jxa_script.
+
+    Yields:
+        The lines of the script output, without their line endings
+
+    Raises:
+        JXAScriptError: If script execution fails
+    """
+    yield from _stream_lines(_osascript_command(script, args), timeout)
+
+
+def _stream_lines(command: list[str], timeout: float, scope: "_AsyncScope | None" = None) -> Iterator[str]:
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding="utf-8")
+    except FileNotFoundError:
+        raise JXAScriptError("osascript not found - AppleScript not available on this system") from None
+    except OSError as e:
+        raise JXAScriptError(f"AppleScript execution error: {str(e)}") from e
+
+    stderr: collections.deque[str] = collections.deque(maxlen=20)
+    reader = threading.Thread(target=_pump, args=(process.stderr, stderr.append), daemon=True)
+    reader.start()
+    timed_out = threading.Event()
+
+    def expire() -> None:
+        timed_out.set()
+        process.kill()
+
+    timer = threading.Timer(timeout, expire)
+    timer.start()
+    if scope is not None:
+        scope.track(process)
+    try:
+        for line in process.stdout:
+            yield line.rstrip("\n")
+        process.wait()
+    finally:
+        timer.cancel()
+        if scope is not None:
+            scope.untrack(process)
+        if process.returncode is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+
+    if timed_out.is_set():
+        raise JXAScriptError(f"AppleScript timed out after {timeout} seconds")
+    if scope is not None and scope.cancelled:
+        raise JXAScriptError("AppleScript cancelled")
+    if process.returncode != 0:
+        reader.join(timeout=1)
+        error_msg = " ".join(stderr).strip() or "Unknown AppleScript error"
+        raise JXAScriptError(f"AppleScript failed: {error_msg}")
+
+
+async def run_jxa_script_async(script: str, timeout: float = 30, args: list[str] | None = None) -> str:
+    """
+    Run JavaScript for Automation script without blocking the event loop and return the output.
+
+    At most max_concurrency scripts run at once, further calls wait for a free slot. The osascript
+    process is killed if the script times out or the calling task is cancelled.
+
+    Args:
+        script: JXA code to execute
+        timeout: Maximum execution time in seconds, not counting the wait for a free slot
+        args: Arguments passed to the run(argv) function of the script, see run_jxa_script.
+
+    Returns:
+        Script output as string (empty string if no output)
+
+    Raises:
+        JXAScriptError: If script execution fails
+    """
+    # Compiling blocks, but only the first time a script is run
+    command = await asyncio.to_thread(_osascript_command, script, args)
+    async with _concurrency_limit():
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except FileNotFoundError:
+            raise JXAScriptError("osascript not found - AppleScript not available on this system") from None
+        except OSError as e:
+            raise JXAScriptError(f"AppleScript execution error: {str(e)}") from e
+
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except TimeoutError as exp:
+            raise JXAScriptError(f"AppleScript timed out after {timeout} seconds") from exp
+        finally:
+            if process.returncode is None:
+                process.kill()
+                with contextlib.suppress(asyncio.CancelledError, ProcessLookupError):
+                    await process.wait()
+
+        if process.returncode != 0:
+            error_msg = stderr.decode().strip() if stderr else "Unknown AppleScript error"
+            raise JXAScriptError(f"AppleScript failed: {error_msg}")
+
+        return stdout.decode().strip() if stdout else ""
+
+
+_max_concurrency = 4
+_semaphores: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = weakref.WeakKeyDictionary()
+
+
+def set_max_concurrency(limit: int) -> None:
+    """Set how many scripts run_jxa_script_async runs against OmniFocus at once."""
+    global _max_concurrency
+    if limit < 1:
+        raise ValueError(f"Invalid concurrency limit: {limit}, it must be at least 1")
+    _max_concurrency = limit
+    _semaphores.clear()
+
+
+def _concurrency_limit() -> asyncio.Semaphore:
+    # Semaphores are bound to the event loop they are first used on
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = asyncio.Semaphore(_max_concurrency)
+    return _semaphores[loop]
+
+
+class _AsyncScope:
+    """Tracks the scripts a blocking function started from call_async runs on the event loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.cancelled = False
+        self._futures: set[concurrent.futures.Future] = set()
+        self._processes: set[subprocess.Popen] = set()
+        self._lock = threading.Lock()
+
+    def run(self, script: str, timeout: float, args: list[str] | None = None) -> str:
+        with self._lock:
+            if self.cancelled:
+                raise JXAScriptError("AppleScript cancelled")
+            future = asyncio.run_coroutine_threadsafe(run_jxa_script_async(script, timeout, args), self.loop)
+            self._futures.add(future)
+        try:
+            return future.result()
+        except concurrent.futures.CancelledError as e:
+            raise JXAScriptError("AppleScript cancelled") from e
+        finally:
+            with self._lock:
+                self._futures.discard(future)
+
+    @contextlib.contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold one of the concurrency slots of the event loop, for processes started from the thread."""
+
+        async def acquire() -> asyncio.Semaphore:
+            semaphore = _concurrency_limit()
+            await semaphore.acquire()
+            return semaphore
+
+        with self._lock:
+            if self.cancelled:
+                raise JXAScriptError("AppleScript cancelled")
+            future = asyncio.run_coroutine_threadsafe(acquire(), self.loop)
+            self._futures.add(future)
+        try:
+            semaphore = future.result()
+        except concurrent.futures.CancelledError as e:
+            raise JXAScriptError("AppleScript cancelled") from e
+        finally:
+            with self._lock:
+                self._futures.discard(future)
+        try:
+            yield
+        finally:
+            self.loop.call_soon_threadsafe(semaphore.release)
+
+    def track(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            if self.cancelled:
+                process.kill()
+            self._processes.add(process)
+
+    def untrack(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.discard(process)
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            for future in self._futures:
+                future.cancel()
+            for process in self._processes:
+                process.kill()
+
+
+_async_scope: contextvars.ContextVar[_AsyncScope | None] = contextvars.ContextVar("_async_scope", default=None)
+
+
+async def call_async(func: Callable[..., T], /, *args, **kwargs) -> T:
+    """Call a blocking OmniFocus function from async code without blocking the event loop.
+
+    The function runs in a worker thread. The scripts it evaluates are run on the calling event loop
+    with run_jxa_script_async, so they count towards the concurrency limit, and cancelling the call
+    kills the osascript processes it is waiting on.
+
+    Args:
+        func: The function to call, e.g. one from mcp_omnifocus.utils.omnifocus.
+        *args: Positional arguments for the function.
+        **kwargs: Keyword arguments for the function.
+
+    Returns:
+        The return value of the function.
+    """
+    scope = _AsyncScope(asyncio.get_running_loop())
+    context = contextvars.copy_context()
+    context.run(_async_scope.set, scope)
+    try:
+        return await asyncio.to_thread(context.run, func, *args, **kwargs)
+    except asyncio.CancelledError:
+        scope.cancel()
+        raise
+
+
+_worker: JXAWorker | None = None
+
+
+def enable_worker(command: list[str] | None = None) -> JXAWorker:
+    """Route scripts through a persistent JXA worker instead of one osascript process per call.
+
+    Args:
+        command: The command that starts the worker, defaults to osascript.
+
+    Returns:
+        The worker that scripts are routed through.
+    """
+    global _worker
+    disable_worker()
+    _worker = JXAWorker(command)
+    return _worker
+
+
+def disable_worker() -> None:
+    """Stop the persistent JXA worker and go back to one osascript process per call."""
+    global _worker
+    worker, _worker = _worker, None
+    if worker is not None:
+        worker.stop()
+
+
+atexit.register(disable_worker)
+
+
+def _run_script(script: str, timeout: float = 30, args: list[str] | None = None) -> str:
+    """Run a JXA script through the persistent worker when enabled, otherwise in a new osascript process.
+
+    If the worker cannot be started or dies before answering, the script is run once more in a new
+    osascript process and the worker is restarted on the next call. Inside call_async, new processes
+    are started on the event loop so they can be bounded and cancelled.
+    """
+    output = _run_in_worker(script, timeout, args)
+    if output is not None:
+        return output
+    scope = _async_scope.get()
+    if scope is not None:
+        return scope.run(script, timeout, args)
+    return run_jxa_script(script, timeout=timeout, args=args)
+
+
+def _run_in_worker(script: str, timeout: float, args: list[str] | None) -> str | None:
+    """Run a JXA script through the persistent worker, None if it is disabled, cannot be started or died."""
+    worker = _worker
+    if worker is None:
+        return None
+    try:
+        # The worker evaluates source, so arguments are handed to run() in the script itself
+        return worker.run(script if args is None else f"{script}\nrun({json.dumps(args)});", timeout=timeout)
+    except JXAWorkerError:
+        return None
+
+
+def _stream_script(script: str, timeout: float = 30, args: list[str] | None = None) -> Iterator[str]:
+    """Run a JXA script and yield its output lines.
+
+    The persistent worker answers with whole messages, so through it the output is split into lines once it
+    is read. Otherwise, or if the worker fails as in _run_script, the script runs in a new osascript process
+    whose output is read line by line. Inside call_async, that process takes a concurrency slot and is killed
+    if the call is cancelled.
+    """
+    output = _run_in_worker(script, timeout, args)
+    if output is not None:
+        yield from output.splitlines()
+        return
+    scope = _async_scope.get()
+    if scope is None:
+        yield from stream_jxa_script(script, timeout, args)
+        return
+    with scope.slot():
+        yield from _stream_lines(_osascript_command(script, args), timeout, scope)
+
+
+def _library_key(library: str) -> str:
+    return "__mcpOmnifocusLibrary_" + hashlib.sha256(library.encode()).hexdigest()[:16]
+
+
+def build_script(script: str, args: Any = None, library: str | None = None, stream: bool = False) -> str:
+    """Build a standalone Omni Automation script.
+
+    Args:
+        script: The script. When args are given, a function expression that is called with them.
+        args: The JSON serializable arguments of the call, None to evaluate the script as it is.
+        library: Functions the script uses, defined before it.
+        stream: Whether the script evaluates to its value as newline-delimited JSON, one line per item
+            when the value is an array. Streamed scripts must be expressions.
+
+    Returns:
+        The script source, for evaluation in OmniFocus.
+    """
+    call = script if args is None else f"({script.strip()})({json.dumps(args)})"
+    if stream:
+        call = f"{__ndjson__}({call.strip()})"
+    if library is None:
+        return call
+    return f"{library}\nvar {_library_key(library)} = true;\n{call}"
+
+
+def _library_call(script: str, args: Any, key: str, stream: bool = False) -> str:
+    """Build a call relying on an installed library, evaluating to LIBRARY_MISSING when it is not defined."""
+    call = f"typeof {key} === 'undefined' ? {json.dumps(LIBRARY_MISSING)} : {build_script(script, args)}"
+    return build_script(call, stream=stream)
+
+
+_installed_libraries: set[str] = set()
+_library_misses = 0
+_library_lock = threading.Lock()
+
+# After this many installed libraries go missing in a row, OmniFocus is assumed not to keep them
+_MAX_LIBRARY_MISSES = 3
+
+
+latency_history = LatencyHistory()
+circuit_breaker = CircuitBreaker()
+_adaptive_timeouts = True
+_max_retries = 2
+_retry_stats = {"retries": 0, "timeouts": 0}
+_retry_lock = threading.Lock()
+
+# Seconds before the first retry of a transient failure, doubled for every further retry
+_RETRY_BACKOFF = 0.25
+
+# Whether the current call is made from a write, see SingleFlight.write
+_writing: contextvars.ContextVar[bool] = contextvars.ContextVar("_writing", default=False)
+
+
+def configure_resilience(
+    timeout: float = 30,
+    adaptive: bool = True,
+    retries: int = 2,
+    breaker_threshold: int = 5,
+    breaker_cooldown: float = 10,
+) -> None:
+    """Configure the timeouts, retries and circuit breaker of script calls, see mcp_omnifocus.utils.resilience.
+
+    Args:
+        timeout: The longest timeout in seconds, and the timeout of scripts without enough history.
+        adaptive: Whether to derive the timeout of every script from its recent durations.
+        retries: The number of times a call failing transiently is retried.
+        breaker_threshold: The number of transient failures in a row that opens the circuit breaker, 0 never
+            opens it.
+        breaker_cooldown: Seconds calls fail at once after the circuit breaker opened.
+    """
+    global _adaptive_timeouts, _max_retries
+    _adaptive_timeouts = adaptive
+    _max_retries = retries
+    latency_history.ceiling = timeout
+    latency_history.floor = min(latency_history.floor, timeout)
+    circuit_breaker.threshold = breaker_threshold
+    circuit_breaker.cooldown = breaker_cooldown
+
+
+def resilience_stats() -> dict[str, Any]:
+    """Return the state of the circuit breaker, the retry and timeout counts, and the timeout of every script."""
+    with _retry_lock:
+        counts = dict(_retry_stats)
+    return {
+        "breaker": circuit_breaker.snapshot(),
+        **counts,
+        "scripts": latency_history.snapshot() if _adaptive_timeouts else {},
+    }
+
+
+# Arguments of the scripts that bound how many tasks they return, a page object with a limit or a limit
+_PAGING_ARGUMENTS = ("page", "limit")
+# Ends the keys of calls that take a paging argument but read everything, see _script_key
+_UNBOUNDED = ":unbounded"
+
+
+def _script_key(script: str, args: Any = None) -> str:
+    """The key the durations of a script are recorded under.
+
+    Calls are told apart by the tool calling them and a digest of the script source and of the shape of its
+    arguments: which ones are given, the page size rounded up to a power of ten and the fields read. A page of
+    ids and every field of every task are thus timed apart. Calls that take a paging argument but are not
+    given one read a whole project, tag or database, which can be any size: their key ends with _UNBOUNDED
+    and they are given the longest timeout.
+    """
+    shape, unbounded = [], False
+    if isinstance(args, dict):
+        for name, value in sorted(args.items()):
+            if name in _PAGING_ARGUMENTS:
+                size = value.get("limit") if isinstance(value, dict) else value
+                unbounded = unbounded or not isinstance(size, int)
+                shape.append(f"{name}<={10 ** len(str(size))}" if isinstance(size, int) else name)
+            elif name == "fields" and isinstance(value, list):
+                shape.append(f"fields={','.join(map(str, value))}")
+            elif value is not None:
+                shape.append(name)
+    digest = hashlib.sha256("\n".join([script, *shape]).encode()).hexdigest()[:8]
+    return f"{current_tool.get() or 'script'}:{digest}{_UNBOUNDED if unbounded else ''}"
+
+
+def _admit() -> None:
+    remaining = circuit_breaker.acquire()
+    if remaining is not None:
+        raise OmniFocusUnavailableError(
+            f"OmniFocus is not responding, calls fail without waiting on it for another {remaining:.1f} seconds"
+        )
+
+
+def _settle(error: BaseException | None) -> str | None:
+    """Record the outcome of a call with the circuit breaker, returning how a JXAScriptError failed."""
+    if error is None:
+        circuit_breaker.success()
+        return None
+    failure = classify(str(error)) if isinstance(error, JXAScriptError) else "cancelled"
+    if failure == "timeout":
+        with _retry_lock:
+            _retry_stats["timeouts"] += 1
+    if failure in TRANSIENT:
+        circuit_breaker.failure()
+    elif failure == "cancelled":
+        circuit_breaker.release()
+    else:
+        circuit_breaker.success()  # OmniFocus answered, with an error of the script
+    return failure
+
+
+def _guarded(key: str, run: Callable[[float], T]) -> T:
+    """Run a script call with its adaptive timeout, retrying transient failures unless the breaker is open.
+
+    Args:
+        key: The key of the script, see _script_key.
+        run: Runs the script with the timeout in seconds it is given.
+    """
+    attempt = 0
+    while True:
+        _admit()
+        if _adaptive_timeouts and not key.endswith(_UNBOUNDED):
+            timeout = latency_history.timeout(key)
+        else:
+            timeout = latency_history.ceiling
+        start = time.perf_counter()
+        try:
+            result = run(timeout)
+        except BaseException as e:
+            failure = _settle(e)
+            if failure == "timeout":
+                # Timed out runs count as taking the whole timeout, so the next run of the script is given longer
+                latency_history.observe(key, timeout)
+            scope = _async_scope.get()
+            if (
+                not isinstance(e, JXAScriptError)
+                or attempt >= _max_retries
+                or not retryable(failure, _writing.get())
+                or (scope is not None and scope.cancelled)
+            ):
+                raise
+            attempt += 1
+            with _retry_lock:
+                _retry_stats["retries"] += 1
+            time.sleep(_RETRY_BACKOFF * 2 ** (attempt - 1))
+            continue
+        latency_history.observe(key, time.perf_counter() - start)
+        _settle(None)
+        return result
+
+
+# The key of the script evaluate_javascript is calling, see _script_key
+_calling: contextvars.ContextVar[str | None] = contextvars.ContextVar("_calling", default=None)
+
+
+def _evaluate(script: str) -> Any:
+    """Evaluate a script in OmniFocus and decode its output, recording the time spent in each phase."""
+    timings: dict[str, float] = {}
+    result, error = "", None
+    start = time.perf_counter()
+    try:
+        output = _guarded(
+            _calling.get() or _script_key(script),
+            lambda timeout: _run_script(__evaluate_script__, timeout, args=[script]),
+        )
+        decoding = time.perf_counter()
+        timings["script"] = (decoding - start) * 1000
+
+        result = output
+        if output.startswith(EVALUATE_MS_HEADER):
+            header, _, result = output.partition("\n")
+            timings["evaluate"] = float(header[len(EVALUATE_MS_HEADER) :])
+            timings["transport"] = max(timings["script"] - timings["evaluate"], 0)
+        value = json.loads(result) if result else {}
+        timings["decode"] = (time.perf_counter() - decoding) * 1000
+        return value
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        timings["total"] = (time.perf_counter() - start) * 1000
+        call_metrics.record_call(timings, len(script.encode()), len(result.encode()), error, script)
+
+
+def evaluate_javascript(script: str, args: Any = None, library: str | None = None) -> Any:
     """Execute a JavaScript script in OmniFocus.
 
     See; https://www.omni-automation.com/omnifocus/index.html
 
+    Scripts are best written once as function expressions and called with args, which are passed as
+    JSON rather than spliced into the source. A library is sent to OmniFocus with the first call that
+    needs it and stays defined in its JavaScript context, later calls only send the function and its
+    arguments. If OmniFocus has lost the library, e.g. after a restart, it is sent again.
+
     Args:
-        script: The JavaScript code to execute.
+        script: The JavaScript code to execute, or a function expression when args are given.
+        args: The JSON serializable arguments to call the script with, None to evaluate it as it is.
+        library: The functions the script uses, e.g. the common functions of the omnifocus module.
 
     Returns:
         The output of the script as a string.
     """
-    jxa_script = f'let script = `{script}`;\n(() => {{\n   return JSON.stringify(Application("OmniFocus").evaluateJavascript(script));\n}})();'
+    token = _calling.set(_script_key(script, args))
+    try:
+        return _evaluate_call(script, args, library)
+    finally:
+        _calling.reset(token)
+
+
+def _evaluate_call(script: str, args: Any, library: str | None) -> Any:
+    global _library_misses
+    if library is None or args is None or _library_misses >= _MAX_LIBRARY_MISSES:
+        return _evaluate(build_script(script, args, library))
+
+    key = _library_key(library)
+    if key in _installed_libraries:
+        result = _evaluate(_library_call(script, args, key))
+        with _library_lock:
+            if result != LIBRARY_MISSING:
+                _library_misses = 0
+                return result
+            _installed_libraries.discard(key)
+            _library_misses += 1
+
+    result = _evaluate(build_script(script, args, library))
+    with _library_lock:
+        _installed_libraries.add(key)
+    return result
+
+
+def _evaluate_stream(script: str) -> Iterator[Any]:
+    """Evaluate a streamed script in OmniFocus and decode its output line by line, recording the call.
+
+    Time spent by the consumer between items is not counted towards the call.
+    """
+    timings: dict[str, float] = {"decode": 0.0}
+    output_bytes, error = 0, None
+    active = 0.0
+    resumed = time.perf_counter()
+    lines: Iterator[str] | None = None
+    try:
+        # OmniFocus has evaluated the script once its first line is out, so failures up to then are retried as
+        # for other calls. Streams are given the longest timeout, as it includes the time the consumer takes.
+        first, lines = _guarded(
+            _calling.get() or _script_key(script),
+            lambda _: _open_stream(script, latency_history.ceiling),
+        )
+        for line in itertools.chain([] if first is None else [first], lines):
+            if line.startswith(EVALUATE_MS_HEADER) and "evaluate" not in timings:
+                timings["evaluate"] = float(line[len(EVALUATE_MS_HEADER) :])
+                continue
+            if not line:
+                continue
+            output_bytes += len(line.encode()) + 1
+            decoding = time.perf_counter()
+            item = json.loads(line)
+            timings["decode"] += (time.perf_counter() - decoding) * 1000
+            active += time.perf_counter() - resumed
+            yield item
+            resumed = time.perf_counter()
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        if lines is not None:
+            lines.close()
+        active += time.perf_counter() - resumed
+        timings["total"] = active * 1000
+        timings["script"] = max(timings["total"] - timings["decode"], 0)
+        if "evaluate" in timings:
+            timings["transport"] = max(timings["script"] - timings["evaluate"], 0)
+        call_metrics.record_call(timings, len(script.encode()), output_bytes, error, script)
+
+
+def _open_stream(script: str, timeout: float) -> tuple[str | None, Iterator[str]]:
+    """Start a streamed script and read its first output line, None if there is no output."""
+    lines = _stream_script(__stream_script__, timeout, args=[script])
+    try:
+        return next(lines, None), lines
+    except BaseException:
+        lines.close()
+        raise
+
+
+_END = object()
+
+
+def evaluate_javascript_stream(script: str, args: Any = None, library: str | None = None) -> Iterator[Any]:
+    """Execute a JavaScript script in OmniFocus and yield the items of its value as they are decoded.
+
+    The script's value is encoded as newline-delimited JSON inside OmniFocus and decoded one line at a
+    time from the osascript output, so only the items not yet consumed are held in memory. Libraries
+    are handled as by evaluate_javascript.
+
+    Args:
+        script: The JavaScript expression to evaluate, or a function expression when args are given.
+        args: The JSON serializable arguments to call the script with, None to evaluate it as it is.
+        library: The functions the script uses, e.g. the common functions of the omnifocus module.
+
+    Yields:
+        The items of the value when it is an array, the value itself otherwise.
+    """
+    global _library_misses
+    if library is None or args is None or _library_misses >= _MAX_LIBRARY_MISSES:
+        yield from _evaluate_stream(build_script(script, args, library, stream=True))
+        return
+
+    key = _library_key(library)
+    if key in _installed_libraries:
+        items = _evaluate_stream(_library_call(script, args, key, stream=True))
+        first = next(items, _END)
+        with _library_lock:
+            missing = first == LIBRARY_MISSING
+            if missing:
+                _installed_libraries.discard(key)
+                _library_misses += 1
+            else:
+                _library_misses = 0
+        if not missing:
+            if first is not _END:
+                yield first
+            yield from items
+            return
+        items.close()
+
+    items = _evaluate_stream(build_script(script, args, library, stream=True))
+    first = next(items, _END)
+    with _library_lock:
+        _installed_libraries.add(key)
+    if first is not _END:
+        yield first
+    yield from items
+
+
+class _Flight:
+    """One execution of a read, shared by the identical calls made while it runs."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.cancelled = False
+
+
+class SingleFlight:
+    """Shares one execution between identical reads of OmniFocus made while it is running.
+
+    Reads are keyed by the function they call and its normalized arguments. A read made while an identical
+    one runs waits for it and returns its result, or raises its error, instead of running the same script
+    again. If the call running the read is cancelled, the waiting calls run it again themselves.
+
+    Writes are never shared. Each write starts a new generation when it starts and when it ends, and reads
+    only join reads of their own generation, so a read never returns data from before a write that had
+    started when the read was made.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[tuple[int, str], _Flight] = {}
+        self._generation = 0
+        self._stats = {"executions": 0, "coalesced": 0, "writes": 0}
+
+    def call(self, key: str, func: Callable[[], T]) -> T:
+        """Call a read, or wait for the identical read already running.
+
+        Args:
+            key: What identifies identical reads, e.g. the function name and its arguments.
+            func: The read to call.
+
+        Returns:
+            The value of the read.
+        """
+        while True:
+            with self._lock:
+                flight_key = (self._generation, key)
+                flight = self._flights.get(flight_key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[flight_key] = _Flight()
+                    self._stats["executions"] += 1
+                else:
+                    self._stats["coalesced"] += 1
+            if leader:
+                return self._run(flight_key, flight, func)
+            flight.done.wait()
+            if flight.cancelled:
+                continue
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+    def _run(self, flight_key: tuple[int, str], flight: _Flight, func: Callable[[], T]) -> T:
+        try:
+            flight.result = func()
+            return flight.result
+        except BaseException as e:
+            scope = _async_scope.get()
+            flight.cancelled = scope is not None and scope.cancelled
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(flight_key) is flight:
+                    del self._flights[flight_key]
+            flight.done.set()
+
+    @contextlib.contextmanager
+    def write(self) -> Iterator[None]:
+        """Mark the block as a write, which reads made before or during it do not share with later ones."""
+        with self._lock:
+            self._generation += 1
+            self._stats["writes"] += 1
+        token = _writing.set(True)
+        try:
+            yield
+        finally:
+            _writing.reset(token)
+            with self._lock:
+                self._generation += 1
+
+    def stats(self) -> dict[str, int]:
+        """Return the number of reads executed, reads that shared another's execution, and writes."""
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._flights)}
+
+
+single_flight = SingleFlight()
+
+
+def coalesced(func: Callable[..., T]) -> Callable[..., T]:
+    """Decorate a read function so that identical concurrent calls share one execution, see SingleFlight.
+
+    Calls are identical when they bind the same arguments, whether given by position, by keyword or as defaults.
+    """
+    signature = inspect.signature(func)
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = f"{name}:{json.dumps(bound.arguments, sort_keys=True, default=str)}"
+        return single_flight.call(key, lambda: func(*args, **kwargs))
 
-    output = run_jxa_script(jxa_script)
-    return json.loads(output) if output else {}
+    return wrapper
@@ -0,0 +1,114 @@
+import threading
+from typing import Any, Literal
+
+from mcp_omnifocus.utils import omnifocus
+
+Kind = Literal["tasks", "projects", "tags"]
+KINDS: tuple[Kind, ...] = ("tasks", "projects", "tags")
+
+
+class DeltaSync:
+    """A locally held copy of the OmniFocus tasks, projects and tags kept current with delta refreshes.
+
+    The first refresh lists everything. Later refreshes only ask OmniFocus for what was added or modified
+    since the previous one, and only list every id when the object counts show that something was
+    deleted. Records hold every available field, so any field projection can be answered locally. Tasks are
+    given the names of their project and tags from the local records when read, as renaming those does not
+    modify the tasks.
+
+    Records are kept in memory, subclasses can keep them elsewhere by overriding ``_merge``, ``_count``,
+    ``_prune`` and ``_commit``.
+    """
+
+    def __init__(self):
+        self.records: dict[Kind, dict[str, dict[str, Any]]] = {kind: {} for kind in KINDS}
+        self.watermark: float | None = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> dict[str, dict[str, int]]:
+        """Merge the changes made in OmniFocus since the last refresh.
+
+        Returns:
+            The number of "added", "updated" and "removed" records per kind.
+        """
+        with self._lock:
+            changes = omnifocus.list_changes(self.watermark, all_fields=True)
+            summary = {}
+            for kind in KINDS:
+                added = self._merge(kind, changes[kind])
+                summary[kind] = {"added": added, "updated": len(changes[kind]) - added, "removed": 0}
+
+            # Everything added since the last refresh is in the changes, so the local records can only
+            # outnumber OmniFocus when something was deleted.
+            stale = [kind for kind in KINDS if self._count(kind) != changes["counts"][kind]]
+            if stale:
+                ids = omnifocus.list_ids()
+                for kind in stale:
+                    summary[kind]["removed"] = self._prune(kind, set(ids[kind]))
+
+            self._commit(changes["now"])
+            return summary
+
+    def _merge(self, kind: Kind, records: list[dict[str, Any]]) -> int:
+        """Add or replace local records, returning how many were new."""
+        local = self.records[kind]
+        added = sum(1 for record in records if record["id"] not in local)
+        local.update((record["id"], record) for record in records)
+        return added
+
+    def _count(self, kind: Kind) -> int:
+        """Return the number of local records of a kind."""
+        return len(self.records[kind])
+
+    def _prune(self, kind: Kind, remaining: set[str]) -> int:
+        """Remove the local records whose ids are not remaining, returning how many were removed."""
+        local = self.records[kind]
+        removed = [record_id for record_id in local if record_id not in remaining]
+        for record_id in removed:
+            del local[record_id]
+        return len(removed)
+
+    def _commit(self, watermark: float) -> None:
+        """Record the OmniFocus clock time the next refresh lists changes from."""
+        self.watermark = watermark
+
+    def reset(self) -> None:
+        """Drop every local record, the next refresh lists everything again."""
+        with self._lock:
+            self.records = {kind: {} for kind in KINDS}
+            self.watermark = None
+
+    def _with_current_names(self, tasks: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Give tasks the names their project and tags have in the local records.
+
+        Renaming a project or tag does not modify its tasks, so the names in their records can be older than
+        the local project and tag records, which are listed again when renamed.
+        """
+        projects = {project["id"]: project["name"] for project in self.list_projects(["id", "name"])}
+        tags = {tag["id"]: tag["name"] for tag in self.list_tags(["id", "name"])}
+        named = []
+        for task in tasks:
+            task = dict(task)
+            if task.get("projectId") in projects:
+                task["projectName"] = projects[task["projectId"]]
+            tag_ids = task.get("tagIds") or []
+            if all(tag_id in tags for tag_id in tag_ids):
+                task["tags"] = [tags[tag_id] for tag_id in tag_ids]
+            named.append(task)
+        return named
+
+    def list_tasks(self, fields: list[omnifocus.TaskField] | None = None) -> list[dict[str, Any]]:
+        """Return the local copy of the tasks with the requested fields, or the default fields when None."""
+        return omnifocus.project_fields(
+            self._with_current_names(list(self.records["tasks"].values())), fields, omnifocus.DEFAULT_TASK_FIELDS
+        )
+
+    def list_projects(self, fields: list[omnifocus.ProjectField] | None = None) -> list[dict[str, Any]]:
+        """Return the local copy of the projects with the requested fields, or the default fields when None."""
+        return omnifocus.project_fields(
+            list(self.records["projects"].values()), fields, omnifocus.DEFAULT_PROJECT_FIELDS
+        )
+
+    def list_tags(self, fields: list[omnifocus.TagField] | None = None) -> list[dict[str, Any]]:
+        """Return the local copy of the tags with the requested fields, or the default fields when None."""
+        return omnifocus.project_fields(list(self.records["tags"].values()), fields, omnifocus.DEFAULT_TAG_FIELDS)
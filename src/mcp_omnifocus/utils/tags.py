@@ -0,0 +1,77 @@
+"""The OmniFocus tag hierarchy held in Python, indexed by tag id.
+
+The hierarchy is read from OmniFocus in one top-down traversal (see the tagHierarchy script function),
+which gives every tag its id, name, full name and parent id. ``TagIndex`` answers questions about the
+hierarchy from those records, such as the full name, ancestors or subtree of a tag, without another
+round-trip to OmniFocus.
+"""
+
+from typing import Any
+
+
+class TagIndex:
+    """The tags of OmniFocus by id, with the children of every tag."""
+
+    def __init__(self, records: list[dict[str, Any]]):
+        """Index tag records.
+
+        Args:
+            records: The tags with at least their "id", "name", "fullName" and "parentId", as listed by the
+                tagHierarchy script function.
+        """
+        self.records = records
+        self._tags = {record["id"]: record for record in records}
+        # Children by parent id, None for the top level tags, in the order of the records
+        self._children: dict[str | None, list[str]] = {}
+        for record in records:
+            self._children.setdefault(record["parentId"], []).append(record["id"])
+
+    def __contains__(self, tag_id: str) -> bool:
+        return tag_id in self._tags
+
+    def __len__(self) -> int:
+        return len(self._tags)
+
+    def _tag(self, tag_id: str) -> dict[str, Any]:
+        try:
+            return self._tags[tag_id]
+        except KeyError:
+            raise ValueError(f"Could not find tag: {tag_id}") from None
+
+    def full_name(self, tag_id: str) -> str:
+        """Return the full name of a tag, its name and the names of its ancestors joined with " : "."""
+        return self._tag(tag_id)["fullName"]
+
+    def ancestors(self, tag_id: str) -> list[str]:
+        """Return the ids of the ancestors of a tag, from its parent up to the top level tag."""
+        ancestors = []
+        parent_id = self._tag(tag_id)["parentId"]
+        while parent_id is not None and parent_id in self._tags:
+            ancestors.append(parent_id)
+            parent_id = self._tags[parent_id]["parentId"]
+        return ancestors
+
+    def subtree(self, tag_id: str) -> list[str]:
+        """Return the id of a tag followed by the ids of all its descendants, parents before their children."""
+        self._tag(tag_id)
+        ids = []
+        pending = [tag_id]
+        while pending:
+            current = pending.pop()
+            ids.append(current)
+            pending.extend(reversed(self._children.get(current, [])))
+        return ids
+
+    def tree(self, fields: list[str], root_id: str | None = None) -> list[dict[str, Any]]:
+        """Return the tags as a nested tree, each tag with its fields and a "children" list of tags.
+
+        Args:
+            fields: The tag fields to return for every tag.
+            root_id: The tag whose children to return, None for the top level tags.
+        """
+        if root_id is not None:
+            self._tag(root_id)
+        return [
+            {**{field: self._tags[child_id].get(field) for field in fields}, "children": self.tree(fields, child_id)}
+            for child_id in self._children.get(root_id, [])
+        ]
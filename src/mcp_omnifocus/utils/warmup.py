@@ -0,0 +1,100 @@
+"""Warm-up of OmniFocus and the caches in the background while the server waits for its first tool call.
+
+The first calls of a session otherwise pay for everything that is only slow once: starting OmniFocus or
+connecting to it, compiling the evaluation script, sending the script library to OmniFocus and reading
+the projects, tags and inbox that most sessions start with. ``WarmUp`` runs those reads one after the
+other in a task on the server's event loop, started once the server starts up, so that they land in the
+snapshot cache (or the delta sync copy). Each step runs through ``mcp_omnifocus.utils.scripting.call_async``
+like a tool call, so its scripts count towards the same concurrency limit as the first requests.
+
+Tool calls do not wait for the warm-up as a whole. A call for something the warm-up is reading at that
+moment shares its execution, see ``mcp_omnifocus.utils.scripting.coalesced``, and a call for something
+already read is served from the cache.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from mcp_omnifocus.utils import scripting
+from mcp_omnifocus.utils.metrics import call_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    """Runs named warm-up steps in order in a background task, recording how each went.
+
+    A failed step skips the steps after it, which would most likely fail the same way and only hold up
+    the tool calls waiting on OmniFocus meanwhile.
+    """
+
+    def __init__(self, steps: dict[str, Callable[[], Any]]):
+        """Prepare a warm-up, which starts with start.
+
+        Args:
+            steps: The steps by name, called without arguments in order.
+        """
+        self.steps = steps
+        self._lock = threading.Lock()
+        self._status: dict[str, dict[str, Any]] = {name: {"status": "pending"} for name in steps}
+        self._done = threading.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> "asyncio.Task[None]":
+        """Start running the steps in a task on the running event loop, returning the task."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run(), name="omnifocus-warm-up")
+        return self._task
+
+    def stop(self) -> None:
+        """Cancel the steps still to run, which are then recorded as skipped."""
+        if self._task is not None:
+            self._task.cancel()
+
+    async def run(self) -> None:
+        """Run the steps in order, stopping at the first that fails."""
+        try:
+            # Scripts of the warm-up are recorded in the call metrics as a tool of their own
+            with call_metrics.tool("warm_up"):
+                for name, step in self.steps.items():
+                    if not await self._step(name, step):
+                        break
+        finally:
+            with self._lock:
+                for status in self._status.values():
+                    if status["status"] == "pending":
+                        status["status"] = "skipped"
+            self._done.set()
+
+    async def _step(self, name: str, step: Callable[[], Any]) -> bool:
+        """Run a step, returning whether it succeeded."""
+        self._update(name, status="running")
+        start = time.perf_counter()
+        try:
+            await scripting.call_async(step)
+        except asyncio.CancelledError:
+            self._update(name, status="skipped")
+            raise
+        except Exception as e:
+            self._update(name, status="failed", ms=_since(start), error=str(e))
+            logger.warning("Warm-up step %s failed, skipping the rest: %s", name, e)
+            return False
+        self._update(name, status="done", ms=_since(start))
+        return True
+
+    def _update(self, name: str, **status: Any) -> None:
+        with self._lock:
+            self._status[name] = status
+
+    def stats(self) -> dict[str, Any]:
+        """Return whether the warm-up finished, and the status and duration of every step."""
+        with self._lock:
+            return {"done": self._done.is_set(), "steps": {name: dict(status) for name, status in self._status.items()}}
+
+
+def _since(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
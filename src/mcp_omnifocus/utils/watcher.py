@@ -0,0 +1,162 @@
+"""A watcher over the OmniFocus data directory, reporting when OmniFocus or its sync changed the database.
+
+Cached reads are otherwise only known to be stale when they expire, or when a write goes through this
+server: changes made in OmniFocus itself, or synced from another device, go unnoticed until then. OmniFocus
+saves every change as a new transaction file in its ``.ofocus`` bundle, so a change of the files in the
+data directory is a change of the database.
+
+``DatabaseWatcher`` watches a directory with the file system notifications of the platform (FSEvents on
+macOS, inotify on Linux) through watchfiles when it is installed, and by polling the modification times of
+the files otherwise. A sync writes several files in a burst, which are reported as one change once the
+directory has been quiet for the debounce interval, or after the longest delay while the burst goes on.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, Literal
+
+from mcp_omnifocus.utils.metrics import call_metrics
+
+logger = logging.getLogger(__name__)
+
+Backend = Literal["auto", "native", "poll"]
+
+
+class DatabaseWatcher:
+    """Calls a function with the paths changed in a directory, once per burst of changes."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        on_change: Callable[[set[Path]], Any],
+        debounce: float = 1.0,
+        max_delay: float = 10.0,
+        poll_interval: float = 1.0,
+        backend: Backend = "auto",
+    ):
+        """Prepare a watcher, which starts with start.
+
+        Args:
+            path: The directory to watch, including its subdirectories.
+            on_change: Called in the watcher thread with the paths changed, added or removed in a burst.
+            debounce: Seconds without changes that end a burst.
+            max_delay: Longest time in seconds a burst is held back while changes keep coming.
+            poll_interval: Seconds between two scans of the directory when polling.
+            backend: "native" for file system notifications through watchfiles, "poll" for polling, "auto" for
+                notifications when watchfiles is installed.
+        """
+        self.path = Path(path)
+        self.on_change = on_change
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.backend = _backend(backend)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._stats: dict[str, Any] = {"changes": 0, "paths": 0, "errors": 0, "last_change": None}
+
+    def start(self) -> None:
+        """Start watching in a daemon thread."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="omnifocus-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float | None = 5) -> None:
+        """Stop watching, a burst not reported yet is dropped."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        try:
+            if self.backend == "native":
+                self._watch_native()
+            else:
+                self._watch_polling()
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+            logger.exception("Stopped watching %s", self.path)
+
+    def _watch_native(self) -> None:
+        import watchfiles
+
+        # watchfiles yields once no change came for step milliseconds, or after debounce milliseconds
+        for changes in watchfiles.watch(
+            self.path,
+            step=int(self.debounce * 1000),
+            debounce=int(self.max_delay * 1000),
+            stop_event=self._stop,
+            rust_timeout=int(self.poll_interval * 1000),
+            yield_on_timeout=False,
+        ):
+            self._report({Path(path) for _, path in changes})
+
+    def _watch_polling(self) -> None:
+        previous = _scan(self.path)
+        pending: set[Path] = set()
+        first = last = 0.0
+        while not self._stop.wait(self.poll_interval):
+            current = _scan(self.path)
+            changed = {path for path in previous.keys() | current.keys() if previous.get(path) != current.get(path)}
+            previous = current
+            now = time.monotonic()
+            if changed:
+                first = first if pending else now
+                last = now
+                pending |= changed
+            if pending and (now - last >= self.debounce or now - first >= self.max_delay):
+                self._report(pending)
+                pending = set()
+
+    def _report(self, paths: set[Path]) -> None:
+        with self._lock:
+            self._stats["changes"] += 1
+            self._stats["paths"] += len(paths)
+            self._stats["last_change"] = time.time()
+        try:
+            # Scripts run by the change hooks are recorded in the call metrics as a tool of their own
+            with call_metrics.tool("watcher"):
+                self.on_change(paths)
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+            logger.exception("Could not handle the changes of %s", self.path)
+
+    def stats(self) -> dict[str, Any]:
+        """Return the backend, whether the watcher runs, and how many bursts and paths it reported."""
+        with self._lock:
+            running = self._thread is not None and self._thread.is_alive()
+            return {"path": str(self.path), "backend": self.backend, "running": running, **self._stats}
+
+
+def _backend(backend: Backend) -> Literal["native", "poll"]:
+    if backend != "auto":
+        return backend
+    try:
+        import watchfiles  # noqa: F401
+    except ImportError:
+        return "poll"
+    return "native"
+
+
+def _scan(path: Path) -> dict[Path, tuple[int, int]]:
+    """The modification time and size of every file under a directory, by path."""
+    files = {}
+    for root, _, names in os.walk(path):
+        for name in names:
+            file = Path(root, name)
+            try:
+                stat = file.stat()
+            except OSError:
+                # Removed while scanning, which the next scan reports
+                continue
+            files[file] = (stat.st_mtime_ns, stat.st_size)
+    return files
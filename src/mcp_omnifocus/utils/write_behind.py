@@ -0,0 +1,461 @@
+"""Write-behind of task mutations: queued, merged per task and applied to OmniFocus in one script.
+
+Instead of waiting for OmniFocus on every update, completion or new task, the ``WriteBehindQueue``
+acknowledges mutations at once and applies them in batches with ``batch_update_tasks``, either once
+the oldest queued mutation has waited for the flush interval, once enough mutations are queued, or
+when ``flush`` is called. Before a batch is sent, the mutations of each task are merged:
+
+    updates     fold into one update, later values winning and tags accumulating
+    statuses    of complete, drop and activate, only the last is applied, after the update
+    creates     take the updates of the new task, which is referred to by a provisional id until then
+
+Every mutation is appended to a journal file before it is acknowledged, and the journal is cut back
+once a batch is applied, so queued mutations survive a crash and are queued again on the next start.
+A batch that fails, times out or is cut short by a crash may still have been applied by OmniFocus.
+Updates and status changes are idempotent and are applied again, but creating a task again would
+create it twice: creates are marked as sent in the journal before their batch is applied, and a sent
+create that was not confirmed is never sent again. It is reported as failed instead, together with
+the mutations of the task it would have created.
+
+A journal belongs to the one queue holding an exclusive lock on it, as MCP clients start a server per
+session and several may run at once. A queue whose journal is locked by another running server journals
+to a file of its own next to it instead. On start, a queue also takes over the journals of servers that
+are gone, which are the only ones it can lock, and queues their mutations again.
+"""
+
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from pathlib import Path
+from typing import IO, Any
+
+from mcp_omnifocus.utils import omnifocus
+from mcp_omnifocus.utils.omnifocus import TaskOperation, TaskOperationResult
+
+logger = logging.getLogger(__name__)
+
+# Starts the ids of queued tasks that OmniFocus has not created yet
+PROVISIONAL_PREFIX = "pending-"
+
+_EDIT_FIELDS = ("name", "note", "project_id", "defer_date", "due_date", "flagged")
+_STATUS_ACTIONS = ("complete", "drop", "activate")
+
+
+def merge(operations: list[TaskOperation]) -> tuple[list[TaskOperation], list[int]]:
+    """Merge queued operations into at most one edit and one status change per task.
+
+    Args:
+        operations: The operations in the order they were queued.
+
+    Returns:
+        The merged operations in the order their tasks were first queued, edits before status changes, and
+        for every queued operation the index of the merged operation it was folded into.
+    """
+    merged: list[TaskOperation] = []
+    edits: dict[str, int] = {}
+    statuses: dict[str, int] = {}
+    positions: list[int] = []
+    for operation in operations:
+        task_id, action = operation["task_id"], operation["action"]
+        if action in _STATUS_ACTIONS:
+            if task_id in statuses:
+                merged[statuses[task_id]]["action"] = action
+            else:
+                statuses[task_id] = len(merged)
+                merged.append({"task_id": task_id, "action": action})
+            positions.append(statuses[task_id])
+            continue
+
+        if task_id not in edits:
+            edits[task_id] = len(merged)
+            merged.append({"task_id": task_id, "action": "create" if action == "create" else "update"})
+        edit = merged[edits[task_id]]
+        for field in _EDIT_FIELDS:
+            if operation.get(field) is not None:
+                edit[field] = operation[field]
+        if operation.get("tag_ids"):
+            edit["tag_ids"] = list(dict.fromkeys([*(edit.get("tag_ids") or []), *operation["tag_ids"]]))
+        positions.append(edits[task_id])
+
+    # The operations of a task stay together where the task was first queued, its edit before its status
+    # change, even when the status change was queued first
+    def position(index: int) -> tuple[int, bool]:
+        task_id = merged[index]["task_id"]
+        return min(edits.get(task_id, index), statuses.get(task_id, index)), merged[index]["action"] in _STATUS_ACTIONS
+
+    order = sorted(range(len(merged)), key=position)
+    renumbered = {old: new for new, old in enumerate(order)}
+    return [merged[index] for index in order], [renumbered[index] for index in positions]
+
+
+class WriteBehindQueue:
+    """Task mutations acknowledged at once and applied to OmniFocus in merged batches."""
+
+    def __init__(
+        self,
+        journal: str | Path | None = None,
+        interval: float = 0.5,
+        max_operations: int = 50,
+        apply: Callable[[list[TaskOperation]], list[TaskOperationResult]] | None = None,
+    ):
+        """Create a queue, queuing again the mutations left in the journals of servers no longer running.
+
+        Args:
+            journal: The file mutations are journaled to until they are applied, None to keep them in memory only.
+                When another running server holds it, a file of this queue next to it is used instead.
+            interval: Seconds the oldest queued mutation waits before the queue is flushed in the background.
+            max_operations: Number of queued mutations that triggers a flush before the interval is over.
+            apply: Applies a batch of operations, batch_update_tasks by default.
+        """
+        if interval <= 0 or max_operations < 1:
+            raise ValueError(f"Invalid flush interval {interval} or operation count {max_operations}")
+        self.interval = interval
+        self.max_operations = max_operations
+        self._apply = apply or omnifocus.batch_update_tasks
+        self._journal: Path | None = None
+        self._journal_lock: IO | None = None
+        self._own_journal = False
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._queue: list[TaskOperation] = []
+        self._first_queued = 0.0
+        # The ids OmniFocus gave the tasks queued under provisional ids
+        self._resolved: dict[str, str] = {}
+        self._failures: list[TaskOperationResult] = []
+        self._stats = {"queued": 0, "flushes": 0, "applied": 0, "failed": 0, "batch_errors": 0}
+        self._last_error: str | None = None
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+
+        if journal is not None:
+            self._journal, self._journal_lock = _claim_journal(Path(journal))
+            self._own_journal = self._journal != Path(journal)
+            self._queue.extend(_read_journal(self._journal))
+            # Journals left by servers that are gone, their locks were released with their processes
+            for orphan in _sibling_journals(Path(journal)):
+                if orphan == self._journal or (lock := _lock_journal(orphan)) is None:
+                    continue
+                try:
+                    operations = _read_journal(orphan)
+                    self._append_journal(operations)
+                    self._queue.extend(operations)
+                    orphan.unlink(missing_ok=True)
+                    if orphan != Path(journal):
+                        _lock_path(orphan).unlink(missing_ok=True)
+                finally:
+                    lock.close()
+            # Creates of a batch that was cut short may have been applied
+            if self._abandon_sent_creates("The server stopped while the task was being created, it may exist"):
+                self._rewrite_journal()
+            if self._queue:
+                logger.info("Queued %d task mutations again from %s", len(self._queue), self._journal)
+                self._first_queued = time.monotonic()
+
+    def enqueue(self, operation: TaskOperation) -> dict[str, Any]:
+        """Queue a mutation and journal it.
+
+        Args:
+            operation: The operation, as accepted by batch_update_tasks. The task_id of "create" operations
+                is replaced with a provisional id.
+
+        Returns:
+            An acknowledgement with the task_id the mutation applies to, its action and the number of
+            queued mutations.
+        """
+        operation = {key: value for key, value in operation.items() if value is not None}
+        if operation["action"] == "create":
+            operation["task_id"] = f"{PROVISIONAL_PREFIX}{uuid.uuid4().hex[:12]}"
+        with self._wake:
+            operation["task_id"] = self._resolved.get(operation["task_id"], operation["task_id"])
+            self._append_journal([operation])
+            self._queue.append(operation)
+            self._stats["queued"] += 1
+            if len(self._queue) == 1:
+                self._first_queued = time.monotonic()
+            self._wake.notify_all()
+            pending = len(self._queue)
+        return {"task_id": operation["task_id"], "action": operation["action"], "queued": True, "pending": pending}
+
+    def create_task(self, task_name: str, task_note: str | None = None) -> dict[str, Any]:
+        """Queue the creation of a task in the inbox, see omnifocus.create_task."""
+        return self.enqueue({"task_id": "", "action": "create", "name": task_name, "note": task_note})
+
+    def update_task(
+        self,
+        task_id: str,
+        task_name: str | None = None,
+        task_note: str | None = None,
+        task_tag_ids: list[str] | None = None,
+        task_project_id: str | None = None,
+        task_defer_date: str | None = None,
+        task_due_date: str | None = None,
+        task_flagged: bool | None = None,
+    ) -> dict[str, Any]:
+        """Queue an update of a task, see omnifocus.update_task."""
+        return self.enqueue(
+            {
+                "task_id": task_id,
+                "action": "update",
+                "name": task_name,
+                "note": task_note,
+                "tag_ids": task_tag_ids,
+                "project_id": task_project_id,
+                "defer_date": task_defer_date,
+                "due_date": task_due_date,
+                "flagged": task_flagged,
+            }
+        )
+
+    def complete_task(self, task_id: str) -> dict[str, Any]:
+        """Queue the completion of a task."""
+        return self.enqueue({"task_id": task_id, "action": "complete"})
+
+    def drop_task(self, task_id: str) -> dict[str, Any]:
+        """Queue dropping a task."""
+        return self.enqueue({"task_id": task_id, "action": "drop"})
+
+    def activate_task(self, task_id: str) -> dict[str, Any]:
+        """Queue activating a task."""
+        return self.enqueue({"task_id": task_id, "action": "activate"})
+
+    def pending(self) -> int:
+        """Return the number of queued mutations."""
+        with self._lock:
+            return len(self._queue)
+
+    def flush(self, keep_failures: bool = False) -> list[TaskOperationResult]:
+        """Apply the queued mutations to OmniFocus in one batch.
+
+        Mutations queued while the batch is applied wait for the next flush. If the batch cannot be applied
+        at all, the mutations stay queued and the error is raised, except for the creates of the batch and
+        the mutations of their tasks: OmniFocus may have created the tasks before the error, so they are not
+        sent again and are reported by take_failures instead.
+
+        Args:
+            keep_failures: Keep the failed results for take_failures, for flushes nobody waits on.
+
+        Returns:
+            One result per queued mutation, in the order they were queued, with the task as it is after the
+            whole batch or the error of the merged operation the mutation was folded into.
+        """
+        with self._flush_lock:
+            with self._lock:
+                operations = list(self._queue)
+            if not operations:
+                return []
+
+            merged, positions = merge(operations)
+            if any(operation["action"] == "create" for operation in operations):
+                with self._lock:
+                    for operation in operations:
+                        if operation["action"] == "create":
+                            operation["sent"] = True
+                    self._rewrite_journal()
+            try:
+                outcomes = self._apply(merged)
+            except Exception as e:
+                with self._lock:
+                    self._stats["batch_errors"] += 1
+                    self._last_error = str(e)
+                    if self._abandon_sent_creates(f"The batch creating the task failed, it may exist: {e}"):
+                        self._rewrite_journal()
+                raise
+
+            results: list[TaskOperationResult] = []
+            for operation, position in zip(operations, positions, strict=True):
+                outcome = outcomes[position]
+                results.append({**outcome, "task_id": operation["task_id"], "action": operation["action"]})
+            failures = [result for result in results if not result["success"]]
+
+            with self._lock:
+                for operation, outcome in zip(merged, outcomes, strict=True):
+                    if operation["action"] == "create" and outcome["success"] and outcome["task"]:
+                        self._resolved[operation["task_id"]] = outcome["task"]["id"]
+                # Mutations queued since refer to created tasks by their provisional ids until now
+                del self._queue[: len(operations)]
+                for operation in self._queue:
+                    operation["task_id"] = self._resolved.get(operation["task_id"], operation["task_id"])
+                self._rewrite_journal()
+                self._stats["flushes"] += 1
+                self._stats["applied"] += len(results) - len(failures)
+                self._stats["failed"] += len(failures)
+                self._last_error = None
+                if keep_failures:
+                    self._failures.extend(failures)
+            return results
+
+    def take_failures(self) -> list[TaskOperationResult]:
+        """Return and forget the failed results of the flushes made with keep_failures, and the creates not sent again."""
+        with self._lock:
+            failures, self._failures = self._failures, []
+            return failures
+
+    def resolve(self, task_id: str) -> str:
+        """Return the id OmniFocus gave a task queued under a provisional id, the id itself for other tasks."""
+        with self._lock:
+            return self._resolved.get(task_id, task_id)
+
+    def stats(self) -> dict[str, Any]:
+        """Return the number of queued, applied and failed mutations, flushes and the last batch error."""
+        with self._lock:
+            return {
+                **self._stats,
+                "pending": len(self._queue),
+                "journal": str(self._journal) if self._journal is not None else None,
+                "interval": self.interval,
+                "max_operations": self.max_operations,
+                "last_error": self._last_error,
+            }
+
+    def start(self) -> None:
+        """Start flushing the queue in a background thread."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="mcp-omnifocus-write-behind", daemon=True)
+            self._thread.start()
+
+    def stop(self, flush: bool = True) -> None:
+        """Stop the background thread, flushing the queue one last time unless told otherwise.
+
+        Mutations that cannot be applied stay in the journal, which is then released for the next server to
+        queue them again.
+        """
+        with self._wake:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._wake.notify_all()
+        if thread is not None:
+            thread.join()
+        if flush:
+            try:
+                self.flush(keep_failures=True)
+            except Exception:
+                logger.exception("Could not apply the queued task mutations, they stay in %s", self._journal)
+        with self._lock:
+            lock, self._journal_lock = self._journal_lock, None
+            if lock is not None and self._own_journal and not self._queue:
+                # Nothing is left for a journal made next to the shared one while it was held
+                self._journal.unlink(missing_ok=True)
+                _lock_path(self._journal).unlink(missing_ok=True)
+        if lock is not None:
+            lock.close()
+
+    def _run(self) -> None:
+        while True:
+            with self._wake:
+                while not self._stopping and (not self._queue or self._due() > 0):
+                    self._wake.wait(self._due() if self._queue else None)
+                if self._stopping:
+                    return
+            try:
+                self.flush(keep_failures=True)
+            except Exception:
+                logger.exception("Could not apply the queued task mutations, retrying in %s seconds", self.interval)
+                with self._lock:
+                    self._first_queued = time.monotonic()
+
+    def _abandon_sent_creates(self, error: str) -> bool:
+        """Unqueue the creates sent in a batch that was not confirmed and the mutations of their tasks.
+
+        They are reported as failed with the given error. Called with the lock held, returns whether any
+        mutation was unqueued.
+        """
+        sent = {operation["task_id"] for operation in self._queue if operation.get("sent")}
+        if not sent:
+            return False
+        for operation in self._queue:
+            if operation["task_id"] in sent:
+                self._failures.append(
+                    {
+                        "task_id": operation["task_id"],
+                        "action": operation["action"],
+                        "success": False,
+                        "task": None,
+                        "error": error,
+                    }
+                )
+                self._stats["failed"] += 1
+        self._queue = [operation for operation in self._queue if operation["task_id"] not in sent]
+        return True
+
+    def _due(self) -> float:
+        """Seconds until the queue is due for a flush, 0 once it is."""
+        if len(self._queue) >= self.max_operations:
+            return 0
+        return max(self._first_queued + self.interval - time.monotonic(), 0)
+
+    def _append_journal(self, operations: list[TaskOperation]) -> None:
+        if self._journal is None:
+            return
+        self._journal.parent.mkdir(parents=True, exist_ok=True)
+        with self._journal.open("a") as file:
+            file.writelines(json.dumps(operation) + "\n" for operation in operations)
+            file.flush()
+            os.fsync(file.fileno())
+
+    def _rewrite_journal(self) -> None:
+        if self._journal is None:
+            return
+        # Replaced in one step, so a crash leaves either the old or the new journal
+        partial = self._journal.with_name(self._journal.name + ".tmp")
+        with partial.open("w") as file:
+            file.writelines(json.dumps(operation) + "\n" for operation in self._queue)
+            file.flush()
+            os.fsync(file.fileno())
+        partial.replace(self._journal)
+
+
+def _lock_path(journal: Path) -> Path:
+    # The journal itself is replaced on every flush, so the lock is held on a file next to it
+    return journal.with_name(journal.name + ".lock")
+
+
+def _lock_journal(journal: Path) -> IO | None:
+    """Take the exclusive lock of a journal, None if another queue holds it.
+
+    The lock lasts until the returned file is closed, or the process holding it ends.
+    """
+    journal.parent.mkdir(parents=True, exist_ok=True)
+    file = _lock_path(journal).open("a")
+    try:
+        fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        file.close()
+        return None
+    return file
+
+
+def _claim_journal(journal: Path) -> tuple[Path, IO]:
+    """Lock a journal for a queue, or a new journal of its own next to it when another queue holds it."""
+    lock = _lock_journal(journal)
+    if lock is not None:
+        return journal, lock
+    while True:
+        own = journal.with_name(f"{journal.stem}-{uuid.uuid4().hex[:8]}{journal.suffix}")
+        lock = _lock_journal(own)
+        if lock is not None:
+            return own, lock
+
+
+def _sibling_journals(journal: Path) -> list[Path]:
+    """The journal and the journals queues made next to it while another one held it."""
+    return [journal, *sorted(journal.parent.glob(f"{journal.stem}-*{journal.suffix}"))]
+
+
+def _read_journal(journal: Path) -> list[TaskOperation]:
+    operations = []
+    if journal.exists():
+        with journal.open() as file:
+            for line in file:
+                with contextlib.suppress(ValueError):
+                    operations.append(json.loads(line))
+    return operations
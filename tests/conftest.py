@@ -1,6 +1,19 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
 import pytest
 
-from mcp_omnifocus.utils.scripting import run_jxa_script
+from mcp_omnifocus.utils import omnifocus, scripting
+from mcp_omnifocus.utils.cache import snapshot_cache
+from mcp_omnifocus.utils.resilience import CircuitBreaker, LatencyHistory
+from mcp_omnifocus.utils.scripting import JXAScriptError, build_script, run_jxa_script
+
+FAKE_OMNIFOCUS = str(Path(__file__).with_name("fake_omnifocus.js"))
+FAKE_OSASCRIPT = str(Path(__file__).with_name("fake_osascript.py"))
 
 
 def check_omnifocus_availability() -> bool:
@@ -42,6 +55,14 @@ def require_omnifocus(omnifocus_available):
     return True
 
 
+@pytest.fixture(autouse=True)
+def fresh_resilience(monkeypatch):
+    """Give every test its own script durations and a closed circuit breaker."""
+    monkeypatch.setattr(scripting, "latency_history", LatencyHistory())
+    monkeypatch.setattr(scripting, "circuit_breaker", CircuitBreaker())
+    monkeypatch.setattr(scripting, "_retry_stats", {"retries": 0, "timeouts": 0})
+
+
 # Custom marker for tests that require OmniFocus
 def pytest_configure(config):
     """Register custom markers."""
@@ -55,3 +76,70 @@ def pytest_collection_modifyitems(config, items):
         for item in items:
             if "requires_omnifocus" in item.keywords:
                 item.add_marker(skip_omnifocus)
+
+
+@pytest.fixture
+def fake_osascript(tmp_path, monkeypatch):
+    """Put the stand-in osascript and osacompile from fake_osascript.py at the front of the PATH."""
+    shim = tmp_path / "osascript"
+    shim.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_OSASCRIPT}" "$@"\n')
+    shim.chmod(0o755)
+    compiler = tmp_path / "osacompile"
+    compiler.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_OSASCRIPT}" --compile "$@"\n')
+    compiler.chmod(0o755)
+    monkeypatch.setenv("MCP_OMNIFOCUS_SCRIPT_CACHE", str(tmp_path / "scripts"))
+    monkeypatch.setattr(scripting, "_compiled_scripts", {})
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    return shim
+
+
+@pytest.fixture
+def fake_omnifocus(monkeypatch):
+    """Run the scripts generated by the omnifocus module under node against an in-memory database.
+
+    The fixture returns the database dictionary, which tests fill with "projects", "tags", "tasks" and
+    "perspectives" records before calling the functions under test. Changes made by a script are not persisted.
+    """
+    if shutil.which("node") is None:
+        pytest.skip("node is required to run scripts against the fake OmniFocus")
+
+    database = {"projects": [], "tags": [], "tasks": []}
+
+    def evaluate_javascript(script: str, args=None, library=None):
+        # Each node process starts empty, so the library is always sent along with the call
+        request = json.dumps({"database": database, "script": build_script(script, args, library)})
+        result = subprocess.run(["node", FAKE_OMNIFOCUS], input=request, capture_output=True, text=True, check=True)
+        output = json.loads(result.stdout)
+        if "error" in output:
+            raise JXAScriptError(f"AppleScript failed: {output['error']}")
+        return output["result"]
+
+    def evaluate_javascript_stream(script: str, args=None, library=None):
+        output = evaluate_javascript(build_script(script, args, library, stream=True))
+        return (json.loads(line) for line in output.splitlines() if line)
+
+    monkeypatch.setattr(omnifocus, "evaluate_javascript", evaluate_javascript)
+    monkeypatch.setattr(omnifocus, "evaluate_javascript_stream", evaluate_javascript_stream)
+    snapshot_cache.clear()
+    yield database
+    snapshot_cache.clear()
+
+
+@pytest.fixture
+def sample_database(fake_omnifocus):
+    """A small database with two projects, a tag hierarchy and a handful of tasks."""
+    fake_omnifocus["projects"] = [
+        {"id": "p1", "name": "Home", "status": "Active"},
+        {"id": "p2", "name": "Work", "status": "Active"},
+    ]
+    fake_omnifocus["tags"] = [
+        {"id": "t1", "name": "Errands"},
+        {"id": "t2", "name": "Shops", "parent": "t1"},
+    ]
+    fake_omnifocus["tasks"] = [
+        {"id": "a", "name": "Buy milk", "project": "p1", "tags": ["t2"], "dueDate": "2025-01-02T10:00:00Z"},
+        {"id": "b", "name": "Write report", "project": "p2", "note": "Quarterly numbers", "flagged": True},
+        {"id": "c", "name": "Call plumber", "tags": ["t1"]},
+        {"id": "d", "name": "Old chore", "project": "p1", "status": "Completed"},
+    ]
+    return fake_omnifocus
@@ -0,0 +1,250 @@
+// A minimal stand-in for the OmniFocus automation object model, used to run the scripts generated
+// by mcp_omnifocus.utils.omnifocus under node on systems without OmniFocus.
+//
+// Usage: node fake_omnifocus.js < {"database": {...}, "script": "..."}
+// Prints {"result": ...} with the value of the script, or {"error": "..."} if it throws.
+//
+// The database holds "projects", "tags", "tasks" and custom "perspectives" with their filter "rules"
+// and "aggregation". No window is open.
+//
+// The database can also be read from a JSON file given as "databasePath". With "raw": true the value
+// is printed as JSON on its own, as osascript does, and errors go to stderr with a non-zero exit code.
+// With "stream": true as well, the value of a streamed script, already newline-delimited JSON, is
+// printed as it is.
+
+const fs = require("fs");
+const input = JSON.parse(fs.readFileSync(0, "utf8"));
+const database = input.databasePath ? JSON.parse(fs.readFileSync(input.databasePath, "utf8")) : input.database || {};
+
+function makeEnum(names) {
+    const values = {};
+    names.forEach(name => {
+        values[name] = { name: name, toString: () => name };
+    });
+    return values;
+}
+
+function toDate(value) {
+    return value === null || value === undefined ? null : new Date(value);
+}
+
+// Positions are the "ending" of a project or task, tasks without one go to the inbox
+const Task = function (name, position) {
+    const task = makeTask({ id: "new-" + (allTasks.length + 1), name: name });
+    allTasks.push(task);
+    if (!position) {
+        inbox.push(task);
+    } else if (position.project) {
+        task.containingProject = position.project;
+    } else {
+        task.parent = position.task;
+        task.parent.children.push(task);
+        task.containingProject = task.parent.containingProject;
+    }
+    return task;
+};
+Task.Status = makeEnum(["Available", "Blocked", "Completed", "Dropped", "DueSoon", "Next", "Overdue"]);
+Task.byIdentifier = id => allTasks.find(task => task.id.primaryKey === id) || null;
+
+const Project = function (name) {
+    const project = makeProject({ id: "new-project-" + (allProjects.length + 1), name: name });
+    allProjects.push(project);
+    return project;
+};
+Project.Status = makeEnum(["Active", "Done", "Dropped", "OnHold"]);
+Project.byIdentifier = id => allProjects.find(project => project.id.primaryKey === id) || null;
+
+const Tag = function (name) {
+    const tag = makeTag({ id: "new-tag-" + (allTags.length + 1), name: name });
+    allTags.push(tag);
+    return tag;
+};
+Tag.byIdentifier = id => allTags.find(tag => tag.id.primaryKey === id) || null;
+
+const Perspective = {
+    BuiltIn: makeEnum(["Inbox", "Projects", "Tags", "Forecast", "Flagged", "Review", "Nearby", "Search"]),
+    Custom: {
+        all: (database.perspectives || []).map(record => ({
+            name: record.name,
+            archivedFilterRules: record.rules,
+            archivedTopLevelFilterAggregation: record.aggregation,
+        })),
+    },
+};
+Perspective.BuiltIn.all = Object.values(Perspective.BuiltIn);
+
+// No window is open, perspectives can only be listed from the database
+const document = { windows: [] };
+
+function makeTag(record) {
+    return {
+        id: { primaryKey: record.id },
+        name: record.name,
+        parent: null,
+        children: [],
+        get tasks() {
+            return allTasks.filter(task => task.tags.includes(this));
+        },
+        get flattenedTags() {
+            return this.children.flatMap(child => [child].concat(child.flattenedTags));
+        },
+    };
+}
+
+function makeTask(record) {
+    const task = {
+        id: { primaryKey: record.id },
+        name: record.name,
+        note: record.note || "",
+        flagged: !!record.flagged,
+        deferDate: toDate(record.deferDate),
+        dueDate: toDate(record.dueDate),
+        added: toDate(record.added),
+        modified: toDate(record.modified),
+        completed: record.status === "Completed",
+        dropped: record.status === "Dropped",
+        containingProject: null,
+        parent: null,
+        children: [],
+        tags: [],
+        _status: record.status || "Available",
+        get taskStatus() {
+            if (this.completed) {
+                return Task.Status.Completed;
+            }
+            if (this.dropped) {
+                return Task.Status.Dropped;
+            }
+            return Task.Status[this._status];
+        },
+        get active() {
+            return !this.completed && !this.dropped;
+        },
+        set active(value) {
+            if (value) {
+                this.completed = false;
+                this.dropped = false;
+                this._status = "Available";
+            }
+        },
+        get hasChildren() {
+            return this.children.length > 0;
+        },
+        get flattenedChildren() {
+            return this.children.flatMap(child => [child].concat(child.flattenedChildren));
+        },
+        get ending() {
+            return { task: this };
+        },
+        markComplete() {
+            this.completed = true;
+        },
+        drop(allOccurrences) {
+            this.dropped = true;
+        },
+        addTag(tag) {
+            if (!this.tags.includes(tag)) {
+                this.tags.push(tag);
+            }
+        },
+    };
+    return task;
+}
+
+function makeProject(record) {
+    const root = makeTask({ id: record.id, name: record.name, modified: record.modified, added: record.added });
+    return {
+        id: { primaryKey: record.id },
+        name: record.name,
+        note: record.note || "",
+        status: Project.Status[record.status || "Active"],
+        flagged: !!record.flagged,
+        deferDate: toDate(record.deferDate),
+        dueDate: toDate(record.dueDate),
+        tags: [],
+        task: root,
+        get tasks() {
+            return allTasks.filter(task => task.containingProject === this && task.parent === null);
+        },
+        get flattenedTasks() {
+            return allTasks.filter(task => task.containingProject === this);
+        },
+        get ending() {
+            return { project: this };
+        },
+        markComplete() {
+            this.status = Project.Status.Done;
+        },
+        addTag(tag) {
+            if (!this.tags.includes(tag)) {
+                this.tags.push(tag);
+            }
+        },
+    };
+}
+
+const allTags = (database.tags || []).map(makeTag);
+(database.tags || []).forEach((record, index) => {
+    if (record.parent) {
+        const parent = Tag.byIdentifier(record.parent);
+        allTags[index].parent = parent;
+        parent.children.push(allTags[index]);
+    }
+});
+
+const allProjects = (database.projects || []).map(makeProject);
+(database.projects || []).forEach((record, index) => {
+    allProjects[index].tags = (record.tags || []).map(Tag.byIdentifier);
+});
+
+const allTasks = (database.tasks || []).map(makeTask);
+const inbox = [];
+(database.tasks || []).forEach((record, index) => {
+    const task = allTasks[index];
+    task.tags = (record.tags || []).map(Tag.byIdentifier);
+    if (record.project) {
+        task.containingProject = Project.byIdentifier(record.project);
+    }
+    if (record.parent) {
+        task.parent = Task.byIdentifier(record.parent);
+        task.parent.children.push(task);
+        task.containingProject = task.containingProject || task.parent.containingProject;
+    } else if (!record.project) {
+        inbox.push(task);
+    }
+});
+
+function moveTasks(tasks, destination) {
+    tasks.forEach(task => {
+        task.containingProject = destination;
+        task.parent = null;
+        const position = inbox.indexOf(task);
+        if (position >= 0) {
+            inbox.splice(position, 1);
+        }
+    });
+}
+
+Object.assign(globalThis, { Task, Project, Tag, Perspective, document, moveTasks, inbox });
+Object.defineProperty(globalThis, "flattenedTasks", { get: () => allTasks.slice() });
+Object.defineProperty(globalThis, "flattenedProjects", { get: () => allProjects.slice() });
+Object.defineProperty(globalThis, "flattenedTags", { get: () => allTags.slice() });
+Object.defineProperty(globalThis, "tags", { get: () => allTags.filter(tag => tag.parent === null) });
+
+try {
+    const result = (0, eval)(input.script);
+    if (input.raw && input.stream) {
+        process.stdout.write(String(result));
+    } else if (input.raw) {
+        process.stdout.write(result === undefined ? "" : JSON.stringify(result));
+    } else {
+        process.stdout.write(JSON.stringify({ result: result === undefined ? null : result }));
+    }
+} catch (e) {
+    if (input.raw) {
+        process.stderr.write("execution error: Error: " + e.toString());
+        process.exitCode = 1;
+    } else {
+        process.stdout.write(JSON.stringify({ error: e.toString() }));
+    }
+}
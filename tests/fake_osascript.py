@@ -0,0 +1,90 @@
+"""A stand-in for ``osascript`` used to exercise the scripting layer on systems without AppleScript.
+
+Invoked as ``fake_osascript.py -l JavaScript -e <script> [args...]`` or ``fake_osascript.py <file> [args...]``
+it answers once, like osascript. If the script is the JXA worker it speaks the worker protocol over
+stdin/stdout instead. Invoked as ``fake_osascript.py --compile -l JavaScript -o <file> -e <script>`` it
+stands in for osacompile and writes the script source to the file.
+
+Scripts are not executed, instead they and their arguments are scanned for directives:
+
+    fake:echo:<word>   answer with the JSON encoded word
+    fake:lines:<n>     answer with n lines of newline-delimited JSON
+    fake:pid           answer with the JSON encoded process id
+    fake:sleep:<secs>  sleep before answering
+    fake:error:<word>  fail with the word as the error message
+    fake:code:<n>      fail with Apple event error -n, e.g. 600 for "Application isn't running"
+    fake:crash         exit the process without answering
+"""
+
+import json
+import os
+import re
+import sys
+import time
+
+# Mirrors mcp_omnifocus.utils.scripting.WORKER_PROTOCOL, importing the package would slow every fake launch
+WORKER_PROTOCOL = "mcp-omnifocus-worker/1"
+
+DIRECTIVE = re.compile(r"fake:(\w+)(?::([\w.]+))?")
+
+
+def evaluate(script: str) -> str:
+    output = "null"
+    for directive, value in DIRECTIVE.findall(script):
+        if directive == "echo":
+            output = json.dumps(value)
+        elif directive == "lines":
+            output = "\n".join(json.dumps({"index": index}) for index in range(int(value)))
+        elif directive == "pid":
+            output = json.dumps(os.getpid())
+        elif directive == "sleep":
+            time.sleep(float(value))
+        elif directive == "error":
+            raise RuntimeError(value)
+        elif directive == "code":
+            raise RuntimeError(f"Apple event error. (-{value})")
+        elif directive == "crash":
+            sys.exit(3)
+    return output
+
+
+def serve() -> None:
+    def write(message: dict) -> None:
+        sys.stdout.write(json.dumps(message) + "\n")
+        sys.stdout.flush()
+
+    write({"ready": WORKER_PROTOCOL})
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        try:
+            write({"id": request["id"], "result": evaluate(request["script"])})
+        except RuntimeError as e:
+            write({"id": request["id"], "error": str(e)})
+
+
+def main() -> None:
+    argv = sys.argv[1:]
+    if argv[0] == "--compile":
+        with open(argv[argv.index("-o") + 1], "w") as f:
+            f.write(argv[argv.index("-e") + 1])
+        return
+    if "-e" in argv:
+        script, args = argv[argv.index("-e") + 1], argv[argv.index("-e") + 2 :]
+    else:
+        with open(argv[0]) as f:
+            script, args = f.read(), argv[1:]
+    script = " ".join([script, *args])
+    if WORKER_PROTOCOL in script:
+        serve()
+        return
+    try:
+        print(evaluate(script))
+    except RuntimeError as e:
+        print(f"execution error: Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
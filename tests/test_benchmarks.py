@@ -0,0 +1,90 @@
+import importlib.util
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from mcp_omnifocus.utils.cache import snapshot_cache
+
+BENCHMARKS = Path(__file__).parent.parent / "benchmarks"
+
+
+def load_benchmark(name: str):
+    spec = importlib.util.spec_from_file_location(name, BENCHMARKS / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def tool_costs():
+    return load_benchmark("tool_costs")
+
+
+@pytest.fixture
+def wire_format(monkeypatch):
+    # The benchmark imports its database generator from tool_costs, as when run from the benchmarks directory
+    monkeypatch.syspath_prepend(str(BENCHMARKS))
+    return load_benchmark("wire_format")
+
+
+def test_synthetic_database(tool_costs):
+    """Test that synthetic databases have the requested size, reproducibly, with valid references."""
+    database = tool_costs.synthetic_database(500)
+
+    assert len(database["tasks"]) == 500
+    assert database == tool_costs.synthetic_database(500)
+    project_ids = {project["id"] for project in database["projects"]}
+    tag_ids = {tag["id"] for tag in database["tags"]}
+    assert all(task["project"] in project_ids for task in database["tasks"] if task["project"])
+    assert all(set(task["tags"]) <= tag_ids for task in database["tasks"])
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is required to run the OmniFocus stand-in")
+def test_tool_costs_run(tool_costs):
+    """Test that every tool is measured and that regressions against a baseline are reported."""
+    results = {"results": tool_costs.run([30], repeat=1)}
+    measured = results["results"]["30"]
+
+    assert set(measured) == set(tool_costs.tools(tool_costs.synthetic_database(30)))
+    assert all(metrics["stdout_bytes"] > 0 for metrics in measured.values())
+    assert snapshot_cache.ttl > 0
+
+    assert tool_costs.compare(results, results, tolerance=0.25) == []
+    baseline = {"results": {"30": {"list_tasks": {**measured["list_tasks"], "stdout_bytes": 1}}}}
+    assert tool_costs.compare(results, baseline, tolerance=0.25) == [
+        f"30 tasks, list_tasks: stdout_bytes 1 -> {measured['list_tasks']['stdout_bytes']}"
+    ]
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is required to run the OmniFocus stand-in")
+def test_wire_format_run(wire_format):
+    """Test that both encodings are measured, decode to the same tasks, and column tables are smaller."""
+    measured = wire_format.run([50], repeat=1)["50"]
+
+    assert set(measured) == set(wire_format.LISTINGS)
+    assert all(0 < metrics["bytes_saved"] < 1 for metrics in measured.values())
+
+
+def test_startup_run():
+    """Test that the server answers initialize and tools/list, and that regressions against a baseline are reported."""
+    startup = load_benchmark("startup")
+    results = {"results": startup.run(1)}
+    measured = results["results"]
+
+    assert set(measured) == {"initialize_ms", "tools_list_ms", "import_ms", "import_floor_ms"}
+    assert 0 < measured["initialize_ms"] <= measured["tools_list_ms"]
+    assert startup.compare(results, results, tolerance=0.25) == []
+    baseline = {"results": {**measured, "import_ms": measured["import_ms"] / 2}}
+    assert startup.compare(results, baseline, tolerance=0.25) == [
+        f"import_ms {measured['import_ms'] / 2} -> {measured['import_ms']}"
+    ]
+
+
+def test_utils_import_without_server():
+    """Test that importing the OmniFocus functions does not import the server and FastMCP with them."""
+    code = "import sys, mcp_omnifocus.utils.omnifocus; print('fastmcp' in sys.modules, 'mcp_omnifocus.server' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.split() == ["False", "False"]
@@ -0,0 +1,164 @@
+import threading
+import time
+
+import pytest
+
+from mcp_omnifocus.utils.cache import SnapshotCache, cached, snapshot_cache
+from mcp_omnifocus.utils.omnifocus import (
+    complete_task,
+    create_task,
+    list_inbox,
+    list_projects,
+    list_tasks,
+    task_stats,
+    update_task,
+)
+
+
+def test_cache_hit_and_miss():
+    """Test that cached values are returned and counted."""
+    cache = SnapshotCache(ttl=10, maxsize=4)
+
+    assert cache.get("tasks", "all") == (False, None)
+    cache.set("tasks", "all", [1, 2])
+    assert cache.get("tasks", "all") == (True, [1, 2])
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+
+def test_cache_expires_entries():
+    """Test that entries are not served after the TTL."""
+    cache = SnapshotCache(ttl=0.05)
+    cache.set("tags", "all", ["a"])
+    time.sleep(0.1)
+
+    assert cache.get("tags", "all") == (False, None)
+    assert cache.stats()["size"] == 0
+
+
+def test_cache_evicts_least_recently_used():
+    """Test that the least recently used entry is evicted once the cache is full."""
+    cache = SnapshotCache(maxsize=2)
+    cache.set("tasks", "a", 1)
+    cache.set("tasks", "b", 2)
+    cache.get("tasks", "a")
+    cache.set("tasks", "c", 3)
+
+    assert cache.get("tasks", "b") == (False, None)
+    assert cache.get("tasks", "a") == (True, 1)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_disabled_with_zero_ttl():
+    """Test that nothing is cached when the TTL is 0."""
+    cache = SnapshotCache(ttl=0)
+    cache.set("tasks", "all", [1])
+
+    assert cache.get("tasks", "all") == (False, None)
+
+
+def test_cache_invalidate_and_patch():
+    """Test that invalidation and patching only touch their namespace."""
+    cache = SnapshotCache()
+    cache.set("tasks", "all", [1])
+    cache.set("tags", "all", ["a"])
+
+    cache.patch("tasks", lambda value: value + [2])
+    assert cache.get("tasks", "all") == (True, [1, 2])
+
+    cache.invalidate("tasks")
+    assert cache.get("tasks", "all") == (False, None)
+    assert cache.get("tags", "all") == (True, ["a"])
+
+
+@pytest.mark.parametrize(
+    "write",
+    [
+        lambda: snapshot_cache.invalidate("counter"),
+        lambda: snapshot_cache.invalidate(),
+        lambda: snapshot_cache.patch("counter", lambda value: value),
+    ],
+)
+def test_read_overtaken_by_a_write_is_not_cached(write):
+    """Test that a read started before a write does not cache what it read once the write dropped the cache."""
+    database = {"count": 1}
+    reading, written = threading.Event(), threading.Event()
+
+    @cached("counter")
+    def read_count():
+        count = database["count"]
+        reading.set()
+        written.wait(5)
+        return count
+
+    reader = threading.Thread(target=read_count)
+    reader.start()
+    assert reading.wait(5)
+    database["count"] = 2
+    write()
+    written.set()
+    reader.join(5)
+
+    assert read_count() == 2
+    snapshot_cache.clear()
+
+
+def test_reads_served_from_cache(sample_database):
+    """Test that repeated list calls only evaluate one script."""
+    first = list_projects()
+    sample_database["projects"].append({"id": "p3", "name": "Garden"})
+
+    assert list_projects() == first
+    assert list_projects(fields=None) == first
+    assert snapshot_cache.stats()["hits"] == 2
+
+
+def test_writes_patch_and_invalidate_tasks(sample_database):
+    """Test that task writes patch the cached task list or drop it."""
+    list_tasks()
+
+    update_task("a", task_name="Buy oat milk")
+    assert next(task for task in list_tasks() if task["id"] == "a")["name"] == "Buy oat milk"
+
+    created = create_task("Water plants")
+    assert list_tasks()[-1] == created
+
+    complete_task("b")
+    assert snapshot_cache.stats()["size"] == 0
+
+
+def test_writes_patch_projected_tasks(sample_database):
+    """Test that patched task lists keep the fields they were listed with."""
+    list_tasks(fields=["id", "name"])
+    list_tasks(fields=["name", "tagIds"])
+
+    update_task("a", task_name="Buy oat milk")
+
+    assert list_tasks(fields=["id", "name"])[0] == {"id": "a", "name": "Buy oat milk"}
+    assert snapshot_cache.stats()["size"] == 1
+
+
+def test_task_writes_invalidate_inbox(sample_database):
+    """Test that the cached inbox is dropped by task writes, which may move tasks in or out of it."""
+    assert [task["id"] for task in list_inbox()] == ["c"]
+
+    # The fake database does not keep the changes of scripts, they are made to it directly
+    update_task("c", task_project_id="p1")
+    sample_database["tasks"][2]["project"] = "p1"
+    assert list_inbox() == []
+
+    created = create_task("Water plants")
+    sample_database["tasks"].append({"id": created["id"], "name": "Water plants"})
+    assert [task["id"] for task in list_inbox()] == [created["id"]]
+
+
+def test_task_writes_invalidate_task_stats(sample_database):
+    """Test that cached task counts are dropped by task writes, and counts by due date are not cached."""
+    assert task_stats(["flagged"])["groups"] == [{"flagged": False, "count": 2}, {"flagged": True, "count": 1}]
+    task_stats(["due"])
+    assert snapshot_cache.stats()["size"] == 1
+
+    update_task("a", task_flagged=True)
+    sample_database["tasks"][0]["flagged"] = True
+    assert task_stats(["flagged"])["groups"] == [{"flagged": True, "count": 2}, {"flagged": False, "count": 1}]
@@ -0,0 +1,102 @@
+import pytest
+
+from mcp_omnifocus.utils import columns, omnifocus
+from mcp_omnifocus.utils.cache import snapshot_cache
+from mcp_omnifocus.utils.columns import decode_table, format_js_date
+from mcp_omnifocus.utils.omnifocus import (
+    TaskField,
+    list_changes,
+    list_tasks,
+    list_tasks_by_tag,
+    query_tasks,
+)
+
+ALL_FIELDS: list[TaskField] = list(TaskField.__args__)
+
+
+def test_format_js_date():
+    """Test that dates are formatted like Date.toString, in the zone they were read in."""
+    assert format_js_date(1735812000000, "GMT+0000 (Coordinated Universal Time)") == (
+        "Thu Jan 02 2025 10:00:00 GMT+0000 (Coordinated Universal Time)"
+    )
+    assert format_js_date(1751364000999, "GMT+0200 (Central European Summer Time)") == (
+        "Tue Jul 01 2025 12:00:00 GMT+0200 (Central European Summer Time)"
+    )
+    assert format_js_date(0, "GMT-0330 (Newfoundland Standard Time)") == (
+        "Wed Dec 31 1969 20:30:00 GMT-0330 (Newfoundland Standard Time)"
+    )
+
+
+def test_decode_table():
+    """Test that interned strings, flags, and dates are decoded into the object encoding."""
+    table = {
+        "count": 2,
+        "columns": {
+            "id": ["a", "b"],
+            "projectName": [0, -1],
+            "tags": [[1, 2], []],
+            "flagged": [1, -1],
+            "dueDate": [1735812000000, None],
+        },
+        "zones": {},
+        "strings": ["Home", "Errands", "Shops"],
+        "zoneNames": ["GMT+0000 (Coordinated Universal Time)"],
+    }
+
+    assert decode_table(table) == [
+        {
+            "id": "a",
+            "projectName": "Home",
+            "tags": ["Errands", "Shops"],
+            "flagged": True,
+            "dueDate": "Thu Jan 02 2025 10:00:00 GMT+0000 (Coordinated Universal Time)",
+        },
+        {"id": "b", "projectName": None, "tags": [], "flagged": None, "dueDate": None},
+    ]
+
+
+@pytest.fixture
+def both_encodings(sample_database, monkeypatch):
+    """Call a function with column tables of two rows and with one object per task, returning both results."""
+    sample_database["tasks"][1].update(added="2025-07-01T10:00:00Z", modified="2025-07-02T10:00:00.500Z")
+    monkeypatch.setattr(columns, "TABLE_ROWS", 2)
+
+    def call(function, *args, **kwargs):
+        results = []
+        for enabled in (True, False):
+            monkeypatch.setattr(omnifocus, "column_tables", enabled)
+            snapshot_cache.clear()
+            results.append(function(*args, **kwargs))
+        return results
+
+    return call
+
+
+@pytest.mark.parametrize(
+    "zone, summer",
+    [
+        ("UTC", "GMT+0000 (Coordinated Universal Time)"),
+        ("Europe/Berlin", "GMT+0200 (Central European Summer Time)"),
+        ("America/St_Johns", "GMT-0230 (Newfoundland Daylight Time)"),
+    ],
+)
+def test_column_tables_match_objects(both_encodings, monkeypatch, zone, summer):
+    """Test that every task listing decodes column tables into exactly the objects it would otherwise get."""
+    monkeypatch.setenv("TZ", zone)
+
+    tables, objects = both_encodings(list_tasks, fields=ALL_FIELDS)
+    assert tables == objects
+    assert len(tables) == 4
+    assert tables[1]["added"].endswith(summer)
+
+    for function, args, kwargs in [
+        (list_tasks, (), {}),
+        (list_tasks, (), {"limit": 3, "fields": ALL_FIELDS}),
+        (list_tasks_by_tag, ("t2",), {}),
+        (query_tasks, ({"field": "flagged", "op": "eq", "value": False},), {"fields": ALL_FIELDS}),
+    ]:
+        tables, objects = both_encodings(function, *args, **kwargs)
+        assert tables == objects, function.__name__
+
+    tables, objects = both_encodings(list_changes, None, all_fields=True)
+    assert tables["tasks"] == objects["tasks"]
@@ -0,0 +1,91 @@
+import json
+import logging
+
+import pytest
+
+from mcp_omnifocus.utils import scripting
+from mcp_omnifocus.utils.metrics import CallMetrics, Histogram, call_metrics
+from mcp_omnifocus.utils.scripting import JXAScriptError, evaluate_javascript
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    call_metrics.reset()
+    yield
+    call_metrics.reset()
+    call_metrics.slow_call_ms = None
+
+
+def test_histogram_buckets_are_cumulative():
+    """Test that every observation counts in its bucket and every larger one."""
+    histogram = Histogram((1, 10, float("inf")))
+    for value in (0.5, 5, 50):
+        histogram.observe(value)
+
+    assert histogram.snapshot() == {"count": 3, "sum": 55.5, "buckets": {"1": 1, "10": 2, "+Inf": 3}}
+
+
+def test_calls_are_recorded_per_tool_and_phase(monkeypatch):
+    """Test that the evaluation time reported by the wrapper splits the osascript time."""
+    monkeypatch.setattr(scripting, "_run_script", lambda script, timeout=30, args=None: '#evaluate-ms 5\n["Inbox"]')
+
+    with call_metrics.tool("list_perspectives"):
+        assert evaluate_javascript("1") == ["Inbox"]
+
+    stats = call_metrics.snapshot()["tools"]["list_perspectives"]
+    assert stats["calls"] == 1
+    assert set(stats["durations_ms"]) == {"script", "evaluate", "transport", "decode", "total", "tool"}
+    assert stats["durations_ms"]["evaluate"]["sum"] == 5
+    assert stats["bytes"]["output"]["sum"] == len('["Inbox"]')
+    assert stats["bytes"]["script"]["sum"] > 0
+
+
+@pytest.mark.parametrize("header", ["#evaluate-ms 12.5\n", ""])
+def test_output_bytes_exclude_the_evaluation_header(monkeypatch, header):
+    """Test that the recorded output size is the encoded size of the result alone, without the timing header."""
+    result = '{"name": "Café ☕"}'
+    monkeypatch.setattr(scripting, "_run_script", lambda script, timeout=30, args=None: header + result)
+
+    with call_metrics.tool("get_task"):
+        assert evaluate_javascript("1") == {"name": "Café ☕"}
+
+    output = call_metrics.snapshot()["tools"]["get_task"]["bytes"]["output"]
+    assert (output["count"], output["sum"]) == (1, len(result.encode()))
+
+
+def test_errors_are_counted_by_scope(fake_osascript):
+    """Test that a failed script counts once for the call and once for the tool that raised it."""
+    with pytest.raises(JXAScriptError), call_metrics.tool("get_task"):
+        evaluate_javascript("fake:error:boom")
+
+    stats = call_metrics.snapshot()["tools"]["get_task"]
+    assert stats["errors"] == {"tool": {"JXAScriptError": 1}, "call": {"JXAScriptError": 1}}
+    assert stats["bytes"]["output"]["sum"] == 0
+
+
+def test_prometheus_format(monkeypatch):
+    """Test the counters and histogram series of the Prometheus text format."""
+    monkeypatch.setattr(scripting, "_run_script", lambda script, timeout=30, args=None: "#evaluate-ms 5\n[]")
+    with call_metrics.tool("list_tags"):
+        evaluate_javascript("1")
+
+    lines = call_metrics.prometheus().splitlines()
+    assert 'mcp_omnifocus_calls_total{tool="list_tags"} 1' in lines
+    assert 'mcp_omnifocus_duration_milliseconds_bucket{tool="list_tags",phase="evaluate",le="5"} 1' in lines
+    assert 'mcp_omnifocus_duration_milliseconds_count{tool="list_tags",phase="evaluate"} 1' in lines
+    assert 'mcp_omnifocus_size_bytes_bucket{tool="list_tags",kind="output",le="+Inf"} 1' in lines
+    assert "# TYPE mcp_omnifocus_size_bytes histogram" in lines
+
+
+def test_slow_calls_are_logged(caplog):
+    """Test that calls over the threshold are logged with their timings and the end of the script."""
+    metrics = CallMetrics(slow_call_ms=100)
+    with caplog.at_level(logging.WARNING, logger="mcp_omnifocus.utils.metrics"):
+        metrics.record_call({"total": 50}, 10, 10, script="fast()")
+        metrics.record_call({"total": 150, "evaluate": 120}, 10, 20, script="slow({})")
+
+    [record] = caplog.records
+    logged = json.loads(record.getMessage().removeprefix("Slow OmniFocus call: "))
+    assert logged["timings_ms"] == {"total": 150, "evaluate": 120}
+    assert logged["call"] == "slow({})"
+    assert logged["tool"] == "none"
@@ -0,0 +1,116 @@
+import pytest
+
+from mcp_omnifocus.utils.mirror import Mirror, match_expression
+
+
+@pytest.fixture
+def mirror(sample_database):
+    sample_database["tasks"].append(
+        {"id": "e", "name": "Pick up parcel", "note": "Ask about the milk delivery", "tags": ["t2"]}
+    )
+    mirror = Mirror()
+    mirror.refresh()
+    yield mirror
+    mirror.close()
+
+
+def test_search_ranks_names_above_notes(mirror):
+    """Test that a match in the name ranks above a match in the note, with snippets of the match."""
+    results = mirror.search_tasks("milk")
+
+    assert [task["id"] for task in results] == ["a", "e"]
+    assert results[0]["score"] > results[1]["score"]
+    assert results[0]["snippet"] == "Buy [milk]"
+    assert "[milk]" in results[1]["snippet"]
+
+
+def test_search_matches_prefixes_and_all_words(mirror):
+    """Test that words match longer words they start with, and every word has to match."""
+    assert [task["id"] for task in mirror.search_tasks("quart numb")] == ["b"]
+    assert mirror.search_tasks("milk report") == []
+
+
+def test_search_filters(mirror):
+    """Test that completed tasks are left out unless asked for, and results can be limited to a project or tag."""
+    assert mirror.search_tasks("chore") == []
+    assert [task["id"] for task in mirror.search_tasks("chore", include_completed=True)] == ["d"]
+    assert [task["id"] for task in mirror.search_tasks("milk", project_id="p1")] == ["a"]
+    assert [task["id"] for task in mirror.search_tasks("milk", tag_id="t2")] == ["a", "e"]
+    assert mirror.search_tasks("milk", tag_id="t1") == []
+
+
+def test_search_fields(mirror):
+    """Test that search results are projected to the requested fields."""
+    [task] = mirror.search_tasks("plumber", fields=["id", "tagIds"])
+
+    assert set(task) == {"id", "tagIds", "score", "snippet"}
+    assert task["tagIds"] == ["t1"]
+    assert task["snippet"] == "Call [plumber]"
+
+
+@pytest.mark.parametrize("text", ['"unbalanced', "milk AND OR", "NEAR(", "*", "", "col:umn"])
+def test_search_text_is_not_query_syntax(mirror, text):
+    """Test that FTS5 operators and punctuation in the search text are treated as plain words."""
+    mirror.search_tasks(text)
+
+
+def test_match_expression():
+    """Test that every word of the text becomes a quoted prefix query."""
+    assert match_expression("Buy  milk!") == '"Buy"* "milk"*'
+    assert match_expression("  ") is None
+
+
+def test_refresh_updates_index(mirror, sample_database):
+    """Test that changed and deleted tasks are reindexed on refresh."""
+    sample_database["tasks"][0].update(name="Buy oat drink", modified="2100-01-01T00:00:00Z")
+    del sample_database["tasks"][2]
+    summary = mirror.refresh()
+
+    assert summary["tasks"]["removed"] == 1
+    assert [task["id"] for task in mirror.search_tasks("milk")] == ["e"]
+    assert [task["id"] for task in mirror.search_tasks("oat")] == ["a"]
+    assert mirror.search_tasks("plumber") == []
+
+
+def test_mirror_survives_restart_and_rebuilds(sample_database, tmp_path):
+    """Test that a mirror kept in a file is searchable after reopening, and can be rebuilt from scratch."""
+    path = str(tmp_path / "mirror.db")
+    first = Mirror(path)
+    first.refresh()
+    first.close()
+
+    sample_database["tasks"].clear()
+    reopened = Mirror(path)
+    assert reopened.watermark == first.watermark
+    assert [task["id"] for task in reopened.search_tasks("plumber")] == ["c"]
+
+    summary = reopened.rebuild()
+    assert summary["tasks"] == {"added": 0, "updated": 0, "removed": 0}
+    assert reopened.search_tasks("plumber") == []
+    reopened.close()
+
+
+def test_refresh_if_stale(mirror, sample_database):
+    """Test that the mirror is only refreshed when it is old or a write happened."""
+    sample_database["tasks"][0].update(name="Buy bread", modified="2100-01-01T00:00:00Z")
+
+    mirror.refresh_if_stale(max_age=60)
+    assert mirror.search_tasks("bread") == []
+
+    mirror.mark_stale()
+    mirror.refresh_if_stale(max_age=60)
+    assert [task["id"] for task in mirror.search_tasks("bread")] == ["a"]
+
+
+def test_search_results_have_current_tag_names(sample_database):
+    """Test that search results carry the current name of a renamed tag, although their tasks were not modified."""
+    for record in sample_database["tasks"] + sample_database["projects"]:
+        record["modified"] = "2020-01-01T00:00:00Z"
+    mirror = Mirror()
+    mirror.refresh()
+
+    sample_database["tags"][0]["name"] = "Chores"
+    mirror.refresh()
+
+    assert mirror.search_tasks("plumber", fields=["tags"])[0]["tags"] == ["Chores"]
+    mirror.close()
@@ -0,0 +1,229 @@
+import re
+import zipfile
+
+import pytest
+
+from mcp_omnifocus.utils import omnifocus
+from mcp_omnifocus.utils.ofocus import DatabaseUnreadableError, OFocusDatabase
+
+BASE = "00000000000000=base+first.zip"
+DELTA = "20250102100000=first+second.zip"
+
+# The sample database of conftest.py as OmniFocus saves it
+SAMPLE = """
+<folder id="f1"><name>Areas</name><rank>1</rank></folder>
+<context id="t1"><name>Errands</name><rank>1</rank></context>
+<context id="t2"><context idref="t1"/><name>Shops</name><rank>1</rank></context>
+<task id="p1"><name>Home</name><rank>1</rank><project><folder idref="f1"/><status>active</status></project></task>
+<task id="p2"><name>Work</name><rank>2</rank><project><folder idref="f1"/><status>active</status></project></task>
+<task id="a"><task idref="p1"/><name>Buy milk</name><rank>1</rank><due>2100-01-02T10:00:00.000Z</due></task>
+<task id="b">
+  <task idref="p2"/><name>Write report</name><rank>1</rank><flagged>true</flagged>
+  <note><text><p><run><lit>Quarterly numbers</lit></run></p></text></note>
+</task>
+<task id="c"><inbox>true</inbox><name>Call plumber</name><rank>1</rank></task>
+<task id="d"><task idref="p1"/><name>Old chore</name><rank>2</rank><completed>2025-01-01T09:00:00.000Z</completed></task>
+<task-to-tag id="a.t2"><task idref="a"/><context idref="t2"/></task-to-tag>
+<task-to-tag id="c.t1"><task idref="c"/><context idref="t1"/></task-to-tag>
+"""
+
+
+def write_transaction(bundle, name, elements):
+    """Save a transaction with the given XML elements into a bundle, as OmniFocus does."""
+    bundle.mkdir(exist_ok=True)
+    with zipfile.ZipFile(bundle / name, "w") as archive:
+        archive.writestr(
+            "contents.xml",
+            '<?xml version="1.0" encoding="utf-8" standalone="no"?>\n'
+            f'<omnifocus xmlns="http://www.omnigroup.com/namespace/OmniFocus/v2">{elements}</omnifocus>',
+        )
+
+
+@pytest.fixture
+def bundle(tmp_path, monkeypatch):
+    """An .ofocus bundle with the sample database, read by the omnifocus functions."""
+    path = tmp_path / "OmniFocus.ofocus"
+    write_transaction(path, BASE, SAMPLE)
+    omnifocus.snapshot_cache.clear()
+    monkeypatch.setattr(omnifocus, "database", OFocusDatabase(path))
+    yield path
+    omnifocus.snapshot_cache.clear()
+
+
+@pytest.fixture
+def no_scripts(monkeypatch):
+    """Fail every script, to check that reads are answered from the bundle."""
+
+    def evaluate_javascript(script, args=None, library=None):
+        raise AssertionError("A script was run in OmniFocus")
+
+    monkeypatch.setattr(omnifocus, "evaluate_javascript", evaluate_javascript)
+    monkeypatch.setattr(omnifocus, "evaluate_javascript_stream", evaluate_javascript)
+
+
+def without_zone_names(records):
+    """Drop the zone names of dates, which JavaScript and Python name differently."""
+    return [
+        {
+            key: re.sub(r" \(.*\)$", "", value) if key.endswith("Date") and value else value
+            for key, value in record.items()
+        }
+        for record in records
+    ]
+
+
+def test_same_records_as_omnifocus(sample_database, bundle):
+    """Test that the bundle gives the records OmniFocus gives for the same database."""
+    sample_database["tasks"][0]["dueDate"] = "2100-01-02T10:00:00Z"
+    database = omnifocus.database
+    fields = list(omnifocus.TaskField.__args__)
+    from_bundle = {
+        "tasks": omnifocus.list_tasks(fields=fields),
+        "projects": omnifocus.list_projects(),
+        "tags": omnifocus.list_tags(fields=["id", "name", "fullName", "parentId"]),
+        "task": omnifocus.get_task("b"),
+    }
+    omnifocus.snapshot_cache.clear()
+    omnifocus.database = None
+    from_omnifocus = {
+        "tasks": omnifocus.list_tasks(fields=fields),
+        "projects": omnifocus.list_projects(),
+        "tags": omnifocus.list_tags(fields=["id", "name", "fullName", "parentId"]),
+        "task": omnifocus.get_task("b"),
+    }
+    omnifocus.database = database
+
+    for records in (from_bundle, from_omnifocus):
+        records["tasks"] = without_zone_names(sorted(records["tasks"], key=lambda task: task["id"]))
+        for task in records["tasks"]:
+            # The fake OmniFocus has no added and modified dates, nor statuses depending on them
+            task.update(added=None, modified=None, status=task["status"] if task["completed"] else "Available")
+    assert from_bundle == from_omnifocus
+
+
+def test_transactions_are_applied_in_order(bundle, no_scripts):
+    """Test that later transactions update, add and delete the objects of earlier ones."""
+    write_transaction(
+        bundle,
+        DELTA,
+        """
+        <task id="a" op="update"><task idref="p1"/><name>Buy oat milk</name><rank>1</rank></task>
+        <task id="b" op="delete"/>
+        <task id="p2" op="reference"/>
+        <task id="e"><task idref="p2"/><name>Plan week</name><rank>2</rank></task>
+        <context id="t3"><context idref="t2"/><name>Bakery</name><rank>2</rank></context>
+        """,
+    )
+
+    tasks = omnifocus.list_tasks(fields=["id", "name", "projectName", "tags"])
+    assert tasks == [
+        {"id": "c", "name": "Call plumber", "projectName": None, "tags": ["Errands"]},
+        {"id": "a", "name": "Buy oat milk", "projectName": "Home", "tags": ["Shops"]},
+        {"id": "d", "name": "Old chore", "projectName": "Home", "tags": []},
+        {"id": "e", "name": "Plan week", "projectName": "Work", "tags": []},
+    ]
+    assert [tag["fullName"] for tag in omnifocus.list_tags()] == [
+        "Errands",
+        "Errands : Shops",
+        "Errands : Shops : Bakery",
+    ]
+    assert [task["id"] for task in omnifocus.list_tasks_by_project("p2")] == ["e"]
+    assert [task["id"] for task in omnifocus.list_tasks_by_tag("t1", include_descendants=True)] == ["c", "a"]
+    assert [task["id"] for task in omnifocus.list_tasks_by_tag("t2", task_status=["Completed"])] == []
+
+    page = omnifocus.list_tasks(limit=3, fields=["name"])
+    assert page["tasks"] == [{"name": "Call plumber"}, {"name": "Buy oat milk"}, {"name": "Old chore"}]
+    assert omnifocus.list_tasks(cursor=page["next_cursor"], fields=["name"])["tasks"] == [{"name": "Plan week"}]
+
+
+def test_only_new_transactions_are_parsed(bundle, monkeypatch):
+    """Test that reading again parses only the transactions saved since the last read."""
+    database = OFocusDatabase(bundle)
+    parsed = []
+    parse = database._parse
+    monkeypatch.setattr(database, "_parse", lambda name: parsed.append(name) or parse(name))
+    assert len(database.tasks()) == 4
+
+    write_transaction(bundle, DELTA, '<task id="e"><inbox>true</inbox><name>New</name><rank>2</rank></task>')
+    assert len(database.tasks()) == 5
+    assert parsed == [BASE, DELTA]
+
+
+def test_statuses(tmp_path):
+    """Test that statuses follow the dates, sequential order and project states in the bundle."""
+    write_transaction(
+        tmp_path / "OmniFocus.ofocus",
+        BASE,
+        """
+        <task id="p1"><name>Steps</name><rank>1</rank><order>sequential</order><project/></task>
+        <task id="p2"><name>Someday</name><rank>2</rank><project><status>inactive</status></project></task>
+        <task id="first"><task idref="p1"/><name>First</name><rank>1</rank></task>
+        <task id="second"><task idref="p1"/><name>Second</name><rank>2</rank></task>
+        <task id="held"><task idref="p2"/><name>Held</name><rank>1</rank></task>
+        <task id="late"><inbox>true</inbox><name>Late</name><rank>1</rank><due>2000-01-01T00:00:00.000Z</due></task>
+        <task id="later"><inbox>true</inbox><name>Later</name><rank>2</rank><start>2100-01-01T00:00:00</start></task>
+        <task id="gone"><inbox>true</inbox><name>Gone</name><rank>3</rank><hidden>2025-01-01T00:00:00.000Z</hidden></task>
+        """,
+    )
+    database = OFocusDatabase(tmp_path / "OmniFocus.ofocus")
+
+    statuses = {task["id"]: task["status"] for task in database.tasks()}
+    assert statuses == {
+        "late": "Overdue",
+        "later": "Blocked",
+        "gone": "Dropped",
+        "first": "Next",
+        "second": "Blocked",
+        "held": "Blocked",
+    }
+    assert [project["status"] for project in database.projects()] == ["Active", "OnHold"]
+    assert database.task("gone")["dropped"] is True
+
+
+def test_encrypted_database_falls_back_to_omnifocus(sample_database, bundle):
+    """Test that an encrypted bundle is not read, the functions then ask OmniFocus."""
+    (bundle / "encrypted").write_text("")
+    with pytest.raises(DatabaseUnreadableError, match="encrypted"):
+        omnifocus.database.tasks()
+    # Only OmniFocus has the due date of the sample database
+    assert omnifocus.get_task("a")["dueDate"].startswith("Thu Jan 02 2025")
+
+
+def test_unreadable_transaction_falls_back_to_omnifocus(sample_database, bundle):
+    """Test that a transaction that is not a zipped contents.xml has the functions ask OmniFocus."""
+    (bundle / DELTA).write_bytes(b"not a zip file")
+    assert [project["id"] for project in omnifocus.list_projects()] == ["p1", "p2"]
+    with pytest.raises(DatabaseUnreadableError, match=re.escape(DELTA)):
+        omnifocus.database.projects()
+
+
+@pytest.mark.parametrize(
+    "element",
+    [
+        '<task id="e"><inbox>true</inbox><name>New</name><rank>1</rank><due>next week</due></task>',
+        '<task id="e"><inbox>true</inbox><name>New</name><rank>first</rank></task>',
+    ],
+)
+def test_malformed_value_falls_back_to_omnifocus(sample_database, bundle, element):
+    """Test that a transaction with a date or rank that does not parse has the functions ask OmniFocus."""
+    write_transaction(bundle, DELTA, element)
+    with pytest.raises(DatabaseUnreadableError, match=re.escape(DELTA)):
+        omnifocus.database.tasks()
+    assert [task["id"] for task in omnifocus.list_inbox()] == ["c"]
+
+
+def test_missing_task_is_asked_from_omnifocus(sample_database, bundle):
+    """Test that tasks OmniFocus has not saved to the bundle yet are read from OmniFocus."""
+    sample_database["tasks"].append({"id": "e", "name": "Just added"})
+    assert omnifocus.get_task("e")["name"] == "Just added"
+
+
+def test_writes_wait_for_omnifocus_to_save(sample_database, bundle, no_scripts, monkeypatch):
+    """Test that after a write the bundle is only read again once OmniFocus saved a transaction."""
+    omnifocus.list_projects()
+    omnifocus.database.expect_change()
+    with pytest.raises(DatabaseUnreadableError, match="not saved"):
+        omnifocus.database.projects()
+
+    write_transaction(bundle, DELTA, '<task id="p2" op="update"><name>Office</name><rank>2</rank><project/></task>')
+    assert [project["name"] for project in omnifocus.database.projects()] == ["Home", "Office"]
@@ -1,6 +1,19 @@
 import pytest
 
-from mcp_omnifocus.utils.omnifocus import list_perspectives, list_projects, list_tags, list_tasks
+from mcp_omnifocus.utils import omnifocus
+from mcp_omnifocus.utils.omnifocus import (
+    batch_update_tasks,
+    create_task,
+    get_task,
+    import_outline,
+    list_perspectives,
+    list_projects,
+    list_tags,
+    list_tasks,
+    list_tasks_by_project,
+    paginate,
+    update_task,
+)
 from mcp_omnifocus.utils.scripting import run_jxa_script
 
 
@@ -72,3 +85,191 @@ def test_list_tasks():
         isinstance(task["id"], str) and isinstance(task["name"], str) and isinstance(task["status"], str)
         for task in tasks
     )
+
+
+def test_update_task_quotes_values(sample_database):
+    """Test that update_task passes names and notes with quotes and newlines through intact."""
+    task = update_task("c", task_name='Call "Joe\'s" plumber', task_note="line one\nline `two` ${x}")
+
+    assert task["name"] == 'Call "Joe\'s" plumber'
+    assert task["note"] == "line one\nline `two` ${x}"
+
+
+def test_create_task_quotes_values(sample_database):
+    """Test that create_task passes names and notes with quotes and backslashes through intact."""
+    task = create_task('Fix "the" \\ back\'slash', task_note="a `b` ${c}\n")
+
+    assert task["name"] == 'Fix "the" \\ back\'slash'
+    assert task["note"] == "a `b` ${c}\n"
+
+
+def test_batch_update_tasks(sample_database):
+    """Test that a batch applies every operation and reports failures per item."""
+    results = batch_update_tasks(
+        [
+            {"task_id": "a", "action": "complete"},
+            {"task_id": "missing", "action": "drop"},
+            {"task_id": "c", "action": "move", "project_id": "p2"},
+            {"task_id": "b", "action": "update", "flagged": False, "tag_ids": ["t1"]},
+            {"task_id": "c", "action": "move", "project_id": "nope"},
+        ]
+    )
+
+    assert [result["success"] for result in results] == [True, False, True, True, False]
+    assert [result["task_id"] for result in results] == ["a", "missing", "c", "b", "c"]
+    assert results[0]["task"]["completed"] is True
+    assert "Could not find task" in results[1]["error"]
+    assert results[2]["task"]["projectName"] == "Work"
+    assert results[3]["task"]["flagged"] is False
+    assert results[3]["task"]["tags"] == ["Errands"]
+    assert "Could not find project" in results[4]["error"]
+
+
+def test_import_outline(sample_database, monkeypatch):
+    """Test that an outline is created with its hierarchy in one script, with the ids in the order of the outline."""
+    evaluate = omnifocus.evaluate_javascript
+    scripts = []
+
+    def evaluate_and_describe(script, args=None, library=None):
+        # Changes are not persisted, so the script describes the tasks before it ends
+        scripts.append(script)
+        described = (
+            f"args => ({{ result: ({script.strip()})(args), tasks: flattenedTasks.map(task => ({{"
+            "name: task.name, parent: task.parent ? task.parent.name : null, "
+            "project: task.containingProject ? task.containingProject.name : null, "
+            "tags: task.tags.map(tag => tag.name), flagged: task.flagged, completed: task.completed }))})"
+        )
+        output = evaluate(described, args, library)
+        scripts.append(output["tasks"])
+        return output["result"]
+
+    monkeypatch.setattr(omnifocus, "evaluate_javascript", evaluate_and_describe)
+    results = import_outline(
+        "- Call back @Errands\nHome:\n- Fix shelf @flagged\n\t- Buy screws @Hardware @done\nGarden:\n- Mow"
+    )
+
+    assert [(result["kind"], result["name"], result["created"]) for result in results] == [
+        ("task", "Call back", True),
+        ("project", "Home", False),
+        ("task", "Fix shelf", True),
+        ("task", "Buy screws", True),
+        ("project", "Garden", True),
+        ("task", "Mow", True),
+    ]
+    assert results[1]["id"] == "p1" and all(result["id"] and result["error"] is None for result in results)
+    assert len(scripts) == 2
+    created = {task["name"]: task for task in scripts[1]}
+    assert created["Call back"] == {
+        "name": "Call back",
+        "parent": None,
+        "project": None,
+        "tags": ["Errands"],
+        "flagged": False,
+        "completed": False,
+    }
+    assert (created["Fix shelf"]["project"], created["Fix shelf"]["flagged"]) == ("Home", True)
+    assert created["Buy screws"] == {
+        "name": "Buy screws",
+        "parent": "Fix shelf",
+        "project": "Home",
+        "tags": ["Hardware"],
+        "flagged": False,
+        "completed": True,
+    }
+    assert created["Mow"]["project"] == "Garden"
+
+
+def test_import_outline_chunks(monkeypatch):
+    """Test that large outlines are imported in chunks, nested items referring to earlier chunks by id."""
+    payloads = []
+
+    def evaluate_javascript(script, args=None, library=None):
+        payloads.append(args["items"])
+        start = sum(len(payload) for payload in payloads[:-1])
+        return [
+            {"id": None, "created": False, "error": "failed"}
+            if item["name"] == "Broken"
+            else {"id": f"id{start + index}", "created": True, "error": None}
+            for index, item in enumerate(args["items"])
+        ]
+
+    monkeypatch.setattr(omnifocus, "evaluate_javascript", evaluate_javascript)
+    results = import_outline("Home:\n- One\n\t- Two\n- Broken\n\t- Three\n\t- Four", chunk_size=2)
+
+    assert [len(payload) for payload in payloads] == [2, 2, 2]
+    assert [result["id"] for result in results] == ["id0", "id1", "id2", None, "id4", "id5"]
+    assert (payloads[0][1]["parentIndex"], payloads[0][1]["parentId"]) == (0, None)
+    assert payloads[1][0] == {**payloads[1][0], "parentIndex": None, "parentId": "id1", "parentKind": "task"}
+    assert payloads[1][1] == {**payloads[1][1], "parentIndex": None, "parentId": "id0", "parentKind": "project"}
+    assert payloads[2][0]["parentFailed"] and payloads[2][1]["parentFailed"]
+
+
+def test_batch_update_tasks_empty():
+    """Test that an empty batch does not run a script."""
+    assert batch_update_tasks([]) == []
+
+
+def test_list_tasks_pages(sample_database):
+    """Test that list_tasks returns pages that can be followed to the end."""
+    first = list_tasks(limit=3)
+    assert [task["id"] for task in first["tasks"]] == ["a", "b", "c"]
+    assert first["total"] == 4
+
+    second = list_tasks(limit=3, cursor=first["next_cursor"])
+    assert [task["id"] for task in second["tasks"]] == ["d"]
+    assert second["next_cursor"] is None
+
+
+def test_list_tasks_cursor_survives_edits(sample_database):
+    """Test that a cursor continues after its last task even if tasks were added before it."""
+    first = list_tasks(limit=2)
+    sample_database["tasks"].insert(0, {"id": "z", "name": "Inserted"})
+
+    second = list_tasks(limit=2, cursor=first["next_cursor"])
+    assert [task["id"] for task in second["tasks"]] == ["c", "d"]
+
+
+def test_list_tasks_by_project_pages(sample_database):
+    """Test that status filtering happens before paging."""
+    page = list_tasks_by_project("p1", task_status=["Available"], limit=5)
+
+    assert [task["id"] for task in page["tasks"]] == ["a"]
+    assert page["total"] == 1
+    assert page["next_cursor"] is None
+
+
+def test_invalid_page_arguments():
+    """Test that invalid limits and cursors are rejected before a script is run."""
+    with pytest.raises(ValueError, match="limit"):
+        list_tasks(limit=0)
+    with pytest.raises(ValueError, match="cursor"):
+        list_tasks(cursor="not a cursor")
+
+
+def test_paginate_matches_list_tasks(sample_database):
+    """Test that paging a task list in memory gives the same pages and cursors."""
+    tasks = list_tasks()
+    page = paginate(tasks, limit=3)
+
+    assert page == list_tasks(limit=3)
+    assert paginate(tasks, limit=3, cursor=page["next_cursor"]) == list_tasks(limit=3, cursor=page["next_cursor"])
+
+
+def test_list_tasks_fields(sample_database):
+    """Test that only the requested task fields are returned."""
+    tasks = list_tasks(fields=["id", "tagIds", "projectId"])
+
+    assert tasks[0] == {"id": "a", "tagIds": ["t2"], "projectId": "p1"}
+    assert get_task("b", fields=["name", "note"]) == {"name": "Write report", "note": "Quarterly numbers"}
+
+
+def test_list_projects_and_tags_fields(sample_database):
+    """Test that project and tag fields can be projected too."""
+    assert list_projects(fields=["name"]) == [{"name": "Home"}, {"name": "Work"}]
+    assert list_tags(fields=["id", "parentId"]) == [{"id": "t1", "parentId": None}, {"id": "t2", "parentId": "t1"}]
+
+
+def test_invalid_fields():
+    """Test that unknown fields are rejected before a script is run."""
+    with pytest.raises(ValueError, match="Invalid fields"):
+        list_tasks(fields=["id", "nope"])
@@ -0,0 +1,93 @@
+import pytest
+
+from mcp_omnifocus.utils.outline import parse_outline
+
+TASKPAPER = """\
+- Call plumber @errands
+Home:
+- Buy milk @tags(Errands, Shops) @due(2025-01-02)
+- Fix the shelf @flagged
+\tNeeds longer screws
+\tand a drill
+\t- Buy screws @defer(2025-01-01 09:00) @estimate(30m)
+\tTools:
+\t\t- Borrow a drill @done(2025-01-01)
+Work: @flagged
+- Write report
+"""
+
+MARKDOWN = """\
+# Home
+- [ ] Buy milk @Errands @due(2025-01-02T08:30)
+- [ ] Fix the shelf
+  Needs longer screws
+  - [x] Buy screws
+1. Water plants
+
+## Work
+* Write report
+"""
+
+
+def summary(items):
+    return [(item["kind"], item["name"], item["parent"]) for item in items]
+
+
+def test_taskpaper():
+    """Test that TaskPaper projects, nested tasks, notes and attributes are read."""
+    items = parse_outline(TASKPAPER)
+
+    assert summary(items) == [
+        ("task", "Call plumber", None),
+        ("project", "Home", None),
+        ("task", "Buy milk", 1),
+        ("task", "Fix the shelf", 1),
+        ("task", "Buy screws", 3),
+        ("task", "Tools", 3),
+        ("task", "Borrow a drill", 5),
+        ("project", "Work", None),
+        ("task", "Write report", 7),
+    ]
+    assert items[0]["tags"] == ["errands"]
+    assert items[2]["tags"] == ["Errands", "Shops"]
+    assert items[2]["due_date"] == "2025-01-02T17:00:00"
+    assert items[3]["flagged"] and items[3]["note"] == "Needs longer screws\nand a drill"
+    assert items[4]["defer_date"] == "2025-01-01T09:00:00" and items[4]["tags"] == []
+    assert items[6]["completed"] and items[6]["tags"] == []
+    assert items[7]["flagged"]
+
+
+def test_markdown():
+    """Test that Markdown headings, checkboxes and list items are read."""
+    items = parse_outline(MARKDOWN)
+
+    assert summary(items) == [
+        ("project", "Home", None),
+        ("task", "Buy milk", 0),
+        ("task", "Fix the shelf", 0),
+        ("task", "Buy screws", 2),
+        ("task", "Water plants", 0),
+        ("project", "Work", None),
+        ("task", "Write report", 5),
+    ]
+    assert items[1]["tags"] == ["Errands"] and items[1]["due_date"] == "2025-01-02T08:30:00"
+    assert items[2]["note"] == "Needs longer screws"
+    assert items[3]["completed"] and not items[2]["completed"]
+
+
+def test_syntax_is_detected():
+    """Test that lines only one of the syntaxes reads as items are read as the detected syntax."""
+    assert summary(parse_outline("Home:\n- Buy milk")) == [("project", "Home", None), ("task", "Buy milk", 0)]
+    assert summary(parse_outline("Home:\n- [ ] Buy milk")) == [("task", "Buy milk", None)]
+    assert parse_outline("Home:\n- [ ] Buy milk")[0]["note"] is None
+    assert summary(parse_outline("Home:\n- Buy milk", syntax="markdown")) == [("task", "Buy milk", None)]
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [("- Buy milk @due(tomorrow)", "Invalid date"), ("- @flagged", "needs a name")],
+)
+def test_invalid_items(text, message):
+    """Test that dates that are not ISO dates and items without a name are rejected."""
+    with pytest.raises(ValueError, match=message):
+        parse_outline(text)
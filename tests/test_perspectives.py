@@ -0,0 +1,136 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from mcp_omnifocus.utils import omnifocus, perspectives
+from mcp_omnifocus.utils.omnifocus import list_perspective_tasks, perspective_index
+from mcp_omnifocus.utils.scripting import JXAScriptError
+
+
+@pytest.fixture
+def perspective_database(fake_omnifocus):
+    now = datetime.now().astimezone()
+    fake_omnifocus["projects"] = [{"id": "p1", "name": "Home", "status": "Active"}]
+    fake_omnifocus["tags"] = [{"id": "t1", "name": "Errands"}, {"id": "t2", "name": "Waiting"}]
+    fake_omnifocus["tasks"] = [
+        {"id": "a", "name": "Buy milk", "tags": ["t1"]},
+        {"id": "b", "name": "Sort receipts"},
+        {"id": "b1", "name": "Find receipts", "parent": "b"},
+        {"id": "c", "name": "Old note", "status": "Completed"},
+        {"id": "d", "name": "Fix gate", "project": "p1", "flagged": True, "dueDate": now.isoformat()},
+        {"id": "e", "name": "Paint fence", "project": "p1", "flagged": True, "status": "Blocked"},
+        {"id": "f", "name": "Call plumber", "project": "p1", "tags": ["t2"], "note": "about the leak"},
+        {"id": "g", "name": "Renew passport", "project": "p1", "dueDate": (now + timedelta(days=30)).isoformat()},
+    ]
+    fake_omnifocus["perspectives"] = [
+        {"name": "Errands", "rules": [{"actionHasAnyOfTags": ["t1", "t2"]}], "aggregation": "all"},
+        {"name": "Leaks", "rules": [{"actionMatchingSearch": ["LEAK"]}], "aggregation": "all"},
+        {"name": "Today", "rules": [{"actionDateIsToday": "due"}], "aggregation": "all"},
+    ]
+    return fake_omnifocus
+
+
+def ids(tasks: list[dict]) -> list[str]:
+    return [task["id"] for task in tasks]
+
+
+def test_built_in_perspectives(perspective_database):
+    """Test that Inbox, Flagged and Forecast are listed from the database, without a window."""
+    assert ids(list_perspective_tasks("Inbox", fields=["id"])) == ["a", "b1"]
+    assert ids(list_perspective_tasks("flagged", fields=["id"])) == ["d"]
+    assert ids(list_perspective_tasks("Forecast", fields=["id"])) == ["d"]
+
+    page = list_perspective_tasks("Inbox", limit=1, fields=["id"])
+    assert ids(page["tasks"]) == ["a"]
+    assert page["total"] == 2
+
+
+def test_custom_perspectives(perspective_database):
+    """Test that custom perspectives are listed through their filter rules."""
+    assert ids(list_perspective_tasks("Errands", fields=["id"])) == ["a", "f"]
+    assert ids(list_perspective_tasks("leaks", fields=["id"])) == ["f"]
+
+
+def test_window_fallback(perspective_database):
+    """Test that perspectives that cannot be described as filters go through the window path."""
+    with pytest.raises(JXAScriptError, match="No OmniFocus window is open to show perspective: Today"):
+        list_perspective_tasks("Today")
+    with pytest.raises(JXAScriptError, match="No OmniFocus window is open to show perspective: Review"):
+        list_perspective_tasks("Review")
+    with pytest.raises(JXAScriptError, match="Could not find perspective: Nope"):
+        list_perspective_tasks("Nope")
+
+
+def test_headless_perspectives_disabled(perspective_database, monkeypatch):
+    """Test that every perspective goes through the window when headless evaluation is turned off."""
+    monkeypatch.setattr(omnifocus, "headless_perspectives", False)
+    with pytest.raises(JXAScriptError, match="No OmniFocus window is open"):
+        list_perspective_tasks("Inbox")
+
+
+def test_perspective_index(perspective_database):
+    """Test that the perspectives are looked up by name once and cached."""
+    index = perspective_index()
+    perspective_database["perspectives"] = []
+
+    assert perspective_index() is index
+    assert index["INBOX"] == {"name": "Inbox", "custom": False}
+    assert index["ERRANDS"]["rules"] == [{"actionHasAnyOfTags": ["t1", "t2"]}]
+
+
+def test_forecast_view():
+    """Test that the Forecast covers the remaining tasks due yesterday and today."""
+    source, expression = perspectives.built_in_view("Forecast", today=date(2025, 3, 10))
+    assert source == "tasks"
+    assert expression["and"][1:] == [
+        {"field": "dueDate", "op": "gte", "value": "2025-03-09"},
+        {"field": "dueDate", "op": "lt", "value": "2025-03-11"},
+    ]
+    assert perspectives.built_in_view("Projects") is None
+
+
+@pytest.mark.parametrize(
+    ("rules", "aggregation", "expected"),
+    [
+        ([], "all", None),
+        ([{"actionAvailability": "available"}], None, {"and": [perspectives._AVAILABILITY["available"]]}),
+        (
+            [{"actionStatus": "flagged"}, {"actionHasNoProject": True}],
+            "any",
+            {
+                "or": [
+                    {"field": "flagged", "op": "eq", "value": True},
+                    {"field": "projectId", "op": "exists", "value": False},
+                ]
+            },
+        ),
+        (
+            [{"aggregateType": "none", "aggregateRules": [{"actionHasAllOfTags": ["t1"]}]}, {"disabledRule": {}}],
+            "all",
+            {"and": [{"not": {"or": [{"and": [{"field": "tagIds", "op": "has", "value": "t1"}]}]}}]},
+        ),
+        (
+            [{"actionIsLeaf": True}, {"actionHasDueDate": True}],
+            "all",
+            {"and": [{"field": "dueDate", "op": "exists", "value": True}]},
+        ),
+    ],
+)
+def test_custom_view(rules, aggregation, expected):
+    """Test the translation of filter rules into task filters."""
+    assert perspectives.custom_view(rules, aggregation) == ("tasks", expected)
+
+
+@pytest.mark.parametrize(
+    ("rules", "aggregation"),
+    [
+        (None, None),
+        ([{"actionWithinFocus": ["f1"]}], "all"),
+        ([{"actionAvailability": "firstAvailable"}], "all"),
+        ([{"actionIsLeaf": True}], "any"),
+        ([], "any"),
+    ],
+)
+def test_custom_view_unsupported(rules, aggregation):
+    """Test that rules without an equivalent filter leave the perspective to the window path."""
+    assert perspectives.custom_view(rules, aggregation) is None
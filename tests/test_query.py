@@ -0,0 +1,205 @@
+import random
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from mcp_omnifocus.utils import query
+from mcp_omnifocus.utils.omnifocus import list_tasks, query_tasks, task_stats
+from mcp_omnifocus.utils.query import QueryError, compile_predicate, evaluate, validate, validate_sort
+
+TAGS = [
+    {"id": "t1", "name": "Errands"},
+    {"id": "t2", "name": "Shops", "parent": "t1"},
+    {"id": "t3", "name": "Hardware", "parent": "t2"},
+    {"id": "t4", "name": "Waiting"},
+]
+PROJECTS = [{"id": "p1", "name": "Home"}, {"id": "p2", "name": "Work"}]
+DATES = ["2025-01-01T09:00:00Z", "2025-03-15T12:00:00Z", "2025-06-30T18:00:00Z"]
+WORDS = ["milk", "report", "Plumber", "garden", "call"]
+
+
+def random_task(rng: random.Random, index: int) -> dict:
+    return {
+        "id": f"task{index}",
+        "name": " ".join(rng.sample(WORDS, 2)),
+        "note": rng.choice(["", "", "see the Report", "buy milk"]),
+        "project": rng.choice([None, "p1", "p2"]),
+        "status": rng.choice(["Available", "Blocked", "Next", "Completed", "Dropped", "Overdue"]),
+        "flagged": rng.random() < 0.3,
+        "dueDate": rng.choice([None] + DATES),
+        "deferDate": rng.choice([None] + DATES),
+        "tags": rng.sample([tag["id"] for tag in TAGS], rng.randint(0, 2)),
+    }
+
+
+def random_filter(rng: random.Random, depth: int = 0) -> dict:
+    if depth < 2 and rng.random() < 0.4:
+        kind = rng.choice(["and", "or", "not"])
+        if kind == "not":
+            return {"not": random_filter(rng, depth + 1)}
+        return {kind: [random_filter(rng, depth + 1) for _ in range(rng.randint(1, 3))]}
+    return rng.choice(
+        [
+            {"field": "name", "op": "contains", "value": rng.choice(WORDS).upper()},
+            {"field": "name", "op": "startswith", "value": rng.choice(WORDS)},
+            {"field": "note", "op": "exists", "value": rng.random() < 0.5},
+            {"field": "projectName", "op": "eq", "value": rng.choice(["home", "Work"])},
+            {"field": "projectId", "op": "exists", "value": False},
+            {"field": "status", "op": "in", "value": rng.sample(query.STATUSES, 2)},
+            {"field": "flagged", "op": "eq", "value": True},
+            {"field": "completed", "op": "eq", "value": False},
+            {"field": "dueDate", "op": rng.choice(["lt", "lte", "gt", "gte"]), "value": rng.choice(DATES)},
+            {"field": "deferDate", "op": "exists", "value": True},
+            {"field": "tagIds", "op": "has", "value": rng.choice(TAGS)["id"]},
+            {"field": "tagIds", "op": "has_any", "value": ["t3", "t4"]},
+            {"field": "tagIds", "op": "in_subtree", "value": rng.choice(["t1", "t2", "t9"])},
+        ]
+    )
+
+
+def to_record(task: dict) -> dict:
+    """Convert a fake OmniFocus task into the record shape read by the local evaluator."""
+
+    def millis(value):
+        return int(datetime.fromisoformat(value).timestamp() * 1000) if value else None
+
+    project = next((project for project in PROJECTS if project["id"] == task["project"]), None)
+    return {
+        "name": task["name"],
+        "note": task["note"],
+        "projectName": project["name"] if project else None,
+        "projectId": task["project"],
+        "status": task["status"],
+        "flagged": task["flagged"],
+        "completed": task["status"] == "Completed",
+        "dropped": task["status"] == "Dropped",
+        "dueDate": millis(task["dueDate"]),
+        "deferDate": millis(task["deferDate"]),
+        "added": None,
+        "modified": None,
+        "tagIds": task["tags"],
+    }
+
+
+@pytest.fixture
+def random_database(fake_omnifocus):
+    rng = random.Random(7)
+    fake_omnifocus["tags"] = TAGS
+    fake_omnifocus["projects"] = PROJECTS
+    fake_omnifocus["tasks"] = [random_task(rng, index) for index in range(40)]
+    return fake_omnifocus
+
+
+def test_compiled_predicate_matches_local_evaluator(random_database):
+    """Test that the JXA predicate selects the same tasks as the in-memory evaluator."""
+    rng = random.Random(11)
+    tag_parents = {tag["id"]: tag.get("parent") for tag in TAGS}
+
+    for _ in range(25):
+        expression = random_filter(rng)
+        expected = [
+            task["id"]
+            for task in random_database["tasks"]
+            if evaluate(validate(expression), to_record(task), tag_parents)
+        ]
+        actual = [task["id"] for task in query_tasks(expression, fields=["id"])]
+        assert actual == expected, expression
+
+
+def test_query_tasks_sort_and_limit(random_database):
+    """Test that tasks are sorted with missing values last and then limited."""
+    tasks = query_tasks(sort=[{"field": "dueDate", "direction": "desc"}, {"field": "name"}], fields=["dueDate", "name"])
+
+    due_dates = [task["dueDate"] for task in tasks]
+    dated = [due for due in due_dates if due is not None]
+    assert due_dates == dated + [None] * (len(due_dates) - len(dated))
+    assert len(query_tasks(sort=[{"field": "name"}], limit=5)) == 5
+
+
+def test_task_stats_match_listed_tasks(random_database):
+    """Test that the counts computed in OmniFocus are those of the listed tasks."""
+    tasks = list_tasks(fields=["projectId", "projectName", "status", "tagIds", "tags", "dueDate"])
+    remaining = [task for task in tasks if task["status"] not in ("Completed", "Dropped")]
+
+    stats = task_stats(["project", "status"])
+    assert stats["total"] == len(remaining)
+    assert {(group["projectId"], group["project"], group["status"]): group["count"] for group in stats["groups"]} == (
+        Counter((task["projectId"], task["projectName"], task["status"]) for task in remaining)
+    )
+    counts = [group["count"] for group in stats["groups"]]
+    assert counts == sorted(counts, reverse=True)
+
+    by_tag = task_stats(["tag"], include_completed=True)
+    expected = Counter(
+        tag for task in tasks for tag in (list(zip(task["tagIds"], task["tags"], strict=True)) or [(None, None)])
+    )
+    assert {(group["tagId"], group["tag"]): group["count"] for group in by_tag["groups"]} == expected
+
+    due = task_stats(["due"], include_completed=True)
+    # Every due date of the random database is in the past
+    assert {group["due"]: group["count"] for group in due["groups"]} == Counter(
+        "none" if task["dueDate"] is None else "overdue" for task in tasks
+    )
+
+
+def test_task_stats_filter_and_limit(random_database):
+    """Test that only the tasks matching the filter are counted, and only the largest groups returned."""
+    flagged = {"field": "flagged", "op": "eq", "value": True}
+    stats = task_stats(["flagged"], filter=flagged, include_completed=True)
+    assert stats == {"total": len(query_tasks(flagged)), "groups": [{"flagged": True, "count": stats["total"]}]}
+    assert task_stats([], include_completed=True) == {"total": 40, "groups": [{"count": 40}]}
+    assert len(task_stats(["project", "status"], limit=2)["groups"]) == 2
+
+    with pytest.raises(ValueError, match="Invalid dimensions"):
+        task_stats(["colour"])
+    with pytest.raises(QueryError, match="Invalid limit"):
+        task_stats(["tag"], limit=0)
+
+
+@pytest.mark.parametrize(
+    "expression, message",
+    [
+        ({"field": "colour", "op": "eq", "value": "red"}, "unknown field"),
+        ({"field": "flagged", "op": "contains", "value": "x"}, "does not support"),
+        ({"field": "dueDate", "op": "lt", "value": "tomorrow"}, "ISO date"),
+        ({"field": "status", "op": "in", "value": ["Finished"]}, "unknown statuses"),
+        ({"and": []}, "non-empty list"),
+        ({"not": {"field": "name", "op": "eq"}}, "missing value"),
+        ({"field": ["name"], "op": "eq", "value": "x"}, r"filter: unknown field \['name'\]"),
+        ({"field": {"name": 1}, "op": "eq", "value": "x"}, "unknown field"),
+        ({"or": [{"field": "name", "op": ["eq"], "value": "x"}]}, r"filter\.or\[0\]: field 'name' does not support"),
+        ({"field": "dueDate", "op": "lt", "value": float("nan")}, "finite number"),
+        ({"field": "dueDate", "op": "gt", "value": float("inf")}, "finite number"),
+        ({"not": {"field": "dueDate", "op": "lt", "value": float("-inf")}}, r"filter\.not: expected a finite number"),
+        ({"field": "dueDate", "op": "lt", "value": "0001-01-01T00:00:00+14:00"}, "ISO date"),
+    ],
+)
+def test_invalid_filters(expression, message):
+    """Test that invalid filters are rejected with a useful message."""
+    with pytest.raises(QueryError, match=message):
+        validate(expression)
+
+
+@pytest.mark.parametrize(
+    "sort, message",
+    [
+        (["name"], r"sort\[0\]: expected a \{field, direction\} object"),
+        ([{"field": "name"}, {"field": "tags"}], r"sort\[1\]: cannot sort"),
+        ([{"field": "name", "direction": "up"}], "direction"),
+        ([{"field": ["name"]}], r"sort\[0\]: cannot sort"),
+        ([{"field": "name", "direction": {"desc": True}}], r"sort\[0\]: direction"),
+    ],
+)
+def test_invalid_sort(sort, message):
+    """Test that invalid sort keys are rejected with the index of the key."""
+    with pytest.raises(QueryError, match=message):
+        validate_sort(sort)
+
+
+def test_compile_resolves_subtrees_once():
+    """Test that tag subtrees are looked up once per query rather than once per task."""
+    source = compile_predicate(validate({"field": "tagIds", "op": "in_subtree", "value": "t1"}))
+
+    assert source.count("tagSubtree(") == 1
+    assert source.index("tagSubtree(") < source.index("return task =>")
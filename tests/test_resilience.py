@@ -0,0 +1,194 @@
+import time
+
+import pytest
+
+from mcp_omnifocus.utils import scripting
+from mcp_omnifocus.utils.resilience import CircuitBreaker, LatencyHistory, classify, retryable
+from mcp_omnifocus.utils.scripting import (
+    JXAScriptError,
+    OmniFocusUnavailableError,
+    evaluate_javascript,
+    evaluate_javascript_stream,
+    resilience_stats,
+    single_flight,
+)
+
+
+@pytest.mark.parametrize(
+    "message, failure",
+    [
+        ("AppleScript timed out after 30 seconds", "timeout"),
+        ("AppleScript cancelled", "cancelled"),
+        ("AppleScript failed: execution error: Error: Application isn't running. (-600)", "unavailable"),
+        ("AppleScript failed: execution error: Connection is invalid. (-609)", "unavailable"),
+        ("AppleScript failed: execution error: Error: AppleEvent timed out. (-1712)", "busy"),
+        ("AppleScript failed: execution error: Error: Could not find task: abc (-2700)", "error"),
+        ("osascript not found - AppleScript not available on this system", "error"),
+    ],
+)
+def test_classify(message, failure):
+    """Test that failures are told apart by their message and Apple event error code."""
+    assert classify(message) == failure
+
+
+def test_retryable():
+    """Test that writes are only retried when the script cannot have run."""
+    assert retryable("unavailable", write=False) and retryable("unavailable", write=True)
+    assert retryable("busy", write=False) and not retryable("busy", write=True)
+    assert not retryable("timeout", write=False) and not retryable("error", write=False)
+
+
+def test_latency_history_timeouts():
+    """Test that timeouts follow the durations of each script, within the floor and the ceiling."""
+    history = LatencyHistory(ceiling=30, floor=2, multiplier=4, min_samples=3)
+    for seconds in (1, 1.5):
+        history.observe("slow", seconds)
+    assert history.timeout("slow") == 30
+
+    history.observe("slow", 2)
+    assert history.timeout("slow") == 8
+    for _ in range(3):
+        history.observe("fast", 0.1)
+    assert history.timeout("fast") == 2
+    for _ in range(3):
+        history.observe("stuck", 20)
+    assert history.timeout("stuck") == 30
+    assert history.snapshot()["slow"] == {"samples": 3, "max_s": 2, "timeout_s": 8}
+
+
+def test_circuit_breaker():
+    """Test that the breaker opens after repeated failures, probes after the cooldown and closes on success."""
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=3, cooldown=10, clock=lambda: now[0])
+    for _ in range(2):
+        assert breaker.acquire() is None
+        breaker.failure()
+    breaker.success()
+    for _ in range(3):
+        assert breaker.acquire() is None
+        breaker.failure()
+    assert breaker.state == "open"
+    assert breaker.acquire() == 10
+
+    now[0] = 10
+    assert breaker.state == "half-open"
+    assert breaker.acquire() is None
+    assert breaker.acquire() == 0  # Only one probe at a time
+    breaker.failure()
+    assert breaker.state == "open"
+    assert breaker.acquire() == 10
+
+    now[0] = 20
+    assert breaker.acquire() is None
+    breaker.success()
+    assert breaker.state == "closed"
+    assert breaker.snapshot() == {"state": "closed", "consecutive_failures": 0, "opened": 1, "rejected": 3}
+
+
+def test_transient_failures_are_retried(monkeypatch):
+    """Test that a read failing because OmniFocus is not running is retried until it answers."""
+    monkeypatch.setattr(scripting, "_RETRY_BACKOFF", 0.01)
+    outcomes = [JXAScriptError("AppleScript failed: Application isn't running. (-600)"), "#evaluate-ms 1\n42"]
+
+    def run_script(script, timeout=30, args=None):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(scripting, "_run_script", run_script)
+    assert evaluate_javascript("42") == 42
+    assert resilience_stats()["retries"] == 1
+
+
+def test_streams_are_retried_and_open_the_breaker(fake_osascript, monkeypatch):
+    """Test that streamed scripts are retried and counted by the breaker like other calls."""
+    monkeypatch.setattr(scripting, "_RETRY_BACKOFF", 0.01)
+    scripting.circuit_breaker.threshold = 3
+    with pytest.raises(JXAScriptError, match="-600"):
+        list(evaluate_javascript_stream("fake:code:600"))
+    assert resilience_stats()["retries"] == 2
+
+    with pytest.raises(OmniFocusUnavailableError):
+        list(evaluate_javascript_stream("fake:lines:2"))
+
+    monkeypatch.setattr(scripting, "circuit_breaker", CircuitBreaker())
+    assert list(evaluate_javascript_stream("fake:lines:2")) == [{"index": 0}, {"index": 1}]
+
+
+def test_retries_are_bounded(fake_osascript, monkeypatch):
+    """Test that a transient failure is retried at most the configured number of times."""
+    monkeypatch.setattr(scripting, "_RETRY_BACKOFF", 0.01)
+    with pytest.raises(JXAScriptError, match="-600"):
+        evaluate_javascript("fake:code:600")
+    assert resilience_stats()["retries"] == 2
+
+
+def test_writes_are_not_retried_when_they_may_have_run(fake_osascript, monkeypatch):
+    """Test that a busy OmniFocus has reads retried, but not writes."""
+    monkeypatch.setattr(scripting, "_RETRY_BACKOFF", 0.01)
+    with single_flight.write(), pytest.raises(JXAScriptError, match="-1712"):
+        evaluate_javascript("fake:code:1712")
+    assert resilience_stats()["retries"] == 0
+
+    with pytest.raises(JXAScriptError, match="-1712"):
+        evaluate_javascript("fake:code:1712")
+    assert resilience_stats()["retries"] == 2
+
+
+def test_script_errors_are_not_retried(fake_osascript):
+    """Test that errors raised by scripts are neither retried nor open the breaker."""
+    for _ in range(scripting.circuit_breaker.threshold + 1):
+        with pytest.raises(JXAScriptError, match="boom"):
+            evaluate_javascript("fake:error:boom")
+    assert resilience_stats()["retries"] == 0
+    assert scripting.circuit_breaker.state == "closed"
+
+
+def test_breaker_fails_fast(fake_osascript, monkeypatch):
+    """Test that calls fail without running once OmniFocus failed repeatedly."""
+    monkeypatch.setattr(scripting, "_max_retries", 0)
+    scripting.circuit_breaker.threshold = 2
+    for _ in range(2):
+        with pytest.raises(JXAScriptError, match="-600"):
+            evaluate_javascript("fake:code:600")
+
+    start = time.monotonic()
+    with pytest.raises(OmniFocusUnavailableError, match="not responding"):
+        evaluate_javascript("fake:echo:hello")
+    assert time.monotonic() - start < 0.05
+    assert resilience_stats()["breaker"]["state"] == "open"
+
+
+def test_adaptive_timeout(fake_osascript):
+    """Test that a script that usually answers quickly is given up on long before the longest timeout."""
+    history = scripting.latency_history
+    history.floor, history.multiplier, history.min_samples = 1, 2, 3
+    for _ in range(3):
+        assert evaluate_javascript("(value => value)", "fake:echo:quick") == "quick"
+
+    start = time.monotonic()
+    with pytest.raises(JXAScriptError, match="timed out"):
+        evaluate_javascript("(value => value)", "fake:sleep:10")
+    assert time.monotonic() - start < 5
+    assert resilience_stats()["timeouts"] == 1
+
+    # The timed out run counts as taking its whole timeout, so the script is given longer next time
+    key = next(iter(resilience_stats()["scripts"]))
+    assert history.timeout(key) >= 2
+
+
+def test_whole_listing_after_fast_pages_is_not_timed_out(fake_osascript):
+    """Test that fast pages of a listing do not shorten the timeout of reading the whole listing."""
+    history = scripting.latency_history
+    history.floor, history.multiplier, history.min_samples = 1, 2, 3
+    listing = "(args => args.name)"
+    for _ in range(3):
+        assert evaluate_javascript(listing, {"name": "fake:echo:page", "page": {"limit": 5}}) == "page"
+
+    assert evaluate_javascript(listing, {"name": "fake:sleep:1.5 fake:echo:all", "page": None}) == "all"
+    assert evaluate_javascript(listing, {"name": "fake:sleep:1.5 fake:echo:more", "page": {"limit": 500}}) == "more"
+    # Pages of the size timed so far are still given up on quickly
+    with pytest.raises(JXAScriptError, match="timed out"):
+        evaluate_javascript(listing, {"name": "fake:sleep:10", "page": {"limit": 5}})
+    assert any(key.endswith(":unbounded") for key in resilience_stats()["scripts"])
@@ -1,9 +1,27 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
 from textwrap import dedent
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from mcp_omnifocus.utils.scripting import run_jxa_script
+from mcp_omnifocus.utils import scripting
+from mcp_omnifocus.utils.scripting import (
+    LIBRARY_MISSING,
+    JXAScriptError,
+    build_script,
+    call_async,
+    coalesced,
+    compile_script,
+    evaluate_javascript,
+    evaluate_javascript_stream,
+    run_jxa_script,
+    run_jxa_script_async,
+    single_flight,
+    stream_jxa_script,
+)
 
 
 def test_successful_script_execution():
@@ -40,3 +58,314 @@ def test_evaluate_javascript():
 
     output = run_jxa_script(script)
     assert output == "Hello from OmniFocus"
+
+
+def test_run_jxa_script_async(fake_osascript):
+    """Test that scripts run asynchronously return their output."""
+    assert asyncio.run(run_jxa_script_async("fake:echo:hello")) == '"hello"'
+
+    with pytest.raises(JXAScriptError, match="boom"):
+        asyncio.run(run_jxa_script_async("fake:error:boom"))
+
+
+def test_run_jxa_script_async_timeout(fake_osascript):
+    """Test that a script that runs too long is killed at the timeout."""
+    start = time.monotonic()
+    with pytest.raises(JXAScriptError, match="timed out"):
+        asyncio.run(run_jxa_script_async("fake:sleep:5", timeout=0.5))
+    assert time.monotonic() - start < 3
+
+
+@pytest.mark.parametrize("limit, minimum, maximum", [(1, 0.9, 5), (3, 0, 0.9)])
+def test_concurrency_limit(fake_osascript, limit, minimum, maximum):
+    """Test that no more than the configured number of scripts run at once."""
+
+    async def run_three():
+        await asyncio.gather(*(run_jxa_script_async("fake:sleep:0.3") for _ in range(3)))
+
+    scripting.set_max_concurrency(limit)
+    try:
+        start = time.monotonic()
+        asyncio.run(run_three())
+        assert minimum <= time.monotonic() - start < maximum
+    finally:
+        scripting.set_max_concurrency(4)
+
+
+def test_call_async_does_not_block_event_loop(fake_osascript):
+    """Test that a slow call does not hold up a cheap one started after it."""
+
+    async def run():
+        slow = asyncio.create_task(call_async(evaluate_javascript, "fake:sleep:1 fake:echo:slow"))
+        await asyncio.sleep(0.1)
+        start = time.monotonic()
+        assert await call_async(evaluate_javascript, "fake:echo:fast") == "fast"
+        elapsed = time.monotonic() - start
+        assert await slow == "slow"
+        return elapsed
+
+    assert asyncio.run(run()) < 0.8
+
+
+def test_call_async_cancellation(fake_osascript):
+    """Test that cancelling a call releases it promptly instead of waiting for the script."""
+
+    async def run():
+        call = asyncio.create_task(call_async(evaluate_javascript, "fake:sleep:5"))
+        await asyncio.sleep(0.3)
+        start = time.monotonic()
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        # The slot held by the cancelled script is free again
+        scripting.set_max_concurrency(1)
+        try:
+            assert await call_async(evaluate_javascript, "fake:echo:next") == "next"
+        finally:
+            scripting.set_max_concurrency(4)
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) < 2
+
+
+def test_compile_script_is_cached(fake_osascript):
+    """Test that a script is compiled once and reused from disk, also by a new process."""
+    path = compile_script("function run(argv) { return argv[0]; }")
+    assert path is not None and path.exists()
+    compiled_at = path.stat().st_mtime_ns
+
+    scripting._compiled_scripts.clear()
+    with patch("subprocess.run") as mock_run:
+        assert compile_script("function run(argv) { return argv[0]; }") == path
+    mock_run.assert_not_called()
+    assert path.stat().st_mtime_ns == compiled_at
+    assert compile_script("function run(argv) { return argv[1]; }") != path
+
+
+def test_scripts_with_arguments_run_compiled(fake_osascript):
+    """Test that a script taking arguments is run from its compiled form."""
+    assert run_jxa_script("function run(argv) {}", args=["fake:echo:hello"]) == '"hello"'
+    assert asyncio.run(run_jxa_script_async("function run(argv) {}", args=["fake:echo:again"])) == '"again"'
+    assert len(list(scripting.script_cache_dir().glob("*.scpt"))) == 1
+
+
+def test_scripts_run_from_source_without_osacompile(monkeypatch):
+    """Test that scripts are run from source, with their arguments, when they cannot be compiled."""
+    monkeypatch.setattr(scripting, "_compiled_scripts", {})
+    mock_result = MagicMock(returncode=0, stdout="ok\n", stderr="")
+
+    with patch("subprocess.run", side_effect=[FileNotFoundError(), mock_result]) as mock_run:
+        assert run_jxa_script("function run(argv) {}", args=["a b"]) == "ok"
+
+    assert mock_run.call_args.args[0] == ["osascript", "-l", "JavaScript", "-e", "function run(argv) {}", "a b"]
+
+
+def test_evaluate_javascript_passes_arguments_as_json(fake_osascript):
+    """Test that arguments reach the script as JSON, whatever characters they contain."""
+    assert evaluate_javascript("args => args.word", {"word": "fake:echo:hello", "quote": "'\"`${x}\\"}) == "hello"
+
+
+def test_stream_jxa_script(fake_osascript):
+    """Test that output lines are yielded one at a time, and failures raised once the output ends."""
+    lines = stream_jxa_script("fake:lines:3")
+    assert next(lines) == '{"index": 0}'
+    assert list(lines) == ['{"index": 1}', '{"index": 2}']
+
+    with pytest.raises(JXAScriptError, match="boom"):
+        list(stream_jxa_script("fake:error:boom"))
+    with pytest.raises(JXAScriptError, match="timed out"):
+        list(stream_jxa_script("fake:sleep:5", timeout=0.5))
+
+
+def test_evaluate_javascript_stream(fake_osascript):
+    """Test that streamed output is decoded line by line into the items of the value."""
+    items = evaluate_javascript_stream("args => args.directive", {"directive": "fake:lines:1000"})
+    assert next(items) == {"index": 0}
+    assert sum(1 for _ in items) == 999
+
+
+def test_evaluate_javascript_stream_in_call_async(fake_osascript):
+    """Test that streamed scripts take a concurrency slot, and are killed when the call is cancelled."""
+
+    async def run():
+        scripting.set_max_concurrency(1)
+        try:
+            items = await call_async(lambda: list(evaluate_javascript_stream("fake:lines:2")))
+            assert items == [{"index": 0}, {"index": 1}]
+
+            call = asyncio.create_task(call_async(lambda: list(evaluate_javascript_stream("fake:sleep:5"))))
+            await asyncio.sleep(0.3)
+            start = time.monotonic()
+            call.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await call
+            assert await call_async(evaluate_javascript, "fake:echo:next") == "next"
+            return time.monotonic() - start
+        finally:
+            scripting.set_max_concurrency(4)
+
+    assert asyncio.run(run()) < 2
+
+
+def test_build_script_stream():
+    """Test that streamed scripts encode arrays as one JSON line per item."""
+    script = build_script("args => args.items", {"items": [1, 2]}, stream=True)
+
+    assert script.startswith("(value => Array.isArray(value)")
+    assert script.endswith('((args => args.items)({"items": [1, 2]}))')
+
+
+@pytest.fixture
+def omnifocus_context(monkeypatch):
+    """Stand in for the JavaScript context of OmniFocus, recording the scripts evaluated in it."""
+    monkeypatch.setattr(scripting, "_installed_libraries", set())
+    monkeypatch.setattr(scripting, "_library_misses", 0)
+    context = {"scripts": [], "defined": set(), "persists": True}
+
+    def evaluate(script):
+        context["scripts"].append(script)
+        if script.startswith("typeof"):
+            key = script.split()[1]
+            if key not in context["defined"]:
+                return LIBRARY_MISSING
+        elif "var __mcpOmnifocusLibrary_" in script and context["persists"]:
+            context["defined"].add(script.split("var ")[1].split(" ")[0])
+        return "done"
+
+    monkeypatch.setattr(scripting, "_evaluate", evaluate)
+    return context
+
+
+def test_library_sent_once(omnifocus_context):
+    """Test that a library is only sent with the first call that needs it."""
+    for _ in range(3):
+        assert (
+            evaluate_javascript("args => libraryFunction(args)", {"n": 1}, library="function libraryFunction() {}")
+            == "done"
+        )
+
+    sent = ["function libraryFunction" in script for script in omnifocus_context["scripts"]]
+    assert sent == [True, False, False]
+
+
+def test_library_resent_when_lost(omnifocus_context):
+    """Test that a library OmniFocus no longer has is sent again, and no longer assumed kept if it never is."""
+    evaluate_javascript("args => 1", {}, library="function f() {}")
+    omnifocus_context["defined"].clear()
+    omnifocus_context["persists"] = False
+
+    assert evaluate_javascript("args => 1", {}, library="function f() {}") == "done"
+    assert len(omnifocus_context["scripts"]) == 3
+
+    for _ in range(3):
+        evaluate_javascript("args => 1", {}, library="function f() {}")
+    omnifocus_context["scripts"].clear()
+    evaluate_javascript("args => 1", {}, library="function f() {}")
+    assert len(omnifocus_context["scripts"]) == 1
+    assert "function f" in omnifocus_context["scripts"][0]
+
+
+def test_library_sent_once_with_streams(monkeypatch):
+    """Test that streamed calls rely on and install libraries like other calls."""
+    monkeypatch.setattr(scripting, "_installed_libraries", set())
+    monkeypatch.setattr(scripting, "_library_misses", 0)
+    scripts = []
+
+    def evaluate(script):
+        scripts.append(script)
+        yield from [1, 2]
+
+    monkeypatch.setattr(scripting, "_evaluate_stream", evaluate)
+    for _ in range(2):
+        assert list(evaluate_javascript_stream("args => [1, 2]", {}, library="function f() {}")) == [1, 2]
+
+    assert ["function f" in script for script in scripts] == [True, False]
+    assert "typeof __mcpOmnifocusLibrary_" in scripts[1]
+
+
+def test_coalesced_reads_share_one_execution():
+    """Test that identical concurrent reads run once and all get the same result."""
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    @coalesced
+    def read(value, scale=1):
+        calls.append(value)
+        started.set()
+        release.wait(5)
+        return {"value": value * scale}
+
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        leader = executor.submit(read, 1)
+        started.wait(5)
+        followers = [executor.submit(read, 1), executor.submit(read, value=1), executor.submit(read, 1, scale=1)]
+        other = executor.submit(read, 2)
+        time.sleep(0.2)
+        release.set()
+        results = [future.result() for future in [leader, *followers]]
+
+    assert sorted(calls) == [1, 2]
+    assert all(result is results[0] for result in results)
+    assert other.result() == {"value": 2}
+
+
+def test_coalesced_reads_do_not_cross_writes():
+    """Test that a read made after a write started does not join a read started before it."""
+    release = threading.Event()
+    calls = []
+
+    @coalesced
+    def read():
+        calls.append(len(calls))
+        release.wait(5)
+        return len(calls)
+
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        before = executor.submit(read)
+        time.sleep(0.2)
+        with single_flight.write():
+            during = executor.submit(read)
+            time.sleep(0.2)
+        release.set()
+        assert before.result() == during.result() == 2
+    assert len(calls) == 2
+
+
+def test_coalesced_reads_share_errors():
+    """Test that the error of a shared read is raised to every caller."""
+    release = threading.Event()
+
+    @coalesced
+    def read():
+        release.wait(5)
+        raise JXAScriptError("AppleScript failed: nope")
+
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        futures = [executor.submit(read)]
+        time.sleep(0.2)
+        futures.append(executor.submit(read))
+        time.sleep(0.2)
+        release.set()
+        for future in futures:
+            with pytest.raises(JXAScriptError, match="nope"):
+                future.result()
+
+
+def test_coalesced_read_reruns_when_cancelled(fake_osascript):
+    """Test that reads waiting on a cancelled call run the read themselves."""
+
+    @coalesced
+    def read():
+        return evaluate_javascript("fake:sleep:1 fake:echo:done")
+
+    async def run():
+        leader = asyncio.create_task(call_async(read))
+        await asyncio.sleep(0.3)
+        follower = asyncio.create_task(call_async(read))
+        await asyncio.sleep(0.1)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == "done"
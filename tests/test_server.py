@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from fastmcp import Client
+from typer.testing import CliRunner
+
+from mcp_omnifocus import server
+from mcp_omnifocus.utils import omnifocus
+from mcp_omnifocus.utils.cache import snapshot_cache
+
+
+@pytest.fixture
+def run_server(monkeypatch):
+    """Start the server with command line arguments, connecting an in-memory client to it instead of stdio."""
+    for name in ("delta_sync", "mirror", "write_queue", "warm_up", "watcher"):
+        monkeypatch.setattr(server, name, None)
+    monkeypatch.setattr(server, "mirror_max_age", server.mirror_max_age)
+    ttl = snapshot_cache.ttl
+
+    def run(args, session):
+        async def connect():
+            async with Client(server.mcp) as client:
+                return await session(client)
+
+        outcome = {}
+        monkeypatch.setattr(server.mcp, "run", lambda **options: outcome.setdefault("result", asyncio.run(connect())))
+        CliRunner().invoke(server.app, args, catch_exceptions=False)
+        return outcome["result"]
+
+    yield run
+    snapshot_cache.configure(ttl=ttl)
+
+
+@pytest.fixture
+def scripts(sample_database, monkeypatch):
+    """The scripts evaluated in the fake OmniFocus."""
+    evaluated = []
+    evaluate = omnifocus.evaluate_javascript
+
+    def counting_evaluate(script, args=None, library=None):
+        evaluated.append(script)
+        return evaluate(script, args, library)
+
+    monkeypatch.setattr(omnifocus, "evaluate_javascript", counting_evaluate)
+    return evaluated
+
+
+def test_tool_results_match_their_output_schema(sample_database):
+    """Test that tools returning flags, lists and missing values pass the output schema clients check them against."""
+
+    async def call(name, arguments):
+        async with Client(server.mcp) as client:
+            return (await client.call_tool(name, arguments)).structured_content
+
+    task = asyncio.run(call("get_task", {"task_id": "a"}))
+    assert task["flagged"] is False
+    assert task["tags"] == ["Shops"]
+    projects = asyncio.run(call("list_projects", {}))["result"]
+    assert [project["id"] for project in projects] == ["p1", "p2"]
+
+
+async def _warm_up_then_list(client):
+    # Started by the lifespan of the server
+    await server.warm_up.start()
+    for name in ("list_projects", "list_tags", "list_inbox"):
+        await client.call_tool(name, {})
+    return server.warm_up.stats()["steps"]
+
+
+def test_tool_calls_after_warm_up_run_no_script(scripts, run_server):
+    """Test that --warm-up caches what the first tool calls read, without any --cache-ttl or --watch."""
+    steps = run_server(["--warm-up"], _warm_up_then_list)
+    assert list(steps) == ["connect", "projects", "tags", "inbox"]
+    assert all(step["status"] == "done" for step in steps.values())
+    # One script per step, none for the tool calls
+    assert len(scripts) == 4
+
+
+def test_warm_up_without_cache_only_connects(scripts, run_server):
+    """Test that with the cache disabled, the warm-up does not read what it would have nowhere to keep."""
+    steps = run_server(["--warm-up", "--cache-ttl", "0"], _warm_up_then_list)
+    assert list(steps) == ["connect"]
+    assert len(scripts) == 4
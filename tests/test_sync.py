@@ -0,0 +1,82 @@
+import time
+from datetime import UTC, datetime
+
+from mcp_omnifocus.utils.sync import DeltaSync
+
+
+def test_first_refresh_lists_everything(sample_database):
+    """Test that the first refresh loads every record."""
+    sync = DeltaSync()
+    summary = sync.refresh()
+
+    assert summary["tasks"] == {"added": 4, "updated": 0, "removed": 0}
+    assert {task["id"] for task in sync.list_tasks()} == {"a", "b", "c", "d"}
+    assert {project["name"] for project in sync.list_projects()} == {"Home", "Work"}
+    assert {tag["fullName"] for tag in sync.list_tags()} == {"Errands", "Errands : Shops"}
+    assert sync.watermark is not None
+
+
+def test_refresh_merges_changes(sample_database):
+    """Test that later refreshes only merge tasks modified since the watermark."""
+    for task in sample_database["tasks"]:
+        task["modified"] = "2020-01-01T00:00:00Z"
+    sync = DeltaSync()
+    sync.refresh()
+
+    sample_database["tasks"][0].update(name="Buy oat milk", modified="2100-01-01T00:00:00Z")
+    sample_database["tasks"].append({"id": "e", "name": "New task", "added": "2100-01-01T00:00:00Z"})
+    summary = sync.refresh()
+
+    assert summary["tasks"] == {"added": 1, "updated": 1, "removed": 0}
+    assert sync.records["tasks"]["a"]["name"] == "Buy oat milk"
+    assert "e" in sync.records["tasks"]
+
+
+def test_refresh_detects_deletions(sample_database):
+    """Test that deleted tasks are removed from the local copy."""
+    for task in sample_database["tasks"]:
+        task["modified"] = "2020-01-01T00:00:00Z"
+    sync = DeltaSync()
+    sync.refresh()
+
+    del sample_database["tasks"][1]
+    summary = sync.refresh()
+
+    assert summary["tasks"] == {"added": 0, "updated": 0, "removed": 1}
+    assert set(sync.records["tasks"]) == {"a", "c", "d"}
+
+
+def test_refresh_lists_tasks_whose_status_changed_with_time(sample_database):
+    """Test that tasks whose defer or due date passed since the last refresh are fetched again."""
+    for record in sample_database["tasks"] + sample_database["projects"]:
+        record["modified"] = "2020-01-01T00:00:00Z"
+    sample_database["tasks"][1]["status"] = "Blocked"
+    sync = DeltaSync()
+    sync.refresh()
+
+    # The defer date passes between the two refreshes, OmniFocus does not modify the task for it
+    deferred = datetime.fromtimestamp((sync.watermark + 5) / 1000, UTC)
+    sample_database["tasks"][1].update(deferDate=deferred.isoformat(), status="Available")
+    time.sleep(0.05)
+    summary = sync.refresh()
+
+    assert summary["tasks"] == {"added": 0, "updated": 1, "removed": 0}
+    assert sync.records["tasks"]["b"]["status"] == "Available"
+
+
+def test_tasks_have_current_project_and_tag_names(sample_database):
+    """Test that renaming a project or tag renames it in the tasks, which are not modified by it."""
+    for record in sample_database["tasks"] + sample_database["projects"]:
+        record["modified"] = "2020-01-01T00:00:00Z"
+    sync = DeltaSync()
+    sync.refresh()
+
+    sample_database["projects"][1].update(name="Office", modified="2100-01-01T00:00:00Z")
+    sample_database["tags"][0]["name"] = "Chores"
+    sync.refresh()
+
+    tasks = {task["id"]: task for task in sync.list_tasks(["id", "projectName", "tags"])}
+    assert tasks["b"]["projectName"] == "Office"
+    assert tasks["c"]["tags"] == ["Chores"]
+    # The local record is kept as OmniFocus listed it
+    assert sync.records["tasks"]["c"]["tags"] == ["Errands"]
@@ -0,0 +1,85 @@
+import pytest
+
+from mcp_omnifocus.utils.omnifocus import list_tags, list_tasks_by_tag, tag_index
+
+TAGS = [
+    {"id": "t1", "name": "Errands"},
+    {"id": "t2", "name": "Shops", "parent": "t1"},
+    {"id": "t3", "name": "Hardware", "parent": "t2"},
+    {"id": "t4", "name": "Waiting"},
+    {"id": "t5", "name": "Post", "parent": "t1"},
+]
+
+
+@pytest.fixture
+def tag_database(fake_omnifocus):
+    fake_omnifocus["tags"] = TAGS
+    fake_omnifocus["tasks"] = [
+        {"id": "a", "name": "Buy milk", "tags": ["t2"]},
+        {"id": "b", "name": "Buy screws", "tags": ["t3", "t2"]},
+        {"id": "c", "name": "Post letter", "tags": ["t5"]},
+        {"id": "d", "name": "Hear back", "tags": ["t4"]},
+        {"id": "e", "name": "Plan errands", "tags": ["t1"]},
+    ]
+    return fake_omnifocus
+
+
+def test_list_tags_full_names(tag_database):
+    """Test that full names are built in one traversal, parents before their children."""
+    assert list_tags(fields=["id", "fullName"]) == [
+        {"id": "t1", "fullName": "Errands"},
+        {"id": "t2", "fullName": "Errands : Shops"},
+        {"id": "t3", "fullName": "Errands : Shops : Hardware"},
+        {"id": "t5", "fullName": "Errands : Post"},
+        {"id": "t4", "fullName": "Waiting"},
+    ]
+
+
+def test_list_tags_tree(tag_database):
+    """Test that tags can be listed nested under their parents."""
+    assert list_tags(fields=["name"], tree=True) == [
+        {
+            "name": "Errands",
+            "children": [
+                {"name": "Shops", "children": [{"name": "Hardware", "children": []}]},
+                {"name": "Post", "children": []},
+            ],
+        },
+        {"name": "Waiting", "children": []},
+    ]
+
+
+def test_tag_index(tag_database):
+    """Test that the index resolves the hierarchy without calling OmniFocus again."""
+    index = tag_index()
+    tag_database["tags"] = []  # A second call would find no tags
+
+    assert tag_index() is index
+    assert len(index) == 5
+    assert index.full_name("t3") == "Errands : Shops : Hardware"
+    assert index.ancestors("t3") == ["t2", "t1"]
+    assert index.ancestors("t4") == []
+    assert index.subtree("t1") == ["t1", "t2", "t3", "t5"]
+    assert index.subtree("t3") == ["t3"]
+    with pytest.raises(ValueError, match="Could not find tag: nope"):
+        index.subtree("nope")
+
+
+def test_list_tasks_by_tag_descendants(tag_database):
+    """Test that the tasks of descendant tags are included once each when asked for."""
+    assert [task["id"] for task in list_tasks_by_tag("t1", fields=["id"])] == ["e"]
+    tasks = list_tasks_by_tag("t1", fields=["id"], include_descendants=True)
+    assert sorted(task["id"] for task in tasks) == ["a", "b", "c", "e"]
+    assert [task["id"] for task in list_tasks_by_tag("t3", fields=["id"], include_descendants=True)] == ["b"]
+
+    page = list_tasks_by_tag("t1", fields=["id"], include_descendants=True, limit=3)
+    assert page["total"] == 4
+
+
+def test_list_tasks_by_tag_descendants_new_tag(tag_database):
+    """Test that a tag added after the index was cached is found by reading the index again."""
+    tag_index()
+    tag_database["tags"] = TAGS + [{"id": "t6", "name": "Pharmacy", "parent": "t4"}]
+    tag_database["tasks"].append({"id": "f", "name": "Pick up", "tags": ["t6"]})
+
+    assert [task["id"] for task in list_tasks_by_tag("t6", fields=["id"], include_descendants=True)] == ["f"]
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from mcp_omnifocus.utils import omnifocus
+from mcp_omnifocus.utils.scripting import call_async
+from mcp_omnifocus.utils.warmup import WarmUp
+
+
+@pytest.fixture
+def evaluations(sample_database, monkeypatch):
+    """Count the scripts evaluated in the fake OmniFocus, each taking at least 0.2 seconds."""
+    scripts = []
+    evaluate = omnifocus.evaluate_javascript
+
+    def slow_evaluate(script, args=None, library=None):
+        scripts.append(script)
+        time.sleep(0.2)
+        return evaluate(script, args, library)
+
+    monkeypatch.setattr(omnifocus, "evaluate_javascript", slow_evaluate)
+    return scripts
+
+
+def test_warm_up_fills_the_cache(evaluations):
+    """Test that the projects, tags and inbox read by the warm-up are served from the cache afterwards."""
+    warm_up = WarmUp(
+        {
+            "connect": omnifocus.prime,
+            "projects": omnifocus.list_projects,
+            "tags": omnifocus.tag_index,
+            "inbox": omnifocus.list_inbox,
+        }
+    )
+    asyncio.run(warm_up.run())
+    assert len(evaluations) == 4
+
+    # Called as the tools call them
+    omnifocus.list_projects(fields=None)
+    omnifocus.list_tags(fields=None, tree=False)
+    omnifocus.list_inbox(limit=None, cursor=None, fields=None)
+    assert len(evaluations) == 4
+
+    stats = warm_up.stats()
+    assert stats["done"]
+    assert {name: step["status"] for name, step in stats["steps"].items()} == dict.fromkeys(warm_up.steps, "done")
+
+
+def test_calls_during_warm_up_share_its_reads(evaluations):
+    """Test that a call made while the warm-up reads the same data waits for that read instead of reading again."""
+    warm_up = WarmUp({"projects": omnifocus.list_projects})
+
+    async def run():
+        task = warm_up.start()
+        await asyncio.sleep(0.05)
+        projects = await call_async(omnifocus.list_projects, fields=None)
+        await task
+        return projects
+
+    projects = asyncio.run(run())
+    assert warm_up.stats()["done"]
+    assert [project["id"] for project in projects] == ["p1", "p2"]
+    assert evaluations == [omnifocus.__list_projects__]
+
+
+def test_failed_step_skips_the_rest():
+    """Test that the steps after a failed one are skipped, and the failure recorded."""
+    ran = threading.Event()
+
+    def fail():
+        raise RuntimeError("OmniFocus is not running")
+
+    warm_up = WarmUp({"connect": fail, "projects": ran.set})
+    assert warm_up.stats()["steps"]["connect"] == {"status": "pending"}
+    asyncio.run(warm_up.run())
+
+    steps = warm_up.stats()["steps"]
+    assert steps["connect"]["status"] == "failed"
+    assert steps["connect"]["error"] == "OmniFocus is not running"
+    assert steps["projects"] == {"status": "skipped"}
+    assert not ran.is_set()
+
+
+def test_stopping_skips_the_remaining_steps():
+    """Test that stopping the warm-up with the server records the steps it did not get to as skipped."""
+
+    async def run():
+        warm_up = WarmUp({"connect": lambda: time.sleep(0.3), "projects": omnifocus.list_projects})
+        running = warm_up.start()
+        await asyncio.sleep(0.05)
+        warm_up.stop()
+        with pytest.raises(asyncio.CancelledError):
+            await running
+        return warm_up.stats()
+
+    stats = asyncio.run(run())
+    assert stats["done"]
+    assert stats["steps"] == {"connect": {"status": "skipped"}, "projects": {"status": "skipped"}}
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+from mcp_omnifocus.utils.watcher import DatabaseWatcher
+
+
+@pytest.fixture(params=["poll", "native"])
+def backend(request):
+    """Watch with both backends, notifications only where watchfiles is installed."""
+    if request.param == "native":
+        pytest.importorskip("watchfiles")
+    return request.param
+
+
+class Changes:
+    """Records the bursts of changes a watcher reports."""
+
+    def __init__(self):
+        self.bursts: list[set] = []
+        self.reported = threading.Event()
+
+    def __call__(self, paths):
+        self.bursts.append(paths)
+        self.reported.set()
+
+
+def test_burst_is_reported_once(tmp_path, backend):
+    """Test that files written in a burst, as by a sync, are reported together once the directory is quiet."""
+    changes = Changes()
+    watcher = DatabaseWatcher(tmp_path, changes, debounce=0.5, poll_interval=0.1, backend=backend)
+    watcher.start()
+    try:
+        time.sleep(0.3)
+        for name in ("a.zip", "b.zip", "c.zip"):
+            (tmp_path / name).write_text(name)
+            time.sleep(0.05)
+        assert changes.reported.wait(timeout=10)
+        time.sleep(1)
+    finally:
+        watcher.stop()
+
+    assert len(changes.bursts) == 1
+    assert {path.name for path in changes.bursts[0]} == {"a.zip", "b.zip", "c.zip"}
+    stats = watcher.stats()
+    assert (stats["backend"], stats["running"], stats["changes"], stats["paths"]) == (backend, False, 1, 3)
+
+
+def test_long_burst_is_reported_after_the_longest_delay(tmp_path):
+    """Test that changes that keep coming are reported after the longest delay instead of being held back."""
+    changes = Changes()
+    watcher = DatabaseWatcher(tmp_path, changes, debounce=0.5, max_delay=0.6, poll_interval=0.1, backend="poll")
+    watcher.start()
+    try:
+        start = time.monotonic()
+        while not changes.reported.is_set() and time.monotonic() - start < 5:
+            (tmp_path / "busy.zip").write_text(str(time.monotonic()))
+            time.sleep(0.1)
+        assert changes.reported.is_set()
+        assert time.monotonic() - start < 2
+    finally:
+        watcher.stop()
+
+
+def test_failing_hook_keeps_watching(tmp_path):
+    """Test that an error raised by the change hook is recorded, and later changes are still reported."""
+    changes = Changes()
+
+    def on_change(paths):
+        changes(paths)
+        if len(changes.bursts) == 1:
+            raise RuntimeError("OmniFocus is not running")
+
+    watcher = DatabaseWatcher(tmp_path, on_change, debounce=0.1, poll_interval=0.05, backend="poll")
+    watcher.start()
+    try:
+        for name in ("first.zip", "second.zip"):
+            changes.reported.clear()
+            time.sleep(0.1)
+            (tmp_path / name).write_text(name)
+            assert changes.reported.wait(timeout=5)
+    finally:
+        watcher.stop()
+
+    assert [{path.name for path in burst} for burst in changes.bursts] == [{"first.zip"}, {"second.zip"}]
+    assert watcher.stats()["errors"] == 1
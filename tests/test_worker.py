@@ -0,0 +1,116 @@
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from mcp_omnifocus.utils import scripting
+from mcp_omnifocus.utils.scripting import (
+    JXAScriptError,
+    JXAWorker,
+    JXAWorkerError,
+    __worker_script__,
+    disable_worker,
+    enable_worker,
+    evaluate_javascript,
+    evaluate_javascript_stream,
+)
+
+FAKE_OSASCRIPT = [sys.executable, str(Path(__file__).with_name("fake_osascript.py")), "-l", "JavaScript"]
+
+
+@pytest.fixture
+def worker():
+    worker = JXAWorker(FAKE_OSASCRIPT + ["-e", __worker_script__])
+    yield worker
+    worker.stop()
+
+
+@pytest.fixture
+def fake_worker():
+    worker = enable_worker(FAKE_OSASCRIPT + ["-e", __worker_script__])
+    yield worker
+    disable_worker()
+
+
+def test_worker_reuses_process(worker):
+    """Test that consecutive scripts are evaluated by the same worker process."""
+    first = worker.run("fake:pid")
+    second = worker.run("fake:pid")
+
+    assert first == second
+    assert worker.alive
+
+
+def test_worker_reports_script_errors(worker):
+    """Test that a failing script raises without killing the worker."""
+    pid = worker.run("fake:pid")
+
+    with pytest.raises(JXAScriptError, match="boom"):
+        worker.run("fake:error:boom")
+
+    assert worker.run("fake:pid") == pid
+
+
+def test_worker_restarts_after_crash(worker):
+    """Test that a crashed worker is replaced on the next request."""
+    pid = worker.run("fake:pid")
+
+    with pytest.raises(JXAWorkerError):
+        worker.run("fake:crash")
+
+    assert not worker.alive
+    assert worker.run("fake:pid") != pid
+
+
+def test_worker_killed_on_timeout(worker):
+    """Test that a worker that does not answer in time is killed and replaced."""
+    pid = worker.run("fake:pid")
+
+    with pytest.raises(JXAScriptError, match="timed out"):
+        worker.run("fake:sleep:5", timeout=0.5)
+
+    assert not worker.alive
+    assert worker.run("fake:pid") != pid
+
+
+def test_worker_fails_to_start():
+    """Test that a worker that cannot be launched raises a worker error."""
+    worker = JXAWorker(["/nonexistent/osascript"])
+
+    with pytest.raises(JXAWorkerError):
+        worker.run("fake:pid")
+
+
+def test_evaluate_javascript_uses_worker(fake_worker):
+    """Test that evaluate_javascript routes scripts through the enabled worker."""
+    with patch("subprocess.run") as mock_run:
+        assert evaluate_javascript("fake:echo:hello") == "hello"
+
+    mock_run.assert_not_called()
+    assert fake_worker.alive
+
+
+def test_evaluate_javascript_stream_uses_worker(fake_worker):
+    """Test that streamed scripts are routed through the enabled worker too."""
+    fake_worker.start()
+    with patch("subprocess.Popen") as mock_popen:
+        assert list(evaluate_javascript_stream("fake:lines:3")) == [{"index": 0}, {"index": 1}, {"index": 2}]
+
+    mock_popen.assert_not_called()
+
+
+def test_evaluate_javascript_falls_back_to_osascript():
+    """Test that evaluate_javascript falls back to a one-shot osascript when the worker is unavailable."""
+    enable_worker(["/nonexistent/osascript"])
+    try:
+        with patch.object(scripting, "run_jxa_script", return_value='"fallback"') as mock_run:
+            assert evaluate_javascript("fake:echo:hello") == "fallback"
+        mock_run.assert_called_once()
+    finally:
+        disable_worker()
+
+
+def test_fake_worker_protocol_matches():
+    """Test that the stand-in osascript speaks the same worker protocol as the server."""
+    assert f'"{scripting.WORKER_PROTOCOL}"' in Path(__file__).with_name("fake_osascript.py").read_text()
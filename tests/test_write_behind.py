@@ -0,0 +1,233 @@
+import threading
+import time
+
+import pytest
+
+from mcp_omnifocus.utils.omnifocus import batch_update_tasks
+from mcp_omnifocus.utils.write_behind import PROVISIONAL_PREFIX, WriteBehindQueue, merge
+
+
+class FakeBatch:
+    """Applies batches by recording them, creating tasks with ids new-1, new-2, ..."""
+
+    def __init__(self, fail_tasks=(), error=None):
+        self.batches = []
+        self.fail_tasks = set(fail_tasks)
+        self.error = error
+        self.applied = threading.Event()
+
+    def __call__(self, operations):
+        if self.error is not None:
+            raise self.error
+        self.batches.append(operations)
+        self.applied.set()
+        outcomes = []
+        for index, operation in enumerate(operations):
+            failed = operation["task_id"] in self.fail_tasks
+            task_id = f"new-{index + 1}" if operation["action"] == "create" else operation["task_id"]
+            outcomes.append(
+                {
+                    "task_id": operation["task_id"],
+                    "action": operation["action"],
+                    "success": not failed,
+                    "task": None if failed else {"id": task_id},
+                    "error": f"Could not find task: {task_id}" if failed else None,
+                }
+            )
+        return outcomes
+
+
+def test_merge():
+    """Test that mutations merge into one edit and one status change per task, edits first."""
+    merged, positions = merge(
+        [
+            {"task_id": "a", "action": "complete"},
+            {"task_id": "b", "action": "update", "name": "B", "tag_ids": ["t1"]},
+            {"task_id": "a", "action": "update", "flagged": True},
+            {"task_id": "b", "action": "update", "name": "B2", "note": "n", "tag_ids": ["t2", "t1"]},
+            {"task_id": "a", "action": "drop"},
+            {"task_id": "p", "action": "create", "name": "New"},
+            {"task_id": "p", "action": "update", "due_date": "2025-01-01"},
+        ]
+    )
+    assert merged == [
+        {"task_id": "a", "action": "update", "flagged": True},
+        {"task_id": "a", "action": "drop"},
+        {"task_id": "b", "action": "update", "name": "B2", "note": "n", "tag_ids": ["t1", "t2"]},
+        {"task_id": "p", "action": "create", "name": "New", "due_date": "2025-01-01"},
+    ]
+    assert positions == [1, 2, 0, 2, 1, 3, 3]
+
+
+def test_flush_results_per_operation(tmp_path):
+    """Test that a flush applies one merged batch and reports every queued mutation."""
+    apply = FakeBatch(fail_tasks={"b"})
+    queue = WriteBehindQueue(tmp_path / "journal.jsonl", apply=apply)
+    created = queue.create_task("Buy milk")
+    queue.update_task(created["task_id"], task_flagged=True)
+    queue.update_task("a", task_name="A")
+    queue.complete_task("a")
+    queue.drop_task("b")
+
+    assert created["task_id"].startswith(PROVISIONAL_PREFIX)
+    assert queue.pending() == 5
+    results = queue.flush()
+
+    assert len(apply.batches) == 1 and len(apply.batches[0]) == 4
+    assert [(result["action"], result["success"]) for result in results] == [
+        ("create", True),
+        ("update", True),
+        ("update", True),
+        ("complete", True),
+        ("drop", False),
+    ]
+    assert results[4]["error"] == "Could not find task: b"
+    assert queue.pending() == 0
+    assert queue.flush() == []
+
+    # The created task is known by its OmniFocus id from now on
+    assert queue.resolve(created["task_id"]) == "new-1"
+    assert queue.complete_task(created["task_id"])["task_id"] == "new-1"
+
+
+def test_batch_error_keeps_queue(tmp_path):
+    """Test that mutations stay queued when the batch cannot be applied."""
+    queue = WriteBehindQueue(
+        tmp_path / "journal.jsonl", apply=FakeBatch(error=RuntimeError("OmniFocus is not running"))
+    )
+    queue.complete_task("a")
+    with pytest.raises(RuntimeError):
+        queue.flush()
+    assert queue.pending() == 1
+    assert queue.stats()["last_error"] == "OmniFocus is not running"
+
+
+def test_failed_batch_does_not_create_twice(tmp_path):
+    """Test that the creates of a failed batch, which OmniFocus may have applied, are not sent again."""
+    journal = tmp_path / "journal.jsonl"
+    apply = FakeBatch(error=TimeoutError("The script timed out"))
+    queue = WriteBehindQueue(journal, apply=apply)
+    created = queue.create_task("Buy milk")
+    queue.update_task(created["task_id"], task_flagged=True)
+    queue.complete_task("a")
+    with pytest.raises(TimeoutError):
+        queue.flush()
+
+    # The update of a task is applied again, the new task and its mutations are reported instead
+    assert queue.pending() == 1
+    failures = queue.take_failures()
+    assert [(failure["task_id"], failure["action"]) for failure in failures] == [
+        (created["task_id"], "create"),
+        (created["task_id"], "update"),
+    ]
+    assert failures[0]["error"] == "The batch creating the task failed, it may exist: The script timed out"
+    apply.error = None
+    queue.flush()
+    assert apply.batches == [[{"task_id": "a", "action": "complete"}]]
+
+
+def test_create_cut_short_is_not_sent_again_after_restart(tmp_path):
+    """Test that a create whose batch was sent when the server stopped is not queued again by the next one."""
+    journal = tmp_path / "journal.jsonl"
+
+    def crash(operations):
+        raise SystemExit  # The server stops while OmniFocus applies the batch
+
+    queue = WriteBehindQueue(journal, apply=crash)
+    queue.create_task("Buy milk")
+    queue.complete_task("a")
+    with pytest.raises(SystemExit):
+        queue.flush()
+    del queue
+
+    apply = FakeBatch()
+    restarted = WriteBehindQueue(journal, apply=apply)
+    assert restarted.pending() == 1
+    assert [failure["action"] for failure in restarted.take_failures()] == ["create"]
+    restarted.flush()
+    assert apply.batches == [[{"task_id": "a", "action": "complete"}]]
+
+
+def test_journal_survives_restart(tmp_path):
+    """Test that mutations not yet applied are queued again from the journal."""
+    journal = tmp_path / "journal.jsonl"
+    queue = WriteBehindQueue(journal, apply=FakeBatch())
+    queue.complete_task("a")
+    queue.flush()
+    queue.update_task("b", task_note="later")
+    del queue  # A crash, the second mutation was never applied
+
+    apply = FakeBatch()
+    restarted = WriteBehindQueue(journal, apply=apply)
+    assert restarted.pending() == 1
+    restarted.flush()
+    assert apply.batches == [[{"task_id": "b", "action": "update", "note": "later"}]]
+    assert journal.read_text() == ""
+
+
+@pytest.mark.parametrize(("interval", "max_operations", "count"), [(0.2, 100, 1), (30, 3, 3)])
+def test_background_flush(interval, max_operations, count):
+    """Test that the queue is flushed once the interval is over, or once enough mutations are queued."""
+    apply = FakeBatch(fail_tasks={"task0"})
+    queue = WriteBehindQueue(interval=interval, max_operations=max_operations, apply=apply)
+    queue.start()
+    try:
+        start = time.monotonic()
+        for index in range(count):
+            queue.complete_task(f"task{index}")
+        assert apply.applied.wait(5)
+        assert time.monotonic() - start < 2
+    finally:
+        queue.stop()
+    assert len(apply.batches[0]) == count
+    assert [failure["task_id"] for failure in queue.take_failures()] == ["task0"]
+    assert queue.take_failures() == []
+
+
+def test_batch_update_tasks_create(sample_database):
+    """Test that a batch can create a task and refer to it by its placeholder id."""
+    results = batch_update_tasks(
+        [
+            {"task_id": "new", "action": "create", "name": "Water plants", "note": "Balcony", "flagged": True},
+            {"task_id": "new", "action": "complete"},
+            {"task_id": "x", "action": "create"},
+        ]
+    )
+
+    assert results[0]["success"] and results[1]["success"]
+    assert results[0]["task"]["name"] == "Water plants" and results[0]["task"]["flagged"] is True
+    assert results[1]["task"]["completed"] is True
+    assert results[2]["error"] == "A name is required to create a task"
+
+
+def test_journal_belongs_to_one_queue(tmp_path):
+    """Test that queues of servers running at once on the same journal never apply each other's mutations."""
+    journal = tmp_path / "journal.jsonl"
+    first, second = FakeBatch(), FakeBatch()
+    running = WriteBehindQueue(journal, apply=first)
+    other = WriteBehindQueue(journal, apply=second)
+    assert running.stats()["journal"] == str(journal)
+    assert other.stats()["journal"] != str(journal)
+
+    running.complete_task("a")
+    other.complete_task("b")
+    other.drop_task("c")
+    running.flush()
+    # The flush of one queue does not cut back the journal of the other
+    assert other.pending() == 2
+    assert first.batches == [[{"task_id": "a", "action": "complete"}]]
+
+    running.update_task("d", task_note="later")
+    other.stop(flush=False)  # Gone without applying its mutations
+    third = FakeBatch()
+    restarted = WriteBehindQueue(journal, apply=third)
+    # The mutations of the server that is gone are queued again, those of the running one are not
+    assert restarted.pending() == 2
+    restarted.flush()
+    assert third.batches == [[{"task_id": "b", "action": "complete"}, {"task_id": "c", "action": "drop"}]]
+    assert running.pending() == 1
+
+    restarted.stop()
+    running.stop()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["journal.jsonl", "journal.jsonl.lock"]
+    assert second.batches == []